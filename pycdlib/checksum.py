@@ -0,0 +1,320 @@
+# Copyright (C) 2026  The PyCdlib developers
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation;
+# version 2.1 of the License.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Checksum routines used by PyCdlib.
+
+Every checksum has a pure Python reference implementation, which is the
+definition of the checksum, and faster implementations built on C-backed
+primitives from the standard library (and NumPy, if it is installed).  The
+module level functions crc_ccitt, byte_sum, word16_sum, and word32_sum are
+bound to the fastest available backend; set_backend can select another one.
+'''
+
+from __future__ import absolute_import
+
+import array
+import binascii
+import struct
+import sys
+
+try:
+    import numpy  # pylint: disable=import-error
+except ImportError:
+    numpy = None
+
+import pycdlib.pycdlibexception as pycdlibexception
+
+# This is the CRC CCITT table generated with a polynomial of 0x11021 and
+# 16-bits.  The following code will re-generate the table:
+#
+# def _bytecrc(crc, poly, n):
+#    mask = 1<<(n-1)
+#    for i in range(8):
+#        if crc & mask:
+#            crc = (crc << 1) ^ poly
+#        else:
+#            crc = crc << 1
+#    mask = (1<<n) - 1
+#    crc = crc & mask
+#    return crc
+#
+# def _mkTable(poly, n):
+#    mask = (1<<n) - 1
+#    poly = poly & mask
+#    table = [_bytecrc(i<<(n-8),poly,n) for i in range(256)]
+#    return table
+_crc_ccitt_table = (0, 4129, 8258, 12387, 16516, 20645, 24774, 28903, 33032,
+                    37161, 41290, 45419, 49548, 53677, 57806, 61935, 4657, 528,
+                    12915, 8786, 21173, 17044, 29431, 25302, 37689, 33560, 45947,
+                    41818, 54205, 50076, 62463, 58334, 9314, 13379, 1056, 5121,
+                    25830, 29895, 17572, 21637, 42346, 46411, 34088, 38153,
+                    58862, 62927, 50604, 54669, 13907, 9842, 5649, 1584, 30423,
+                    26358, 22165, 18100, 46939, 42874, 38681, 34616, 63455, 59390,
+                    55197, 51132, 18628, 22757, 26758, 30887, 2112, 6241, 10242,
+                    14371, 51660, 55789, 59790, 63919, 35144, 39273, 43274, 47403,
+                    23285, 19156, 31415, 27286, 6769, 2640, 14899, 10770, 56317,
+                    52188, 64447, 60318, 39801, 35672, 47931, 43802, 27814, 31879,
+                    19684, 23749, 11298, 15363, 3168, 7233, 60846, 64911, 52716,
+                    56781, 44330, 48395, 36200, 40265, 32407, 28342, 24277, 20212,
+                    15891, 11826, 7761, 3696, 65439, 61374, 57309, 53244, 48923,
+                    44858, 40793, 36728, 37256, 33193, 45514, 41451, 53516, 49453,
+                    61774, 57711, 4224, 161, 12482, 8419, 20484, 16421, 28742,
+                    24679, 33721, 37784, 41979, 46042, 49981, 54044, 58239, 62302,
+                    689, 4752, 8947, 13010, 16949, 21012, 25207, 29270, 46570,
+                    42443, 38312, 34185, 62830, 58703, 54572, 50445, 13538, 9411,
+                    5280, 1153, 29798, 25671, 21540, 17413, 42971, 47098, 34713,
+                    38840, 59231, 63358, 50973, 55100, 9939, 14066, 1681, 5808,
+                    26199, 30326, 17941, 22068, 55628, 51565, 63758, 59695,
+                    39368, 35305, 47498, 43435, 22596, 18533, 30726, 26663, 6336,
+                    2273, 14466, 10403, 52093, 56156, 60223, 64286, 35833, 39896,
+                    43963, 48026, 19061, 23124, 27191, 31254, 2801, 6864, 10931,
+                    14994, 64814, 60687, 56684, 52557, 48554, 44427, 40424, 36297,
+                    31782, 27655, 23652, 19525, 15522, 11395, 7392, 3265, 61215,
+                    65342, 53085, 57212, 44955, 49082, 36825, 40952, 28183, 32310,
+                    20053, 24180, 11923, 16050, 3793, 7920)
+
+# The array typecode for unsigned 32-bit integers; 'I' is 4 bytes on every
+# common platform, but the C standard only promises 2.
+_WORD32_TYPECODE = 'I' if array.array('I').itemsize == 4 else 'L'
+
+# Below this many bytes, the overhead of setting up a NumPy array is larger
+# than what it saves.
+_NUMPY_THRESHOLD = 4096
+
+
+def _byte_values(data):
+    '''
+    Internal function to get the byte values of a string of data on both
+    Python 2 and Python 3.
+
+    Parameters:
+     data - The data to get the byte values of.
+    Returns:
+     A bytearray of the data.
+    '''
+    if isinstance(data, bytearray):
+        return data
+    return bytearray(data)
+
+
+def crc_ccitt_reference(data):
+    '''
+    Calculate the CRC over a range of bytes using the CCITT polynomial, one
+    byte at a time.  This is the reference implementation.
+
+    Parameters:
+     data - The array of bytes to calculate the CRC over.
+    Returns:
+     The CCITT CRC of the data.
+    '''
+    crc = 0
+    for x in _byte_values(data):
+        crc = _crc_ccitt_table[x ^ ((crc >> 8) & 0xFF)] ^ ((crc << 8) & 0xFF00)
+
+    return crc
+
+
+def byte_sum_reference(data):
+    '''
+    Calculate the sum of all of the bytes of the data, one byte at a time.
+    This is the reference implementation.
+
+    Parameters:
+     data - The data to sum.
+    Returns:
+     The sum of the bytes.
+    '''
+    total = 0
+    for x in _byte_values(data):
+        total += x
+
+    return total
+
+
+def word16_sum_reference(data):
+    '''
+    Calculate the sum, modulo 2^16, of the data taken as little-endian 16-bit
+    words, one word at a time.  This is the reference implementation.
+
+    Parameters:
+     data - The data to sum; its length must be a multiple of 2.
+    Returns:
+     The sum of the words.
+    '''
+    values = _byte_values(data)
+    total = 0
+    for i in range(0, len(values), 2):
+        total = (total + values[i] + (values[i + 1] << 8)) & 0xffff
+
+    return total
+
+
+def word32_sum_reference(data):
+    '''
+    Calculate the sum, modulo 2^32, of the data taken as little-endian 32-bit
+    words, one word at a time.  This is the reference implementation.
+
+    Parameters:
+     data - The data to sum; its length must be a multiple of 4.
+    Returns:
+     The sum of the words.
+    '''
+    total = 0
+    for i in range(0, len(data), 4):
+        total = (total + struct.unpack_from('<L', data, i)[0]) & 0xffffffff
+
+    return total
+
+
+def _crc_ccitt_stdlib(data):
+    '''
+    Calculate the CCITT CRC with binascii, which implements exactly this CRC
+    (as used by the XMODEM and BinHex 4 formats) in C.
+
+    Parameters:
+     data - The array of bytes to calculate the CRC over.
+    Returns:
+     The CCITT CRC of the data.
+    '''
+    return binascii.crc_hqx(data, 0)
+
+
+def _byte_sum_stdlib(data):
+    '''
+    Calculate the sum of all of the bytes of the data, letting sum() iterate
+    over a bytearray in C.
+
+    Parameters:
+     data - The data to sum.
+    Returns:
+     The sum of the bytes.
+    '''
+    return sum(_byte_values(data))
+
+
+def _word_array(typecode, data):
+    '''
+    Internal function to view the data as an array of little-endian words.
+
+    Parameters:
+     typecode - The array typecode of the words.
+     data - The data to convert.
+    Returns:
+     An array of the words, in native byte order.
+    '''
+    words = array.array(typecode, bytes(data))
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+
+def _word16_sum_stdlib(data):
+    '''
+    Calculate the sum, modulo 2^16, of the data taken as little-endian 16-bit
+    words using an array.
+
+    Parameters:
+     data - The data to sum; its length must be a multiple of 2.
+    Returns:
+     The sum of the words.
+    '''
+    return sum(_word_array('H', data)) & 0xffff
+
+
+def _word32_sum_stdlib(data):
+    '''
+    Calculate the sum, modulo 2^32, of the data taken as little-endian 32-bit
+    words using an array.
+
+    Parameters:
+     data - The data to sum; its length must be a multiple of 4.
+    Returns:
+     The sum of the words.
+    '''
+    return sum(_word_array(_WORD32_TYPECODE, data)) & 0xffffffff
+
+
+def _word32_sum_numpy(data):
+    '''
+    Calculate the sum, modulo 2^32, of the data taken as little-endian 32-bit
+    words with NumPy, falling back to the standard library for small data.
+
+    Parameters:
+     data - The data to sum; its length must be a multiple of 4.
+    Returns:
+     The sum of the words.
+    '''
+    if len(data) < _NUMPY_THRESHOLD:
+        return _word32_sum_stdlib(data)
+    words = numpy.frombuffer(data, dtype='<u4')
+    return int(words.sum(dtype=numpy.uint64)) & 0xffffffff
+
+
+_BACKENDS = {
+    'reference': (crc_ccitt_reference, byte_sum_reference,
+                  word16_sum_reference, word32_sum_reference),
+    'stdlib': (_crc_ccitt_stdlib, _byte_sum_stdlib, _word16_sum_stdlib,
+               _word32_sum_stdlib),
+}
+if numpy is not None:
+    _BACKENDS['numpy'] = (_crc_ccitt_stdlib, _byte_sum_stdlib,
+                          _word16_sum_stdlib, _word32_sum_numpy)
+
+
+def backends():
+    '''
+    Get the names of the checksum backends available on this system.
+
+    Parameters:
+     None.
+    Returns:
+     A sorted list of the names of the available backends.
+    '''
+    return sorted(_BACKENDS)
+
+
+def get_backend():
+    '''
+    Get the name of the backend used by the module level checksum functions.
+
+    Parameters:
+     None.
+    Returns:
+     The name of the current backend.
+    '''
+    return _current_backend
+
+
+def set_backend(name):
+    '''
+    Select the implementation used by the module level checksum functions.
+
+    Parameters:
+     name - The name of the backend; one of the names returned by backends().
+    Returns:
+     Nothing.
+    '''
+    global crc_ccitt, byte_sum, word16_sum, word32_sum, _current_backend  # pylint: disable=global-statement,invalid-name
+    if name not in _BACKENDS:
+        raise pycdlibexception.PyCdlibInvalidInput('Unknown checksum backend %s; must be one of %s' % (name, ', '.join(backends())))
+    (crc_ccitt, byte_sum, word16_sum, word32_sum) = _BACKENDS[name]
+    _current_backend = name
+
+
+crc_ccitt = byte_sum = word16_sum = word32_sum = None
+_current_backend = None
+set_backend('numpy' if numpy is not None else 'stdlib')
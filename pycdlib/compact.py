@@ -0,0 +1,715 @@
+# Copyright (C) 2026  The PyCdlib developers
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation;
+# version 2.1 of the License.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+A compact, read-only, column-oriented store of the directory records of one
+namespace of an ISO.
+'''
+
+from __future__ import absolute_import
+
+import array
+import collections
+
+import pycdlib.dates as dates
+import pycdlib.dr as dr
+import pycdlib.pycdlibexception as pycdlibexception
+import pycdlib.utils as utils
+
+# The typecode used for the columns holding 32-bit on-disk values; 'I' is
+# 4 bytes on every platform we care about, but the C standard only promises 2.
+_U32 = 'I' if array.array('I').itemsize >= 4 else 'L'
+
+# The typecode used for the columns holding indices and blob offsets.
+_INDEX = 'L'
+
+# The internal per-entry flags.
+_FLAG_DIR = 0x1
+_FLAG_RR = 0x2
+_FLAG_SYMLINK = 0x4
+_FLAG_CONTINUATION = 0x8
+
+# The length of a packed Directory Record date.
+_DATE_LENGTH = 7
+
+
+class CompactRecord(object):
+    '''
+    A class that is a lightweight view of a single entry in a CompactTree.  The
+    common read-only parts of the dr.DirectoryRecord API are answered straight
+    out of the columns of the tree; any other attribute is looked up on the
+    real dr.DirectoryRecord, which is parsed from the ISO the first time it is
+    needed.
+    '''
+    __slots__ = ('_tree', '_index')
+
+    def __init__(self, tree, index):
+        self._tree = tree
+        self._index = index
+
+    def __eq__(self, other):
+        return isinstance(other, CompactRecord) and self._tree is other._tree and self._index == other._index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self._tree), self._index))
+
+    def __repr__(self):
+        return 'CompactRecord(%r)' % (self.full_path())
+
+    def __getattr__(self, name):
+        # Only called for attributes that are not answered by the columns;
+        # fall back to the full Directory Record.
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.directory_record(), name)
+
+    def file_identifier(self):
+        '''
+        A method to get the identifier of this entry.
+
+        Parameters:
+         None.
+        Returns:
+         String representing the identifier of this entry.
+        '''
+        if self._index == 0:
+            return b'/'
+        return self._tree._ident(self._index)  # pylint: disable=protected-access
+
+    def name(self):
+        '''
+        A method to get the name of this entry in the namespace of the tree;
+        this is the Rock Ridge name for the 'rr' namespace, and the file
+        identifier otherwise.
+
+        Parameters:
+         None.
+        Returns:
+         String representing the name of this entry.
+        '''
+        return self._tree._name(self._index)  # pylint: disable=protected-access
+
+    def is_dir(self):
+        '''
+        A method to determine whether this entry is a directory.
+
+        Parameters:
+         None.
+        Returns:
+         True if this entry is a directory, False otherwise.
+        '''
+        return bool(self._tree._flags[self._index] & _FLAG_DIR)  # pylint: disable=protected-access
+
+    def is_file(self):
+        '''
+        A method to determine whether this entry is a file.
+
+        Parameters:
+         None.
+        Returns:
+         True if this entry is a file, False otherwise.
+        '''
+        return not self.is_dir()
+
+    def is_symlink(self):
+        '''
+        A method to determine whether this entry is a Rock Ridge symlink.
+
+        Parameters:
+         None.
+        Returns:
+         True if this entry is a symlink, False otherwise.
+        '''
+        return bool(self._tree._flags[self._index] & _FLAG_SYMLINK)  # pylint: disable=protected-access
+
+    def is_dot(self):
+        '''
+        A method to determine whether this entry is a 'dot' entry.  The tree
+        never stores 'dot' entries, so this is always False.
+
+        Parameters:
+         None.
+        Returns:
+         False.
+        '''
+        return False
+
+    def is_dotdot(self):
+        '''
+        A method to determine whether this entry is a 'dotdot' entry.  The
+        tree never stores 'dotdot' entries, so this is always False.
+
+        Parameters:
+         None.
+        Returns:
+         False.
+        '''
+        return False
+
+    def extent_location(self):
+        '''
+        A method to get the location of this entry on the ISO.
+
+        Parameters:
+         None.
+        Returns:
+         Extent location of this entry on the ISO.
+        '''
+        return self._tree._extents[self._index]  # pylint: disable=protected-access
+
+    def get_data_length(self):
+        '''
+        A method to get the length of the data that this entry points to.
+        As with dr.DirectoryRecord, this is the length of this one extent of
+        a file that is split across several directory records.
+
+        Parameters:
+         None.
+        Returns:
+         The length of the data that this entry points to.
+        '''
+        return self._tree._lengths[self._index]  # pylint: disable=protected-access
+
+    @property
+    def file_flags(self):
+        '''
+        The ISO9660 file flags of this entry.
+        '''
+        return self._tree._file_flags[self._index]  # pylint: disable=protected-access
+
+    @property
+    def date(self):
+        '''
+        The dates.DirectoryRecordDate of this entry.
+        '''
+        return self._tree._date(self._index)  # pylint: disable=protected-access
+
+    @property
+    def parent(self):
+        '''
+        The CompactRecord of the parent directory of this entry, or None for
+        the root.
+        '''
+        if self._index == 0:
+            return None
+        return CompactRecord(self._tree, self._tree._parents[self._index])  # pylint: disable=protected-access
+
+    def has_rock_ridge(self):
+        '''
+        A method to determine whether this entry has Rock Ridge extensions.
+
+        Parameters:
+         None.
+        Returns:
+         True if this entry has Rock Ridge extensions, False otherwise.
+        '''
+        return bool(self._tree._flags[self._index] & _FLAG_RR)  # pylint: disable=protected-access
+
+    def file_mode(self):
+        '''
+        A method to get the Rock Ridge POSIX file mode of this entry.
+
+        Parameters:
+         None.
+        Returns:
+         The POSIX file mode bits of this entry.
+        '''
+        return self._tree._posix(self._index)[0]  # pylint: disable=protected-access
+
+    def file_links(self):
+        '''
+        A method to get the Rock Ridge POSIX link count of this entry.
+
+        Parameters:
+         None.
+        Returns:
+         The POSIX link count of this entry.
+        '''
+        return self._tree._posix(self._index)[1]  # pylint: disable=protected-access
+
+    def user_id(self):
+        '''
+        A method to get the Rock Ridge POSIX user ID of this entry.
+
+        Parameters:
+         None.
+        Returns:
+         The POSIX user ID of this entry.
+        '''
+        return self._tree._posix(self._index)[2]  # pylint: disable=protected-access
+
+    def group_id(self):
+        '''
+        A method to get the Rock Ridge POSIX group ID of this entry.
+
+        Parameters:
+         None.
+        Returns:
+         The POSIX group ID of this entry.
+        '''
+        return self._tree._posix(self._index)[3]  # pylint: disable=protected-access
+
+    def symlink_path(self):
+        '''
+        A method to get the target of this Rock Ridge symlink.
+
+        Parameters:
+         None.
+        Returns:
+         Symlink path as a string.
+        '''
+        return self._tree._symlink(self._index)  # pylint: disable=protected-access
+
+    def full_path(self):
+        '''
+        A method to get the absolute path of this entry in the namespace of
+        the tree.
+
+        Parameters:
+         None.
+        Returns:
+         The absolute path of this entry as a string.
+        '''
+        return self._tree._full_path(self._index)  # pylint: disable=protected-access
+
+    def children(self):
+        '''
+        A method to get the entries of this directory.
+
+        Parameters:
+         None.
+        Returns:
+         A list of CompactRecord objects, one per entry of this directory.
+        '''
+        return self._tree._children(self._index)  # pylint: disable=protected-access
+
+    def directory_record(self):
+        '''
+        A method to get the full dr.DirectoryRecord of this entry from the
+        PyCdlib object that the tree was built from.
+
+        Parameters:
+         None.
+        Returns:
+         The dr.DirectoryRecord object of this entry.
+        '''
+        return self._tree._directory_record(self._index)  # pylint: disable=protected-access
+
+
+class CompactTree(object):
+    '''
+    A class that keeps the directory records of one namespace of an ISO in a
+    set of array-backed columns, with the names and symlink targets packed
+    into byte blobs that are indexed by offset tables.  The directories are
+    stored breadth-first, so the entries of each directory are contiguous.
+    Entries are handed out as CompactRecord objects, which only hold an index
+    into the columns.  The tree is a snapshot of the directory records on the
+    opened ISO, so changes made to the PyCdlib object afterwards are not
+    reflected in it.  As in the full tree, a directory relocated by Rock Ridge
+    appears both at the location its child link points from and under the
+    relocation directory where it is physically recorded.
+    '''
+    __slots__ = ('_iso', '_fp', '_namespace', '_block_size', '_parents',
+                 '_child_starts', '_child_ends', '_extents', '_lengths',
+                 '_file_flags', '_flags', '_dates', '_idents',
+                 '_ident_offsets', '_rr_names', '_rr_name_offsets', '_modes',
+                 '_links', '_uids', '_gids', '_symlinks', '_symlink_offsets')
+
+    def __init__(self, iso, fp, vd, namespace):
+        self._iso = iso
+        self._fp = fp
+        self._namespace = namespace
+        self._block_size = vd.logical_block_size()
+        self._parents = array.array(_INDEX)
+        self._child_starts = array.array(_INDEX)
+        self._child_ends = array.array(_INDEX)
+        self._extents = array.array(_U32)
+        self._lengths = array.array(_U32)
+        self._file_flags = array.array('B')
+        self._flags = array.array('B')
+        self._dates = bytearray()
+        self._idents = bytearray()
+        self._ident_offsets = array.array(_INDEX, [0])
+        self._rr_names = bytearray()
+        self._rr_name_offsets = array.array(_INDEX, [0])
+        self._modes = array.array(_U32)
+        self._links = array.array(_U32)
+        self._uids = array.array(_U32)
+        self._gids = array.array(_U32)
+        self._symlinks = bytearray()
+        self._symlink_offsets = array.array(_INDEX, [0])
+
+        self._build(vd)
+
+    def _append(self, parent, rec, extent, length, flags):
+        '''
+        An internal method to add the columns of one directory record to the
+        tree.
+
+        Parameters:
+         parent - The index of the parent directory of the entry.
+         rec - The dr.DirectoryRecord to add.
+         extent - The extent that the data of the entry starts at.
+         length - The length of the data of the entry.
+         flags - The internal flags of the entry.
+        Returns:
+         The index of the new entry.
+        '''
+        index = len(self._parents)
+        self._parents.append(parent)
+        self._child_starts.append(0)
+        self._child_ends.append(0)
+        self._extents.append(extent)
+        self._lengths.append(length)
+        self._file_flags.append(rec.file_flags)
+        self._dates += rec.date.record()
+
+        if rec.is_root:
+            self._ident_offsets.append(len(self._idents))
+        else:
+            self._idents += rec.file_ident
+            self._ident_offsets.append(len(self._idents))
+
+        mode = links = uid = gid = 0
+        rr = rec.rock_ridge
+        if rr is not None:
+            flags |= _FLAG_RR
+            self._rr_names += rr.name()
+            px_record = rr.dr_entries.px_record
+            if px_record is None:
+                px_record = rr.ce_entries.px_record
+            if px_record is not None:
+                mode = px_record.posix_file_mode
+                links = px_record.posix_file_links
+                uid = px_record.posix_user_id
+                gid = px_record.posix_group_id
+            if rr.is_symlink():
+                flags |= _FLAG_SYMLINK
+                self._symlinks += rr.symlink_path()
+        self._rr_name_offsets.append(len(self._rr_names))
+        self._symlink_offsets.append(len(self._symlinks))
+        self._modes.append(mode)
+        self._links.append(links)
+        self._uids.append(uid)
+        self._gids.append(gid)
+        self._flags.append(flags)
+
+        return index
+
+    def _parse_record(self, vd, data, parent):
+        '''
+        An internal method to parse a single directory record, including any
+        Rock Ridge entries in its continuation area.
+
+        Parameters:
+         vd - The volume descriptor the record belongs to.
+         data - The bytes of the record.
+         parent - The dr.DirectoryRecord of the directory holding the record.
+        Returns:
+         The parsed dr.DirectoryRecord.
+        '''
+        rec = dr.DirectoryRecord()
+        rec.parse(vd, data, parent)
+        rr = rec.rock_ridge
+        if rr is not None and rr.dr_entries.ce_record is not None:
+            ce_record = rr.dr_entries.ce_record
+            con_block = utils.pread(self._fp, ce_record.len_cont_area,
+                                    ce_record.bl_cont_area * self._block_size + ce_record.offset_cont_area)
+            rr.parse(con_block, False, rr.bytes_to_skip, True)
+        return rec
+
+    def _build(self, vd):
+        '''
+        An internal method to read all of the directory records of the volume
+        descriptor into the columns.  Only the records of the directories that
+        are still waiting to be read are alive at any one time.
+
+        Parameters:
+         vd - The volume descriptor to read the directory records of.
+        Returns:
+         Nothing.
+        '''
+        root = vd.root_directory_record()
+        self._append(0, root, root.orig_extent_loc, root.get_data_length(),
+                     _FLAG_DIR)
+
+        pending = collections.deque([(0, root.orig_extent_loc,
+                                      root.get_data_length(), root)])
+        while pending:
+            index, extent, length, dir_record = pending.popleft()
+            self._child_starts[index] = len(self._parents)
+            data = utils.pread(self._fp, length, extent * self._block_size)
+            last_ident = None
+            offset = 0
+            while offset < length:
+                if offset > (len(data) - 1):
+                    raise pycdlibexception.PyCdlibInvalidISO('Invalid directory record')
+                lenbyte = bytearray([data[offset]])[0]
+                if lenbyte == 0:
+                    # Padding up to the end of this extent.
+                    offset += self._block_size - (offset % self._block_size)
+                    continue
+
+                rec = self._parse_record(vd, data[offset:offset + lenbyte],
+                                         dir_record)
+                offset += lenbyte
+
+                if rec.is_dot() or rec.is_dotdot():
+                    continue
+
+                # Relocated directories are stored both where their child
+                # link points to and where they physically are (in the
+                # relocation directory), just like in the full tree.
+                rr = rec.rock_ridge
+                flags = 0
+                child_extent = rec.extent_location()
+                child_length = rec.get_data_length()
+                if rr is not None and rr.child_link_record_exists():
+                    # The size of a relocated directory is only recorded in
+                    # its own 'dot' entry.
+                    flags |= _FLAG_DIR
+                    child_extent = rr.child_link_extent()
+                    dot_data = utils.pread(self._fp, self._block_size,
+                                           child_extent * self._block_size)
+                    dot = self._parse_record(vd, dot_data[:bytearray([dot_data[0]])[0]],
+                                             rec)
+                    child_length = dot.get_data_length()
+                elif rec.is_dir():
+                    flags |= _FLAG_DIR
+                elif last_ident == rec.file_ident:
+                    # A file with more than one extent has a directory record
+                    # per extent, all with the same name.
+                    flags |= _FLAG_CONTINUATION
+
+                new_index = self._append(index, rec, child_extent,
+                                         child_length, flags)
+                if flags & _FLAG_DIR:
+                    last_ident = None
+                    pending.append((new_index, child_extent, child_length, rec))
+                else:
+                    last_ident = rec.file_ident
+
+            self._child_ends[index] = len(self._parents)
+
+    def __len__(self):
+        return len(self._parents)
+
+    def _ident(self, index):
+        '''
+        An internal method to get the file identifier of an entry.
+
+        Parameters:
+         index - The index of the entry.
+        Returns:
+         The file identifier of the entry.
+        '''
+        return bytes(self._idents[self._ident_offsets[index]:self._ident_offsets[index + 1]])
+
+    def _name(self, index):
+        '''
+        An internal method to get the name of an entry in the namespace of the
+        tree.
+
+        Parameters:
+         index - The index of the entry.
+        Returns:
+         The name of the entry.
+        '''
+        if self._namespace == 'rr' and self._flags[index] & _FLAG_RR:
+            return bytes(self._rr_names[self._rr_name_offsets[index]:self._rr_name_offsets[index + 1]])
+        return self._ident(index)
+
+    def _date(self, index):
+        '''
+        An internal method to get the date of an entry.
+
+        Parameters:
+         index - The index of the entry.
+        Returns:
+         A dates.DirectoryRecordDate object.
+        '''
+        date = dates.DirectoryRecordDate()
+        date.parse(bytes(self._dates[index * _DATE_LENGTH:(index + 1) * _DATE_LENGTH]))
+        return date
+
+    def _posix(self, index):
+        '''
+        An internal method to get the Rock Ridge POSIX attributes of an entry.
+
+        Parameters:
+         index - The index of the entry.
+        Returns:
+         A tuple of (mode, links, user ID, group ID).
+        '''
+        if not self._flags[index] & _FLAG_RR:
+            raise pycdlibexception.PyCdlibInvalidInput('Entry has no Rock Ridge attributes')
+        return (self._modes[index], self._links[index], self._uids[index],
+                self._gids[index])
+
+    def _symlink(self, index):
+        '''
+        An internal method to get the symlink target of an entry.
+
+        Parameters:
+         index - The index of the entry.
+        Returns:
+         The symlink target of the entry.
+        '''
+        if not self._flags[index] & _FLAG_SYMLINK:
+            raise pycdlibexception.PyCdlibInvalidInput('Entry is not a symlink!')
+        return bytes(self._symlinks[self._symlink_offsets[index]:self._symlink_offsets[index + 1]])
+
+    def _full_path(self, index):
+        '''
+        An internal method to get the absolute path of an entry.
+
+        Parameters:
+         index - The index of the entry.
+        Returns:
+         The absolute path of the entry as a string.
+        '''
+        encoding = 'utf-16_be' if self._namespace == 'joliet' else 'utf-8'
+        names = []
+        while index != 0:
+            names.append(self._name(index).decode(encoding))
+            index = self._parents[index]
+        return '/' + '/'.join(reversed(names))
+
+    def _children(self, index):
+        '''
+        An internal method to get the entries of a directory.  The extra
+        directory records of files with more than one extent are left out.
+
+        Parameters:
+         index - The index of the directory.
+        Returns:
+         A list of CompactRecord objects.
+        '''
+        if not self._flags[index] & _FLAG_DIR:
+            raise pycdlibexception.PyCdlibInvalidInput('Record is not a directory!')
+        return [CompactRecord(self, i) for i in range(self._child_starts[index], self._child_ends[index])
+                if not self._flags[i] & _FLAG_CONTINUATION]
+
+    def _lookup(self, path):
+        '''
+        An internal method to find the index of the entry at a path.
+
+        Parameters:
+         path - The absolute path to look up in the namespace of the tree.
+        Returns:
+         The index of the entry.
+        '''
+        path = utils.normpath(path)
+        if not utils.starts_with_slash(path):
+            raise pycdlibexception.PyCdlibInvalidInput('Must be a path starting with /')
+
+        encoding = 'utf-16_be' if self._namespace == 'joliet' else 'utf-8'
+        index = 0
+        for comp in utils.split_path(path):
+            if not comp:
+                continue
+            if not self._flags[index] & _FLAG_DIR:
+                raise pycdlibexception.PyCdlibInvalidInput('Could not find path %s' % (path))
+            name = comp.decode('utf-8').encode(encoding)
+            for i in range(self._child_starts[index], self._child_ends[index]):
+                if not self._flags[i] & _FLAG_CONTINUATION and self._name(i) == name:
+                    index = i
+                    break
+            else:
+                raise pycdlibexception.PyCdlibInvalidInput('Could not find path %s' % (path))
+        return index
+
+    def _directory_record(self, index):
+        '''
+        An internal method to get the full directory record of an entry from
+        the PyCdlib object.
+
+        Parameters:
+         index - The index of the entry.
+        Returns:
+         The dr.DirectoryRecord object of the entry.
+        '''
+        key = {'iso9660': 'iso_path', 'rr': 'rr_path', 'joliet': 'joliet_path'}[self._namespace]
+        return self._iso.get_record(**{key: self._full_path(index)})
+
+    def get_record(self, path):
+        '''
+        Get the entry at a path.
+
+        Parameters:
+         path - The absolute path in the namespace of the tree.
+        Returns:
+         A CompactRecord object for the entry.
+        '''
+        return CompactRecord(self, self._lookup(path))
+
+    def list_children(self, path):
+        '''
+        Generate the entries of a directory.  Unlike PyCdlib.list_children,
+        the 'dot' and 'dotdot' entries are not included.
+
+        Parameters:
+         path - The absolute path of the directory in the namespace of the
+                tree.
+        Yields:
+         CompactRecord objects for the entries of the directory.
+        Returns:
+         Nothing.
+        '''
+        for child in self._children(self._lookup(path)):
+            yield child
+
+    def walk(self):
+        '''
+        Generate every entry of the tree, parents before their children.
+
+        Parameters:
+         None.
+        Yields:
+         CompactRecord objects for every entry, starting with the root.
+        Returns:
+         Nothing.
+        '''
+        for index in range(len(self._parents)):
+            if not self._flags[index] & _FLAG_CONTINUATION:
+                yield CompactRecord(self, index)
+
+    def get_file_from_iso_fp(self, outfp, path, blocksize=8192):
+        '''
+        Copy the data of a file straight from the ISO into a file object.
+
+        Parameters:
+         outfp - The file object to write data to.
+         path - The absolute path of the file in the namespace of the tree.
+         blocksize - The number of bytes in each transfer.
+        Returns:
+         Nothing.
+        '''
+        index = self._lookup(path)
+        if self._flags[index] & _FLAG_DIR:
+            raise pycdlibexception.PyCdlibInvalidInput('Cannot write out a directory')
+        if self._flags[index] & _FLAG_SYMLINK:
+            raise pycdlibexception.PyCdlibInvalidInput('Symlinks have no data associated with them')
+
+        while True:
+            utils.copy_data_from(self._lengths[index], blocksize, self._fp,
+                                 self._extents[index] * self._block_size, outfp)
+            index += 1
+            if index >= len(self._parents) or not self._flags[index] & _FLAG_CONTINUATION:
+                break
@@ -20,6 +20,7 @@ Classes and utilities for ISO date support.
 
 from __future__ import absolute_import
 
+import calendar
 import struct
 import time
 try:
@@ -69,12 +70,16 @@ class DirectoryRecordDate(object):
     tm structure (the new() method).
     '''
     FMT = '=BBBBBBb'
+    _STRUCT = utils.compile_struct(FMT)
 
     __slots__ = ('_initialized', 'years_since_1900', 'month', 'day_of_month',
-                 'hour', 'minute', 'second', 'gmtoffset')
+                 'hour', 'minute', 'second', 'gmtoffset', '_shared',
+                 '_record_cache', '__weakref__')
 
     def __init__(self):
         self._initialized = False
+        self._shared = False
+        self._record_cache = None
 
     def parse(self, datestr):
         '''
@@ -90,7 +95,7 @@ class DirectoryRecordDate(object):
 
         (self.years_since_1900, self.month, self.day_of_month, self.hour,
          self.minute, self.second,
-         self.gmtoffset) = struct.unpack_from(self.FMT, datestr, 0)
+         self.gmtoffset) = self._STRUCT.unpack_from(datestr, 0)
 
         self._initialized = True
 
@@ -130,9 +135,35 @@ class DirectoryRecordDate(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('Directory Record Date not initialized')
 
-        return struct.pack(self.FMT, self.years_since_1900, self.month,
-                           self.day_of_month, self.hour, self.minute,
-                           self.second, self.gmtoffset)
+        if self._record_cache is not None:
+            return self._record_cache
+
+        rec = self._STRUCT.pack(self.years_since_1900, self.month,
+                                self.day_of_month, self.hour, self.minute,
+                                self.second, self.gmtoffset)
+        if self._shared:
+            self._record_cache = rec
+        return rec
+
+    def epoch_seconds(self):
+        '''
+        Return the number of seconds since the Unix epoch (in UTC) that this
+        Directory Record date represents.
+
+        Parameters:
+         None.
+        Returns:
+         The number of seconds since the epoch, or None if the date is unset.
+        '''
+        if not self._initialized:
+            raise pycdlibexception.PyCdlibInternalError('Directory Record Date not initialized')
+
+        if self.month == 0 or self.day_of_month == 0:
+            return None
+
+        return calendar.timegm((self.years_since_1900 + 1900, self.month,
+                                self.day_of_month, self.hour, self.minute,
+                                self.second, 0, 0, 0)) - self.gmtoffset * 15 * 60
 
     def __ne__(self, other):
         return self.years_since_1900 != other.years_since_1900 or self.month != other.month or self.day_of_month != other.day_of_month or self.hour != other.hour or self.minute != other.minute or self.second != other.second or self.gmtoffset != other.gmtoffset
@@ -156,10 +187,12 @@ class VolumeDescriptorDate(object):
 
     __slots__ = ('_initialized', 'year', 'month', 'dayofmonth', 'hour',
                  'minute', 'second', 'hundredthsofsecond', 'gmtoffset',
-                 'date_str')
+                 'date_str', '_shared', '_record_cache', '__weakref__')
 
     def __init__(self):
         self._initialized = False
+        self._shared = False
+        self._record_cache = None
 
     def parse(self, datestr):
         '''
@@ -250,5 +283,27 @@ class VolumeDescriptorDate(object):
 
         self._initialized = True
 
+    def epoch_seconds(self):
+        '''
+        Return the number of seconds since the Unix epoch (in UTC) that this
+        Volume Descriptor Date represents.
+
+        Parameters:
+          None.
+        Returns:
+          The number of seconds since the epoch, or None if the date is not
+          specified.
+        '''
+        if not self._initialized:
+            raise pycdlibexception.PyCdlibInternalError('This Volume Descriptor Date is not yet initialized')
+
+        if self.year == 0:
+            return None
+
+        return calendar.timegm((self.year, self.month, self.dayofmonth,
+                                self.hour, self.minute, self.second, 0, 0,
+                                0)) + self.hundredthsofsecond / 100.0 - self.gmtoffset * 15 * 60
+
     def __ne__(self, other):
         return self.year != other.year or self.month != other.month or self.dayofmonth != other.dayofmonth or self.hour != other.hour or self.minute != other.minute or self.second != other.second or self.hundredthsofsecond != other.hundredthsofsecond or self.gmtoffset != other.gmtoffset or self.date_str != other.date_str
+
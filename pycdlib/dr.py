@@ -21,7 +21,6 @@ The class to support ISO9660 Directory Records.
 from __future__ import absolute_import
 
 import bisect
-import struct
 
 import pycdlib.dates as dates
 import pycdlib.inode as inode
@@ -39,6 +38,7 @@ class XARecord(object):
                  '_filenum')
 
     FMT = '=HHH2sB5s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -56,7 +56,7 @@ class XARecord(object):
             raise pycdlibexception.PyCdlibInternalError('This XARecord is already initialized!')
 
         (self._group_id, self._user_id, self._attributes, signature, self._filenum,
-         unused) = struct.unpack_from(self.FMT, xastr, 0)
+         unused) = self._STRUCT.unpack_from(xastr, 0)
 
         if signature != b'XA':
             raise pycdlibexception.PyCdlibInvalidISO('Invalid signature on the XARecord!')
@@ -97,8 +97,8 @@ class XARecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('This XARecord is not yet initialized!')
 
-        return struct.pack(self.FMT, self._group_id, self._user_id,
-                           self._attributes, b'XA', self._filenum, b'\x00' * 5)
+        return self._STRUCT.pack(self._group_id, self._user_id,
+                                 self._attributes, b'XA', self._filenum, b'\x00' * 5)
 
     @staticmethod
     def length():
@@ -108,14 +108,346 @@ class XARecord(object):
         return 14
 
 
+class DirectoryRecordChildren(object):
+    '''
+    A class to hold the children of a directory Directory Record, in sorted
+    order.  The children are stored as a list of logical blocks, each holding
+    the children whose directory records end up in that block on the ISO.
+    This means that adding or removing a child only has to repack the blocks
+    that actually change, rather than recalculating the location of every
+    child after it.  The object otherwise acts like a read-only list of the
+    children.
+    '''
+    __slots__ = ('_log_block_size', '_blocks', '_used', '_starts', '_len')
+
+    def __init__(self, log_block_size):
+        self._log_block_size = log_block_size
+        self._blocks = []
+        self._used = []
+        # The index of the first child in each block; only the first
+        # len(self._starts) entries are known to be correct.
+        self._starts = []
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for block in self._blocks:
+            for child in block:
+                yield child
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError('child index out of range')
+
+        block_index, pos = self._position_of_index(index)
+        return self._blocks[block_index][pos]
+
+    def _invalidate_from(self, block_index):
+        '''
+        Internal method to forget the start indices of all of the blocks after
+        the given one.
+
+        Parameters:
+         block_index - The block that was modified.
+        Returns:
+         Nothing.
+        '''
+        del self._starts[block_index + 1:]
+
+    def _block_start(self, block_index):
+        '''
+        Internal method to get the index of the first child in a block,
+        computing the start indices up to that block if necessary.
+
+        Parameters:
+         block_index - The block to get the start index for.
+        Returns:
+         The index of the first child in the block.
+        '''
+        starts = self._starts
+        if not starts:
+            starts.append(0)
+        while len(starts) <= block_index:
+            prev = len(starts) - 1
+            starts.append(starts[prev] + len(self._blocks[prev]))
+        return starts[block_index]
+
+    def _position_of_index(self, index):
+        '''
+        Internal method to convert an index into a block index and a position
+        within that block.
+
+        Parameters:
+         index - The index to convert.
+        Returns:
+         A tuple of the block index and the position within the block.
+        '''
+        last = len(self._blocks) - 1
+        if index >= self._len - len(self._blocks[last]):
+            return last, index - (self._len - len(self._blocks[last]))
+
+        self._block_start(last)
+        block_index = bisect.bisect_right(self._starts, index) - 1
+        return block_index, index - self._starts[block_index]
+
+    def _find_block(self, child):
+        '''
+        Internal method to find the first block that the child sorts into.
+
+        Parameters:
+         child - The child to look for.
+        Returns:
+         The index of the first block whose last child is not less than the
+         child, or the last block if there is no such block.
+        '''
+        lo = 0
+        hi = len(self._blocks) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._blocks[mid][-1] < child:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bisect_left(self, child):
+        '''
+        Find the index at which the child would be inserted to keep the
+        children sorted, to the left of any equal children.
+
+        Parameters:
+         child - The child to look for.
+        Returns:
+         The index at which the child would be inserted.
+        '''
+        if not self._blocks:
+            return 0
+
+        block_index = self._find_block(child)
+        pos = bisect.bisect_left(self._blocks[block_index], child)
+        return self._block_start(block_index) + pos
+
+    def _locate(self, child):
+        '''
+        Internal method to find exactly this child object.
+
+        Parameters:
+         child - The child to find.
+        Returns:
+         A tuple of the block index and position within the block, or None if
+         the child is not in this object.
+        '''
+        if not self._blocks:
+            return None
+
+        block_index = self._find_block(child)
+        pos = bisect.bisect_left(self._blocks[block_index], child)
+        # There may be several children that sort equally (for instance, the
+        # directory records of very large files), so look for this exact one.
+        while block_index < len(self._blocks):
+            block = self._blocks[block_index]
+            while pos < len(block):
+                if block[pos] is child:
+                    return block_index, pos
+                if child < block[pos]:
+                    return None
+                pos += 1
+            block_index += 1
+            pos = 0
+
+        return None
+
+    def index(self, child):
+        '''
+        Get the index of exactly this child object.
+
+        Parameters:
+         child - The child to find.
+        Returns:
+         The index of the child, or None if the child is not in this object.
+        '''
+        location = self._locate(child)
+        if location is None:
+            return None
+        return self._block_start(location[0]) + location[1]
+
+    def extents_and_offset(self, child):
+        '''
+        Get the number of extents up to and including the one that the child
+        is in, and the offset into that extent just past the end of the
+        child's directory record.
+
+        Parameters:
+         child - The child to find.
+        Returns:
+         A tuple of the number of extents and the offset, or None if the child
+         is not in this object.
+        '''
+        location = self._locate(child)
+        if location is None:
+            return None
+        block_index, pos = location
+        offset = 0
+        for c in self._blocks[block_index][:pos + 1]:
+            offset += c.dr_len
+        return block_index + 1, offset
+
+    def num_extents(self):
+        '''
+        Get the number of extents needed to hold all of the children.
+
+        Parameters:
+         None.
+        Returns:
+         The number of extents needed to hold all of the children.
+        '''
+        return max(len(self._blocks), 1)
+
+    def last_offset(self):
+        '''
+        Get the offset into the last extent just past the end of the last
+        child's directory record.
+
+        Parameters:
+         None.
+        Returns:
+         The offset into the last extent.
+        '''
+        if not self._used:
+            return 0
+        return self._used[-1]
+
+    def insert(self, index, child):
+        '''
+        Insert a child at the given index.  The caller must ensure that the
+        index keeps the children sorted.
+
+        Parameters:
+         index - The index to insert the child at.
+         child - The child to insert.
+        Returns:
+         Nothing.
+        '''
+        if not self._blocks:
+            self._blocks.append([])
+            self._used.append(0)
+
+        if index >= self._len:
+            block_index = len(self._blocks) - 1
+            pos = len(self._blocks[block_index])
+        else:
+            block_index, pos = self._position_of_index(index)
+            if pos == 0 and block_index > 0:
+                # The child goes between two blocks; it belongs at the end of
+                # the earlier one if it fits there.
+                block_index -= 1
+                pos = len(self._blocks[block_index])
+
+        self._blocks[block_index].insert(pos, child)
+        self._used[block_index] += child.dr_len
+        self._len += 1
+        self._repack(block_index)
+
+    def __delitem__(self, index):
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError('child index out of range')
+
+        block_index, pos = self._position_of_index(index)
+        child = self._blocks[block_index].pop(pos)
+        self._used[block_index] -= child.dr_len
+        self._len -= 1
+
+        if not self._blocks[block_index]:
+            del self._blocks[block_index]
+            del self._used[block_index]
+            pos = 0
+
+        if pos == 0 and block_index > 0:
+            # The first child of the block changed, so it may now fit at the
+            # end of the previous block.
+            block_index -= 1
+        if self._blocks:
+            self._repack(block_index)
+        else:
+            del self._starts[:]
+
+    def _repack(self, block_index):
+        '''
+        Internal method to restore the packing of children into blocks, after
+        the given block (or the first child of the block after it) changed.
+        Each block holds as many children as fit in it, in order, and the
+        repacking stops as soon as a block is left unchanged.
+
+        Parameters:
+         block_index - The first block to repack.
+        Returns:
+         Nothing.
+        '''
+        self._invalidate_from(block_index)
+
+        blocks = self._blocks
+        used = self._used
+        log_block_size = self._log_block_size
+
+        # Both the modified block and the one after it always need checking.
+        force = 2
+        while block_index < len(blocks):
+            block = blocks[block_index]
+            changed = force > 0
+            force -= 1
+
+            # If the block overflowed, push children from the end to the
+            # beginning of the next block.
+            while used[block_index] > log_block_size:
+                if block_index + 1 == len(blocks):
+                    blocks.append([])
+                    used.append(0)
+                child = block.pop()
+                used[block_index] -= child.dr_len
+                blocks[block_index + 1].insert(0, child)
+                used[block_index + 1] += child.dr_len
+                changed = True
+                force = 1
+
+            # If there is now room, pull children from the beginning of the
+            # next block.
+            while block_index + 1 < len(blocks):
+                nextblock = blocks[block_index + 1]
+                if not nextblock:
+                    del blocks[block_index + 1]
+                    del used[block_index + 1]
+                    continue
+                if used[block_index] + nextblock[0].dr_len > log_block_size:
+                    break
+                child = nextblock.pop(0)
+                used[block_index + 1] -= child.dr_len
+                block.append(child)
+                used[block_index] += child.dr_len
+                changed = True
+                force = 1
+
+            if not changed:
+                break
+            block_index += 1
+
+
 class DirectoryRecord(object):
     '''
     A class that represents an ISO9660 directory record.
     '''
-    __slots__ = ('_initialized', 'new_extent_loc', 'ptr', 'extents_to_here',
-                 'offset_to_here', 'xa_pad_size', 'data_continuation', 'vd',
+    __slots__ = ('_initialized', 'new_extent_loc', 'ptr',
+                 'xa_pad_size', 'data_continuation', 'vd',
                  'children', 'rr_children', 'inode', '_printable_name', 'date',
-                 'index_in_parent', 'dr_len', 'xattr_len', 'file_flags',
+                 'dr_len', 'xattr_len', 'file_flags',
                  'file_unit_size', 'interleave_gap_size', 'len_fi', 'isdir',
                  'orig_extent_loc', 'data_length', 'seqnum', 'is_root',
                  'parent', 'rock_ridge', 'xa_record', 'file_ident')
@@ -128,25 +460,23 @@ class DirectoryRecord(object):
     FILE_FLAG_MULTI_EXTENT_BIT = 7
 
     FMT = '=BBLLLL7sBBBHHB'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
         self.new_extent_loc = None
         self.ptr = None
-        self.extents_to_here = 1
-        self.offset_to_here = 0
         self.xa_pad_size = 0
         self.data_continuation = None
         self.children = []
         self.rr_children = []
-        self.index_in_parent = None
         self.is_root = False
         self.isdir = False
         self.rock_ridge = None
         self.xa_record = None
         self.inode = None
 
-    def parse(self, vd, record, parent):
+    def parse(self, vd, record, parent, interned=None):
         '''
         Parse a directory record out of a string.
 
@@ -154,6 +484,8 @@ class DirectoryRecord(object):
          vd - The Volume Descriptor this record is part of.
          record - The string to parse for this record.
          parent - The parent of this record.
+         interned - The utils.InternTable to share identical dates and Rock
+                    Ridge records through, or None to not share them.
         Returns:
          True if this Directory Record has Rock Ridge extensions, False otherwise.
         '''
@@ -168,7 +500,7 @@ class DirectoryRecord(object):
         (self.dr_len, self.xattr_len, extent_location_le, extent_location_be,
          data_length_le, data_length_be_unused, dr_date, self.file_flags,
          self.file_unit_size, self.interleave_gap_size, seqnum_le, seqnum_be,
-         self.len_fi) = struct.unpack_from(self.FMT, record[:33], 0)
+         self.len_fi) = self._STRUCT.unpack_from(record, 0)
 
         # In theory we should have a check here that checks to make sure that
         # the length of the record we were passed in matches the data record
@@ -190,8 +522,7 @@ class DirectoryRecord(object):
             raise pycdlibexception.PyCdlibInvalidISO('Little-endian and big-endian seqnum disagree')
         self.seqnum = seqnum_le
 
-        self.date = dates.DirectoryRecordDate()
-        self.date.parse(dr_date)
+        self.date = utils.parse_record(interned, dates.DirectoryRecordDate, dr_date)
 
         # OK, we've unpacked what we can from the beginning of the string.  Now
         # we have to use the len_fi to get the rest.
@@ -217,7 +548,7 @@ class DirectoryRecord(object):
             self.isdir = True
         else:
             record_offset = 33
-            self.file_ident = record[record_offset:record_offset + self.len_fi]
+            self.file_ident = bytes(record[record_offset:record_offset + self.len_fi])
             record_offset += self.len_fi
             if self.file_flags & (1 << self.FILE_FLAG_DIRECTORY_BIT):
                 self.isdir = True
@@ -258,7 +589,7 @@ class DirectoryRecord(object):
                 self.rock_ridge.parse(record[record_offset:],
                                       is_first_dir_record_of_root,
                                       bytes_to_skip,
-                                      False)
+                                      False, interned)
 
         if self.xattr_len != 0:
             if self.file_flags & (1 << self.FILE_FLAG_RECORD_BIT):
@@ -376,7 +707,7 @@ class DirectoryRecord(object):
         # so we leave it at None.
         self.orig_extent_loc = None
         self.len_fi = len(self.file_ident)
-        self.dr_len = struct.calcsize(self.FMT) + self.len_fi
+        self.dr_len = self._STRUCT.size + self.len_fi
 
         # From Ecma-119, 9.1.6, the file flag bits are:
         #
@@ -586,38 +917,49 @@ class DirectoryRecord(object):
         else:
             self.file_flags &= ~(1 << self.FILE_FLAG_EXISTENCE_BIT)
 
-    def _recalculate_extents_and_offsets(self, index, logical_block_size):
+    def _location_in_parent(self):
         '''
-        Internal method to recalculate the extents and offsets associated with
-        children of this directory record.
+        Internal method to get the number of extents up to and including the
+        one that this Directory Record is in within its parent, and the offset
+        just past the end of this Directory Record in that extent.
 
         Parameters:
-         index - The index at which to start the recalculation.
-         logical_block_size - The block size to use for comparisons.
+         None.
         Returns:
-         A tuple where the first element is the total number of extents required
-         by the children and where the second element is the offset into the
-         last extent currently being used.
+         A tuple of the number of extents and the offset.
         '''
-        if index == 0:
-            dirrecord_offset = 0
-            num_extents = 1
-        else:
-            dirrecord_offset = self.children[index - 1].offset_to_here
-            num_extents = self.children[index - 1].extents_to_here
-
-        for i in range(index, len(self.children)):
-            c = self.children[i]
-            dirrecord_len = c.dr_len
-            if (dirrecord_offset + dirrecord_len) > logical_block_size:
-                num_extents += 1
-                dirrecord_offset = 0
-            dirrecord_offset += dirrecord_len
-            c.extents_to_here = num_extents
-            c.offset_to_here = dirrecord_offset
-            c.index_in_parent = i
-
-        return num_extents, dirrecord_offset
+        if self.parent is None or not self.parent.children:
+            return 1, 0
+
+        location = self.parent.children.extents_and_offset(self)
+        if location is None:
+            return 1, 0
+        return location
+
+    @property
+    def extents_to_here(self):
+        '''
+        The number of extents of the parent up to and including the one this
+        Directory Record is in.
+        '''
+        return self._location_in_parent()[0]
+
+    @property
+    def offset_to_here(self):
+        '''
+        The offset just past the end of this Directory Record in the extent of
+        the parent that it is in.
+        '''
+        return self._location_in_parent()[1]
+
+    @property
+    def index_in_parent(self):
+        '''
+        The index of this Directory Record in the children of its parent.
+        '''
+        if self.parent is None or not self.parent.children:
+            return None
+        return self.parent.children.index(self)
 
     def _add_child(self, child, logical_block_size, allow_duplicate, check_overflow):
         '''
@@ -642,7 +984,10 @@ class DirectoryRecord(object):
         # of a duplicate child.  Thus, to check for duplicates we only need to
         # see if the child to be added is a duplicate with the entry that
         # bisect_left returned.
-        index = bisect.bisect_left(self.children, child)
+        if not self.children:
+            self.children = DirectoryRecordChildren(logical_block_size)
+
+        index = self.children.bisect_left(child)
         if index != len(self.children) and self.children[index].file_ident == child.file_ident:
             if not self.children[index].is_associated_file() and not child.is_associated_file():
                 if not (self.rock_ridge is not None and self.file_identifier() == b'RR_MOVED'):
@@ -666,12 +1011,10 @@ class DirectoryRecord(object):
 
             self.rr_children.insert(rr_index, child)
 
-        # We now have to check if we need to add another logical block.
-        # We have to iterate over the entire list again, because where we
-        # placed this last entry may rearrange the empty spaces in the blocks
-        # that we've already allocated.
-        num_extents, offset_unused = self._recalculate_extents_and_offsets(index,
-                                                                           logical_block_size)
+        # We now have to check if we need to add another logical block.  The
+        # children object keeps track of how the children are packed into
+        # blocks, including any rearranging that the new child caused.
+        num_extents = self.children.num_extents()
 
         overflowed = False
         if check_overflow and (num_extents * logical_block_size > self.data_length):
@@ -762,12 +1105,27 @@ class DirectoryRecord(object):
 
         del self.children[index]
 
-        # We now have to check if we need to remove a logical block.
-        # We have to iterate over the entire list again, because where we
-        # removed this last entry may rearrange the empty spaces in the blocks
-        # that we've already allocated.
-        num_extents, dirrecord_offset = self._recalculate_extents_and_offsets(index,
-                                                                              logical_block_size)
+        if child.rock_ridge is not None and not child.is_dot() and not child.is_dotdot():
+            lo = 0
+            hi = len(self.rr_children)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.rr_children[mid].rock_ridge.name() < child.rock_ridge.name():
+                    lo = mid + 1
+                else:
+                    hi = mid
+            # There may be more than one child with the same Rock Ridge name
+            # (for instance, very long files), so find this exact one.
+            while lo < len(self.rr_children) and self.rr_children[lo] is not child:
+                lo += 1
+            if lo < len(self.rr_children):
+                del self.rr_children[lo]
+
+        # We now have to check if we need to remove a logical block.  The
+        # children object keeps track of how the children are packed into
+        # blocks, including any rearranging that the removal caused.
+        num_extents = self.children.num_extents()
+        dirrecord_offset = self.children.last_offset()
 
         underflow = False
         total_size = (num_extents - 1) * logical_block_size + dirrecord_offset
@@ -915,7 +1273,7 @@ class DirectoryRecord(object):
         self.date = dates.DirectoryRecordDate()
         self.date.new()
 
-        padlen = struct.calcsize(self.FMT) + self.len_fi
+        padlen = self._STRUCT.size + self.len_fi
         padstr = b'\x00' * (padlen % 2)
 
         extent_loc = self._extent_location()
@@ -927,13 +1285,13 @@ class DirectoryRecord(object):
         if self.rock_ridge is not None:
             rr_rec = self.rock_ridge.record_dr_entries()
 
-        outlist = [struct.pack(self.FMT, self.dr_len, self.xattr_len,
-                               extent_loc, utils.swab_32bit(extent_loc),
-                               self.data_length, utils.swab_32bit(self.data_length),
-                               self.date.record(), self.file_flags,
-                               self.file_unit_size, self.interleave_gap_size,
-                               self.seqnum, utils.swab_16bit(self.seqnum),
-                               self.len_fi) + self.file_ident + padstr + xa_rec + rr_rec]
+        outlist = [self._STRUCT.pack(self.dr_len, self.xattr_len,
+                                     extent_loc, utils.swab_32bit(extent_loc),
+                                     self.data_length, utils.swab_32bit(self.data_length),
+                                     self.date.record(), self.file_flags,
+                                     self.file_unit_size, self.interleave_gap_size,
+                                     self.seqnum, utils.swab_16bit(self.seqnum),
+                                     self.len_fi) + self.file_ident + padstr + xa_rec + rr_rec]
 
         outlist.append(b'\x00' * (len(outlist[0]) % 2))
 
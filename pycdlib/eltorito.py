@@ -24,6 +24,7 @@ from __future__ import print_function
 import os
 import struct
 
+import pycdlib.checksum as checksum
 import pycdlib.pycdlibexception as pycdlibexception
 import pycdlib.utils as utils
 
@@ -131,6 +132,7 @@ class EltoritoValidationEntry(object):
     # Offset 0x1e:      Key byte 0x55
     # Offset 0x1f:      Key byte 0xaa
     FMT = '=BBH24sHBB'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -147,22 +149,7 @@ class EltoritoValidationEntry(object):
         Returns:
          The checksum of the data.
         '''
-        def identity(x):
-            '''
-            The identity function so we can use a function for python2/3
-            compatibility.
-            '''
-            return x
-
-        if isinstance(data, str):
-            myord = ord
-        elif isinstance(data, bytes):
-            myord = identity
-        s = 0
-        for i in range(0, len(data), 2):
-            w = myord(data[i]) + (myord(data[i + 1]) << 8)
-            s = (s + w) & 0xffff
-        return s
+        return checksum.word16_sum(data)
 
     def parse(self, valstr):
         '''
@@ -178,7 +165,7 @@ class EltoritoValidationEntry(object):
 
         (header_id, self.platform_id, reserved_unused, self.id_string,
          self.checksum, keybyte1,
-         keybyte2) = struct.unpack_from(self.FMT, valstr, 0)
+         keybyte2) = self._STRUCT.unpack_from(valstr, 0)
 
         if header_id != 1:
             raise pycdlibexception.PyCdlibInvalidISO('El Torito Validation entry header ID not 1')
@@ -226,8 +213,8 @@ class EltoritoValidationEntry(object):
         Returns:
          String representing this El Torito Validation Entry.
         '''
-        return struct.pack(self.FMT, 1, self.platform_id, 0, self.id_string,
-                           self.checksum, 0x55, 0xaa)
+        return self._STRUCT.pack(1, self.platform_id, 0, self.id_string,
+                                 self.checksum, 0x55, 0xaa)
 
     def record(self):
         '''
@@ -273,6 +260,7 @@ class EltoritoEntry(object):
     # Offset 0xc:      Selection criteria type
     # Offset 0xd-0x1f: Selection critera
     FMT = '=BBHBBHLB19s'
+    _STRUCT = utils.compile_struct(FMT)
     MEDIA_NO_EMUL = 0
     MEDIA_12FLOPPY = 1
     MEDIA_144FLOPPY = 2
@@ -298,7 +286,7 @@ class EltoritoEntry(object):
         (self.boot_indicator, self.boot_media_type, self.load_segment,
          self.system_type, unused1, self.sector_count, self.load_rba,
          self.selection_criteria_type,
-         self.selection_criteria) = struct.unpack_from(self.FMT, valstr, 0)
+         self.selection_criteria) = self._STRUCT.unpack_from(valstr, 0)
 
         if self.boot_indicator not in (0x88, 0x00):
             raise pycdlibexception.PyCdlibInvalidISO('Invalid eltorito initial entry boot indicator')
@@ -420,11 +408,11 @@ class EltoritoEntry(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('El Torito Entry not yet initialized')
 
-        return struct.pack(self.FMT, self.boot_indicator, self.boot_media_type,
-                           self.load_segment, self.system_type, 0,
-                           self.sector_count, self.load_rba,
-                           self.selection_criteria_type,
-                           self.selection_criteria)
+        return self._STRUCT.pack(self.boot_indicator, self.boot_media_type,
+                                 self.load_segment, self.system_type, 0,
+                                 self.sector_count, self.load_rba,
+                                 self.selection_criteria_type,
+                                 self.selection_criteria)
 
     def length(self):
         '''
@@ -450,6 +438,7 @@ class EltoritoSectionHeader(object):
                  'num_section_entries', 'id_string', 'section_entries')
 
     FMT = '=BBH28s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -468,7 +457,7 @@ class EltoritoSectionHeader(object):
             raise pycdlibexception.PyCdlibInternalError('El Torito Section Header already initialized')
 
         (self.header_indicator, self.platform_id, self.num_section_entries,
-         self.id_string) = struct.unpack_from(self.FMT, valstr, 0)
+         self.id_string) = self._STRUCT.unpack_from(valstr, 0)
 
         self._initialized = True
 
@@ -556,9 +545,9 @@ class EltoritoSectionHeader(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('El Torito Section Header not yet initialized')
 
-        outlist = [struct.pack(self.FMT, self.header_indicator,
-                               self.platform_id, self.num_section_entries,
-                               self.id_string)]
+        outlist = [self._STRUCT.pack(self.header_indicator,
+                                     self.platform_id, self.num_section_entries,
+                                     self.id_string)]
 
         for entry in self.section_entries:
             outlist.append(entry.record())
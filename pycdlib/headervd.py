@@ -20,7 +20,6 @@ Implementation of header Volume Descriptors for Ecma-119/ISO9660.
 
 from __future__ import absolute_import
 
-import struct
 import time
 
 import pycdlib.dates as dates
@@ -58,6 +57,7 @@ class PrimaryOrSupplementaryVD(object):
                  'orig_extent_loc')
 
     FMT = '=B5sBB32s32sQLL32sHHHHHHLLLLLL34s128s128s128s128s37s37s37s17s17s17s17sBB512s653s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self, vd_type):
         self._initialized = False
@@ -70,17 +70,19 @@ class PrimaryOrSupplementaryVD(object):
         self.new_extent_loc = None
         self.orig_extent_loc = None
         # Only used for PVD
-        self.rr_ce_blocks = []
+        self.rr_ce_blocks = rockridge.RockRidgeContinuationBlocks()
 
         self._vd_type = vd_type
 
-    def parse(self, vd, extent_loc):
+    def parse(self, vd, extent_loc, interned=None):
         '''
         Parse a Volume Descriptor out of a string.
 
         Parameters:
          vd - The string containing the Volume Descriptor.
          extent_loc - The location on the ISO of this Volume Descriptor.
+         interned - The utils.InternTable to share identical dates and Rock
+                    Ridge records through, or None to not share them.
         Returns:
          Nothing.
         '''
@@ -97,7 +99,7 @@ class PrimaryOrSupplementaryVD(object):
          self.abstract_file_identifier, self.bibliographic_file_identifier,
          vol_create_date_str, vol_mod_date_str, vol_expire_date_str,
          vol_effective_date_str, self.file_structure_version, unused2,
-         self.application_use, zero_unused) = struct.unpack_from(self.FMT, vd, 0)
+         self.application_use, zero_unused) = self._STRUCT.unpack_from(vd, 0)
 
         # According to Ecma-119, 8.4.1, the primary volume descriptor type
         # should be 1.
@@ -173,16 +175,12 @@ class PrimaryOrSupplementaryVD(object):
         self.preparer_identifier.parse(prepare_ident_str)
         self.application_identifier = FileOrTextIdentifier()
         self.application_identifier.parse(app_ident_str)
-        self.volume_creation_date = dates.VolumeDescriptorDate()
-        self.volume_creation_date.parse(vol_create_date_str)
-        self.volume_modification_date = dates.VolumeDescriptorDate()
-        self.volume_modification_date.parse(vol_mod_date_str)
-        self.volume_expiration_date = dates.VolumeDescriptorDate()
-        self.volume_expiration_date.parse(vol_expire_date_str)
-        self.volume_effective_date = dates.VolumeDescriptorDate()
-        self.volume_effective_date.parse(vol_effective_date_str)
+        self.volume_creation_date = utils.parse_record(interned, dates.VolumeDescriptorDate, vol_create_date_str)
+        self.volume_modification_date = utils.parse_record(interned, dates.VolumeDescriptorDate, vol_mod_date_str)
+        self.volume_expiration_date = utils.parse_record(interned, dates.VolumeDescriptorDate, vol_expire_date_str)
+        self.volume_effective_date = utils.parse_record(interned, dates.VolumeDescriptorDate, vol_effective_date_str)
         self.root_dir_record = dr.DirectoryRecord()
-        self.root_dir_record.parse(self, root_dir_record, None)
+        self.root_dir_record.parse(self, root_dir_record, None, interned)
 
         self.orig_extent_loc = extent_loc
         self.new_extent_loc = None
@@ -404,43 +402,42 @@ class PrimaryOrSupplementaryVD(object):
         vol_mod_date = dates.VolumeDescriptorDate()
         vol_mod_date.new(time.time())
 
-        return struct.pack(self.FMT,
-                           self._vd_type,
-                           b'CD001',
-                           self.version,
-                           self.flags,
-                           self.system_identifier,
-                           self.volume_identifier,
-                           0,
-                           self.space_size,
-                           utils.swab_32bit(self.space_size),
-                           self.escape_sequences,
-                           self.set_size,
-                           utils.swab_16bit(self.set_size),
-                           self.seqnum,
-                           utils.swab_16bit(self.seqnum),
-                           self.log_block_size,
-                           utils.swab_16bit(self.log_block_size),
-                           self.path_tbl_size,
-                           utils.swab_32bit(self.path_tbl_size),
-                           self.path_table_location_le,
-                           self.optional_path_table_location_le,
-                           utils.swab_32bit(self.path_table_location_be),
-                           self.optional_path_table_location_be,
-                           self.root_dir_record.record(),
-                           self.volume_set_identifier,
-                           self.publisher_identifier.record(),
-                           self.preparer_identifier.record(),
-                           self.application_identifier.record(),
-                           self.copyright_file_identifier,
-                           self.abstract_file_identifier,
-                           self.bibliographic_file_identifier,
-                           self.volume_creation_date.record(),
-                           vol_mod_date.record(),
-                           self.volume_expiration_date.record(),
-                           self.volume_effective_date.record(),
-                           self.file_structure_version, 0, self.application_use,
-                           b'\x00' * 653)
+        return self._STRUCT.pack(self._vd_type,
+                                 b'CD001',
+                                 self.version,
+                                 self.flags,
+                                 self.system_identifier,
+                                 self.volume_identifier,
+                                 0,
+                                 self.space_size,
+                                 utils.swab_32bit(self.space_size),
+                                 self.escape_sequences,
+                                 self.set_size,
+                                 utils.swab_16bit(self.set_size),
+                                 self.seqnum,
+                                 utils.swab_16bit(self.seqnum),
+                                 self.log_block_size,
+                                 utils.swab_16bit(self.log_block_size),
+                                 self.path_tbl_size,
+                                 utils.swab_32bit(self.path_tbl_size),
+                                 self.path_table_location_le,
+                                 self.optional_path_table_location_le,
+                                 utils.swab_32bit(self.path_table_location_be),
+                                 self.optional_path_table_location_be,
+                                 self.root_dir_record.record(),
+                                 self.volume_set_identifier,
+                                 self.publisher_identifier.record(),
+                                 self.preparer_identifier.record(),
+                                 self.application_identifier.record(),
+                                 self.copyright_file_identifier,
+                                 self.abstract_file_identifier,
+                                 self.bibliographic_file_identifier,
+                                 self.volume_creation_date.record(),
+                                 vol_mod_date.record(),
+                                 self.volume_expiration_date.record(),
+                                 self.volume_effective_date.record(),
+                                 self.file_structure_version, 0, self.application_use,
+                                 b'\x00' * 653)
 
     def track_rr_ce_entry(self, extent, offset, length):
         '''
@@ -463,17 +460,8 @@ class PrimaryOrSupplementaryVD(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('This Primary Volume Descriptor is not yet initialized')
 
-        for block in self.rr_ce_blocks:
-            if block.extent_location() == extent:
-                break
-        else:
-            # We didn't find it in the list, add it
-            block = rockridge.RockRidgeContinuationBlock(extent, self.log_block_size)
-            self.rr_ce_blocks.append(block)
-
-        block.track_entry(offset, length)
-
-        return block
+        return self.rr_ce_blocks.track_entry(extent, offset, length,
+                                             self.log_block_size)
 
     def add_rr_ce_entry(self, length):
         '''
@@ -493,19 +481,7 @@ class PrimaryOrSupplementaryVD(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('This Primary Volume Descriptor is not yet initialized')
 
-        added_block = False
-        for block in self.rr_ce_blocks:
-            offset = block.add_entry(length)
-            if offset is not None:
-                break
-        else:
-            # We didn't find a block this would fit in; add one.
-            block = rockridge.RockRidgeContinuationBlock(0, self.log_block_size)
-            self.rr_ce_blocks.append(block)
-            offset = block.add_entry(length)
-            added_block = True
-
-        return (added_block, block, offset)
+        return self.rr_ce_blocks.add_entry(length, self.log_block_size)
 
     def clear_rr_ce_entries(self):
         '''
@@ -930,6 +906,7 @@ class VolumeDescriptorSetTerminator(object):
     __slots__ = ('_initialized', 'orig_extent_loc', 'new_extent_loc')
 
     FMT = '=B5sB2041s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -948,7 +925,7 @@ class VolumeDescriptorSetTerminator(object):
             raise pycdlibexception.PyCdlibInternalError('Volume Descriptor Set Terminator already initialized')
 
         (descriptor_type, identifier, version,
-         zero_unused) = struct.unpack_from(self.FMT, vd, 0)
+         zero_unused) = self._STRUCT.unpack_from(vd, 0)
 
         # According to Ecma-119, 8.3.1, the volume descriptor set terminator
         # type should be 255
@@ -999,8 +976,8 @@ class VolumeDescriptorSetTerminator(object):
         '''
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('Volume Descriptor Set Terminator not yet initialized')
-        return struct.pack(self.FMT, VOLUME_DESCRIPTOR_TYPE_SET_TERMINATOR,
-                           b'CD001', 1, b'\x00' * 2041)
+        return self._STRUCT.pack(VOLUME_DESCRIPTOR_TYPE_SET_TERMINATOR,
+                                 b'CD001', 1, b'\x00' * 2041)
 
     def extent_location(self):
         '''
@@ -1041,6 +1018,7 @@ class BootRecord(object):
                  'boot_system_use', 'orig_extent_loc', 'new_extent_loc')
 
     FMT = '=B5sB32s32s1977s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1060,7 +1038,7 @@ class BootRecord(object):
 
         (descriptor_type, identifier, version,
          self.boot_system_identifier, self.boot_identifier,
-         self.boot_system_use) = struct.unpack_from(self.FMT, vd, 0)
+         self.boot_system_use) = self._STRUCT.unpack_from(vd, 0)
 
         # According to Ecma-119, 8.2.1, the boot record type should be 0
         if descriptor_type != VOLUME_DESCRIPTOR_TYPE_BOOT_RECORD:
@@ -1112,9 +1090,9 @@ class BootRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('Boot Record not yet initialized')
 
-        return struct.pack(self.FMT, VOLUME_DESCRIPTOR_TYPE_BOOT_RECORD,
-                           b'CD001', 1, self.boot_system_identifier,
-                           self.boot_identifier, self.boot_system_use)
+        return self._STRUCT.pack(VOLUME_DESCRIPTOR_TYPE_BOOT_RECORD,
+                                 b'CD001', 1, self.boot_system_identifier,
+                                 self.boot_identifier, self.boot_system_use)
 
     def update_boot_system_use(self, boot_sys_use):
         '''
@@ -1178,7 +1156,7 @@ class VersionVolumeDescriptor(object):
 
         if data[:3] == b'MKI' or all(v == 0 for v in bytearray(data)):
             # OK, we have a version descriptor.
-            self._data = data
+            self._data = bytes(data)
             self.orig_extent_loc = extent_location
             self._initialized = True
             return True
@@ -0,0 +1,336 @@
+# Copyright (C) 2026  The PyCdlib developers
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation;
+# version 2.1 of the License.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+PyCdlib on-disk cache of parsed ISO metadata.
+'''
+
+from __future__ import absolute_import
+
+import gc
+import glob
+import hashlib
+import hmac
+import io
+import os
+try:
+    import cPickle as pickle  # pylint: disable=import-error
+except ImportError:
+    import pickle
+import stat
+import sys
+import tempfile
+import zlib
+
+import pycdlib.pycdlibexception as pycdlibexception
+import pycdlib.utils as utils
+
+# The offset and size of the area of the ISO that is hashed when the cache is
+# asked to verify the volume descriptors; this covers the ISO9660 volume
+# descriptors and the UDF volume recognition sequence on typical ISOs.
+_DESCRIPTOR_AREA_OFFSET = 16 * 2048
+_DESCRIPTOR_AREA_LENGTH = 32 * 2048
+
+# The length of the secret key used to authenticate the cache entries.
+_SECRET_LENGTH = 32
+
+_code_fingerprint = None
+
+
+def _library_fingerprint():
+    '''
+    An internal function to get a fingerprint of the installed PyCdlib code.
+    The cached entries are pickled PyCdlib objects, so they are only usable by
+    exactly the code that created them.
+
+    Parameters:
+     None.
+    Returns:
+     A string fingerprinting the PyCdlib code.
+    '''
+    global _code_fingerprint  # pylint: disable=global-statement
+    if _code_fingerprint is None:
+        parts = [repr(sys.version_info[:2])]
+        for filename in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+            st = os.stat(filename)
+            parts.append('%s:%d:%d' % (os.path.basename(filename), st.st_size, int(st.st_mtime)))
+        _code_fingerprint = hashlib.sha256(','.join(parts).encode('utf-8')).hexdigest()
+    return _code_fingerprint
+
+
+def _owned_by_us(st):
+    '''
+    An internal function to check whether a file belongs to the current user.
+    On platforms without user IDs, every file is considered ours.
+
+    Parameters:
+     st - The stat result of the file.
+    Returns:
+     True if the file is owned by the current user, False otherwise.
+    '''
+    getuid = getattr(os, 'getuid', None)
+    if getuid is None:
+        return True
+    return st.st_uid == getuid()
+
+
+class IndexCache(object):
+    '''
+    A class to keep the parsed metadata of ISOs in a directory on disk, so that
+    opening the same ISO again can skip parsing it.  Entries are keyed by the
+    identity of the ISO file (device, inode, size, and modification time, and
+    optionally a hash of the volume descriptor area), so modifying or replacing
+    the ISO makes its old entry unreachable.  Whenever the cache grows past
+    max_size bytes, the least recently used entries are removed.
+
+    The entries are pickled Python objects, and unpickling data runs code, so
+    every entry is authenticated with an HMAC before it is unpickled.  The
+    HMAC key is either passed in as secret, or kept in a file in the cache
+    directory that only the current user can read; entries (and key files)
+    that are not owned by the current user are rejected as well.
+    '''
+    __slots__ = ('directory', 'max_size', 'verify_descriptors', '_secret')
+
+    MAGIC = b'PYCDIDX2'
+    SUFFIX = '.idx'
+    KEY_NAME = 'secret.key'
+
+    def __init__(self, directory, max_size=256 * 1024 * 1024,
+                 verify_descriptors=False, secret=None):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        self.directory = directory
+        self.max_size = max_size
+        self.verify_descriptors = verify_descriptors
+        if secret is None:
+            secret = self._load_secret()
+        self._secret = secret
+
+    def _load_secret(self):
+        '''
+        Internal method to read the HMAC key out of the key file in the cache
+        directory, creating the key file if it does not exist yet.
+
+        Parameters:
+         None.
+        Returns:
+         The HMAC key as bytes.
+        '''
+        path = os.path.join(self.directory, self.KEY_NAME)
+        flags = getattr(os, 'O_BINARY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+        try:
+            fd = os.open(path, flags | os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except OSError:
+            fd = None
+        if fd is not None:
+            secret = os.urandom(_SECRET_LENGTH)
+            with os.fdopen(fd, 'wb') as outfp:
+                outfp.write(secret)
+            return secret
+
+        try:
+            fd = os.open(path, flags | os.O_RDONLY)
+        except OSError:
+            raise pycdlibexception.PyCdlibInvalidInput('Could not open the index cache key file %s' % (path))
+        with os.fdopen(fd, 'rb') as infp:
+            st = os.fstat(infp.fileno())
+            if not _owned_by_us(st) or st.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+                raise pycdlibexception.PyCdlibInvalidInput('The index cache key file %s must be owned by and only accessible to the current user' % (path))
+            secret = infp.read()
+        if len(secret) != _SECRET_LENGTH:
+            raise pycdlibexception.PyCdlibInvalidInput('The index cache key file %s is corrupt' % (path))
+
+        return secret
+
+    def _digest(self, payload):
+        '''
+        Internal method to compute the HMAC authenticating an entry.
+
+        Parameters:
+         payload - The compressed, pickled payload of the entry.
+        Returns:
+         The HMAC of the payload as bytes.
+        '''
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()
+
+    def key(self, fp):
+        '''
+        A method to compute the cache key of an opened ISO.
+
+        Parameters:
+         fp - The file object of the ISO.
+        Returns:
+         The cache key as a string, or None if the ISO cannot be cached (it
+         is not a regular file).
+        '''
+        try:
+            fileno = fp.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            return None
+
+        st = os.fstat(fileno)
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        mtime = getattr(st, 'st_mtime_ns', None)
+        if mtime is None:
+            mtime = int(st.st_mtime * 1000000000)
+
+        parts = [_library_fingerprint(), str(st.st_dev), str(st.st_ino),
+                 str(st.st_size), str(mtime)]
+        if self.verify_descriptors:
+            area = utils.pread(fp, _DESCRIPTOR_AREA_LENGTH, _DESCRIPTOR_AREA_OFFSET)
+            parts.append(hashlib.sha256(area).hexdigest())
+
+        return hashlib.sha256(','.join(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        '''
+        Internal method to get the path of the cache entry for a key.
+
+        Parameters:
+         key - The cache key.
+        Returns:
+         The path to the cache entry.
+        '''
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key):
+        '''
+        A method to load a cache entry.  Entries that cannot be read back are
+        removed and treated as missing.
+
+        Parameters:
+         key - The cache key.
+        Returns:
+         The object stored for the key, or None if there is no usable entry.
+        '''
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as infp:
+                st = os.fstat(infp.fileno())
+                data = infp.read()
+        except (IOError, OSError):
+            return None
+
+        if not _owned_by_us(st):
+            # Somebody else planted this file; it cannot be trusted, and it
+            # may not be ours to remove either.
+            return None
+
+        # Unpickling creates a lot of objects that all stay alive, so the
+        # garbage collector passes it triggers are pure overhead.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if not data.startswith(self.MAGIC):
+                raise ValueError('Bad magic')
+            digest_end = len(self.MAGIC) + hashlib.sha256().digest_size
+            payload = data[digest_end:]
+            if not hmac.compare_digest(data[len(self.MAGIC):digest_end], self._digest(payload)):
+                raise ValueError('Bad digest')
+            (stored_key, obj) = pickle.loads(zlib.decompress(payload))
+            if stored_key != key:
+                raise ValueError('Key mismatch')
+        except Exception:  # pylint: disable=broad-except
+            self._remove(path)
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        # Mark the entry as recently used.
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return obj
+
+    def store(self, key, obj):
+        '''
+        A method to store a cache entry, then trim the cache down to size.
+        Failing to store an entry is not an error; the cache is simply left
+        as it was.
+
+        Parameters:
+         key - The cache key.
+         obj - The object to store.
+        Returns:
+         Nothing.
+        '''
+        try:
+            payload = zlib.compress(pickle.dumps((key, obj), pickle.HIGHEST_PROTOCOL), 1)
+        except (pickle.PicklingError, TypeError, RuntimeError):
+            return
+        data = self.MAGIC + self._digest(payload) + payload
+
+        # Write to a temporary file and rename it into place, so a concurrent
+        # reader never sees a partially written entry.
+        try:
+            (fd, tmppath) = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        except (IOError, OSError):
+            return
+        try:
+            with os.fdopen(fd, 'wb') as outfp:
+                outfp.write(data)
+            getattr(os, 'replace', os.rename)(tmppath, self._path(key))
+        except (IOError, OSError):
+            self._remove(tmppath)
+            return
+
+        self._prune()
+
+    def _remove(self, path):
+        '''
+        Internal method to remove a file from the cache, ignoring errors.
+
+        Parameters:
+         path - The path to remove.
+        Returns:
+         Nothing.
+        '''
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _prune(self):
+        '''
+        Internal method to remove the least recently used entries until the
+        cache fits in max_size.
+
+        Parameters:
+         None.
+        Returns:
+         Nothing.
+        '''
+        entries = []
+        total = 0
+        for path in glob.glob(os.path.join(self.directory, '*' + self.SUFFIX)):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+            total += st.st_size
+
+        entries.sort()
+        for mtime_unused, path, size in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
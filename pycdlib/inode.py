@@ -168,16 +168,38 @@ class Inode(object):
         self.data_length = length
         self.fp_offset = 0
 
+    def data_offset(self, logical_block_size):
+        '''
+        Get the offset into the data file object at which the data for this
+        Inode starts.
+
+        Parameters:
+         logical_block_size - The logical block size of the ISO.
+        Returns:
+         The offset at which the data for this Inode starts.
+        '''
+        if not self._initialized:
+            raise pycdlibexception.PyCdlibInternalError('Inode is not yet initialized')
+
+        if self.original_data_location == self.DATA_ON_ORIGINAL_ISO:
+            return self.orig_extent_loc * logical_block_size
+
+        return self.fp_offset
+
 
 class InodeOpenData(object):
     '''
     A class to be a contextmanager for opening data on a DirectoryRecord object.
+    Unless told not to seek, the file object is positioned at the start of the
+    data; callers that may share the file object with other threads must not
+    let it seek, and must only read at explicit offsets (with utils.pread).
     '''
-    __slots__ = ('ino', 'logical_block_size', 'data_fp')
+    __slots__ = ('ino', 'logical_block_size', 'seek', 'data_fp')
 
-    def __init__(self, ino, logical_block_size):
+    def __init__(self, ino, logical_block_size, seek=True):
         self.ino = ino
         self.logical_block_size = logical_block_size
+        self.seek = seek
 
     def __enter__(self):
         if self.ino.manage_fp:
@@ -188,10 +210,8 @@ class InodeOpenData(object):
         else:
             self.data_fp = self.ino.data_fp
 
-        if self.ino.original_data_location == self.ino.DATA_ON_ORIGINAL_ISO:
-            self.data_fp.seek(self.ino.orig_extent_loc * self.logical_block_size)
-        else:
-            self.data_fp.seek(self.ino.fp_offset)
+        if self.seek:
+            self.data_fp.seek(self.ino.data_offset(self.logical_block_size))
 
         return self.data_fp, self.ino.data_length
 
@@ -24,6 +24,7 @@ import random
 import struct
 
 import pycdlib.pycdlibexception as pycdlibexception
+import pycdlib.utils as utils
 
 
 class IsoHybrid(object):
@@ -36,6 +37,7 @@ class IsoHybrid(object):
                  'part_offset', 'psize', 'geometry_heads', 'geometry_sectors')
 
     FMT = '=400sLLLH'
+    _STRUCT = utils.compile_struct(FMT)
     ORIG_HEADER = b'\x33\xed' + b'\x90' * 30
     MAC_AFP = b'\x45\x52\x08\x00\x00\x00\x90\x90' + b'\x00' * 24
 
@@ -67,7 +69,7 @@ class IsoHybrid(object):
             return False
 
         (self.mbr, self.rba, unused1, self.mbr_id,
-         unused2) = struct.unpack_from(self.FMT, instr[:32 + struct.calcsize(self.FMT)], 32)
+         unused2) = self._STRUCT.unpack_from(instr, 32)
 
         if unused1 != 0:
             raise pycdlibexception.PyCdlibInvalidISO('Invalid IsoHybrid section')
@@ -75,7 +77,7 @@ class IsoHybrid(object):
         if unused2 != 0:
             raise pycdlibexception.PyCdlibInvalidISO('Invalid IsoHybrid section')
 
-        offset = 32 + struct.calcsize(self.FMT)
+        offset = 32 + self._STRUCT.size
         for i in range(1, 5):
             if bytes(bytearray([instr[offset]])) == b'\x80':
                 self.part_entry = i
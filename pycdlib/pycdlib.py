@@ -24,18 +24,23 @@ import bisect
 import collections
 import inspect
 import io
+import mmap as mmapmod
 import os
+import shutil
 import struct
 import sys
-try:
-    from functools import lru_cache
-except ImportError:
-    from pycdlib.backport_functools import lru_cache
+import threading
 try:
     from cStringIO import StringIO as BytesIO
 except ImportError:
     from io import BytesIO  # pylint: disable=ungrouped-imports
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # pylint: disable=import-error
 
+import pycdlib.checksum as checksum
+import pycdlib.compact as compact
 import pycdlib.dr as dr
 import pycdlib.eltorito as eltorito
 import pycdlib.headervd as headervd
@@ -46,6 +51,10 @@ import pycdlib.pycdlibexception as pycdlibexception
 import pycdlib.udf as udfmod
 import pycdlib.utils as utils
 
+# inspect.getargspec was removed in Python 3.11; getfullargspec is its
+# replacement (and does not exist on Python 2).
+_getargspec = getattr(inspect, 'getfullargspec', None) or inspect.getargspec  # pylint: disable=W1505
+
 # There are a number of specific ways that numerical data is stored in the
 # ISO9660/Ecma-119 standard.  In the text these are reference by the section
 # number they are stored in.  A brief synopsis:
@@ -263,6 +272,69 @@ def _interchange_level_from_directory(name):
     return interchange_level
 
 
+def _dirrecord_has_data(rec):
+    '''
+    An internal function to determine whether a file Directory Record has data
+    of its own on the ISO.  Empty files, Rock Ridge symlinks, and Rock Ridge
+    child link records do not.
+
+    Parameters:
+     rec - The Directory Record to check.
+    Returns:
+     True if the Directory Record has data on the ISO, False otherwise.
+    '''
+    if rec.data_length == 0:
+        return False
+
+    rec_rock_ridge = rec.rock_ridge
+    if rec_rock_ridge is not None and (rec_rock_ridge.child_link_record_exists() or rec_rock_ridge.is_symlink()):
+        return False
+
+    return True
+
+
+def _vd_directories(vd):
+    '''
+    An internal helper method to collect all of the directories of the passed
+    in Volume Descriptor, in the breadth-first order that
+    _reassign_vd_dirrecord_extents walks them.  That function collects the
+    files of each directory together, in this order of the directories.
+
+    Parameters:
+     vd - The volume descriptor on which to operate.
+    Returns:
+     The list of Directory Records of the directories on the volume
+     descriptor.
+    '''
+    dir_list = []
+    dirs = collections.deque([vd.root_directory_record()])
+    while dirs:
+        dir_record = dirs.popleft()
+        dir_list.append(dir_record)
+        for child in dir_record.children:
+            if child.is_dir() and not child.is_dot() and not child.is_dotdot():
+                dirs.append(child)
+
+    return dir_list
+
+
+def _set_inode_location(ino, current_extent, part_start):
+    '''
+    An internal function to set the location of an inode and update the
+    metadata of all records attached to it.
+
+    Parameters:
+     ino - The inode to update.
+     current_extent - The extent to set the inode to.
+     part_start - The start of the partition that the inode is on.
+    Returns:
+     Nothing.
+    '''
+    ino.set_location(current_extent)
+    for rec in ino.linked_records:
+        rec.set_data_location(current_extent, current_extent - part_start)
+
+
 def _reassign_vd_dirrecord_extents(vd, current_extent):
     '''
     An internal helper method for reassign_extents that assigns extents to
@@ -342,7 +414,7 @@ def _reassign_vd_dirrecord_extents(vd, current_extent):
                 current_extent += utils.ceiling_div(dir_record.data_length, log_block_size)
             dirs.extend(dir_record.children)
         else:
-            if dir_record.data_length == 0 or (dir_record_rock_ridge is not None and (dir_record_rock_ridge.child_link_record_exists() or dir_record_rock_ridge.is_symlink())):
+            if not _dirrecord_has_data(dir_record):
                 # If this is a child link record, the extent location really
                 # doesn't matter, since it is fake.  We set it to zero.
                 dir_record.new_extent_loc = 0
@@ -388,7 +460,7 @@ def _check_path_depth(iso_path):
         raise pycdlibexception.PyCdlibInvalidInput('Directory levels too deep (maximum is 7)')
 
 
-def _yield_children(rec):
+def _yield_children(rec, walk_all_dirs=None):
     '''
     An internal function to gather and yield all of the children of a Directory
     Record.
@@ -396,6 +468,9 @@ def _yield_children(rec):
     Parameters:
      rec - The Directory Record to get all of the children from (must be a
            directory)
+     walk_all_dirs - A callable that parses the rest of the ISO, used to
+                     resolve child links that were not resolved yet because
+                     the ISO was opened lazily (may be None).
     Yields:
      Children of this Directory Record.
     Returns:
@@ -419,6 +494,8 @@ def _yield_children(rec):
             # want to go find the entry this was relocated to; we do that
             # by following the child_link, then going up to the parent and
             # finding the entry that links to the same one as this one.
+            if child.rock_ridge.cl_to_moved_dr is None and walk_all_dirs is not None:
+                walk_all_dirs()
             cl_parent = child.rock_ridge.cl_to_moved_dr.parent
             for cl_child in cl_parent.children:
                 if cl_child.rock_ridge.name() == child.rock_ridge.name():
@@ -431,6 +508,92 @@ def _yield_children(rec):
         yield child
 
 
+def _extract_name(rec, namespace):
+    '''
+    An internal function to get the local filesystem name that a record should
+    be extracted to in the given namespace.  Names that could escape the
+    extraction directory are rejected.
+
+    Parameters:
+     rec - The Directory Record or UDF File Entry to get the name of.
+     namespace - One of 'iso9660', 'rr', 'joliet', or 'udf'.
+    Returns:
+     The name of the record as a string.
+    '''
+    if namespace == 'udf':
+        name = rec.file_ident.fi.decode(rec.file_ident.encoding)
+    elif namespace == 'rr' and rec.rock_ridge is not None:
+        name = rec.rock_ridge.name().decode('utf-8')
+    else:
+        if namespace == 'joliet':
+            name = rec.file_identifier().decode('utf-16_be')
+        else:
+            name = rec.file_identifier().decode('utf-8')
+        if not rec.is_dir():
+            # Strip off the version number and, if there was no extension,
+            # the trailing dot.
+            name = name.split(';')[0]
+            if name.endswith('.'):
+                name = name[:-1]
+
+    if name in ('', '.', '..') or '/' in name or '\x00' in name or os.sep in name or (os.altsep is not None and os.altsep in name):
+        raise pycdlibexception.PyCdlibInvalidISO('Refusing to extract entry with unsafe name %s' % (repr(name)))
+
+    return name
+
+
+def _extract_order_key(rec):
+    '''
+    An internal function to get the key used to sort records for extraction.
+    Records whose data is on the original ISO are sorted by the extent they
+    start at, so that the ISO is read sequentially; everything else is
+    extracted afterwards.
+
+    Parameters:
+     rec - The Directory Record or UDF File Entry to get the key for.
+    Returns:
+     A tuple that can be used to sort the record.
+    '''
+    ino = rec.inode
+    if ino is not None and ino.original_data_location == ino.DATA_ON_ORIGINAL_ISO:
+        return (0, ino.orig_extent_loc)
+    return (1, 0)
+
+
+def _rr_file_times(rock_ridge):
+    '''
+    An internal function to get the access and modification times out of the
+    Rock Ridge Time Stamp record of an entry.
+
+    Parameters:
+     rock_ridge - The Rock Ridge extension to get the times from.
+    Returns:
+     A tuple of (access time, modification time) in seconds since the epoch,
+     or None if the entry does not record any usable times.
+    '''
+    tf_record = rock_ridge.dr_entries.tf_record
+    if tf_record is None:
+        tf_record = rock_ridge.ce_entries.tf_record
+    if tf_record is None:
+        return None
+
+    atime = None
+    if tf_record.access_time is not None:
+        atime = tf_record.access_time.epoch_seconds()
+    mtime = None
+    if tf_record.modification_time is not None:
+        mtime = tf_record.modification_time.epoch_seconds()
+
+    if atime is None and mtime is None:
+        return None
+    if atime is None:
+        atime = mtime
+    elif mtime is None:
+        mtime = atime
+
+    return (atime, mtime)
+
+
 def _assign_udf_desc_extents(descs, start_extent):
     '''
     An internal function to assign a consecutive sequence of extents for the
@@ -465,9 +628,12 @@ def _assign_udf_desc_extents(descs, start_extent):
 
 class PyCdlib(object):
     '''
-    The main class for manipulating ISOs.
+    The main class for manipulating ISOs.  Any number of threads may read from
+    a single PyCdlib object at once (get_file_from_iso, list_children,
+    get_record, and friends); modifications wait for the readers to finish
+    and exclude everything else while they run.
     '''
-    __slots__ = ('_initialized', '_cdfp', 'pvds', 'svds', 'vdsts', 'brs', 'pvd',
+    __slots__ = ('_initialized', '_cdfp', '_cdmap', '_cdmmap', 'pvds', 'svds', 'vdsts', 'brs', 'pvd',
                  '_tmpdr', 'rock_ridge', '_always_consistent',
                  'eltorito_boot_catalog', 'isohybrid_mbr', 'xa', '_managing_fp',
                  '_needs_reshuffle', '_rr_moved_record', '_rr_moved_name',
@@ -477,7 +643,17 @@ class PyCdlib(object):
                  'udf_main_descs', 'udf_reserve_descs',
                  'udf_logical_volume_integrity',
                  'udf_logical_volume_integrity_terminator', 'udf_root',
-                 'udf_file_set', 'udf_file_set_terminator', 'inodes')
+                 'udf_file_set', 'udf_file_set_terminator', 'inodes',
+                 '_dir_walks', '_batch_depth', '_file_layout', '_iso_path_index',
+                 '_rr_path_index', '_joliet_path_index', '_udf_path_index',
+                 '_rwlock', '_parse_lock', '_interned')
+
+    # The attributes that describe the input file or the configuration of this
+    # object, rather than the parsed ISO, and so are never put in an index
+    # cache.
+    _UNCACHED_ATTRIBUTES = ('_cdfp', '_cdmap', '_cdmmap', '_always_consistent',
+                            '_track_writes', '_managing_fp', '_rwlock',
+                            '_parse_lock', '_interned')
 
     class UDFDescriptors(object):
         '''
@@ -494,6 +670,91 @@ class PyCdlib(object):
             self.unallocated_space = None
             self.terminator = None
 
+    class _PathIndex(object):
+        '''
+        A class to map the full paths in one namespace (ISO9660, Rock Ridge,
+        Joliet, or UDF) to the records that they resolve to.  Only successful
+        lookups are stored, so adding new entries to the ISO never invalidates
+        the index; removing an entry from the ISO must remove it here as well.
+        '''
+        __slots__ = ('_paths', '_records')
+
+        def __init__(self):
+            self._paths = {}
+            self._records = {}
+
+        def get(self, path):
+            '''
+            Get the record that a path resolves to.
+
+            Parameters:
+             path - The full path to look up.
+            Returns:
+             The record for the path, or None if the path is not in the index.
+            '''
+            return self._paths.get(path)
+
+        def add(self, path, rec):
+            '''
+            Add a path and the record that it resolves to.
+
+            Parameters:
+             path - The full path.
+             rec - The record that the path resolves to.
+            Returns:
+             Nothing.
+            '''
+            self._paths[path] = rec
+            self._records.setdefault(id(rec), set()).add(path)
+
+        def remove(self, rec):
+            '''
+            Remove all of the paths that resolve to a record.
+
+            Parameters:
+             rec - The record to remove the paths for.
+            Returns:
+             Nothing.
+            '''
+            for path in self._records.pop(id(rec), set()):
+                self._paths.pop(path, None)
+
+        def __getstate__(self):
+            # The reverse map is keyed by the identity of the records, which
+            # changes when they are copied, so only the paths are saved.
+            return self._paths
+
+        def __setstate__(self, state):
+            self._paths = {}
+            self._records = {}
+            for path, rec in state.items():
+                self.add(path, rec)
+
+    class _DirectoryWalk(object):
+        '''
+        A class to keep track of the state of walking the directories of one
+        filesystem (ISO9660, Joliet, or UDF) on an ISO that is being opened.
+        Directories in 'pending' have been found but their children have not
+        yet been parsed.  A vd of None means that this walks the UDF filesystem.
+        '''
+        __slots__ = ('vd', 'extent_to_ptr', 'extent_to_inode',
+                     'iso_file_length', 'pending', 'all_extent_to_dr',
+                     'parent_links', 'child_links', 'interchange_level',
+                     'lastbyte')
+
+        def __init__(self, vd, extent_to_ptr, extent_to_inode, root,
+                     iso_file_length):
+            self.vd = vd
+            self.extent_to_ptr = extent_to_ptr
+            self.extent_to_inode = extent_to_inode
+            self.iso_file_length = iso_file_length
+            self.pending = collections.OrderedDict([(id(root), root)])
+            self.all_extent_to_dr = {}
+            self.parent_links = []
+            self.child_links = []
+            self.interchange_level = 1
+            self.lastbyte = 0
+
     def _parse_volume_descriptors(self):
         '''
         An internal method to parse the volume descriptors on an ISO.
@@ -511,11 +772,10 @@ class PyCdlib(object):
         # Ecma-119, 6.2.1 says that the Volume Space is divided into a System
         # Area and a Data Area, where the System Area is in logical sectors 0
         # to 15, and whose contents is not specified by the standard.
-        self._cdfp.seek(16 * 2048)
+        curr_extent = 16
         while True:
             # All volume descriptors are exactly 2048 bytes long
-            curr_extent = self._cdfp.tell() // 2048
-            vd = self._cdfp.read(2048)
+            vd = self._read_from_iso(curr_extent * 2048, 2048)
             if len(vd) != 2048:
                 raise pycdlibexception.PyCdlibInvalidISO('Failed to read entire volume descriptor')
             (desc_type, ident) = struct.unpack_from('=B5s', vd, 0)
@@ -524,12 +784,11 @@ class PyCdlib(object):
                                  headervd.VOLUME_DESCRIPTOR_TYPE_BOOT_RECORD,
                                  headervd.VOLUME_DESCRIPTOR_TYPE_SUPPLEMENTARY) or ident not in (b'CD001', b'BEA01', b'NSR02', b'TEA01'):
                 # We read the next extent, and it wasn't a descriptor.  Abort
-                # the loop, remembering to back up the input file descriptor.
-                self._cdfp.seek(-2048, os.SEEK_CUR)
+                # the loop.
                 break
             if desc_type == headervd.VOLUME_DESCRIPTOR_TYPE_PRIMARY:
                 pvd = headervd.PrimaryOrSupplementaryVD(headervd.VOLUME_DESCRIPTOR_TYPE_PRIMARY)
-                pvd.parse(vd, curr_extent)
+                pvd.parse(vd, curr_extent, self._interned)
                 self.pvds.append(pvd)
             elif desc_type == headervd.VOLUME_DESCRIPTOR_TYPE_SET_TERMINATOR:
                 vdst = headervd.VolumeDescriptorSetTerminator()
@@ -559,11 +818,13 @@ class PyCdlib(object):
                     raise pycdlibexception.PyCdlibInvalidISO('Invalid volume identification type')
             elif desc_type == headervd.VOLUME_DESCRIPTOR_TYPE_SUPPLEMENTARY:
                 svd = headervd.PrimaryOrSupplementaryVD(headervd.VOLUME_DESCRIPTOR_TYPE_SUPPLEMENTARY)
-                svd.parse(vd, curr_extent)
+                svd.parse(vd, curr_extent, self._interned)
                 self.svds.append(svd)
             # Since we checked for the valid descriptors above, it is impossible
             # to see an invalid desc_type here, so no check necessary.
 
+            curr_extent += 1
+
         # The language in Ecma-119, p.8, Section 6.7.1 says:
         #
         # The sequence shall contain one Primary Volume Descriptor (see 8.4) recorded at least once.
@@ -585,16 +846,88 @@ class PyCdlib(object):
         if len(self.vdsts) < 1:
             raise pycdlibexception.PyCdlibInvalidISO('Valid ISO9660 filesystems must have at least one Volume Descriptor Set Terminator')
 
-    def _seek_to_extent(self, extent):
+    def _read_from_iso(self, offset, length):
+        '''
+        An internal method to read a range of bytes from the input ISO.  If the
+        input ISO is memory-mapped, the returned data is a zero-copy slice of
+        the mapping; otherwise, the data is read from the file object.
+
+        Parameters:
+         offset - The byte offset into the ISO to start reading at.
+         length - The number of bytes to read.
+        Returns:
+         The data read from the ISO; this may be shorter than length if the
+         ISO is truncated.
+        '''
+        if self._cdmap is not None:
+            return self._cdmap[offset:offset + length]
+
+        return utils.pread(self._cdfp, length, offset)
+
+    def _iso_file_length(self):
+        '''
+        An internal method to get the length of the input ISO in bytes.
+
+        Parameters:
+         None.
+        Returns:
+         The length of the input ISO in bytes.
+        '''
+        if self._cdmap is not None:
+            return len(self._cdmap)
+
+        return utils.file_length(self._cdfp)
+
+    def _map_fp(self, fp):
+        '''
+        An internal method to memory-map the file object containing the input
+        ISO, so that the metadata can be parsed without intermediate copies.
+        In-memory file objects that expose their buffer (like io.BytesIO) are
+        used directly instead of being mapped.
+
+        Parameters:
+         fp - The file object to map.
+        Returns:
+         Nothing.
+        '''
+        if hasattr(fp, 'getbuffer'):
+            self._cdmap = fp.getbuffer()
+            return
+
+        try:
+            fileno = fp.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            raise pycdlibexception.PyCdlibInvalidInput('The file object to memory-map must have a file descriptor')
+
+        try:
+            self._cdmmap = mmapmod.mmap(fileno, 0, access=mmapmod.ACCESS_READ)
+        except (ValueError, EnvironmentError) as e:
+            raise pycdlibexception.PyCdlibInvalidInput('Could not memory-map the ISO: %s' % (e))
+
+        try:
+            self._cdmap = memoryview(self._cdmmap)
+        except TypeError:
+            # Python 2 cannot take a memoryview of an mmap object; slicing the
+            # mmap object directly still saves the seek and read calls.
+            self._cdmap = self._cdmmap
+
+    def _unmap_fp(self):
         '''
-        An internal method to seek to a particular extent on the input ISO.
+        An internal method to tear down the memory mapping of the input ISO
+        (if any).
 
         Parameters:
-         extent - The extent to seek to.
+         None.
         Returns:
          Nothing.
         '''
-        self._cdfp.seek(extent * self.pvd.logical_block_size())
+        if self._cdmap is not None and self._cdmap is not self._cdmmap:
+            self._cdmap.release()
+        self._cdmap = None
+
+        if self._cdmmap is not None:
+            self._cdmmap.close()
+        self._cdmmap = None
 
     def _find_record(self, **kwargs):
         '''
@@ -714,6 +1047,7 @@ class PyCdlib(object):
         while True:
             child = None
 
+            self._walk_pending_dir(entry)
             thelist = getattr(entry, child_list)
             lo = start_offset
             hi = len(thelist)
@@ -734,7 +1068,11 @@ class PyCdlib(object):
 
             if child.rock_ridge is not None and child.rock_ridge.child_link_record_exists():
                 # Here, the rock ridge extension has a child link, so we
-                # need to follow it.
+                # need to follow it.  If the ISO was opened lazily, the
+                # relocated directory may not have been found yet, in which
+                # case we have to walk the rest of the ISO to find it.
+                if child.rock_ridge.cl_to_moved_dr is None:
+                    self._walk_all_dirs()
                 child = child.rock_ridge.cl_to_moved_dr
 
             # We found the child, and it is the last one we are looking for;
@@ -749,7 +1087,6 @@ class PyCdlib(object):
 
         raise pycdlibexception.PyCdlibInvalidInput('Could not find path %s' % (path))
 
-    @lru_cache(maxsize=256)
     def _find_iso_record(self, iso_path):
         '''
         An internal method to find an directory record on the ISO given an ISO
@@ -762,9 +1099,12 @@ class PyCdlib(object):
         Returns:
          The directory record entry representing the entry on the ISO.
         '''
-        return self._find_record(iso_path=iso_path)
+        rec = self._iso_path_index.get(iso_path)
+        if rec is None:
+            rec = self._find_record(iso_path=iso_path)
+            self._iso_path_index.add(iso_path, rec)
+        return rec
 
-    @lru_cache(maxsize=256)
     def _find_rr_record(self, rr_path):
         '''
         An internal method to find an directory record on the ISO given a Rock
@@ -777,9 +1117,12 @@ class PyCdlib(object):
         Returns:
          The directory record entry representing the entry on the ISO.
         '''
-        return self._find_record(rr_path=rr_path)
+        rec = self._rr_path_index.get(rr_path)
+        if rec is None:
+            rec = self._find_record(rr_path=rr_path)
+            self._rr_path_index.add(rr_path, rec)
+        return rec
 
-    @lru_cache(maxsize=256)
     def _find_joliet_record(self, joliet_path):
         '''
         An internal method to find an directory record on the ISO given a Joliet
@@ -792,9 +1135,12 @@ class PyCdlib(object):
         Returns:
          The directory record entry representing the entry on the ISO.
         '''
-        return self._find_record(joliet_path=joliet_path)
+        rec = self._joliet_path_index.get(joliet_path)
+        if rec is None:
+            rec = self._find_record(joliet_path=joliet_path)
+            self._joliet_path_index.add(joliet_path, rec)
+        return rec
 
-    @lru_cache(maxsize=256)
     def _find_udf_record(self, udf_path):
         '''
         An internal method to find an directory record on the ISO given a UDF
@@ -812,6 +1158,10 @@ class PyCdlib(object):
         if udf_path == b'/':
             return self.udf_root
 
+        rec = self._udf_path_index.get(udf_path)
+        if rec is not None:
+            return rec
+
         # Split the path along the slashes
         splitpath = utils.split_path(udf_path)
 
@@ -820,6 +1170,7 @@ class PyCdlib(object):
         entry = self.udf_root
 
         while True:
+            self._walk_pending_dir(entry)
             child = entry.find_file_ident_desc_by_name(currpath)
 
             if child is None:
@@ -830,6 +1181,7 @@ class PyCdlib(object):
             # We found the child, and it is the last one we are looking for;
             # return it.
             if not splitpath:
+                self._udf_path_index.add(udf_path, child.file_entry)
                 return child.file_entry
             else:
                 if not child.is_dir():
@@ -905,204 +1257,207 @@ class PyCdlib(object):
                     if rr is not None and rr != ver:
                         raise pycdlibexception.PyCdlibInvalidISO('Inconsistent Rock Ridge versions on the ISO!')
 
-    def _walk_directories(self, vd, extent_to_ptr, extent_to_inode, path_table_records):
+    def _walk_directory(self, walk, dir_record):
         '''
-        An internal method to walk the directory records in a volume descriptor,
-        starting with the root.  For each child in the directory record,
-        we create a new dr.DirectoryRecord object and append it to the parent.
+        An internal method to parse the directory records in a single directory
+        of a volume descriptor.  For each child in the directory record, we
+        create a new dr.DirectoryRecord object and append it to the parent; any
+        child directories are queued on the walk to be parsed later.
 
         Parameters:
-         vd - The volume descriptor to walk.
-         extent_to_ptr - A dictionary mapping extents to PTRs.
-         extent_to_inode - A dictionary mapping extents to Inodes.
-         path_table_records - The list of path table records.
+         walk - The _DirectoryWalk object for the volume descriptor.
+         dir_record - The directory record to parse the children of.
         Returns:
-         The interchange level that this ISO conforms to.
+         Nothing.
         '''
         cdfp = self._cdfp
-        old_loc = cdfp.tell()
-        cdfp.seek(0, os.SEEK_END)
-        iso_file_length = cdfp.tell()
-        cdfp.seek(old_loc)
-
-        all_extent_to_dr = {}
+        vd = walk.vd
         is_pvd = vd.is_pvd()
-        root_dir_record = vd.root_directory_record()
-        root_dir_record.set_ptr(path_table_records[0])
-        interchange_level = 1
         block_size = vd.logical_block_size()
-        parent_links = []
-        child_links = []
-        lastbyte = 0
-        dirs = collections.deque([root_dir_record])
-        while dirs:
-            dir_record = dirs.popleft()
-
-            self._seek_to_extent(dir_record.extent_location())
-            length = dir_record.get_data_length()
-            offset = 0
-            last_record = None
-            data = cdfp.read(length)
-            while offset < length:
-                if offset > (len(data) - 1):
-                    # The data we read off of the ISO was shorter than what we
-                    # expected.  The ISO is corrupt, throw an error.
-                    raise pycdlibexception.PyCdlibInvalidISO('Invalid directory record')
-                lenbyte = bytearray([data[offset]])[0]
-                if lenbyte == 0:
-                    # If we saw a zero length, this is probably the padding for
-                    # the end of this extent.  Move the offset to the start of
-                    # the next extent.
-                    padsize = block_size - (offset % block_size)
-                    if data[offset:offset + padsize] != b'\x00' * padsize:
-                        # For now we are pedantic, and if the padding bytes
-                        # are not all zero we throw an Exception.  Depending
-                        # one what we see in the wild, we may have to loosen
-                        # this check.
-                        raise pycdlibexception.PyCdlibInvalidISO('Invalid padding on ISO')
-
-                    offset = offset + padsize
-                    continue
+        extent_to_inode = walk.extent_to_inode
+        all_extent_to_dr = walk.all_extent_to_dr
 
-                new_record = dr.DirectoryRecord()
-                rr = new_record.parse(vd, data[offset:offset + lenbyte],
-                                      dir_record)
-                offset += lenbyte
-
-                # The parse method of dr.DirectoryRecord returns None if this
-                # record doesn't have Rock Ridge extensions, or the version of
-                # the Rock Ridge extension (as detected for this directory record).
-                self._set_rock_ridge(rr)
-
-                # Cache some properties of this record for later use.
-                is_symlink = new_record.rock_ridge is not None and new_record.rock_ridge.is_symlink()
-                dots = new_record.is_dot() or new_record.is_dotdot()
-                rr_cl = new_record.rock_ridge is not None and new_record.rock_ridge.child_link_record_exists()
-                is_dir = new_record.is_dir()
-                data_length = new_record.get_data_length()
-                new_extent_loc = new_record.extent_location()
-
-                if is_pvd and not dots and not rr_cl and not is_symlink and new_extent_loc not in all_extent_to_dr:
-                    all_extent_to_dr[new_extent_loc] = new_record
-
-                # ISO generation programs sometimes use random extent locations
-                # for zero-length files.  Thus, it is not valid for us to link
-                # zero-length files to other files, as the linkage will be
-                # essentially random.  Make sure we ignore zero-length files
-                # (which includes symlinks) for linkage.  Similarly, we don't
-                # do the lastbyte calculation on zero-length files for the same
-                # reason.
-                if not is_dir:
-                    len_to_use = data_length
-                    extent_to_use = new_extent_loc
-                    # An important side-effect of this is that zero-length files
-                    # or symlinks get an inode, but it is always set to length 0
-                    # and location 0 and not actually written out.  This is so
-                    # that we can 'link' everything through the Inode.
-                    if len_to_use == 0 or is_symlink:
-                        len_to_use = 0
-                        extent_to_use = 0
-
-                    # Directory Records that point to the El Torito Boot Catalog
-                    # do not get Inodes since all of that is handled in-memory.
-                    if self.eltorito_boot_catalog is not None and extent_to_use == self.eltorito_boot_catalog.extent_location():
-                        self.eltorito_boot_catalog.add_dirrecord(new_record)
-                    else:
-                        # For all real files, we create an inode that points to
-                        # the location on disk.
-                        if extent_to_use in extent_to_inode:
-                            ino = extent_to_inode[extent_to_use]
-                        else:
-                            ino = inode.Inode()
-                            ino.parse(extent_to_use, len_to_use, cdfp,
-                                      block_size)
-                            extent_to_inode[extent_to_use] = ino
-                            self.inodes.append(ino)
-
-                        ino.linked_records.append(new_record)
-                        new_record.inode = ino
-
-                    new_end = extent_to_use * block_size + len_to_use
-                    if new_end > iso_file_length:
-                        # In this case, the end of the file is beyond the size
-                        # of the file.  Since this can't possibly work, truncate
-                        # the file size.
-                        new_record.inode.data_length = iso_file_length - extent_to_use * block_size
-                        for rec in new_record.inode.linked_records:
-                            rec.data_length = new_end
-                    else:
-                        # In this case, the new end is still within the file
-                        # size, but the PVD size is wrong.  Set the lastbyte
-                        # appropriately, which will eventually be used to fix
-                        # the PVD size.
-                        lastbyte = max(lastbyte, new_end)
-
-                if new_record.rock_ridge is not None and new_record.rock_ridge.dr_entries.ce_record is not None:
-                    ce_record = new_record.rock_ridge.dr_entries.ce_record
-                    orig_pos = cdfp.tell()
-                    self._seek_to_extent(ce_record.bl_cont_area)
-                    cdfp.seek(ce_record.offset_cont_area, os.SEEK_CUR)
-                    con_block = cdfp.read(ce_record.len_cont_area)
-                    new_record.rock_ridge.parse(con_block, False,
-                                                new_record.rock_ridge.bytes_to_skip,
-                                                True)
-                    cdfp.seek(orig_pos)
-                    block = self.pvd.track_rr_ce_entry(ce_record.bl_cont_area,
-                                                       ce_record.offset_cont_area,
-                                                       ce_record.len_cont_area)
-                    new_record.rock_ridge.update_ce_block(block)
-
-                if rr_cl:
-                    child_links.append(new_record)
-
-                if is_dir:
-                    if new_record.rock_ridge is not None and new_record.rock_ridge.relocated_record():
-                        self._rr_moved_record = new_record
-
-                    if new_record.is_dotdot() and new_record.rock_ridge is not None and new_record.rock_ridge.parent_link_record_exists():
-                        # If this is the dotdot record, and it has a parent
-                        # link record, make sure to link up the parent link
-                        # directory record.
-                        parent_links.append(new_record)
-                    if not dots and not rr_cl:
-                        dirs.append(new_record)
-                        new_record.set_ptr(extent_to_ptr[new_extent_loc])
-
-                try_long_entry = False
-                try:
-                    new_record.parent.track_child(new_record, block_size)
-                except pycdlibexception.PyCdlibInvalidInput:
-                    # dir_record.track_child() may throw a PyCdlibInvalidInput if it
-                    # saw a duplicate child.  However, we allow duplicate children
-                    # iff this record is a file and the last child has the same name;
-                    # this means we have a very long entry.  If that is not the case,
-                    # re-raise the error, otherwise pass through to try with the
-                    # allow_duplicates flag set to True.
-                    if new_record.is_dir() or last_record is None or last_record.file_identifier() != new_record.file_identifier():
-                        raise
+        length = dir_record.get_data_length()
+        offset = 0
+        last_record = None
+        data = self._read_from_iso(dir_record.extent_location() * block_size,
+                                   length)
+        while offset < length:
+            if offset > (len(data) - 1):
+                # The data we read off of the ISO was shorter than what we
+                # expected.  The ISO is corrupt, throw an error.
+                raise pycdlibexception.PyCdlibInvalidISO('Invalid directory record')
+            lenbyte = bytearray([data[offset]])[0]
+            if lenbyte == 0:
+                # If we saw a zero length, this is probably the padding for
+                # the end of this extent.  Move the offset to the start of
+                # the next extent.
+                padsize = block_size - (offset % block_size)
+                if data[offset:offset + padsize] != b'\x00' * padsize:
+                    # For now we are pedantic, and if the padding bytes
+                    # are not all zero we throw an Exception.  Depending
+                    # one what we see in the wild, we may have to loosen
+                    # this check.
+                    raise pycdlibexception.PyCdlibInvalidISO('Invalid padding on ISO')
+
+                offset = offset + padsize
+                continue
+
+            new_record = dr.DirectoryRecord()
+            rr = new_record.parse(vd, data[offset:offset + lenbyte],
+                                  dir_record, self._interned)
+            offset += lenbyte
+
+            # The parse method of dr.DirectoryRecord returns None if this
+            # record doesn't have Rock Ridge extensions, or the version of
+            # the Rock Ridge extension (as detected for this directory record).
+            self._set_rock_ridge(rr)
+
+            # Cache some properties of this record for later use.
+            is_symlink = new_record.rock_ridge is not None and new_record.rock_ridge.is_symlink()
+            dots = new_record.is_dot() or new_record.is_dotdot()
+            rr_cl = new_record.rock_ridge is not None and new_record.rock_ridge.child_link_record_exists()
+            is_dir = new_record.is_dir()
+            data_length = new_record.get_data_length()
+            new_extent_loc = new_record.extent_location()
+
+            if is_pvd and not dots and not rr_cl and not is_symlink and new_extent_loc not in all_extent_to_dr:
+                all_extent_to_dr[new_extent_loc] = new_record
+
+            # ISO generation programs sometimes use random extent locations
+            # for zero-length files.  Thus, it is not valid for us to link
+            # zero-length files to other files, as the linkage will be
+            # essentially random.  Make sure we ignore zero-length files
+            # (which includes symlinks) for linkage.  Similarly, we don't
+            # do the lastbyte calculation on zero-length files for the same
+            # reason.
+            if not is_dir:
+                len_to_use = data_length
+                extent_to_use = new_extent_loc
+                # An important side-effect of this is that zero-length files
+                # or symlinks get an inode, but it is always set to length 0
+                # and location 0 and not actually written out.  This is so
+                # that we can 'link' everything through the Inode.
+                if len_to_use == 0 or is_symlink:
+                    len_to_use = 0
+                    extent_to_use = 0
+
+                # Directory Records that point to the El Torito Boot Catalog
+                # do not get Inodes since all of that is handled in-memory.
+                if self.eltorito_boot_catalog is not None and extent_to_use == self.eltorito_boot_catalog.extent_location():
+                    self.eltorito_boot_catalog.add_dirrecord(new_record)
+                else:
+                    # For all real files, we create an inode that points to
+                    # the location on disk.
+                    if extent_to_use in extent_to_inode:
+                        ino = extent_to_inode[extent_to_use]
                     else:
-                        try_long_entry = True
+                        ino = inode.Inode()
+                        ino.parse(extent_to_use, len_to_use, cdfp,
+                                  block_size)
+                        extent_to_inode[extent_to_use] = ino
+                        self.inodes.append(ino)
+
+                    ino.linked_records.append(new_record)
+                    new_record.inode = ino
+
+                new_end = extent_to_use * block_size + len_to_use
+                if new_end > walk.iso_file_length:
+                    # In this case, the end of the file is beyond the size
+                    # of the file.  Since this can't possibly work, truncate
+                    # the file size.
+                    new_record.inode.data_length = walk.iso_file_length - extent_to_use * block_size
+                    for rec in new_record.inode.linked_records:
+                        rec.data_length = new_end
+                else:
+                    # In this case, the new end is still within the file
+                    # size, but the PVD size is wrong.  Set the lastbyte
+                    # appropriately, which will eventually be used to fix
+                    # the PVD size.
+                    walk.lastbyte = max(walk.lastbyte, new_end)
+
+            if new_record.rock_ridge is not None and new_record.rock_ridge.dr_entries.ce_record is not None:
+                ce_record = new_record.rock_ridge.dr_entries.ce_record
+                con_block = self._read_from_iso(ce_record.bl_cont_area * self.pvd.logical_block_size() + ce_record.offset_cont_area,
+                                                ce_record.len_cont_area)
+                new_record.rock_ridge.parse(con_block, False,
+                                            new_record.rock_ridge.bytes_to_skip,
+                                            True, self._interned)
+                block = self.pvd.track_rr_ce_entry(ce_record.bl_cont_area,
+                                                   ce_record.offset_cont_area,
+                                                   ce_record.len_cont_area)
+                new_record.rock_ridge.update_ce_block(block)
+
+            if rr_cl:
+                walk.child_links.append(new_record)
+
+            if is_dir:
+                if new_record.rock_ridge is not None and new_record.rock_ridge.relocated_record():
+                    self._rr_moved_record = new_record
+
+                if new_record.is_dotdot() and new_record.rock_ridge is not None and new_record.rock_ridge.parent_link_record_exists():
+                    # If this is the dotdot record, and it has a parent
+                    # link record, make sure to link up the parent link
+                    # directory record.
+                    walk.parent_links.append(new_record)
+                if not dots and not rr_cl:
+                    walk.pending[id(new_record)] = new_record
+                    new_record.set_ptr(walk.extent_to_ptr[new_extent_loc])
+
+            try_long_entry = False
+            try:
+                new_record.parent.track_child(new_record, block_size)
+            except pycdlibexception.PyCdlibInvalidInput:
+                # dir_record.track_child() may throw a PyCdlibInvalidInput if it
+                # saw a duplicate child.  However, we allow duplicate children
+                # iff this record is a file and the last child has the same name;
+                # this means we have a very long entry.  If that is not the case,
+                # re-raise the error, otherwise pass through to try with the
+                # allow_duplicates flag set to True.
+                if new_record.is_dir() or last_record is None or last_record.file_identifier() != new_record.file_identifier():
+                    raise
+                else:
+                    try_long_entry = True
 
-                if try_long_entry:
-                    new_record.parent.track_child(new_record, block_size, True)
+            if try_long_entry:
+                new_record.parent.track_child(new_record, block_size, True)
 
-                if is_pvd:
-                    if new_record.is_dir():
-                        new_level = _interchange_level_from_directory(new_record.file_identifier())
-                    else:
-                        new_level = _interchange_level_from_filename(new_record.file_identifier())
-                    interchange_level = max(interchange_level, new_level)
+            if is_pvd:
+                if new_record.is_dir():
+                    new_level = _interchange_level_from_directory(new_record.file_identifier())
+                else:
+                    new_level = _interchange_level_from_filename(new_record.file_identifier())
+                walk.interchange_level = max(walk.interchange_level, new_level)
 
-                last_record = new_record
+            last_record = new_record
 
-        for pl in parent_links:
-            pl.rock_ridge.parent_link = all_extent_to_dr[pl.rock_ridge.parent_link_extent()]
+    def _walk_directories(self, walk):
+        '''
+        An internal method to walk all of the directory records in a volume
+        descriptor that have not yet been parsed, and then link up the Rock
+        Ridge parent and child links.
 
-        for cl in child_links:
-            cl.rock_ridge.cl_to_moved_dr = all_extent_to_dr[cl.rock_ridge.child_link_extent()]
-            cl.rock_ridge.cl_to_moved_dr.rock_ridge.moved_to_cl_dr = cl
+        Parameters:
+         walk - The _DirectoryWalk object for the volume descriptor.
+        Returns:
+         Nothing.
+        '''
+        while walk.pending:
+            key_unused, dir_record = walk.pending.popitem(last=False)
+            if walk.vd is None:
+                self._walk_udf_directory(walk, dir_record)
+            else:
+                self._walk_directory(walk, dir_record)
 
-        return interchange_level, lastbyte
+        if walk.vd is None:
+            return
+
+        for pl in walk.parent_links:
+            pl.rock_ridge.parent_link = walk.all_extent_to_dr[pl.rock_ridge.parent_link_extent()]
+
+        for cl in walk.child_links:
+            cl.rock_ridge.cl_to_moved_dr = walk.all_extent_to_dr[cl.rock_ridge.child_link_extent()]
+            cl.rock_ridge.cl_to_moved_dr.rock_ridge.moved_to_cl_dr = cl
 
     def _initialize(self):
         '''
@@ -1115,6 +1470,8 @@ class PyCdlib(object):
          Nothing.
         '''
         self._cdfp = None
+        self._cdmap = None
+        self._cdmmap = None
         self.pvd = None
         self.svds = []
         self.brs = []
@@ -1142,13 +1499,17 @@ class PyCdlib(object):
         self._rr_moved_rr_name = None
         self.enhanced_vd = None
         self.joliet_vd = None
-        self._find_iso_record.cache_clear()  # pylint: disable=no-member
-        self._find_rr_record.cache_clear()  # pylint: disable=no-member
-        self._find_joliet_record.cache_clear()  # pylint: disable=no-member
-        self._find_udf_record.cache_clear()  # pylint: disable=no-member
+        self._iso_path_index = self._PathIndex()
+        self._rr_path_index = self._PathIndex()
+        self._joliet_path_index = self._PathIndex()
+        self._udf_path_index = self._PathIndex()
         self._write_check_list = []
         self.version_vd = None
         self.inodes = []
+        self._dir_walks = []
+        self._interned = utils.InternTable()
+        self._batch_depth = 0
+        self._file_layout = None
 
     def _parse_path_table(self, ptr_size, extent):
         '''
@@ -1163,8 +1524,8 @@ class PyCdlib(object):
         Returns:
          Nothing.
         '''
-        self._seek_to_extent(extent)
-        data = self._cdfp.read(ptr_size)
+        data = self._read_from_iso(extent * self.pvd.logical_block_size(),
+                                   ptr_size)
         offset = 0
         out = []
         extent_to_ptr = {}
@@ -1210,12 +1571,107 @@ class PyCdlib(object):
         self.eltorito_boot_catalog = eltorito.EltoritoBootCatalog(br)
         eltorito_boot_catalog_extent, = struct.unpack_from('=L', br.boot_system_use[:4], 0)
 
-        old = self._cdfp.tell()
-        self._cdfp.seek(eltorito_boot_catalog_extent * self.pvd.logical_block_size())
-        data = self._cdfp.read(32)
+        offset = eltorito_boot_catalog_extent * self.pvd.logical_block_size()
+        data = self._read_from_iso(offset, 32)
         while not self.eltorito_boot_catalog.parse(data):
-            data = self._cdfp.read(32)
-        self._cdfp.seek(old)
+            offset += 32
+            data = self._read_from_iso(offset, 32)
+
+    class _FileLayout(object):
+        '''
+        A class to remember where the file data was placed by the last full
+        reshuffle of the extents.  The file data always comes after all of the
+        metadata, so as long as the metadata has not changed size, the layout
+        can be updated by only reassigning the files that moved.  The files
+        are placed directory by directory, so the layout also remembers where
+        the files of each directory start; when files are added to or removed
+        from a directory, only the files from that directory onwards move.
+        '''
+        __slots__ = ('data_start', 'part_start', 'udf_files', 'dirs',
+                     'dir_index', 'dir_starts', 'first_dirty', 'placed',
+                     'inodes', 'extents', 'num_extents')
+
+        def __init__(self, data_start, part_start, skip, udf_files, dirs):
+            self.data_start = data_start
+            self.part_start = part_start
+            self.udf_files = udf_files
+            self.dirs = dirs
+            self.dir_index = {}
+            for index, dir_record in enumerate(dirs):
+                self.dir_index[id(dir_record)] = index
+            self.dir_starts = []
+            self.first_dirty = None
+            self.placed = dict(skip)
+            self.inodes = []
+            self.extents = []
+            self.num_extents = []
+
+        def place(self, ino, extent, log_block_size):
+            '''
+            Record that an Inode was placed at the given extent.
+
+            Parameters:
+             ino - The Inode that was placed.
+             extent - The extent the Inode was placed at.
+             log_block_size - The logical block size of the ISO.
+            Returns:
+             Nothing.
+            '''
+            self.placed[id(ino)] = True
+            self.inodes.append(ino)
+            self.extents.append(extent)
+            self.num_extents.append(utils.ceiling_div(ino.get_data_length(),
+                                                      log_block_size))
+
+        def touch(self, dir_record):
+            '''
+            Record that files were added to or removed from a directory.
+
+            Parameters:
+             dir_record - The Directory Record of the directory.
+            Returns:
+             True if the directory is part of the layout, False otherwise (in
+             which case the layout can no longer be used).
+            '''
+            index = self.dir_index.get(id(dir_record))
+            if index is None:
+                return False
+            if self.first_dirty is None or index < self.first_dirty:
+                self.first_dirty = index
+            return True
+
+        def end(self):
+            '''
+            Get the extent just past the file data placed so far.
+
+            Parameters:
+             None.
+            Returns:
+             The extent just past the file data placed so far.
+            '''
+            if self.extents:
+                return self.extents[-1] + self.num_extents[-1]
+            return self.data_start
+
+        def truncate(self, dir_ordinal):
+            '''
+            Forget about all of the Inodes placed for the directories from the
+            given one onwards (and for UDF).
+
+            Parameters:
+             dir_ordinal - The index of the first directory to forget about.
+            Returns:
+             The extent that the first forgotten Inode was placed at.
+            '''
+            index = self.dir_starts[dir_ordinal]
+            for ino in self.inodes[index:]:
+                del self.placed[id(ino)]
+            del self.dir_starts[dir_ordinal:]
+            del self.inodes[index:]
+            del self.extents[index:]
+            del self.num_extents[index:]
+            self.first_dirty = None
+            return self.end()
 
     def _reshuffle_extents(self):
         '''
@@ -1232,13 +1688,21 @@ class PyCdlib(object):
         endian), the Primary Volume Descriptor directory records, the
         Supplementary Volume Descriptor directory records, the Rock Ridge ER
         sector, the El Torito Boot Catalog, the El Torito Initial Entry, and
-        finally the data for the files.
+        finally the data for the files.  If only files have been added or
+        removed since the last time this was called, only the extents of the
+        file data that moved are reassigned.
 
         Parameters:
          None.
         Returns:
          Nothing.
         '''
+        self._walk_all_dirs()
+
+        if self._file_layout is not None:
+            self._reshuffle_file_extents()
+            return
+
         current_extent = 16
         for pvd in self.pvds:
             pvd.new_extent_loc = current_extent
@@ -1369,19 +1833,16 @@ class PyCdlib(object):
                 # to find the extent containing the list of File Identifier
                 # Descriptors that are in this directory.
                 udf_file_entry.set_data_location(current_extent, current_extent - part_start)
+                # The File Identifier Descriptors are packed one after the
+                # other into contiguous blocks (spread across as many
+                # allocation descriptors as needed), and UDF allows them to
+                # span blocks; each one lives at the block its first byte is
+                # in.
+                data_start = current_extent
                 offset = 0
                 for d in udf_file_entry.fi_descs:
-                    if offset >= log_block_size:
-                        # The offset has spilled over into a new extent.
-                        # Increase the current extent by one, and update the
-                        # offset.  Note that the offset does not go to 0, since
-                        # UDF allows File Identifier Descs to span extents.
-                        # Instead, it is the current offset minus the size of a
-                        # block (say 2050 - 2048, leaving us at offset 2).
-                        current_extent += 1
-                        offset = offset - log_block_size
-
-                    d.set_location(current_extent, current_extent - part_start)
+                    d_extent = data_start + offset // log_block_size
+                    d.set_location(d_extent, d_extent - part_start)
                     if not d.is_parent():
                         if d.is_dir():
                             udf_file_entries.append((d.file_entry, d))
@@ -1389,10 +1850,7 @@ class PyCdlib(object):
                             udf_file_assign_list.append((d.file_entry, d))
                     offset += udfmod.UDFFileIdentifierDescriptor.length(len(d.fi))
 
-                if offset > log_block_size:
-                    current_extent += 1
-
-                current_extent += 1
+                current_extent = data_start + max(utils.ceiling_div(offset, log_block_size), 1)
 
             # Now assign files (this includes symlinks).
             udf_file_entry_inodes_assigned = {}
@@ -1438,12 +1896,11 @@ class PyCdlib(object):
             current_extent += self.joliet_vd.path_table_num_extents
 
         self.pvd.clear_rr_ce_entries()
-        current_extent, pvd_files = _reassign_vd_dirrecord_extents(self.pvd,
+        current_extent, pvd_files_unused = _reassign_vd_dirrecord_extents(self.pvd,
                                                                    current_extent)
 
-        joliet_files = []
         if self.joliet_vd is not None:
-            current_extent, joliet_files = _reassign_vd_dirrecord_extents(self.joliet_vd,
+            current_extent, joliet_files_unused = _reassign_vd_dirrecord_extents(self.joliet_vd,
                                                                           current_extent)
 
         # The rock ridge 'ER' sector must be after all of the directory
@@ -1452,22 +1909,6 @@ class PyCdlib(object):
             self.pvd.root_directory_record().children[0].rock_ridge.dr_entries.ce_record.update_extent(current_extent)
             current_extent += 1
 
-        def _set_inode(ino, current_extent, part_start):
-            '''
-            Internal method to set the location of an inode and update the
-            metadata of all records attached to it.
-
-            Parameters:
-             ino - The inode to update.
-             current_extent - The extent to set the inode to.
-             part_start - The start of the partition that the inode is on.
-            Returns:
-             Nothing.
-            '''
-            ino.set_location(current_extent)
-            for rec in ino.linked_records:
-                rec.set_data_location(current_extent, current_extent - part_start)
-
         if self.eltorito_boot_catalog is not None:
             self.eltorito_boot_catalog.update_catalog_extent(current_extent)
             for rec in self.eltorito_boot_catalog.dirrecords:
@@ -1488,27 +1929,37 @@ class PyCdlib(object):
                 if self.isohybrid_mbr is not None:
                     self.isohybrid_mbr.update_rba(current_extent)
 
-                _set_inode(entry.inode, current_extent, part_start)
+                _set_inode_location(entry.inode, current_extent, part_start)
                 linked_inodes[id(entry.inode)] = True
                 current_extent += utils.ceiling_div(entry.inode.get_data_length(),
                                                     log_block_size)
 
-        for ino in pvd_files + joliet_files + udf_files:
-            if id(ino) in linked_inodes:
-                # We've already assigned an extent because it was linked to an
-                # earlier entry.
-                continue
-
-            _set_inode(ino, current_extent, part_start)
-
-            linked_inodes[id(ino)] = True
-
-            current_extent += utils.ceiling_div(ino.get_data_length(),
-                                                log_block_size)
+        # Remember where the file data starts, and which inodes were placed
+        # where, so that later changes that only add or remove files can
+        # redo just the part of the layout that moves.
+        dirs = _vd_directories(self.pvd)
+        if self.joliet_vd is not None:
+            dirs += _vd_directories(self.joliet_vd)
+        layout = self._FileLayout(current_extent, part_start, linked_inodes,
+                                  udf_files, dirs)
+        current_extent = self._place_files(layout, 0, current_extent)
 
         if self.enhanced_vd is not None:
             self.enhanced_vd.root_directory_record().new_extent_loc = self.pvd.root_directory_record().new_extent_loc
 
+        self._finish_reshuffle(current_extent)
+        self._file_layout = layout
+
+    def _finish_reshuffle(self, current_extent):
+        '''
+        An internal method to do the final steps of assigning extents, once
+        everything up to the end of the file data has been assigned.
+
+        Parameters:
+         current_extent - The extent just past the end of the file data.
+        Returns:
+         Nothing.
+        '''
         if self.udf_anchors:
             self.udf_anchors[1].set_location(current_extent,
                                              self.udf_main_descs.pvd.new_extent_loc,
@@ -1519,6 +1970,90 @@ class PyCdlib(object):
 
         self._needs_reshuffle = False
 
+    def _place_files(self, layout, dir_ordinal, current_extent):
+        '''
+        An internal method to assign extents to the data of the files in the
+        directories of the layout from the given one onwards, followed by the
+        UDF files.  Inodes that have already been placed are skipped.
+
+        Parameters:
+         layout - The _FileLayout to place the files in.
+         dir_ordinal - The index of the first directory to place the files of.
+         current_extent - The extent to place the first file at.
+        Returns:
+         The extent just past the last file placed.
+        '''
+        log_block_size = self.pvd.logical_block_size()
+
+        def _place(ino, current_extent):
+            if id(ino) in layout.placed:
+                # We've already assigned an extent because it was linked to an
+                # earlier entry.
+                return current_extent
+            _set_inode_location(ino, current_extent, layout.part_start)
+            layout.place(ino, current_extent, log_block_size)
+            return current_extent + utils.ceiling_div(ino.get_data_length(),
+                                                      log_block_size)
+
+        for dir_record in layout.dirs[dir_ordinal:]:
+            layout.dir_starts.append(len(layout.inodes))
+            for child in dir_record.children:
+                if child.is_dot() or child.is_dotdot() or child.is_dir():
+                    continue
+                if not _dirrecord_has_data(child):
+                    # If this is a child link record, the extent location
+                    # really doesn't matter, since it is fake.  We set it to
+                    # zero.
+                    child.new_extent_loc = 0
+                elif child.inode is not None:
+                    current_extent = _place(child.inode, current_extent)
+
+        layout.dir_starts.append(len(layout.inodes))
+        for ino in layout.udf_files:
+            current_extent = _place(ino, current_extent)
+
+        return current_extent
+
+    def _reshuffle_file_extents(self):
+        '''
+        An internal method to reassign extents to the file data only, keeping
+        the extents of all of the metadata from the last full reshuffle.  This
+        may only be used when nothing but files have been added or removed
+        since the last call to _reshuffle_extents (which is tracked by
+        _file_layout being set).  Only the files of the first directory that
+        changed and of the directories after it are looked at and reassigned;
+        everything before stays put.
+
+        Parameters:
+         None.
+        Returns:
+         Nothing.
+        '''
+        layout = self._file_layout
+
+        if layout.first_dirty is None:
+            current_extent = layout.end()
+        else:
+            ordinal = layout.first_dirty
+            current_extent = self._place_files(layout, ordinal,
+                                               layout.truncate(ordinal))
+
+        self._finish_reshuffle(current_extent)
+
+    def _touch_file_layout(self, dir_record):
+        '''
+        An internal method to note that files were added to or removed from a
+        directory, so that the next reshuffle reassigns the file data from
+        that directory onwards.
+
+        Parameters:
+         dir_record - The Directory Record of the directory.
+        Returns:
+         Nothing.
+        '''
+        if self._file_layout is not None and not self._file_layout.touch(dir_record):
+            self._file_layout = None
+
     def _add_child_to_dr(self, child, logical_block_size):
         '''
         An internal method to add a child to a directory record, expanding the
@@ -1530,6 +2065,8 @@ class PyCdlib(object):
         Returns:
          The number of bytes to add for this directory record (this may be zero).
         '''
+        self._touch_file_layout(child.parent)
+
         try_long_entry = False
         try:
             ret = child.parent.add_child(child, logical_block_size)
@@ -1551,10 +2088,52 @@ class PyCdlib(object):
         # in order to fit the directory record for this child.  Add another
         # extent as appropriate here.
         if ret:
+            # The directory grew, so the metadata extents all move.
+            self._file_layout = None
             return self.pvd.logical_block_size()
 
         return 0
 
+    def _forget_dr_paths(self, rec):
+        '''
+        An internal method to remove a directory record, and everything
+        underneath it, from the ISO9660, Rock Ridge, and Joliet path indices.
+
+        Parameters:
+         rec - The directory record that is being removed.
+        Returns:
+         Nothing.
+        '''
+        recs = [rec]
+        while recs:
+            rec = recs.pop()
+            self._iso_path_index.remove(rec)
+            self._rr_path_index.remove(rec)
+            self._joliet_path_index.remove(rec)
+            if rec.rock_ridge is not None and rec.rock_ridge.cl_to_moved_dr is not None:
+                # Rock Ridge paths through a child link resolve into the
+                # relocated directory.
+                recs.append(rec.rock_ridge.cl_to_moved_dr)
+            if rec.is_dir():
+                recs.extend(rec.children[2:])
+
+    def _forget_udf_paths(self, rec):
+        '''
+        An internal method to remove a UDF File Entry, and everything
+        underneath it, from the UDF path index.
+
+        Parameters:
+         rec - The UDF File Entry that is being removed.
+        Returns:
+         Nothing.
+        '''
+        recs = [rec]
+        while recs:
+            rec = recs.pop()
+            self._udf_path_index.remove(rec)
+            if rec.is_dir():
+                recs.extend([fi_desc.file_entry for fi_desc in rec.fi_descs if not fi_desc.is_parent()])
+
     def _remove_child_from_dr(self, child, index, logical_block_size):
         '''
         An internal method to remove a child from a directory record, shrinking
@@ -1567,15 +2146,18 @@ class PyCdlib(object):
         Returns:
          The number of bytes to remove for this directory record (this may be zero).
         '''
+        self._forget_dr_paths(child)
+        self._touch_file_layout(child.parent)
 
-        self._find_iso_record.cache_clear()  # pylint: disable=no-member
-        self._find_rr_record.cache_clear()  # pylint: disable=no-member
-        self._find_joliet_record.cache_clear()  # pylint: disable=no-member
+        if child.rock_ridge is not None and child.rock_ridge.dr_entries.ce_record is not None:
+            # Continuation Entries are assigned along with the directories.
+            self._file_layout = None
 
         # The remove_child() method returns True if the parent no longer needs
         # the extent that the directory record for this child was on.  Remove
         # the extent as appropriate here.
         if child.parent.remove_child(child, index, logical_block_size):
+            self._file_layout = None
             return self.pvd.logical_block_size()
 
         return 0
@@ -1668,7 +2250,8 @@ class PyCdlib(object):
 
         return rec, num_bytes_to_add
 
-    def _calculate_eltorito_boot_info_table_csum(self, data_fp, data_len):
+    def _calculate_eltorito_boot_info_table_csum(self, data_fp, data_len,
+                                                 offset):
         '''
         An internal method to calculate the checksum for an El Torito Boot Info
         Table.  This checksum is a simple 32-bit checksum over all of the data
@@ -1677,31 +2260,28 @@ class PyCdlib(object):
         Parameters:
          data_fp - The file object to read the input data from.
          data_len - The length of the input file.
+         offset - The offset in the file object that the input data starts at.
         Returns:
          An integer representing the 32-bit checksum for the boot info table.
         '''
         # Here we want to read the boot file so we can calculate the checksum
-        # over it.
-        num_sectors = utils.ceiling_div(data_len, self.pvd.logical_block_size())
+        # over it.  The file is read a number of sectors at a time, and the
+        # last sector is padded with zeros.
+        log_block_size = self.pvd.logical_block_size()
+        left = utils.ceiling_div(data_len, log_block_size) * log_block_size
+        chunk_size = 64 * log_block_size
         csum = 0
-        curr_sector = 0
-        while curr_sector < num_sectors:
-            block = data_fp.read(self.pvd.logical_block_size())
-            block = block.ljust(2048, b'\x00')
-            i = 0
-            if curr_sector == 0:
-                # The first 64 bytes are not included in the checksum, so skip
-                # them here.
-                i = 64
-            while i < len(block):
-                tmp, = struct.unpack_from('=L', block[:i + 4], i)
-                csum += tmp
-                csum = csum & 0xffffffff
-                i += 4
-
-            curr_sector += 1
-
-        return csum
+        # The first 64 bytes are not included in the checksum, so skip them.
+        skip = 64
+        while left > 0:
+            readsize = min(chunk_size, left)
+            chunk = utils.pread(data_fp, readsize, offset).ljust(readsize, b'\x00')
+            csum += checksum.word32_sum(chunk[skip:] if skip else chunk)
+            skip = 0
+            left -= readsize
+            offset += readsize
+
+        return csum & 0xffffffff
 
     def _check_for_eltorito_boot_info_table(self, ino):
         '''
@@ -1713,21 +2293,20 @@ class PyCdlib(object):
         Returns:
          Nothing.
         '''
-        orig = self._cdfp.tell()
-        with inode.InodeOpenData(ino, self.pvd.logical_block_size()) as (data_fp, data_len):
-            data_fp.seek(8, os.SEEK_CUR)
+        # This can run while other threads are reading from the ISO (when it
+        # was opened lazily), so only read at explicit offsets.
+        log_block_size = self.pvd.logical_block_size()
+        offset = ino.data_offset(log_block_size)
+        with inode.InodeOpenData(ino, log_block_size, seek=False) as (data_fp, data_len):
             bi_table = eltorito.EltoritoBootInfoTable()
-            if bi_table.parse(self.pvd, data_fp.read(eltorito.EltoritoBootInfoTable.header_length()), ino):
-                data_fp.seek(-24, os.SEEK_CUR)
+            if bi_table.parse(self.pvd, utils.pread(data_fp, eltorito.EltoritoBootInfoTable.header_length(), offset + 8), ino):
                 # OK, the rest of the stuff checks out; do a final
                 # check to make sure the checksum is reasonable.
-                csum = self._calculate_eltorito_boot_info_table_csum(data_fp, data_len)
+                csum = self._calculate_eltorito_boot_info_table_csum(data_fp, data_len, offset)
 
                 if csum == bi_table.csum:
                     ino.add_boot_info_table(bi_table)
 
-        self._cdfp.seek(orig)
-
     def _check_rr_name(self, rr_name):
         '''
         An internal method to check whether this ISO requires or does not
@@ -1818,8 +2397,8 @@ class PyCdlib(object):
          Nothing.
         '''
         # Read in the Volume Descriptor Sequence
-        self._seek_to_extent(extent)
-        vd_data = self._cdfp.read(length)
+        vd_data = self._read_from_iso(extent * self.pvd.logical_block_size(),
+                                      length)
 
         # And parse it.  Since the sequence doesn't have to be in any set order,
         # and since some of the entries may be missing, we parse the Descriptor
@@ -1885,11 +2464,10 @@ class PyCdlib(object):
         block_size = self.pvd.logical_block_size()
 
         # Parse the anchors
-        anchor_locations = [(256 * block_size, os.SEEK_SET), (-2048, os.SEEK_END)]
-        for loc, whence in anchor_locations:
-            self._cdfp.seek(loc, whence)
-            extent = self._cdfp.tell() // 2048
-            anchor_data = self._cdfp.read(2048)
+        anchor_locations = [256 * block_size, self._iso_file_length() - 2048]
+        for loc in anchor_locations:
+            extent = loc // 2048
+            anchor_data = self._read_from_iso(loc, 2048)
             anchor_tag = udfmod.UDFTag()
             anchor_tag.parse(anchor_data, extent)
             if anchor_tag.tag_ident != 2:
@@ -1909,8 +2487,8 @@ class PyCdlib(object):
                                   self.udf_reserve_descs)
 
         # Parse the Logical Volume Integrity Sequence
-        self._seek_to_extent(self.udf_main_descs.logical_volume.integrity_sequence_extent)
-        integrity_data = self._cdfp.read(self.udf_main_descs.logical_volume.integrity_sequence_length)
+        integrity_data = self._read_from_iso(self.udf_main_descs.logical_volume.integrity_sequence_extent * block_size,
+                                             self.udf_main_descs.logical_volume.integrity_sequence_length)
 
         offset = 0
         current_extent = self.udf_main_descs.logical_volume.integrity_sequence_extent
@@ -1932,9 +2510,9 @@ class PyCdlib(object):
 
         # Now look for the File Set Descriptor
         current_extent = self.udf_main_descs.partition.part_start_location
-        self._seek_to_extent(current_extent)
         # Read the data for the File Set and File Terminator together
-        file_set_and_term_data = self._cdfp.read(2 * block_size)
+        file_set_and_term_data = self._read_from_iso(current_extent * block_size,
+                                                     2 * block_size)
 
         desc_tag = udfmod.UDFTag()
         desc_tag.parse(file_set_and_term_data[:block_size], 0)
@@ -1965,8 +2543,8 @@ class PyCdlib(object):
         Returns:
          A UDF File Entry object corresponding to the on-disk File Entry.
         '''
-        self._seek_to_extent(abs_file_entry_extent)
-        icbdata = self._cdfp.read(icb.extent_length)
+        icbdata = self._read_from_iso(abs_file_entry_extent * self.pvd.logical_block_size(),
+                                      icb.extent_length)
 
         desc_tag = udfmod.UDFTag()
         desc_tag.parse(icbdata, icb.log_block_num)
@@ -1978,84 +2556,93 @@ class PyCdlib(object):
 
         return file_entry
 
-    def _walk_udf_directories(self, extent_to_inode):
+    def _walk_udf_directory(self, walk, udf_file_entry):
         '''
-        An internal method to walk a UDF filesystem and add all the metadata
-        to this object.
+        An internal method to parse the File Identifier Descriptors (and the
+        File Entries they point to) of a single UDF directory.  Any child
+        directories are queued on the walk to be parsed later.
 
         Parameters:
-         extent_to_inode - A map from extent numbers to Inodes.
+         walk - The _DirectoryWalk object for the UDF filesystem.
+         udf_file_entry - The UDF File Entry of the directory to parse.
         Returns:
          Nothing.
         '''
         part_start = self.udf_main_descs.partition.part_start_location
-        self.udf_root = self._parse_udf_file_entry(part_start + self.udf_file_set.root_dir_icb.log_block_num,
-                                                   self.udf_file_set.root_dir_icb,
-                                                   None)
-
         log_block_size = self.pvd.logical_block_size()
-        udf_file_entries = collections.deque([self.udf_root])
-        while udf_file_entries:
-            udf_file_entry = udf_file_entries.popleft()
-
-            for desc_len, desc_pos in udf_file_entry.alloc_descs:
-                abs_file_ident_extent = part_start + desc_pos
-                self._seek_to_extent(abs_file_ident_extent)
-                data = self._cdfp.read(desc_len)
-                offset = 0
-                while offset < len(data):
-                    current_extent = (abs_file_ident_extent * log_block_size + offset) // log_block_size
-
-                    desc_tag = udfmod.UDFTag()
-                    desc_tag.parse(data[offset:], current_extent - part_start)
-                    if desc_tag.tag_ident != 257:
-                        raise pycdlibexception.PyCdlibInvalidISO('UDF File Identifier Tag identifier not 257')
-                    file_ident = udfmod.UDFFileIdentifierDescriptor()
-                    offset += file_ident.parse(data[offset:],
-                                               current_extent,
-                                               desc_tag)
-                    if file_ident.is_parent():
-                        # For a parent, no further work to do.
-                        udf_file_entry.track_file_ident_desc(file_ident)
-                        continue
-
-                    abs_file_entry_extent = part_start + file_ident.icb.log_block_num
-                    next_entry = self._parse_udf_file_entry(abs_file_entry_extent,
-                                                            file_ident.icb,
-                                                            udf_file_entry)
-                    # For a non-parent, we delay adding this to the list of
-                    # fi_descs until after we check whether this is a valid
-                    # entry or not.
-                    udf_file_entry.track_file_ident_desc(file_ident)
+        extent_to_inode = walk.extent_to_inode
+
+        # The File Identifier Descriptors form one stream across all of the
+        # allocation descriptors, and may be split between two of them, so
+        # read them all in and remember where each one starts in the stream.
+        data = bytearray()
+        desc_starts = []
+        for desc_len, desc_pos in udf_file_entry.alloc_descs:
+            desc_starts.append((len(data), part_start + desc_pos))
+            data += self._read_from_iso((part_start + desc_pos) * log_block_size,
+                                        desc_len)
+        # Parse out of a view of the data, so that each descriptor does not
+        # copy the rest of the directory.
+        view = memoryview(data)
+
+        desc_index = 0
+        offset = 0
+        while offset < len(data):
+            while desc_index + 1 < len(desc_starts) and desc_starts[desc_index + 1][0] <= offset:
+                desc_index += 1
+            (desc_start, abs_file_ident_extent) = desc_starts[desc_index]
+            current_extent = abs_file_ident_extent + (offset - desc_start) // log_block_size
 
-                    file_ident.file_entry = next_entry
-                    next_entry.file_ident = file_ident
+            desc_tag = udfmod.UDFTag()
+            desc_tag.parse(view[offset:], current_extent - part_start)
+            if desc_tag.tag_ident != 257:
+                raise pycdlibexception.PyCdlibInvalidISO('UDF File Identifier Tag identifier not 257')
+            file_ident = udfmod.UDFFileIdentifierDescriptor()
+            offset += file_ident.parse(view[offset:],
+                                       current_extent,
+                                       desc_tag)
+            if file_ident.is_parent():
+                # For a parent, no further work to do.
+                udf_file_entry.track_file_ident_desc(file_ident)
+                continue
 
-                    if file_ident.is_dir():
-                        udf_file_entries.append(next_entry)
+            abs_file_entry_extent = part_start + file_ident.icb.log_block_num
+            next_entry = self._parse_udf_file_entry(abs_file_entry_extent,
+                                                    file_ident.icb,
+                                                    udf_file_entry)
+            # For a non-parent, we delay adding this to the list of
+            # fi_descs until after we check whether this is a valid
+            # entry or not.
+            udf_file_entry.track_file_ident_desc(file_ident)
+
+            file_ident.file_entry = next_entry
+            next_entry.file_ident = file_ident
+
+            if file_ident.is_dir():
+                walk.pending[id(next_entry)] = next_entry
+            else:
+                if next_entry.get_data_length() > 0:
+                    abs_file_data_extent = part_start + next_entry.alloc_descs[0][1]
+                else:
+                    abs_file_data_extent = 0
+                if self.eltorito_boot_catalog is not None and abs_file_data_extent == self.eltorito_boot_catalog.extent_location():
+                    self.eltorito_boot_catalog.add_dirrecord(next_entry)
+                else:
+                    if abs_file_data_extent in extent_to_inode:
+                        ino = extent_to_inode[abs_file_data_extent]
                     else:
-                        if next_entry.get_data_length() > 0:
-                            abs_file_data_extent = part_start + next_entry.alloc_descs[0][1]
-                        else:
-                            abs_file_data_extent = 0
-                        if self.eltorito_boot_catalog is not None and abs_file_data_extent == self.eltorito_boot_catalog.extent_location():
-                            self.eltorito_boot_catalog.add_dirrecord(next_entry)
-                        else:
-                            if abs_file_data_extent in extent_to_inode:
-                                ino = extent_to_inode[abs_file_data_extent]
-                            else:
-                                ino = inode.Inode()
-                                ino.parse(abs_file_data_extent,
-                                          next_entry.get_data_length(), self._cdfp,
-                                          log_block_size)
-                                extent_to_inode[abs_file_data_extent] = ino
-                                self.inodes.append(ino)
-
-                            ino.linked_records.append(next_entry)
-                            next_entry.inode = ino
-                udf_file_entry.finish_directory_parse()
-
-    def _open_fp(self, fp):
+                        ino = inode.Inode()
+                        ino.parse(abs_file_data_extent,
+                                  next_entry.get_data_length(), self._cdfp,
+                                  log_block_size)
+                        extent_to_inode[abs_file_data_extent] = ino
+                        self.inodes.append(ino)
+
+                    ino.linked_records.append(next_entry)
+                    next_entry.inode = ino
+        udf_file_entry.finish_directory_parse()
+
+    def _open_fp(self, fp, mmap, lazy, index_cache=None):
         '''
         An internal method to open an existing ISO for inspection and
         modification.  Note that the file object passed in here must stay open
@@ -2064,6 +2651,11 @@ class PyCdlib(object):
 
         Parameters:
          fp - The file object containing the ISO to open up.
+         mmap - Whether to memory-map the ISO and parse the metadata directly
+                out of the mapping.
+         lazy - Whether to defer parsing directories until they are needed.
+         index_cache - An optional indexcache.IndexCache to load the parsed
+                       metadata from, or to store it in after parsing.
         Returns:
          Nothing.
         '''
@@ -2072,19 +2664,97 @@ class PyCdlib(object):
 
         self._cdfp = fp
 
+        if mmap:
+            self._map_fp(fp)
+
+        key = None
+        if index_cache is not None:
+            key = index_cache.key(fp)
+
+        try:
+            if key is None:
+                self._parse_fp(lazy)
+            elif not self._load_index(index_cache, key):
+                # The whole tree has to be parsed to be stored, so a lazy
+                # parse would buy nothing here.
+                self._parse_fp(False)
+                self._store_index(index_cache, key)
+        except:
+            self._unmap_fp()
+            raise
+
+    def _load_index(self, index_cache, key):
+        '''
+        An internal method to restore the parsed metadata of the ISO from an
+        index cache.
+
+        Parameters:
+         index_cache - The indexcache.IndexCache to load from.
+         key - The cache key of the ISO.
+        Returns:
+         True if the metadata was restored from the cache, False otherwise.
+        '''
+        state = index_cache.load(key)
+        if state is None:
+            return False
+
+        for name, value in state.items():
+            setattr(self, name, value)
+
+        # The input file object is not stored in the cache; point the inodes
+        # of the data on the ISO back at it.
+        for ino in self.inodes:
+            if ino.original_data_location == ino.DATA_ON_ORIGINAL_ISO:
+                ino.data_fp = self._cdfp
+
+        return True
+
+    def _store_index(self, index_cache, key):
+        '''
+        An internal method to store the parsed metadata of the ISO in an index
+        cache.
+
+        Parameters:
+         index_cache - The indexcache.IndexCache to store in.
+         key - The cache key of the ISO.
+        Returns:
+         Nothing.
+        '''
+        state = {}
+        for name in self.__slots__:
+            if name not in self._UNCACHED_ATTRIBUTES and hasattr(self, name):
+                state[name] = getattr(self, name)
+
+        detached = []
+        for ino in self.inodes:
+            if ino.data_fp is self._cdfp:
+                ino.data_fp = None
+                detached.append(ino)
+        try:
+            index_cache.store(key, state)
+        finally:
+            for ino in detached:
+                ino.data_fp = self._cdfp
+
+    def _parse_fp(self, lazy):
+        '''
+        An internal method to parse all of the metadata out of the input ISO.
+
+        Parameters:
+         lazy - Whether to defer parsing directories until they are needed.
+        Returns:
+         Nothing.
+        '''
         # Get the Primary Volume Descriptor (pvd), the set of Supplementary
         # Volume Descriptors (svds), the set of Volume Partition
         # Descriptors (vpds), the set of Boot Records (brs), and the set of
         # Volume Descriptor Set Terminators (vdsts)
         self._parse_volume_descriptors()
 
-        old = self._cdfp.tell()
-        self._cdfp.seek(0)
         tmp_mbr = isohybrid.IsoHybrid()
-        if tmp_mbr.parse(self._cdfp.read(512)):
+        if tmp_mbr.parse(self._read_from_iso(0, 512)):
             # We only save the object if it turns out to be a valid IsoHybrid
             self.isohybrid_mbr = tmp_mbr
-        self._cdfp.seek(old)
 
         if self.pvd.application_use[141:149] == b'CD-XA001':
             self.xa = True
@@ -2116,38 +2786,16 @@ class PyCdlib(object):
 
         extent_to_inode = {}
 
-        # OK, so now that we have the PVD, we start at its root directory
-        # record and find all of the files
-        ic_level, lastbyte = self._walk_directories(self.pvd, extent_to_ptr,
-                                                    extent_to_inode, le_ptrs)
-
-        self.interchange_level = max(self.interchange_level, ic_level)
-
-        # On El Torito ISOs, after we have walked the directories we look
-        # to see if all of the entries in El Torito have corresponding
-        # directory records.  If they don't, then it may be the case that
-        # the El Torito bits of the system are 'hidden' or 'unlinked',
-        # meaning that they take up space but have no corresponding directory
-        # record in the ISO filesystem.  In order to accommodate the rest
-        # of the system, which really expects these things to have directory
-        # records, we use fake directory records that don't get written out.
-        #
-        # Note that we specifically do *not* add these to any sort of parent;
-        # that way, we don't run afoul of any checks that adding a child to a
-        # parent might have.  This means that if we do ever want to unhide this
-        # entry, we'll have to do some additional work to give it a real name
-        # and link it to the appropriate parent.
-        if self.eltorito_boot_catalog is not None:
-            self._link_eltorito(extent_to_inode)
-
-            # Now that everything has a dirrecord, see if we have a boot
-            # info table.
-            self._check_for_eltorito_boot_info_table(self.eltorito_boot_catalog.initial_entry.inode)
-            for sec in self.eltorito_boot_catalog.sections:
-                for entry in sec.section_entries:
-                    self._check_for_eltorito_boot_info_table(entry.inode)
+        # OK, so now that we have the PVD, we queue up its root directory
+        # record so that all of the files can be found.
+        root_dir_record = self.pvd.root_directory_record()
+        root_dir_record.set_ptr(le_ptrs[0])
+        self._dir_walks.append(self._DirectoryWalk(self.pvd, extent_to_ptr,
+                                                   extent_to_inode,
+                                                   root_dir_record,
+                                                   self._iso_file_length()))
 
-        # The PVD is finished.  Now look to see if we need to parse the SVD.
+        # Now look to see if we need to parse the SVD.
         for svd in self.svds:
             if (svd.flags & 0x1) == 0 and svd.escape_sequences[:3] in (b'%/@', b'%/C', b'%/E'):
                 if self.joliet_vd is not None:
@@ -2165,35 +2813,33 @@ class PyCdlib(object):
                     if not ptr.equal_to_be(tmp_be_ptrs[index]):
                         raise pycdlibexception.PyCdlibInvalidISO('Joliet Little-endian and big-endian path table records do not agree')
 
-                self._walk_directories(svd, joliet_extent_to_ptr,
-                                       extent_to_inode, le_ptrs)
+                root_dir_record = svd.root_directory_record()
+                root_dir_record.set_ptr(le_ptrs[0])
+                self._dir_walks.append(self._DirectoryWalk(svd,
+                                                           joliet_extent_to_ptr,
+                                                           extent_to_inode,
+                                                           root_dir_record,
+                                                           self._iso_file_length()))
             elif svd.version == 2 and svd.file_structure_version == 2:
                 if self.enhanced_vd is not None:
                     raise pycdlibexception.PyCdlibInvalidISO('Only a single enhanced VD is supported')
                 self.enhanced_vd = svd
 
-        # We've seen ISOs in the wild (Office XP) that have a PVD space size
-        # that is smaller than the location of the last directory record
-        # extent + length.  If we see this, automatically update the size in the
-        # PVD (and any SVDs) so that subsequent operations will be correct.
-        log_block_size = self.pvd.logical_block_size()
-        if lastbyte > self.pvd.space_size * log_block_size:
-            new_pvd_size = utils.ceiling_div(lastbyte, log_block_size)
-            for pvd in self.pvds:
-                pvd.space_size = new_pvd_size
-            if self.joliet_vd is not None:
-                self.joliet_vd.space_size = new_pvd_size
-            if self.enhanced_vd is not None:
-                self.enhanced_vd.space_size = new_pvd_size
-
         # Look to see if this is a UDF volume.  It is one if we have a UDF BEA,
         # UDF NSR, and UDF TEA, in which case we parse the UDF descriptors and
-        # walk the filesystem.
+        # queue up the root of the filesystem to be walked.
         if self.udf_bea is not None and self.udf_nsr is not None and self.udf_tea is not None:
             self.udf_main_descs = self.UDFDescriptors()
             self.udf_reserve_descs = self.UDFDescriptors()
             self._parse_udf_descriptors()
-            self._walk_udf_directories(extent_to_inode)
+            part_start = self.udf_main_descs.partition.part_start_location
+            self.udf_root = self._parse_udf_file_entry(part_start + self.udf_file_set.root_dir_icb.log_block_num,
+                                                       self.udf_file_set.root_dir_icb,
+                                                       None)
+            self._dir_walks.append(self._DirectoryWalk(None, None,
+                                                       extent_to_inode,
+                                                       self.udf_root,
+                                                       self._iso_file_length()))
 
         # Now we look for the 'version' volume descriptor, common on ISOs made
         # with genisoimage or mkisofs.  This volume descriptor doesn't have any
@@ -2206,13 +2852,113 @@ class PyCdlib(object):
         if self.udf_bea is not None and self.udf_nsr is not None and self.udf_tea is not None:
             version_vd_extent = self.udf_tea.extent_location() + 1
 
+        log_block_size = self.pvd.logical_block_size()
         version_vd = headervd.VersionVolumeDescriptor()
-        self._cdfp.seek(version_vd_extent * log_block_size)
-        if version_vd.parse(self._cdfp.read(log_block_size), version_vd_extent):
+        if version_vd.parse(self._read_from_iso(version_vd_extent * log_block_size, log_block_size),
+                            version_vd_extent):
             self.version_vd = version_vd
 
+        if lazy:
+            # Parse just the root directory of the PVD up-front, since that is
+            # where the Rock Ridge version of the ISO is determined.  Everything
+            # else is parsed the first time it is needed.
+            self._walk_pending_dir(self.pvd.root_directory_record())
+        else:
+            self._walk_all_dirs()
+
         self._initialized = True
 
+    def _walk_pending_dir(self, rec):
+        '''
+        An internal method to parse the children of a directory that was
+        skipped when the ISO was opened lazily.  If the children of this
+        directory have already been parsed, this is a no-op.
+
+        Parameters:
+         rec - The dr.DirectoryRecord or udf.UDFFileEntry of the directory.
+        Returns:
+         Nothing.
+        '''
+        # Directories can be parsed while other threads are reading, so this
+        # is serialized; a thread that finds the directory no longer pending
+        # knows that its children are complete.
+        with self._parse_lock:
+            for walk in self._dir_walks:
+                if id(rec) in walk.pending:
+                    del walk.pending[id(rec)]
+                    if walk.vd is None:
+                        self._walk_udf_directory(walk, rec)
+                    else:
+                        self._walk_directory(walk, rec)
+                    return
+
+    def _walk_all_dirs(self):
+        '''
+        An internal method to parse all of the directories that have not yet
+        been parsed, and to do the work that requires the entire directory tree
+        (linking up El Torito entries, fixing up the volume size, etc).  After
+        this, the object is exactly as if the ISO had been opened eagerly.
+
+        Parameters:
+         None.
+        Returns:
+         Nothing.
+        '''
+        with self._parse_lock:
+            if not self._dir_walks:
+                return
+
+            pvd_walk = self._dir_walks[0]
+            for walk in self._dir_walks:
+                self._walk_directories(walk)
+
+                if walk is not pvd_walk:
+                    continue
+
+                self.interchange_level = max(self.interchange_level,
+                                             pvd_walk.interchange_level)
+
+                # On El Torito ISOs, after we have walked the directories we look
+                # to see if all of the entries in El Torito have corresponding
+                # directory records.  If they don't, then it may be the case that
+                # the El Torito bits of the system are 'hidden' or 'unlinked',
+                # meaning that they take up space but have no corresponding
+                # directory record in the ISO filesystem.  In order to accommodate
+                # the rest of the system, which really expects these things to have
+                # directory records, we use fake directory records that don't get
+                # written out.
+                #
+                # Note that we specifically do *not* add these to any sort of
+                # parent; that way, we don't run afoul of any checks that adding a
+                # child to a parent might have.  This means that if we do ever want
+                # to unhide this entry, we'll have to do some additional work to
+                # give it a real name and link it to the appropriate parent.
+                if self.eltorito_boot_catalog is not None:
+                    self._link_eltorito(pvd_walk.extent_to_inode)
+
+                    # Now that everything has a dirrecord, see if we have a boot
+                    # info table.
+                    self._check_for_eltorito_boot_info_table(self.eltorito_boot_catalog.initial_entry.inode)
+                    for sec in self.eltorito_boot_catalog.sections:
+                        for entry in sec.section_entries:
+                            self._check_for_eltorito_boot_info_table(entry.inode)
+
+            self._dir_walks = []
+
+            # We've seen ISOs in the wild (Office XP) that have a PVD space size
+            # that is smaller than the location of the last directory record
+            # extent + length.  If we see this, automatically update the size in the
+            # PVD (and any SVDs) so that subsequent operations will be correct.
+            log_block_size = self.pvd.logical_block_size()
+            if pvd_walk.lastbyte > self.pvd.space_size * log_block_size:
+                new_pvd_size = utils.ceiling_div(pvd_walk.lastbyte, log_block_size)
+                for pvd in self.pvds:
+                    pvd.space_size = new_pvd_size
+                if self.joliet_vd is not None:
+                    self.joliet_vd.space_size = new_pvd_size
+                if self.enhanced_vd is not None:
+                    self.enhanced_vd.space_size = new_pvd_size
+
     def _get_and_write_fp(self, iso_path, outfp, blocksize):
         '''
         An internal method to fetch a single file from the ISO and write it out
@@ -2237,6 +2983,42 @@ class PyCdlib(object):
 
         self._get_file_from_iso_fp(outfp, rr_path=iso_path, blocksize=blocksize)
 
+    def _copy_inode_data(self, ino, outfp, blocksize):
+        '''
+        An internal method to copy the data of a single inode out to a file
+        object.
+
+        Parameters:
+         ino - The inode to copy the data of.
+         outfp - The file object to write data to.
+         blocksize - The number of bytes in each transfer.
+        Returns:
+         Nothing.
+        '''
+        with inode.InodeOpenData(ino, self.pvd.logical_block_size(), seek=False) as (data_fp, data_len):
+            # All of the reads here are done at explicit offsets, so that
+            # several threads can copy out of the same ISO at once.
+            offset = ino.data_offset(self.pvd.logical_block_size())
+
+            # Here we copy the data into the output file descriptor.  If a boot
+            # info table is present, we overlay the table over bytes 8-64 of the
+            # file.  Note, however, that we never return more bytes than the length
+            # of the file, so the boot info table may get truncated.
+            if ino.boot_info_table is not None:
+                header_len = min(data_len, 8)
+                outfp.write(utils.pread(data_fp, header_len, offset))
+                data_len -= header_len
+                if data_len > 0:
+                    rec = ino.boot_info_table.record()
+                    table_len = min(data_len, len(rec))
+                    outfp.write(rec[:table_len])
+                    data_len -= table_len
+                    if data_len > 0:
+                        utils.copy_data_from(data_len, blocksize, data_fp,
+                                             offset + 8 + len(rec), outfp)
+            else:
+                utils.copy_data_from(data_len, blocksize, data_fp, offset, outfp)
+
     def _get_file_from_iso_fp(self, outfp, **kwargs):
         '''
         An internal method to fetch a single file from the ISO and write it out
@@ -2291,8 +3073,11 @@ class PyCdlib(object):
                 raise pycdlibexception.PyCdlibInvalidInput('Can only write out a file')
 
             if found_file_entry.get_data_length() > 0:
-                with inode.InodeOpenData(found_file_entry.inode, self.pvd.logical_block_size()) as (data_fp, data_len):
-                    utils.copy_data(data_len, blocksize, data_fp, outfp)
+                ino = found_file_entry.inode
+                with inode.InodeOpenData(ino, self.pvd.logical_block_size(), seek=False) as (data_fp, data_len):
+                    utils.copy_data_from(data_len, blocksize, data_fp,
+                                         ino.data_offset(self.pvd.logical_block_size()),
+                                         outfp)
 
         else:
             if joliet_path is not None:
@@ -2323,31 +3108,203 @@ class PyCdlib(object):
                     raise pycdlibexception.PyCdlibInvalidInput('Symlinks have no data associated with them')
 
             while found_record is not None and found_record.get_data_length() > 0:
-                with inode.InodeOpenData(found_record.inode, self.pvd.logical_block_size()) as (data_fp, data_len):
-                    # Here we copy the data into the output file descriptor.  If a boot
-                    # info table is present, we overlay the table over bytes 8-64 of the
-                    # file.  Note, however, that we never return more bytes than the length
-                    # of the file, so the boot info table may get truncated.
-                    if found_record.inode.boot_info_table is not None:
-                        header_len = min(data_len, 8)
-                        outfp.write(data_fp.read(header_len))
-                        data_len -= header_len
-                        if data_len > 0:
-                            rec = found_record.inode.boot_info_table.record()
-                            table_len = min(data_len, len(rec))
-                            outfp.write(rec[:table_len])
-                            data_len -= table_len
-                            if data_len > 0:
-                                data_fp.seek(len(rec), os.SEEK_CUR)
-                                utils.copy_data(data_len, blocksize, data_fp, outfp)
-                    else:
-                        utils.copy_data(data_len, blocksize, data_fp, outfp)
+                self._copy_inode_data(found_record.inode, outfp, blocksize)
 
                 if found_record.data_continuation is not None:
                     found_record = found_record.data_continuation
                 else:
                     found_record = None
 
+    class _ExtractWriters(object):
+        '''
+        A class to hand the writing of extracted files off to a pool of
+        threads.  Each file is routed to exactly one thread, so the chunks of a
+        file are always written in the order they were read.  The queues are
+        bounded so that reading the ISO never gets too far ahead of the writes.
+        '''
+        __slots__ = ('_queues', '_threads', '_errors', '_current')
+
+        def __init__(self, workers):
+            self._queues = []
+            self._threads = []
+            self._errors = []
+            self._current = None
+            for i_unused in range(workers):
+                q = queue.Queue(16)
+                thread = threading.Thread(target=self._run, args=(q,))
+                thread.daemon = True
+                thread.start()
+                self._queues.append(q)
+                self._threads.append(thread)
+
+        def _run(self, q):
+            '''
+            The body of each writer thread.
+
+            Parameters:
+             q - The queue of operations for this thread.
+            Returns:
+             Nothing.
+            '''
+            outfp = None
+            while True:
+                (op, arg) = q.get()
+                if op is None:
+                    break
+
+                try:
+                    if self._errors:
+                        # Some thread has already failed; just drain the queue
+                        # so that the reader never blocks on us.
+                        if outfp is not None:
+                            outfp.close()
+                            outfp = None
+                    elif op == 'open':
+                        outfp = open(arg, 'wb')
+                    elif op == 'write':
+                        outfp.write(arg)
+                    else:
+                        outfp.close()
+                        outfp = None
+                except Exception as e:  # pylint: disable=broad-except
+                    self._errors.append(e)
+
+            if outfp is not None:
+                outfp.close()
+
+        def start(self, path, index):
+            '''
+            Start writing a new file; subsequent calls to write() go to it.
+
+            Parameters:
+             path - The local path to write to.
+             index - The index of the file, used to pick a thread.
+            Returns:
+             Nothing.
+            '''
+            if self._errors:
+                raise self._errors[0]
+            self._current = self._queues[index % len(self._queues)]
+            self._current.put(('open', path))
+
+        def write(self, data):
+            '''
+            Queue data to be written to the current file.
+
+            Parameters:
+             data - The data to write.
+            Returns:
+             Nothing.
+            '''
+            self._current.put(('write', data))
+
+        def close(self):
+            '''
+            Finish writing the current file.
+
+            Parameters:
+             None.
+            Returns:
+             Nothing.
+            '''
+            self._current.put(('close', None))
+            self._current = None
+
+        def finish(self):
+            '''
+            Wait for all of the threads to finish writing, raising the first
+            error any of them saw.
+
+            Parameters:
+             None.
+            Returns:
+             Nothing.
+            '''
+            for q in self._queues:
+                q.put((None, None))
+            for thread in self._threads:
+                thread.join()
+            if self._errors:
+                raise self._errors[0]
+
+    def _extract_entries(self, namespace):
+        '''
+        An internal method to walk all of the entries in a namespace, parents
+        before their children.
+
+        Parameters:
+         namespace - One of 'iso9660', 'rr', 'joliet', or 'udf'.
+        Yields:
+         Tuples of (list of path components, record).
+        Returns:
+         Nothing.
+        '''
+        if namespace == 'udf':
+            root = self.udf_root
+        elif namespace == 'joliet':
+            root = self.joliet_vd.root_directory_record()
+        else:
+            root = self.pvd.root_directory_record()
+
+        dirs = collections.deque([([], root)])
+        while dirs:
+            names, rec = dirs.popleft()
+            yield names, rec
+
+            if namespace == 'udf':
+                for fi_desc in rec.fi_descs:
+                    if fi_desc.is_parent() or fi_desc.file_entry is None:
+                        continue
+                    child = fi_desc.file_entry
+                    child_names = names + [_extract_name(child, namespace)]
+                    if child.is_dir():
+                        dirs.append((child_names, child))
+                    else:
+                        yield child_names, child
+                continue
+
+            for child in _yield_children(rec, self._walk_all_dirs):
+                if child.is_dot() or child.is_dotdot():
+                    continue
+                if child.rock_ridge is not None and child.rock_ridge.relocated_record() and child.parent is rec:
+                    # This is a relocated directory sitting in its physical
+                    # location; it is extracted where its child link points.
+                    continue
+                child_names = names + [_extract_name(child, namespace)]
+                if child.is_dir():
+                    dirs.append((child_names, child))
+                else:
+                    yield child_names, child
+
+    def _extract_record_data(self, rec, outfp, blocksize):
+        '''
+        An internal method to write out all of the data of a file record,
+        following any continuations of the file.
+
+        Parameters:
+         rec - The Directory Record or UDF File Entry to write out.
+         outfp - The file object to write data to.
+         blocksize - The number of bytes in each transfer.
+        Returns:
+         Nothing.
+        '''
+        if rec.inode is None:
+            # The only records with data but no inode are the El Torito boot
+            # catalog records.
+            if rec.get_data_length() > 0 and self.eltorito_boot_catalog is not None:
+                catalog = self.eltorito_boot_catalog.record()
+                length = min(rec.get_data_length(), len(catalog))
+                outfp.write(catalog[:length])
+                utils.zero_fill(outfp, rec.get_data_length() - length, blocksize)
+            return
+
+        while rec is not None:
+            if rec.get_data_length() > 0:
+                self._copy_inode_data(rec.inode, outfp, blocksize)
+            if isinstance(rec, udfmod.UDFFileEntry):
+                break
+            rec = rec.data_continuation
+
     class _WriteRange(object):
         '''
         A class to store the offset and length of a written section of data.
@@ -2394,148 +3351,803 @@ class PyCdlib(object):
             if enable_overwrite_check:
                 bisect.insort_left(self._write_check_list, self._WriteRange(start, end - 1))
 
-    def _output_file_data(self, outfp, blocksize, ino):
+    def _output_file_data(self, outfp, blocksize, ino, sparse=False):
         '''
         Internal method to write a directory record entry out.
 
-        Parameters:
-         outfp - The file object to write the data to.
-         blocksize - The blocksize to use when writing the data out.
-         ino - The Inode to write.
-        Returns:
-         The total number of bytes written out.
-        '''
-        log_block_size = self.pvd.logical_block_size()
+        Parameters:
+         outfp - The file object to write the data to.
+         blocksize - The blocksize to use when writing the data out.
+         ino - The Inode to write.
+         sparse - Whether to seek over blocks of zeros instead of writing them.
+        Returns:
+         A tuple of the total number of bytes written out and the number of
+         bytes that were seeked over instead.
+        '''
+        log_block_size = self.pvd.logical_block_size()
+
+        outfp.seek(ino.extent_location() * log_block_size)
+        tmp_start = outfp.tell()
+        skipped = 0
+        with inode.InodeOpenData(ino, log_block_size, seek=False) as (data_fp, data_len):
+            data_offset = ino.data_offset(log_block_size)
+            if sparse:
+                skipped = utils.copy_data_sparse(data_len, blocksize, data_fp,
+                                                 data_offset, outfp)
+                padbytes = -data_len % log_block_size
+                outfp.seek(padbytes, os.SEEK_CUR)
+                skipped += padbytes
+            else:
+                utils.copy_data_from(data_len, blocksize, data_fp, data_offset,
+                                     outfp)
+                utils.zero_pad(outfp, data_len, log_block_size)
+
+        if self._track_writes:
+            end = outfp.tell()
+            bisect.insort_left(self._write_check_list, self._WriteRange(tmp_start, end - 1))
+
+        # If this file is being used as a bootfile, and the user
+        # requested that the boot info table be patched into it,
+        # we patch the boot info table at offset 8 here.
+        if ino.boot_info_table is not None:
+            old = outfp.tell()
+            outfp.seek(tmp_start + 8)
+            self._outfp_write_with_check(outfp, ino.boot_info_table.record(),
+                                         enable_overwrite_check=False)
+            outfp.seek(old)
+        return (outfp.tell() - tmp_start, skipped)
+
+    def _pwrite_file_data(self, outfd, blocksize, ino, sparse):
+        '''
+        Internal method to write the data of an Inode out to its extent of the
+        output file descriptor with positional writes, so that many Inodes can
+        be written at once.
+
+        Parameters:
+         outfd - The file descriptor to write the data to.
+         blocksize - The blocksize to use when writing the data out.
+         ino - The Inode to write.
+         sparse - Whether to skip blocks of zeros instead of writing them.
+        Returns:
+         A tuple of the total number of bytes written out and the number of
+         bytes that were skipped instead.
+        '''
+        log_block_size = self.pvd.logical_block_size()
+        out_offset = ino.extent_location() * log_block_size
+        data_len = ino.get_data_length()
+
+        # Other threads are reading from the same file objects, so only use
+        # positional reads on them.
+        with inode.InodeOpenData(ino, log_block_size, seek=False) as (data_fp, data_len_unused):
+            skipped = utils.pwrite_data(data_len, blocksize, data_fp,
+                                        ino.data_offset(log_block_size),
+                                        outfd, out_offset, sparse)
+
+        padbytes = -data_len % log_block_size
+        if sparse:
+            skipped += padbytes
+        elif padbytes > 0:
+            os.pwrite(outfd, b'\x00', out_offset + data_len + padbytes - 1)  # pylint: disable=no-member
+
+        # If this file is being used as a bootfile, and the user requested
+        # that the boot info table be patched into it, we patch the boot info
+        # table at offset 8 here.
+        if ino.boot_info_table is not None:
+            os.pwrite(outfd, ino.boot_info_table.record(), out_offset + 8)  # pylint: disable=no-member
+
+        return (data_len + padbytes, skipped)
+
+    def _output_file_data_parallel(self, outfp, blocksize, workers, sparse,
+                                   progress):
+        '''
+        Internal method to write the data of all of the Inodes out using a
+        pool of threads.  The extents of all of the Inodes are fixed by the
+        time the data is written, so the copies are independent of each other.
+
+        Parameters:
+         outfp - The file object to write the data to; it must have a file
+                 descriptor.
+         blocksize - The blocksize to use when writing the data out.
+         workers - The number of threads to use.
+         sparse - Whether to skip blocks of zeros instead of writing them.
+         progress - The Progress object to use for outputting progress.
+        Returns:
+         The number of bytes that were skipped instead of written.
+        '''
+        log_block_size = self.pvd.logical_block_size()
+
+        # The threads write behind the back of the file object, so make sure
+        # it has nothing buffered, and size the output up front so that the
+        # writes land inside the file.
+        outfp.flush()
+        outfd = outfp.fileno()
+        total_size = self.pvd.space_size * log_block_size
+        if os.fstat(outfd).st_size < total_size:
+            os.ftruncate(outfd, total_size)
+
+        jobs = queue.Queue()
+        num_jobs = 0
+        for ino in self.inodes:
+            data_len = ino.get_data_length()
+            if data_len > 0:
+                jobs.put(ino)
+                num_jobs += 1
+                if self._track_writes:
+                    start = ino.extent_location() * log_block_size
+                    end = start + utils.ceiling_div(data_len, log_block_size) * log_block_size
+                    bisect.insort_left(self._write_check_list, self._WriteRange(start, end - 1))
+
+        results = queue.Queue()
+        errors = []
+
+        def run():
+            '''
+            The body of each thread.
+            '''
+            while True:
+                try:
+                    ino = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                if errors:
+                    # Some thread has already failed; just account for the
+                    # rest of the work so the caller stops waiting.
+                    results.put((0, 0))
+                    continue
+                try:
+                    results.put(self._pwrite_file_data(outfd, blocksize, ino, sparse))
+                except Exception as e:  # pylint: disable=broad-except
+                    errors.append(e)
+                    results.put((0, 0))
+
+        threads = []
+        for i_unused in range(min(workers, num_jobs)):
+            thread = threading.Thread(target=run)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        skipped = 0
+        for i_unused in range(num_jobs):
+            (length, ino_skipped) = results.get()
+            skipped += ino_skipped
+            if length > 0:
+                progress.call(length)
+
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        return skipped
+
+    class _ReadWriteLock(object):
+        '''
+        A class implementing a lock that can be held by many readers at once or
+        by a single writer.  Waiting writers are preferred over new readers so
+        that a steady stream of reads cannot starve modifications.  A thread
+        may take a lock it already holds again, and the writer may also take
+        the read lock; taking the write lock while holding only the read lock
+        is an error, since it could never succeed.
+        '''
+        __slots__ = ('_cond', '_readers', '_writer', '_writer_depth',
+                     '_writers_waiting')
+
+        def __init__(self):
+            self._cond = threading.Condition(threading.Lock())
+            self._readers = {}
+            self._writer = None
+            self._writer_depth = 0
+            self._writers_waiting = 0
+
+        def acquire_read(self):
+            '''
+            Take the lock for reading.
+
+            Parameters:
+             None.
+            Returns:
+             Nothing.
+            '''
+            me = threading.current_thread()
+            with self._cond:
+                if self._writer is not me and me not in self._readers:
+                    while self._writer is not None or self._writers_waiting > 0:
+                        self._cond.wait()
+                self._readers[me] = self._readers.get(me, 0) + 1
+
+        def release_read(self):
+            '''
+            Release the lock taken for reading.
+
+            Parameters:
+             None.
+            Returns:
+             Nothing.
+            '''
+            me = threading.current_thread()
+            with self._cond:
+                self._readers[me] -= 1
+                if self._readers[me] == 0:
+                    del self._readers[me]
+                    if not self._readers:
+                        self._cond.notify_all()
+
+        def acquire_write(self):
+            '''
+            Take the lock for writing.
+
+            Parameters:
+             None.
+            Returns:
+             Nothing.
+            '''
+            me = threading.current_thread()
+            with self._cond:
+                if self._writer is me:
+                    self._writer_depth += 1
+                    return
+                if me in self._readers:
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot modify the ISO while reading from it in the same thread')
+                self._writers_waiting += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._writers_waiting -= 1
+                self._writer = me
+                self._writer_depth = 1
+
+        def release_write(self):
+            '''
+            Release the lock taken for writing.
+
+            Parameters:
+             None.
+            Returns:
+             Nothing.
+            '''
+            with self._cond:
+                self._writer_depth -= 1
+                if self._writer_depth == 0:
+                    self._writer = None
+                    self._cond.notify_all()
+
+        def read_locked(self):
+            '''
+            Get a context manager that holds the lock for reading.
+
+            Parameters:
+             None.
+            Returns:
+             A context manager holding the lock for reading.
+            '''
+            return PyCdlib._LockContext(self.acquire_read, self.release_read)
+
+        def write_locked(self):
+            '''
+            Get a context manager that holds the lock for writing.
+
+            Parameters:
+             None.
+            Returns:
+             A context manager holding the lock for writing.
+            '''
+            return PyCdlib._LockContext(self.acquire_write, self.release_write)
+
+    class _LockContext(object):
+        '''
+        A context manager to hold one side of a _ReadWriteLock.
+        '''
+        __slots__ = ('_acquire', '_release')
+
+        def __init__(self, acquire, release):
+            self._acquire = acquire
+            self._release = release
+
+        def __enter__(self):
+            self._acquire()
+
+        def __exit__(self, *args):
+            self._release()
+
+    class _Batch(object):
+        '''
+        A context manager to group a number of modifications to the ISO
+        together.  While inside of the batch, the extents are not reshuffled
+        after each modification, even if the PyCdlib object was created with
+        always_consistent; instead, a single reshuffle is done when the
+        outermost batch exits.
+        '''
+        __slots__ = ('iso',)
+
+        def __init__(self, iso):
+            self.iso = iso
+
+        def __enter__(self):
+            self.iso._batch_depth += 1
+            return self.iso
+
+        def __exit__(self, *args):
+            iso = self.iso
+            if iso._batch_depth == 0:
+                # The ISO was closed (and possibly reopened) inside of the
+                # batch, so there is nothing left to do.
+                return
+            iso._batch_depth -= 1
+            if iso._batch_depth == 0 and iso._always_consistent and iso._needs_reshuffle:
+                with iso._rwlock.write_locked():
+                    iso._reshuffle_extents()
+
+    class _OutputPiece(object):
+        '''
+        A class to store one piece of the mastered ISO; either a string of
+        metadata bytes or the data of an Inode, along with the offset into the
+        ISO where it belongs.
+        '''
+        __slots__ = ('offset', 'data', 'ino')
+
+        def __init__(self, offset, data, ino):
+            self.offset = offset
+            self.data = data
+            self.ino = ino
+
+    class _InodeReader(io.RawIOBase):
+        '''
+        A base class for the read-only, seekable file objects that are built
+        out of the data of Inodes.  Subclasses map positions to the data with
+        a _read_at(pos, length) method, which returns the (non-empty) data at
+        pos, up to length bytes; every read of Inode data is done at an
+        explicit offset, so any number of readers can share the underlying
+        file objects without disturbing each other.
+        '''
+        __slots__ = ('_size', '_log_block_size', '_pos', '_fps')
+
+        def __init__(self, size, log_block_size):
+            super(PyCdlib._InodeReader, self).__init__()
+            self._size = size
+            self._log_block_size = log_block_size
+            self._pos = 0
+            self._fps = {}
+
+        def readable(self):
+            return True
+
+        def seekable(self):
+            return True
+
+        def tell(self):
+            if self.closed:
+                raise ValueError('I/O operation on closed file.')
+            return self._pos
+
+        def seek(self, offset, whence=os.SEEK_SET):
+            if self.closed:
+                raise ValueError('I/O operation on closed file.')
+            if whence == os.SEEK_SET:
+                pos = offset
+            elif whence == os.SEEK_CUR:
+                pos = self._pos + offset
+            elif whence == os.SEEK_END:
+                pos = self._size + offset
+            else:
+                raise ValueError('Invalid whence (%d)' % (whence))
+            if pos < 0:
+                raise ValueError('Negative seek position %d' % (pos))
+            self._pos = pos
+            return self._pos
+
+        def close(self):
+            for fp in self._fps.values():
+                fp.close()
+            self._fps = {}
+            super(PyCdlib._InodeReader, self).close()
+
+        def _read_inode(self, ino, offset, length, zero_fill):
+            '''
+            Internal method to read part of the data of an Inode, with the boot
+            info table patched in if necessary.
+
+            Parameters:
+             ino - The Inode to read from.
+             offset - The offset into the Inode data to start reading at.
+             length - The number of bytes to read.
+             zero_fill - Whether to fill the data with zeros past the end of
+                         the Inode data, up to the length asked for.
+            Returns:
+             The data read.
+            '''
+            if ino.manage_fp:
+                # The data_fp member contains the filename in this case; open
+                # it once and keep it until this reader is closed.
+                if id(ino) not in self._fps:
+                    self._fps[id(ino)] = open(ino.data_fp, 'rb')
+                fp = self._fps[id(ino)]
+            else:
+                fp = ino.data_fp
+
+            data = b''
+            toread = min(length, ino.get_data_length() - offset)
+            if toread > 0:
+                data = utils.pread(fp, toread,
+                                   ino.data_offset(self._log_block_size) + offset)
+            if zero_fill and len(data) < length:
+                data += b'\x00' * (length - len(data))
+
+            if ino.boot_info_table is not None:
+                bit = ino.boot_info_table.record()
+                begin = max(offset, 8)
+                end = min(offset + len(data), 8 + len(bit))
+                if begin < end:
+                    data = bytearray(data)
+                    data[begin - offset:end - offset] = bit[begin - 8:end - 8]
+                    data = bytes(data)
+
+            return data
+
+        def readinto(self, b):
+            if self.closed:
+                raise ValueError('I/O operation on closed file.')
+
+            want = min(len(b), max(self._size - self._pos, 0))
+            done = 0
+            while done < want:
+                data = self._read_at(self._pos + done, want - done)  # pylint: disable=no-member
+                b[done:done + len(data)] = data
+                done += len(data)
+
+            self._pos += done
+            return done
+
+    class _VirtualISO(_InodeReader):
+        '''
+        A class that presents the mastered ISO as a read-only, seekable file
+        object.  The metadata is rendered once when the object is created, but
+        file data is only read from the Inode sources when the corresponding
+        part of the ISO is read.
+        '''
+        __slots__ = ('_pieces', '_offsets')
+
+        def __init__(self, pieces, size, log_block_size):
+            super(PyCdlib._VirtualISO, self).__init__(size, log_block_size)
+            self._pieces = pieces
+            self._offsets = [piece.offset for piece in pieces]
+
+        def _piece_length(self, piece):
+            '''
+            Internal method to get the number of bytes a piece takes up in the
+            ISO, including any padding.
+
+            Parameters:
+             piece - The piece to get the length of.
+            Returns:
+             The length of the piece in bytes.
+            '''
+            if piece.ino is None:
+                return len(piece.data)
+            length = piece.ino.get_data_length()
+            if piece.ino.boot_info_table is not None:
+                length = max(length, 8 + len(piece.ino.boot_info_table.record()))
+            return utils.ceiling_div(length, self._log_block_size) * self._log_block_size
+
+        def _read_at(self, pos, length):
+            index = bisect.bisect_right(self._offsets, pos) - 1
+            if index >= 0:
+                piece = self._pieces[index]
+                piece_offset = pos - piece.offset
+                piece_left = self._piece_length(piece) - piece_offset
+                if piece_left > 0:
+                    toread = min(length, piece_left)
+                    if piece.ino is None:
+                        return piece.data[piece_offset:piece_offset + toread]
+                    return self._read_inode(piece.ino, piece_offset, toread, True)
+
+            # We are in a gap between pieces; fill with zeros up to the start
+            # of the next piece.
+            if index + 1 < len(self._pieces):
+                gap = self._pieces[index + 1].offset - pos
+            else:
+                gap = self._size - pos
+            return b'\x00' * min(length, gap)
+
+    class _FileReader(_InodeReader):
+        '''
+        A class that presents the data of a single file on the ISO as a
+        read-only, seekable file object.  Nothing is read until it is asked
+        for.
+        '''
+        __slots__ = ('_inodes', '_starts')
+
+        def __init__(self, inodes, log_block_size):
+            self._inodes = []
+            self._starts = []
+            size = 0
+            for ino in inodes:
+                if ino.get_data_length() == 0:
+                    continue
+                self._inodes.append(ino)
+                self._starts.append(size)
+                size += ino.get_data_length()
+            super(PyCdlib._FileReader, self).__init__(size, log_block_size)
+
+        def _read_at(self, pos, length):
+            index = bisect.bisect_right(self._starts, pos) - 1
+            ino = self._inodes[index]
+            ino_offset = pos - self._starts[index]
+            toread = min(length, ino.get_data_length() - ino_offset)
+            data = self._read_inode(ino, ino_offset, toread, False)
+            if not data:
+                raise pycdlibexception.PyCdlibInvalidISO('Unexpected end of data while reading file')
+            return data
+
+    def _directory_record_pieces(self, vd, pieces):
+        '''
+        An internal method to generate the output pieces for the path tables
+        and directory records from a particular Volume Descriptor.  Whole path
+        tables and whole directory extents are collected into single pieces,
+        so they can be written out with one call each.
+
+        Parameters:
+         vd - The Volume Descriptor to generate the Directory Records from.
+         pieces - The list of output pieces to append to.
+        Returns:
+         Nothing.
+        '''
+        log_block_size = vd.logical_block_size()
+        le_ptr = bytearray()
+        be_ptr = bytearray()
+        dirs = collections.deque([vd.root_directory_record()])
+        while dirs:
+            curr = dirs.popleft()
+            if curr.is_dir():
+                le_ptr += curr.ptr.record_little_endian()
+                be_ptr += curr.ptr.record_big_endian()
+
+            dir_data = bytearray()
+            curr_dirrecord_offset = 0
+            for child in curr.children:
+                recstr = child.record()
+                if (curr_dirrecord_offset + len(recstr)) > log_block_size:
+                    dir_data += b'\x00' * (log_block_size - curr_dirrecord_offset)
+                    curr_dirrecord_offset = 0
+                dir_data += recstr
+                curr_dirrecord_offset += len(recstr)
+
+                if child.rock_ridge is not None:
+                    if child.rock_ridge.dr_entries.ce_record is not None:
+                        ce_rec = child.rock_ridge.dr_entries.ce_record
+                        pieces.append(self._OutputPiece(ce_rec.bl_cont_area * self.pvd.logical_block_size() + ce_rec.offset_cont_area,
+                                                        child.rock_ridge.record_ce_entries(), None))
+
+                    if child.rock_ridge.child_link_record_exists():
+                        continue
+
+                if child.is_dir():
+                    if not child.is_dot() and not child.is_dotdot():
+                        dirs.append(child)
+
+            if dir_data:
+                pieces.append(self._OutputPiece(curr.extent_location() * log_block_size,
+                                                bytes(dir_data), None))
+
+        pieces.append(self._OutputPiece(vd.path_table_location_le * log_block_size,
+                                        bytes(le_ptr), None))
+        pieces.append(self._OutputPiece(vd.path_table_location_be * log_block_size,
+                                        bytes(be_ptr), None))
+
+    def _output_pieces(self):
+        '''
+        An internal method to generate the list of pieces that make up the
+        mastered ISO, sorted by the offset at which each piece belongs.  The
+        extents must already have been assigned (by _reshuffle_extents, or
+        by parsing) before calling this.
+
+        Parameters:
+         None.
+        Returns:
+         A list of _OutputPiece objects sorted by offset.
+        '''
+        log_block_size = self.pvd.logical_block_size()
+
+        pieces = []
+
+        if self.isohybrid_mbr is not None:
+            pieces.append(self._OutputPiece(0, self.isohybrid_mbr.record(self.pvd.space_size * log_block_size), None))
+
+        # The PVDs are all written one after the other, starting at the
+        # extent of the first one.
+        offset = self.pvd.extent_location() * log_block_size
+        for pvd in self.pvds:
+            rec = pvd.record()
+            pieces.append(self._OutputPiece(offset, rec, None))
+            offset += len(rec)
+
+        single_extent_objs = self.brs + self.svds + self.vdsts
+        if self.udf_bea is not None:
+            single_extent_objs.extend([self.udf_bea, self.udf_nsr, self.udf_tea])
+        if self.version_vd is not None:
+            single_extent_objs.append(self.version_vd)
+        for descs in (self.udf_main_descs, self.udf_reserve_descs):
+            if descs is not None:
+                single_extent_objs.extend([descs.pvd, descs.impl_use,
+                                           descs.partition,
+                                           descs.logical_volume,
+                                           descs.unallocated_space,
+                                           descs.terminator])
+        if self.udf_logical_volume_integrity is not None:
+            single_extent_objs.extend([self.udf_logical_volume_integrity,
+                                       self.udf_logical_volume_integrity_terminator])
+        single_extent_objs.extend(self.udf_anchors)
+        if self.eltorito_boot_catalog is not None:
+            single_extent_objs.append(self.eltorito_boot_catalog)
+        if self.udf_root is not None:
+            single_extent_objs.extend([self.udf_file_set,
+                                       self.udf_file_set_terminator])
+
+        for obj in single_extent_objs:
+            pieces.append(self._OutputPiece(obj.extent_location() * log_block_size,
+                                            obj.record(), None))
+
+        self._directory_record_pieces(self.pvd, pieces)
+        if self.joliet_vd is not None:
+            self._directory_record_pieces(self.joliet_vd, pieces)
+
+        if self.udf_root is not None:
+            part_start = self.udf_main_descs.partition.part_start_location
+            written_file_entry_inodes = {}
+            udf_file_entries = collections.deque([(self.udf_root, True)])
+            while udf_file_entries:
+                udf_file_entry, isdir = udf_file_entries.popleft()
+
+                if udf_file_entry.inode is None or not id(udf_file_entry.inode) in written_file_entry_inodes:
+                    pieces.append(self._OutputPiece(udf_file_entry.extent_location() * log_block_size,
+                                                    udf_file_entry.record(), None))
+                    written_file_entry_inodes[id(udf_file_entry.inode)] = True
+
+                if isdir:
+                    for fi_desc in udf_file_entry.fi_descs:
+                        if not fi_desc.is_parent():
+                            udf_file_entries.append((fi_desc.file_entry, fi_desc.is_dir()))
+                    # Each allocation descriptor of the directory gets its
+                    # own piece, recorded where that descriptor points.
+                    for pos, fi_data in udf_file_entry.file_ident_desc_pieces():
+                        pieces.append(self._OutputPiece((part_start + pos) * log_block_size,
+                                                        fi_data, None))
 
-        outfp.seek(ino.extent_location() * log_block_size)
-        tmp_start = outfp.tell()
-        with inode.InodeOpenData(ino, log_block_size) as (data_fp, data_len):
-            utils.copy_data(data_len, blocksize, data_fp, outfp)
-            utils.zero_pad(outfp, data_len, log_block_size)
+        for ino in self.inodes:
+            if ino.get_data_length() > 0:
+                pieces.append(self._OutputPiece(ino.extent_location() * log_block_size,
+                                                None, ino))
 
-        if self._track_writes:
-            end = outfp.tell()
-            bisect.insort_left(self._write_check_list, self._WriteRange(tmp_start, end - 1))
+        pieces.sort(key=lambda piece: piece.offset)
 
-        # If this file is being used as a bootfile, and the user
-        # requested that the boot info table be patched into it,
-        # we patch the boot info table at offset 8 here.
-        if ino.boot_info_table is not None:
-            old = outfp.tell()
-            outfp.seek(tmp_start + 8)
-            self._outfp_write_with_check(outfp, ino.boot_info_table.record(),
-                                         enable_overwrite_check=False)
-            outfp.seek(old)
-        return outfp.tell() - tmp_start
+        return pieces
 
-    def _write_directory_records(self, vd, outfp, progress):
+    def _write_metadata(self, outfp, pieces, progress):
         '''
-        An internal method to write out the directory records from a particular
-        Volume Descriptor.
+        An internal method to write out the metadata pieces of the ISO.  Pieces
+        that lie close together in the ISO are gathered into one buffer, with
+        the space between them filled with zeros, and written with a single
+        call; the file data pieces are skipped, and never have metadata
+        written over them.
 
         Parameters:
-         vd - The Volume Descriptor to write the Directory Records from.
          outfp - The file object to write data to.
+         pieces - The list of _OutputPiece objects, sorted by offset.
          progress - The Progress object to use for outputting progress.
         Returns:
          Nothing.
         '''
-        log_block_size = vd.logical_block_size()
-        le_ptr_offset = 0
-        be_ptr_offset = 0
-        dirs = collections.deque([vd.root_directory_record()])
-        while dirs:
-            curr = dirs.popleft()
-            curr_dirrecord_offset = 0
-            if curr.is_dir():
-                # Little Endian PTR
-                outfp.seek(vd.path_table_location_le * log_block_size + le_ptr_offset)
-                ret = curr.ptr.record_little_endian()
-                self._outfp_write_with_check(outfp, ret)
-                le_ptr_offset += len(ret)
-
-                # Big Endian PTR
-                outfp.seek(vd.path_table_location_be * log_block_size + be_ptr_offset)
-                ret = curr.ptr.record_big_endian()
-                self._outfp_write_with_check(outfp, ret)
-                be_ptr_offset += len(ret)
-                progress.call(curr.get_data_length())
-
-            dir_extent = curr.extent_location()
-            for child in curr.children:
-                # No matter what type the child is, we need to first write
-                # out the directory record entry.
-                recstr = child.record()
-                if (curr_dirrecord_offset + len(recstr)) > log_block_size:
-                    dir_extent += 1
-                    curr_dirrecord_offset = 0
-                outfp.seek(dir_extent * log_block_size + curr_dirrecord_offset)
-                # Now write out the child
-                self._outfp_write_with_check(outfp, recstr)
-                curr_dirrecord_offset += len(recstr)
+        # Small gaps are cheaper to fill with zeros than to seek over with a
+        # separate write.
+        max_gap = 16 * self.pvd.logical_block_size()
+
+        region_start = None
+        region = bytearray()
+        for piece in pieces:
+            if region_start is not None:
+                gap = piece.offset - (region_start + len(region))
+                if piece.ino is None and 0 <= gap <= max_gap:
+                    region += b'\x00' * gap
+                    region += piece.data
+                    continue
 
-                if child.rock_ridge is not None:
-                    if child.rock_ridge.dr_entries.ce_record is not None:
-                        # The child has a continue block, so write it out here.
-                        ce_rec = child.rock_ridge.dr_entries.ce_record
-                        outfp.seek(ce_rec.bl_cont_area * self.pvd.logical_block_size() + ce_rec.offset_cont_area)
-                        rec = child.rock_ridge.record_ce_entries()
-                        self._outfp_write_with_check(outfp, rec)
-                        progress.call(len(rec))
+                outfp.seek(region_start)
+                self._outfp_write_with_check(outfp, region)
+                progress.call(len(region))
+                region_start = None
 
-                    if child.rock_ridge.child_link_record_exists():
-                        continue
+            if piece.ino is None:
+                region_start = piece.offset
+                region = bytearray(piece.data)
 
-                if child.is_dir():
-                    # If the child is a directory, and is not dot or dotdot,
-                    # we want to descend into it to look at the children.
-                    if not child.is_dot() and not child.is_dotdot():
-                        dirs.append(child)
+        if region_start is not None:
+            outfp.seek(region_start)
+            self._outfp_write_with_check(outfp, region)
+            progress.call(len(region))
+
+    def _stream_file_data(self, outfp, blocksize, ino):
+        '''
+        Internal method to write the data of an Inode out to a file object
+        without seeking, patching in the boot info table if needed.
 
-    def _write_udf_descs(self, descs, outfp, progress):
+        Parameters:
+         outfp - The file object to write the data to.
+         blocksize - The blocksize to use when writing the data out.
+         ino - The Inode to write.
+        Returns:
+         The total number of bytes written out, including padding.
         '''
-        An internal method to write out a UDF Descriptor sequence.
+        log_block_size = self.pvd.logical_block_size()
+
+        with inode.InodeOpenData(ino, log_block_size, seek=False) as (data_fp, data_len):
+            data_offset = ino.data_offset(log_block_size)
+            written = 0
+            if ino.boot_info_table is not None:
+                # The boot info table gets patched in at offset 8 of the file,
+                # so read the head of the file and patch it before writing.
+                bit = ino.boot_info_table.record()
+                head = bytearray(utils.pread(data_fp, min(data_len, 8 + len(bit)),
+                                             data_offset))
+                head += b'\x00' * (8 + len(bit) - len(head))
+                head[8:] = bit
+                outfp.write(head)
+                written = len(head)
+
+            if data_len > written:
+                written += utils.stream_data(data_len - written, blocksize,
+                                             data_fp, data_offset + written,
+                                             outfp)
+                # If the file was shorter than it claimed to be, fill in the
+                # rest with zeros so everything after it stays in place.
+                utils.zero_fill(outfp, data_len - written, blocksize)
+                written = data_len
+
+        padded = utils.ceiling_div(written, log_block_size) * log_block_size
+        utils.zero_fill(outfp, padded - written, blocksize)
+
+        return padded
+
+    def _write_fp_sequential(self, outfp, blocksize, progress):
+        '''
+        Internal method to master the ISO strictly front to back, so that
+        the output file object never needs to be seeked.  Every piece of
+        the ISO is generated and sorted by extent, and the gaps between them
+        are filled with zeros.
 
         Parameters:
-         descs - The UDF Descriptors object to write out.
-         outfp - The output file descriptor to use for writing.
-         progress - The Progress object to use for updating progress.
+         outfp - The file object to write the data to.
+         blocksize - The blocksize to use when copying data.
+         progress - The Progress object to use for outputting progress.
         Returns:
          Nothing.
         '''
         log_block_size = self.pvd.logical_block_size()
+        total_size = self.pvd.space_size * log_block_size
 
-        outfp.seek(descs.pvd.extent_location() * log_block_size)
-        rec = descs.pvd.record()
-        self._outfp_write_with_check(outfp, rec)
-        progress.call(len(rec))
-
-        outfp.seek(descs.impl_use.extent_location() * log_block_size)
-        rec = descs.impl_use.record()
-        self._outfp_write_with_check(outfp, rec)
-        progress.call(len(rec))
+        current = 0
+        for piece in self._output_pieces():
+            if piece.offset < current:
+                raise pycdlibexception.PyCdlibInternalError('Overlapping write at offset %d (already wrote up to %d)' % (piece.offset, current))
 
-        outfp.seek(descs.partition.extent_location() * log_block_size)
-        rec = descs.partition.record()
-        self._outfp_write_with_check(outfp, rec)
-        progress.call(len(rec))
+            utils.zero_fill(outfp, piece.offset - current, blocksize)
+            current = piece.offset
 
-        outfp.seek(descs.logical_volume.extent_location() * log_block_size)
-        rec = descs.logical_volume.record()
-        self._outfp_write_with_check(outfp, rec)
-        progress.call(len(rec))
+            if piece.ino is None:
+                outfp.write(piece.data)
+                length = len(piece.data)
+            else:
+                length = self._stream_file_data(outfp, blocksize, piece.ino)
+            current += length
+            progress.call(length)
 
-        outfp.seek(descs.unallocated_space.extent_location() * log_block_size)
-        rec = descs.unallocated_space.record()
-        self._outfp_write_with_check(outfp, rec)
-        progress.call(len(rec))
+        if current > total_size:
+            raise pycdlibexception.PyCdlibInternalError('Wrote past the end of the ISO! (%d > %d)' % (current, total_size))
+        utils.zero_fill(outfp, total_size - current, blocksize)
 
-        outfp.seek(descs.terminator.extent_location() * log_block_size)
-        rec = descs.terminator.record()
-        self._outfp_write_with_check(outfp, rec)
-        progress.call(len(rec))
+        if self.isohybrid_mbr is not None:
+            outfp.write(self.isohybrid_mbr.record_padding(total_size))
 
-    def _write_fp(self, outfp, blocksize, progress_cb, progress_opaque):
+    def _write_fp(self, outfp, blocksize, progress_cb, progress_opaque,
+                  sequential=False, sparse=False, workers=1):
         '''
         Write a properly formatted ISO out to the file object passed in.  This
         also goes by the name of 'mastering'.
@@ -2547,17 +4159,52 @@ class PyCdlib(object):
                        work.  The callback function must have a signature of:
                        def func(done, total).
          progress_opaque - User data to be passed to the progress callback.
+         sequential - Whether to write the ISO strictly front to back, without
+                      seeking the output file object.
+         sparse - Whether to truncate the output file object and then seek over
+                  blocks of zeros in the file data instead of writing them.
+         workers - The number of threads to write the file data with.
         Returns:
-         Nothing.
+         The number of bytes that were seeked over instead of written.
         '''
         if hasattr(outfp, 'mode') and 'b' not in outfp.mode:
             raise pycdlibexception.PyCdlibInvalidInput("The file to write out must be in binary mode (add 'b' to the open flags)")
 
+        if sequential and sparse:
+            raise pycdlibexception.PyCdlibInvalidInput('A sparse write needs to seek, so it cannot also be sequential')
+
+        if workers < 1:
+            raise pycdlibexception.PyCdlibInvalidInput('The number of workers must be at least 1')
+        if sequential and workers > 1:
+            raise pycdlibexception.PyCdlibInvalidInput('A sequential write cannot use more than one worker')
+
+        if workers > 1:
+            # The threads need positional writes to a file descriptor; if
+            # either is missing, fall back to writing the data in order.
+            try:
+                outfp.fileno()
+            except (AttributeError, io.UnsupportedOperation):
+                workers = 1
+            if not hasattr(os, 'pwrite'):
+                workers = 1
+
+        # Writing out the ISO needs the entire directory tree.
+        self._walk_all_dirs()
+
         if self._needs_reshuffle:
             self._reshuffle_extents()
 
         self._write_check_list = []
-        outfp.seek(0)
+        if not sequential:
+            outfp.seek(0)
+        if sparse:
+            # Everything that is seeked over has to read back as zeros, so
+            # drop whatever the output already had in it.
+            try:
+                outfp.truncate(0)
+            except (AttributeError, IOError, io.UnsupportedOperation):
+                raise pycdlibexception.PyCdlibInvalidInput('A sparse write needs an output file object that can be truncated')
+        skipped = 0
 
         class Progress(object):
             '''
@@ -2577,7 +4224,7 @@ class PyCdlib(object):
                 if self.done > self.total:
                     self.done = self.total
                 if progress_cb is not None:
-                    if len(inspect.getargspec(progress_cb).args) == 2:  # pylint: disable=W1505
+                    if len(_getargspec(progress_cb).args) == 2:
                         progress_cb(self.done, self.total)
                     else:
                         progress_cb(self.done, self.total, progress_opaque)
@@ -2597,153 +4244,30 @@ class PyCdlib(object):
         progress = Progress(self.pvd.space_size * log_block_size)
         progress.call(0)
 
-        if self.isohybrid_mbr is not None:
-            self._outfp_write_with_check(outfp,
-                                         self.isohybrid_mbr.record(self.pvd.space_size * log_block_size))
-
-        # Ecma-119, 6.2.1 says that the Volume Space is divided into a System
-        # Area and a Data Area, where the System Area is in logical sectors 0
-        # to 15, and whose contents is not specified by the standard.  Thus
-        # we skip the first 16 sectors.
-        outfp.seek(self.pvd.extent_location() * log_block_size)
-
-        # First write out the PVD.
-        for pvd in self.pvds:
-            rec = pvd.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-        # Next write out the boot records.
-        for br in self.brs:
-            outfp.seek(br.extent_location() * log_block_size)
-            rec = br.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-        # Next we write out the SVDs.
-        for svd in self.svds:
-            outfp.seek(svd.extent_location() * log_block_size)
-            rec = svd.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-        # Next we write out the Volume Descriptor Terminators.
-        for vdst in self.vdsts:
-            outfp.seek(vdst.extent_location() * log_block_size)
-            rec = vdst.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-        # Next we write out the UDF Volume Recognition sequence (if we are a
-        # UDF ISO).
-        if self.udf_bea is not None:
-            outfp.seek(self.udf_bea.extent_location() * log_block_size)
-            rec = self.udf_bea.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-            outfp.seek(self.udf_nsr.extent_location() * log_block_size)
-            rec = self.udf_nsr.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-            outfp.seek(self.udf_tea.extent_location() * log_block_size)
-            rec = self.udf_tea.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-        # Next we write out the version block if it exists.
-        if self.version_vd is not None:
-            outfp.seek(self.version_vd.extent_location() * log_block_size)
-            rec = self.version_vd.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-        # Now the UDF Main and Reserved Volume Descriptor Sequence
-        if self.udf_main_descs is not None:
-            self._write_udf_descs(self.udf_main_descs, outfp, progress)
-            self._write_udf_descs(self.udf_reserve_descs, outfp, progress)
-
-        # Now the UDF Logical Volume Integrity Sequence (if there is one).
-        if self.udf_logical_volume_integrity is not None:
-            outfp.seek(self.udf_logical_volume_integrity.extent_location() * log_block_size)
-            rec = self.udf_logical_volume_integrity.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-            outfp.seek(self.udf_logical_volume_integrity_terminator.extent_location() * log_block_size)
-            rec = self.udf_logical_volume_integrity_terminator.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-        # Now the UDF Anchor Points (if there are any).
-        for anchor in self.udf_anchors:
-            outfp.seek(anchor.extent_location() * log_block_size)
-            rec = anchor.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-        # In theory, the Path Table Records (for both the PVD and SVD) get
-        # written out next.  Since we store them along with the Directory
-        # Records, however, we will write them out along with the directory
-        # records instead.
-
-        # Now write out the El Torito Boot Catalog if it exists.
-        if self.eltorito_boot_catalog is not None:
-            outfp.seek(self.eltorito_boot_catalog.extent_location() * log_block_size)
-            rec = self.eltorito_boot_catalog.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-        # Now write out the ISO9660 directory records.
-        self._write_directory_records(self.pvd, outfp, progress)
-
-        # Now write out the Joliet directory records, if they exist.
-        if self.joliet_vd is not None:
-            self._write_directory_records(self.joliet_vd, outfp, progress)
-
-        # Now write out the UDF directory records, if they exist.
-        if self.udf_root is not None:
-            # Write out the UDF File Sets
-            outfp.seek(self.udf_file_set.extent_location() * log_block_size)
-            rec = self.udf_file_set.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-            outfp.seek(self.udf_file_set_terminator.extent_location() * log_block_size)
-            rec = self.udf_file_set_terminator.record()
-            self._outfp_write_with_check(outfp, rec)
-            progress.call(len(rec))
-
-            written_file_entry_inodes = {}
-            udf_file_entries = collections.deque([(self.udf_root, True)])
-            while udf_file_entries:
-                udf_file_entry, isdir = udf_file_entries.popleft()
-
-                if udf_file_entry.inode is None or not id(udf_file_entry.inode) in written_file_entry_inodes:
-                    outfp.seek(udf_file_entry.extent_location() * log_block_size)
-                    rec = udf_file_entry.record()
-                    self._outfp_write_with_check(outfp, rec)
-                    progress.call(len(rec))
-                    written_file_entry_inodes[id(udf_file_entry.inode)] = True
+        if sequential:
+            self._write_fp_sequential(outfp, blocksize, progress)
+            progress.finish()
+            return skipped
 
-                if isdir:
-                    outfp.seek(udf_file_entry.fi_descs[0].extent_location() * log_block_size)
-                    # FIXME: for larger directories, we'll actually need to
-                    # iterate over the alloc_descs and write them
-                    for fi_desc in udf_file_entry.fi_descs:
-                        rec = fi_desc.record()
-                        self._outfp_write_with_check(outfp, rec)
-                        progress.call(len(rec))
-                        if not fi_desc.is_parent():
-                            udf_file_entries.append((fi_desc.file_entry, fi_desc.is_dir()))
+        # All of the metadata is rendered up front and written out in as few
+        # calls as possible; the file data follows.
+        self._write_metadata(outfp, self._output_pieces(), progress)
 
         # Now we need to write out the actual files.  Note that in many cases,
         # we haven't yet read the file out of the original, so we need to do
         # that here.
-        for ino in self.inodes:
-            if ino.get_data_length() > 0:
-                progress.call(self._output_file_data(outfp, blocksize, ino))
+        if workers > 1:
+            skipped += self._output_file_data_parallel(outfp, blocksize,
+                                                       workers, sparse,
+                                                       progress)
+        else:
+            for ino in self.inodes:
+                if ino.get_data_length() > 0:
+                    (length, ino_skipped) = self._output_file_data(outfp,
+                                                                   blocksize,
+                                                                   ino, sparse)
+                    skipped += ino_skipped
+                    progress.call(length)
 
         # We need to pad out to the total size of the disk, in the case that
         # the last thing we wrote is shorter than a full block size.  It turns
@@ -2765,6 +4289,8 @@ class PyCdlib(object):
 
         progress.finish()
 
+        return skipped
+
     def _update_rr_ce_entry(self, rec):
         '''
         An internal method to update the Rock Ridge CE entry for the given
@@ -2776,6 +4302,8 @@ class PyCdlib(object):
          The number of additional bytes needed for this Rock Ridge CE entry.
         '''
         if rec.rock_ridge is not None and rec.rock_ridge.dr_entries.ce_record is not None:
+            # Continuation Entries are assigned along with the directories.
+            self._file_layout = None
             celen = rec.rock_ridge.dr_entries.ce_record.len_cont_area
             added_block, block, offset = self.pvd.add_rr_ce_entry(celen)
             rec.rock_ridge.update_ce_block(block)
@@ -2785,7 +4313,8 @@ class PyCdlib(object):
 
         return 0
 
-    def _finish_add(self, num_bytes_to_add, num_partition_bytes_to_add):
+    def _finish_add(self, num_bytes_to_add, num_partition_bytes_to_add,
+                    data_only=False):
         '''
         An internal method to do all of the accounting needed whenever
         something is added to the ISO.  This method should only be called by
@@ -2796,6 +4325,7 @@ class PyCdlib(object):
                             descriptors.
          num_partition_bytes_to_add - The number of additional bytes to add to
                                       the partition if this is a UDF file.
+         data_only - Whether only file data (and no metadata extents) was added.
         Returns:
          Nothing.
         '''
@@ -2815,12 +4345,16 @@ class PyCdlib(object):
             self.udf_reserve_descs.partition.part_length += num_extents_to_add
             self.udf_logical_volume_integrity.size_table += num_extents_to_add
 
-        if self._always_consistent:
+        if not data_only:
+            self._file_layout = None
+
+        if self._always_consistent and self._batch_depth == 0:
             self._reshuffle_extents()
         else:
             self._needs_reshuffle = True
 
-    def _finish_remove(self, num_bytes_to_remove, is_partition):
+    def _finish_remove(self, num_bytes_to_remove, is_partition,
+                       data_only=False):
         '''
         An internal method to do all of the accounting needed whenever
         something is removed from the ISO.  This method should only be called
@@ -2829,6 +4363,7 @@ class PyCdlib(object):
         Parameters:
          num_bytes_to_remove - The number of additional bytes to remove from the descriptors.
          is_partition - Whether these bytes are part of a UDF partition.
+         data_only - Whether only file data (and no metadata extents) was removed.
         Returns:
          Nothing.
         '''
@@ -2848,7 +4383,10 @@ class PyCdlib(object):
             self.udf_reserve_descs.partition.part_length -= num_extents_to_remove
             self.udf_logical_volume_integrity.size_table -= num_extents_to_remove
 
-        if self._always_consistent:
+        if not data_only:
+            self._file_layout = None
+
+        if self._always_consistent and self._batch_depth == 0:
             self._reshuffle_extents()
         else:
             self._needs_reshuffle = True
@@ -3204,7 +4742,7 @@ class PyCdlib(object):
         num_bytes_to_remove += to_remove * logical_block_size
         self.udf_logical_volume_integrity.logical_volume_impl_use.num_files -= 1
 
-        self._find_udf_record.cache_clear()  # pylint: disable=no-member
+        self._forget_udf_paths(rec)
 
         return num_bytes_to_remove
 
@@ -3287,6 +4825,8 @@ class PyCdlib(object):
         else:
             rec = self._find_iso_record(utils.normpath(kwargs['iso_path']))
 
+        self._walk_pending_dir(rec)
+
         return rec
 
     def _create_dot(self, vd, parent, rock_ridge, xa, file_mode):
@@ -3331,6 +4871,8 @@ class PyCdlib(object):
 ########################### PUBLIC API #####################################
     def __init__(self, always_consistent=False):
         self._always_consistent = always_consistent
+        self._rwlock = self._ReadWriteLock()
+        self._parse_lock = threading.RLock()
         self._track_writes = os.getenv('PYCDLIB_TRACK_WRITES', False)
         self._initialize()
 
@@ -3390,59 +4932,77 @@ class PyCdlib(object):
         if self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object already has an ISO; either close it or create a new object')
 
-        if interchange_level < 1 or interchange_level > 4:
-            raise pycdlibexception.PyCdlibInvalidInput('Invalid interchange level (must be between 1 and 4)')
+        with self._rwlock.write_locked():
+            if interchange_level < 1 or interchange_level > 4:
+                raise pycdlibexception.PyCdlibInvalidInput('Invalid interchange level (must be between 1 and 4)')
 
-        if rock_ridge is not None and rock_ridge not in ['1.09', '1.10', '1.12']:
-            raise pycdlibexception.PyCdlibInvalidInput('Rock Ridge value must be None (no Rock Ridge), 1.09, 1.10, or 1.12')
+            if rock_ridge is not None and rock_ridge not in ['1.09', '1.10', '1.12']:
+                raise pycdlibexception.PyCdlibInvalidInput('Rock Ridge value must be None (no Rock Ridge), 1.09, 1.10, or 1.12')
 
-        if udf is not None and udf != '2.60':
-            raise pycdlibexception.PyCdlibInvalidInput('UDF value must be None (no UDF), or 2.60')
+            if udf is not None and udf != '2.60':
+                raise pycdlibexception.PyCdlibInvalidInput('UDF value must be None (no UDF), or 2.60')
 
-        # Now save off the arguments we need to keep around.
-        if not app_ident_str:
-            app_ident_str = 'PyCdlib (C) 2015-2018 Chris Lalancette'
+            # Now save off the arguments we need to keep around.
+            if not app_ident_str:
+                app_ident_str = 'PyCdlib (C) 2015-2018 Chris Lalancette'
 
-        self.interchange_level = interchange_level
+            self.interchange_level = interchange_level
 
-        self.xa = xa
+            self.xa = xa
 
-        if isinstance(joliet, bool):
-            if joliet:
-                joliet = 3
-            else:
-                joliet = None
-
-        self.rock_ridge = rock_ridge
-
-        sys_ident = sys_ident.encode('utf-8')
-        vol_ident = vol_ident.encode('utf-8')
-        vol_set_ident = vol_set_ident.encode('utf-8')
-        pub_ident_str = pub_ident_str.encode('utf-8')
-        preparer_ident_str = preparer_ident_str.encode('utf-8')
-        app_ident_str = app_ident_str.encode('utf-8')
-        copyright_file = copyright_file.encode('utf-8')
-        abstract_file = abstract_file.encode('utf-8')
-        bibli_file = bibli_file.encode('utf-8')
-        app_use = app_use.encode('utf-8')
-
-        # Now start creating the ISO.
-        self.pvd = headervd.pvd_factory(sys_ident, vol_ident, set_size, seqnum,
-                                        log_block_size, vol_set_ident,
-                                        pub_ident_str, preparer_ident_str,
-                                        app_ident_str, copyright_file,
-                                        abstract_file, bibli_file,
-                                        vol_expire_date, app_use, xa)
-        self.pvds.append(self.pvd)
-
-        pvd_log_block_size = self.pvd.logical_block_size()
-
-        num_bytes_to_add = 0
-        if self.interchange_level == 4:
-            self.enhanced_vd = headervd.enhanced_vd_factory(sys_ident,
-                                                            vol_ident,
-                                                            set_size, seqnum,
-                                                            log_block_size,
+            if isinstance(joliet, bool):
+                if joliet:
+                    joliet = 3
+                else:
+                    joliet = None
+
+            self.rock_ridge = rock_ridge
+
+            sys_ident = sys_ident.encode('utf-8')
+            vol_ident = vol_ident.encode('utf-8')
+            vol_set_ident = vol_set_ident.encode('utf-8')
+            pub_ident_str = pub_ident_str.encode('utf-8')
+            preparer_ident_str = preparer_ident_str.encode('utf-8')
+            app_ident_str = app_ident_str.encode('utf-8')
+            copyright_file = copyright_file.encode('utf-8')
+            abstract_file = abstract_file.encode('utf-8')
+            bibli_file = bibli_file.encode('utf-8')
+            app_use = app_use.encode('utf-8')
+
+            # Now start creating the ISO.
+            self.pvd = headervd.pvd_factory(sys_ident, vol_ident, set_size, seqnum,
+                                            log_block_size, vol_set_ident,
+                                            pub_ident_str, preparer_ident_str,
+                                            app_ident_str, copyright_file,
+                                            abstract_file, bibli_file,
+                                            vol_expire_date, app_use, xa)
+            self.pvds.append(self.pvd)
+
+            pvd_log_block_size = self.pvd.logical_block_size()
+
+            num_bytes_to_add = 0
+            if self.interchange_level == 4:
+                self.enhanced_vd = headervd.enhanced_vd_factory(sys_ident,
+                                                                vol_ident,
+                                                                set_size, seqnum,
+                                                                log_block_size,
+                                                                vol_set_ident,
+                                                                pub_ident_str,
+                                                                preparer_ident_str,
+                                                                app_ident_str,
+                                                                copyright_file,
+                                                                abstract_file,
+                                                                bibli_file,
+                                                                vol_expire_date,
+                                                                app_use, xa)
+                self.svds.append(self.enhanced_vd)
+
+                num_bytes_to_add += self.enhanced_vd.logical_block_size()
+
+            if joliet is not None:
+                self.joliet_vd = headervd.joliet_vd_factory(joliet, sys_ident,
+                                                            vol_ident, set_size,
+                                                            seqnum, log_block_size,
                                                             vol_set_ident,
                                                             pub_ident_str,
                                                             preparer_ident_str,
@@ -3452,205 +5012,202 @@ class PyCdlib(object):
                                                             bibli_file,
                                                             vol_expire_date,
                                                             app_use, xa)
-            self.svds.append(self.enhanced_vd)
-
-            num_bytes_to_add += self.enhanced_vd.logical_block_size()
-
-        if joliet is not None:
-            self.joliet_vd = headervd.joliet_vd_factory(joliet, sys_ident,
-                                                        vol_ident, set_size,
-                                                        seqnum, log_block_size,
-                                                        vol_set_ident,
-                                                        pub_ident_str,
-                                                        preparer_ident_str,
-                                                        app_ident_str,
-                                                        copyright_file,
-                                                        abstract_file,
-                                                        bibli_file,
-                                                        vol_expire_date,
-                                                        app_use, xa)
-            self.svds.append(self.joliet_vd)
-
-            # Now that we have added joliet, we need to add the new space to the
-            # PVD for the VD itself.
-            num_bytes_to_add += self.joliet_vd.logical_block_size()
-
-        self.vdsts.append(headervd.vdst_factory())
-        num_bytes_to_add += pvd_log_block_size
-
-        if udf is not None:
-            # Create the Bridge Recognition Volume Sequence
-            self.udf_bea = udfmod.BEAVolumeStructure()
-            self.udf_bea.new()
-
-            self.udf_nsr = udfmod.NSRVolumeStructure()
-            self.udf_nsr.new()
-
-            self.udf_tea = udfmod.TEAVolumeStructure()
-            self.udf_tea.new()
-
-            num_bytes_to_add += 3 * pvd_log_block_size
-
-        # We always create an empty version volume descriptor
-        self.version_vd = headervd.version_vd_factory(pvd_log_block_size)
-        num_bytes_to_add += pvd_log_block_size
-
-        if udf is not None:
-            self.udf_main_descs = self.UDFDescriptors()
+                self.svds.append(self.joliet_vd)
 
-            # We need to pad out to extent 32.  The padding should be the
-            # distance between the current PVD space size and 32.
-            additional_extents = 32 - (self.pvd.space_size + (num_bytes_to_add // pvd_log_block_size))
-            num_bytes_to_add += additional_extents * pvd_log_block_size
+                # Now that we have added joliet, we need to add the new space to the
+                # PVD for the VD itself.
+                num_bytes_to_add += self.joliet_vd.logical_block_size()
 
-            # Create the Main Volume Descriptor Sequence
-            self.udf_main_descs.pvd = udfmod.UDFPrimaryVolumeDescriptor()
-            self.udf_main_descs.pvd.new()
+            self.vdsts.append(headervd.vdst_factory())
+            num_bytes_to_add += pvd_log_block_size
 
-            self.udf_main_descs.impl_use = udfmod.UDFImplementationUseVolumeDescriptor()
-            self.udf_main_descs.impl_use.new()
+            if udf is not None:
+                # Create the Bridge Recognition Volume Sequence
+                self.udf_bea = udfmod.BEAVolumeStructure()
+                self.udf_bea.new()
 
-            self.udf_main_descs.partition = udfmod.UDFPartitionVolumeDescriptor()
-            self.udf_main_descs.partition.new()
+                self.udf_nsr = udfmod.NSRVolumeStructure()
+                self.udf_nsr.new()
 
-            self.udf_main_descs.logical_volume = udfmod.UDFLogicalVolumeDescriptor()
-            self.udf_main_descs.logical_volume.new()
+                self.udf_tea = udfmod.TEAVolumeStructure()
+                self.udf_tea.new()
 
-            self.udf_main_descs.unallocated_space = udfmod.UDFUnallocatedSpaceDescriptor()
-            self.udf_main_descs.unallocated_space.new()
+                num_bytes_to_add += 3 * pvd_log_block_size
 
-            self.udf_main_descs.terminator = udfmod.UDFTerminatingDescriptor()
-            self.udf_main_descs.terminator.new()
+            # We always create an empty version volume descriptor
+            self.version_vd = headervd.version_vd_factory(pvd_log_block_size)
+            num_bytes_to_add += pvd_log_block_size
 
-            num_bytes_to_add += 16 * pvd_log_block_size
+            if udf is not None:
+                self.udf_main_descs = self.UDFDescriptors()
 
-            self.udf_reserve_descs = self.UDFDescriptors()
+                # We need to pad out to extent 32.  The padding should be the
+                # distance between the current PVD space size and 32.
+                additional_extents = 32 - (self.pvd.space_size + (num_bytes_to_add // pvd_log_block_size))
+                num_bytes_to_add += additional_extents * pvd_log_block_size
 
-            # Create the Reserve Volume Descriptor Sequence
-            self.udf_reserve_descs.pvd = udfmod.UDFPrimaryVolumeDescriptor()
-            self.udf_reserve_descs.pvd.new()
+                # Create the Main Volume Descriptor Sequence
+                self.udf_main_descs.pvd = udfmod.UDFPrimaryVolumeDescriptor()
+                self.udf_main_descs.pvd.new()
 
-            self.udf_reserve_descs.impl_use = udfmod.UDFImplementationUseVolumeDescriptor()
-            self.udf_reserve_descs.impl_use.new()
+                self.udf_main_descs.impl_use = udfmod.UDFImplementationUseVolumeDescriptor()
+                self.udf_main_descs.impl_use.new()
 
-            self.udf_reserve_descs.partition = udfmod.UDFPartitionVolumeDescriptor()
-            self.udf_reserve_descs.partition.new()
+                self.udf_main_descs.partition = udfmod.UDFPartitionVolumeDescriptor()
+                self.udf_main_descs.partition.new()
 
-            self.udf_reserve_descs.logical_volume = udfmod.UDFLogicalVolumeDescriptor()
-            self.udf_reserve_descs.logical_volume.new()
+                self.udf_main_descs.logical_volume = udfmod.UDFLogicalVolumeDescriptor()
+                self.udf_main_descs.logical_volume.new()
 
-            self.udf_reserve_descs.unallocated_space = udfmod.UDFUnallocatedSpaceDescriptor()
-            self.udf_reserve_descs.unallocated_space.new()
+                self.udf_main_descs.unallocated_space = udfmod.UDFUnallocatedSpaceDescriptor()
+                self.udf_main_descs.unallocated_space.new()
 
-            self.udf_reserve_descs.terminator = udfmod.UDFTerminatingDescriptor()
-            self.udf_reserve_descs.terminator.new()
+                self.udf_main_descs.terminator = udfmod.UDFTerminatingDescriptor()
+                self.udf_main_descs.terminator.new()
 
-            num_bytes_to_add += 16 * pvd_log_block_size
+                num_bytes_to_add += 16 * pvd_log_block_size
 
-            # Create the Logical Volume Integrity Sequence
-            self.udf_logical_volume_integrity = udfmod.UDFLogicalVolumeIntegrityDescriptor()
-            self.udf_logical_volume_integrity.new()
+                self.udf_reserve_descs = self.UDFDescriptors()
 
-            self.udf_logical_volume_integrity_terminator = udfmod.UDFTerminatingDescriptor()
-            self.udf_logical_volume_integrity_terminator.new()
+                # Create the Reserve Volume Descriptor Sequence
+                self.udf_reserve_descs.pvd = udfmod.UDFPrimaryVolumeDescriptor()
+                self.udf_reserve_descs.pvd.new()
 
-            num_bytes_to_add += 192 * pvd_log_block_size
+                self.udf_reserve_descs.impl_use = udfmod.UDFImplementationUseVolumeDescriptor()
+                self.udf_reserve_descs.impl_use.new()
 
-            # Create the Anchor
-            anchor1 = udfmod.UDFAnchorVolumeStructure()
-            anchor1.new()
-            self.udf_anchors.append(anchor1)
+                self.udf_reserve_descs.partition = udfmod.UDFPartitionVolumeDescriptor()
+                self.udf_reserve_descs.partition.new()
 
-            num_bytes_to_add += pvd_log_block_size
+                self.udf_reserve_descs.logical_volume = udfmod.UDFLogicalVolumeDescriptor()
+                self.udf_reserve_descs.logical_volume.new()
 
-            # Create the File Set
-            self.udf_file_set = udfmod.UDFFileSetDescriptor()
-            self.udf_file_set.new()
+                self.udf_reserve_descs.unallocated_space = udfmod.UDFUnallocatedSpaceDescriptor()
+                self.udf_reserve_descs.unallocated_space.new()
 
-            self.udf_file_set_terminator = udfmod.UDFTerminatingDescriptor()
-            self.udf_file_set_terminator.new()
+                self.udf_reserve_descs.terminator = udfmod.UDFTerminatingDescriptor()
+                self.udf_reserve_descs.terminator.new()
 
-            num_bytes_to_add += 2 * pvd_log_block_size
+                num_bytes_to_add += 16 * pvd_log_block_size
 
-            # Create the root directory, and the 'parent' entry inside.
-            self.udf_root = udfmod.UDFFileEntry()
-            self.udf_root.new(0, 'dir', None, pvd_log_block_size)
-            num_bytes_to_add += pvd_log_block_size
+                # Create the Logical Volume Integrity Sequence
+                self.udf_logical_volume_integrity = udfmod.UDFLogicalVolumeIntegrityDescriptor()
+                self.udf_logical_volume_integrity.new()
 
-            parent = udfmod.UDFFileIdentifierDescriptor()
-            parent.new(True, True, b'')
-            num_new_extents = self.udf_root.add_file_ident_desc(parent, pvd_log_block_size)
-            num_bytes_to_add += num_new_extents * pvd_log_block_size
+                self.udf_logical_volume_integrity_terminator = udfmod.UDFTerminatingDescriptor()
+                self.udf_logical_volume_integrity_terminator.new()
 
-        num_partition_bytes_to_add = 0
-        # Create the PTR, and add the 4 extents that comprise of the LE PTR and
-        # BE PTR to the number of bytes to add.
-        ptr = path_table_record.PathTableRecord()
-        ptr.new_root()
-        self.pvd.root_directory_record().set_ptr(ptr)
-        num_partition_bytes_to_add += 4 * pvd_log_block_size
+                num_bytes_to_add += 192 * pvd_log_block_size
 
-        # Also add one extent to the size for the root directory record.
-        num_partition_bytes_to_add += pvd_log_block_size
+                # Create the Anchor
+                anchor1 = udfmod.UDFAnchorVolumeStructure()
+                anchor1.new()
+                self.udf_anchors.append(anchor1)
 
-        self._create_dot(self.pvd, self.pvd.root_directory_record(),
-                         self.rock_ridge, self.xa, 0o040555)
-        self._create_dotdot(self.pvd, self.pvd.root_directory_record(),
-                            self.rock_ridge, False, self.xa, 0o040555)
+                num_bytes_to_add += pvd_log_block_size
 
-        if self.joliet_vd is not None:
+                # Create the File Set
+                self.udf_file_set = udfmod.UDFFileSetDescriptor()
+                self.udf_file_set.new()
+
+                self.udf_file_set_terminator = udfmod.UDFTerminatingDescriptor()
+                self.udf_file_set_terminator.new()
+
+                num_bytes_to_add += 2 * pvd_log_block_size
+
+                # Create the root directory, and the 'parent' entry inside.
+                self.udf_root = udfmod.UDFFileEntry()
+                self.udf_root.new(0, 'dir', None, pvd_log_block_size)
+                num_bytes_to_add += pvd_log_block_size
+
+                parent = udfmod.UDFFileIdentifierDescriptor()
+                parent.new(True, True, b'')
+                num_new_extents = self.udf_root.add_file_ident_desc(parent, pvd_log_block_size)
+                num_bytes_to_add += num_new_extents * pvd_log_block_size
+
+            num_partition_bytes_to_add = 0
             # Create the PTR, and add the 4 extents that comprise of the LE PTR and
             # BE PTR to the number of bytes to add.
             ptr = path_table_record.PathTableRecord()
             ptr.new_root()
-            self.joliet_vd.root_directory_record().set_ptr(ptr)
+            self.pvd.root_directory_record().set_ptr(ptr)
             num_partition_bytes_to_add += 4 * pvd_log_block_size
 
             # Also add one extent to the size for the root directory record.
             num_partition_bytes_to_add += pvd_log_block_size
 
-            self._create_dot(self.joliet_vd,
-                             self.joliet_vd.root_directory_record(), None,
-                             False, None)
-            self._create_dotdot(self.joliet_vd,
-                                self.joliet_vd.root_directory_record(), None,
-                                False, False, None)
+            self._create_dot(self.pvd, self.pvd.root_directory_record(),
+                             self.rock_ridge, self.xa, 0o040555)
+            self._create_dotdot(self.pvd, self.pvd.root_directory_record(),
+                                self.rock_ridge, False, self.xa, 0o040555)
 
-        if self.rock_ridge is not None:
-            num_partition_bytes_to_add += pvd_log_block_size
+            if self.joliet_vd is not None:
+                # Create the PTR, and add the 4 extents that comprise of the LE PTR and
+                # BE PTR to the number of bytes to add.
+                ptr = path_table_record.PathTableRecord()
+                ptr.new_root()
+                self.joliet_vd.root_directory_record().set_ptr(ptr)
+                num_partition_bytes_to_add += 4 * pvd_log_block_size
+
+                # Also add one extent to the size for the root directory record.
+                num_partition_bytes_to_add += pvd_log_block_size
+
+                self._create_dot(self.joliet_vd,
+                                 self.joliet_vd.root_directory_record(), None,
+                                 False, None)
+                self._create_dotdot(self.joliet_vd,
+                                    self.joliet_vd.root_directory_record(), None,
+                                    False, False, None)
 
-        if udf is not None:
-            anchor2 = udfmod.UDFAnchorVolumeStructure()
-            anchor2.new()
-            self.udf_anchors.append(anchor2)
+            if self.rock_ridge is not None:
+                num_partition_bytes_to_add += pvd_log_block_size
 
-            num_partition_bytes_to_add += pvd_log_block_size
+            if udf is not None:
+                anchor2 = udfmod.UDFAnchorVolumeStructure()
+                anchor2.new()
+                self.udf_anchors.append(anchor2)
 
-        self._finish_add(num_bytes_to_add, num_partition_bytes_to_add)
+                num_partition_bytes_to_add += pvd_log_block_size
 
-        self._initialized = True
+            self._finish_add(num_bytes_to_add, num_partition_bytes_to_add)
 
-    def open(self, filename):
+            self._initialized = True
+
+    def open(self, filename, mmap=False, lazy=False, index_cache=None):
         '''
         Open up an existing ISO for inspection and modification.
 
         Parameters:
          filename - The filename containing the ISO to open up.
+         mmap - Whether to memory-map the ISO while it is open.  When set, all
+                of the metadata is parsed directly out of the mapping without
+                intermediate copies, which is much faster for large ISOs.
+         lazy - Whether to parse the directories of the ISO on-demand.  When
+                set, only the root directory is parsed up-front, and the
+                children of any other directory are parsed the first time that
+                a path in it is looked up.  Any modification or write of the ISO
+                parses all remaining directories first.
+         index_cache - An optional indexcache.IndexCache.  If the cache has an
+                       entry for this ISO file, the parsed metadata is loaded
+                       from it instead of being parsed; otherwise the ISO is
+                       parsed completely (regardless of lazy) and stored in
+                       the cache.
         Returns:
          Nothing.
         '''
         if self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object already has an ISO; either close it or create a new object')
 
-        fp = open(filename, 'r+b')
-        self._managing_fp = True
-        try:
-            self._open_fp(fp)
-        except:
-            fp.close()
-            raise
+        with self._rwlock.write_locked():
+            fp = open(filename, 'r+b')
+            self._managing_fp = True
+            try:
+                self._open_fp(fp, mmap, lazy, index_cache)
+            except:
+                fp.close()
+                raise
 
-    def open_fp(self, fp):
+    def open_fp(self, fp, mmap=False, lazy=False, index_cache=None):
         '''
         Open up an existing ISO for inspection and modification.  Note that the
         file object passed in here must stay open for the lifetime of this
@@ -3660,13 +5217,28 @@ class PyCdlib(object):
 
         Parameters:
          fp - The file object containing the ISO to open up.
+         mmap - Whether to memory-map the ISO while it is open.  When set, all
+                of the metadata is parsed directly out of the mapping without
+                intermediate copies.  The file object must either have a file
+                descriptor or expose its buffer (like io.BytesIO does).
+         lazy - Whether to parse the directories of the ISO on-demand.  When
+                set, only the root directory is parsed up-front, and the
+                children of any other directory are parsed the first time that
+                a path in it is looked up.  Any modification or write of the ISO
+                parses all remaining directories first.
+         index_cache - An optional indexcache.IndexCache.  If the cache has an
+                       entry for this ISO file, the parsed metadata is loaded
+                       from it instead of being parsed; otherwise the ISO is
+                       parsed completely (regardless of lazy) and stored in
+                       the cache.
         Returns:
          Nothing.
         '''
         if self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object already has an ISO; either close it or create a new object')
 
-        self._open_fp(fp)
+        with self._rwlock.write_locked():
+            self._open_fp(fp, mmap, lazy, index_cache)
 
     def get_file_from_iso(self, local_path, **kwargs):
         '''
@@ -3688,8 +5260,9 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        with open(local_path, 'wb') as fp:
-            self._get_file_from_iso_fp(fp, **kwargs)
+        with self._rwlock.read_locked():
+            with open(local_path, 'wb') as fp:
+                self._get_file_from_iso_fp(fp, **kwargs)
 
     def get_file_from_iso_fp(self, outfp, **kwargs):
         '''
@@ -3711,7 +5284,213 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        self._get_file_from_iso_fp(outfp, **kwargs)
+        with self._rwlock.read_locked():
+            self._get_file_from_iso_fp(outfp, **kwargs)
+
+    def open_file_from_iso(self, **kwargs):
+        '''
+        Open a single file on the ISO for reading.  The returned object is a
+        read-only, seekable file object that only reads the parts of the file
+        that are asked for; each one keeps its own position, so many can be
+        open at once.  The data is read when asked for, so the ISO must not be
+        closed or modified while the returned object is in use.
+
+        Parameters:
+         iso_path - The absolute ISO9660 path to lookup on the ISO (exclusive
+                    with rr_path, joliet_path, and udf_path).
+         rr_path - The absolute Rock Ridge path to lookup on the ISO (exclusive
+                   with iso_path, joliet_path, and udf_path).
+         joliet_path - The absolute Joliet path to lookup on the ISO (exclusive
+                       with iso_path, rr_path, and udf_path).
+         udf_path - The absolute UDF path to lookup on the ISO (exclusive with
+                    iso_path, rr_path, and joliet_path).
+        Returns:
+         A file object to read the data of the file from.
+        '''
+        if not self._initialized:
+            raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
+
+        with self._rwlock.read_locked():
+            iso_path = None
+            rr_path = None
+            joliet_path = None
+            udf_path = None
+            num_paths = 0
+            for key in kwargs:
+                if key == 'iso_path' and kwargs[key] is not None:
+                    iso_path = utils.normpath(kwargs[key])
+                    num_paths += 1
+                elif key == 'rr_path' and kwargs[key] is not None:
+                    rr_path = utils.normpath(kwargs[key])
+                    num_paths += 1
+                elif key == 'joliet_path' and kwargs[key] is not None:
+                    joliet_path = utils.normpath(kwargs[key])
+                    num_paths += 1
+                elif key == 'udf_path' and kwargs[key] is not None:
+                    udf_path = utils.normpath(kwargs[key])
+                    num_paths += 1
+                else:
+                    raise pycdlibexception.PyCdlibInvalidInput('Unknown keyword %s' % (key))
+
+            if num_paths != 1:
+                raise pycdlibexception.PyCdlibInvalidInput("Exactly one of 'iso_path', 'rr_path', 'joliet_path', or 'udf_path' must be passed")
+
+            inodes = []
+            if udf_path is not None:
+                if self.udf_root is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot fetch a udf_path from a non-UDF ISO')
+                found_file_entry = self._find_udf_record(udf_path)
+                if not found_file_entry.is_file():
+                    raise pycdlibexception.PyCdlibInvalidInput('Can only open a file')
+                if found_file_entry.inode is not None:
+                    inodes.append(found_file_entry.inode)
+            else:
+                if joliet_path is not None:
+                    if self.joliet_vd is None:
+                        raise pycdlibexception.PyCdlibInvalidInput('Cannot fetch a joliet_path from a non-Joliet ISO')
+                    found_record = self._find_joliet_record(joliet_path)
+                elif rr_path is not None:
+                    if self.rock_ridge is None:
+                        raise pycdlibexception.PyCdlibInvalidInput('Cannot fetch a rr_path from a non-Rock Ridge ISO')
+                    found_record = self._find_rr_record(rr_path)
+                else:
+                    found_record = self._find_iso_record(iso_path)
+
+                if found_record.is_dir():
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot open a directory')
+
+                if found_record.rock_ridge is not None and found_record.rock_ridge.is_symlink():
+                    raise pycdlibexception.PyCdlibInvalidInput('Symlinks have no data associated with them')
+
+                while found_record is not None:
+                    if found_record.inode is not None:
+                        inodes.append(found_record.inode)
+                    found_record = found_record.data_continuation
+
+            return self._FileReader(inodes, self.pvd.logical_block_size())
+
+    def extract_tree(self, dest, namespace=None, workers=1, blocksize=32768):
+        '''
+        Extract every file and directory in one namespace of the ISO to a local
+        directory.  The file data is read in the order it is laid out on the
+        ISO, files that are hard links of each other are only read once, and
+        the writes can be handed off to a pool of threads.  For the Rock Ridge
+        namespace, the symlinks, file modes, and access and modification times
+        are restored as well.
+
+        Parameters:
+         dest - The local directory to extract to; it is created if necessary.
+         namespace - One of 'iso9660', 'rr', 'joliet', or 'udf'.  If None (the
+                     default), Rock Ridge is used if available, then Joliet,
+                     then ISO9660.
+         workers - The number of threads to use for writing the files.
+         blocksize - The number of bytes in each transfer.
+        Returns:
+         Nothing.
+        '''
+        if not self._initialized:
+            raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
+
+        with self._rwlock.read_locked():
+            if namespace is None:
+                if self.rock_ridge is not None:
+                    namespace = 'rr'
+                elif self.joliet_vd is not None:
+                    namespace = 'joliet'
+                else:
+                    namespace = 'iso9660'
+
+            if namespace == 'rr':
+                if self.rock_ridge is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot extract the Rock Ridge namespace from a non-Rock Ridge ISO')
+            elif namespace == 'joliet':
+                if self.joliet_vd is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot extract the Joliet namespace from a non-Joliet ISO')
+            elif namespace == 'udf':
+                if self.udf_root is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot extract the UDF namespace from a non-UDF ISO')
+            elif namespace != 'iso9660':
+                raise pycdlibexception.PyCdlibInvalidInput("Namespace must be one of 'iso9660', 'rr', 'joliet', or 'udf'")
+
+            if workers < 1:
+                raise pycdlibexception.PyCdlibInvalidInput('The number of workers must be at least 1')
+
+            self._walk_all_dirs()
+
+            # First gather up everything to extract.  Files that share an inode are
+            # hard links of each other, so we keep them together and only write
+            # the data out once.
+            dirs = []
+            files = collections.OrderedDict()
+            symlinks = []
+            for names, rec in self._extract_entries(namespace):
+                path = os.path.join(dest, *names)
+                if rec.is_dir():
+                    dirs.append((path, rec))
+                elif namespace == 'rr' and rec.rock_ridge is not None and rec.rock_ridge.is_symlink():
+                    symlinks.append((path, rec))
+                elif namespace == 'udf' and not rec.is_file():
+                    # UDF symlinks and other special files are not extracted.
+                    continue
+                else:
+                    key = id(rec) if rec.inode is None else id(rec.inode)
+                    if key in files:
+                        files[key][1].append(path)
+                    else:
+                        files[key] = (rec, [path])
+
+            for path, rec_unused in dirs:
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+
+            jobs = sorted(files.values(), key=lambda job: _extract_order_key(job[0]))
+
+            writers = None
+            if workers > 1:
+                writers = self._ExtractWriters(workers)
+            try:
+                for index, (rec, paths) in enumerate(jobs):
+                    if writers is None:
+                        with open(paths[0], 'wb') as outfp:
+                            self._extract_record_data(rec, outfp, blocksize)
+                    else:
+                        writers.start(paths[0], index)
+                        self._extract_record_data(rec, writers, blocksize)
+                        writers.close()
+            finally:
+                if writers is not None:
+                    writers.finish()
+
+            for rec_unused, paths in jobs:
+                for path in paths[1:]:
+                    try:
+                        os.link(paths[0], path)
+                    except (AttributeError, OSError):
+                        shutil.copyfile(paths[0], path)
+
+            if namespace != 'rr':
+                return
+
+            for path, rec in symlinks:
+                os.symlink(rec.rock_ridge.symlink_path().decode('utf-8'), path)
+
+            # Directories are done last, deepest first, so that neither writing
+            # their contents nor restoring the times of their children undoes the
+            # modes and times restored here.
+            entries = [(path, rec) for rec, paths in jobs for path in paths]
+            entries.extend(reversed(dirs))
+            for path, rec in entries:
+                if rec.rock_ridge is None:
+                    continue
+                try:
+                    mode = rec.rock_ridge.get_file_mode()
+                except pycdlibexception.PyCdlibInvalidInput:
+                    mode = None
+                if mode is not None:
+                    os.chmod(path, mode & 0o7777)
+                times = _rr_file_times(rec.rock_ridge)
+                if times is not None:
+                    os.utime(path, times)
 
     def get_and_write(self, iso_path, local_path, blocksize=8192):
         '''
@@ -3734,8 +5513,9 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        with open(local_path, 'wb') as fp:
-            self._get_and_write_fp(iso_path, fp, blocksize)
+        with self._rwlock.read_locked():
+            with open(local_path, 'wb') as fp:
+                self._get_and_write_fp(iso_path, fp, blocksize)
 
     def get_and_write_fp(self, iso_path, outfp, blocksize=8192):
         '''
@@ -3757,9 +5537,11 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        self._get_and_write_fp(iso_path, outfp, blocksize)
+        with self._rwlock.read_locked():
+            self._get_and_write_fp(iso_path, outfp, blocksize)
 
-    def write(self, filename, blocksize=32768, progress_cb=None, progress_opaque=None):
+    def write(self, filename, blocksize=32768, progress_cb=None, progress_opaque=None,
+              sparse=False, workers=1):
         '''
         Write a properly formatted ISO out to the filename passed in.  This
         also goes by the name of 'mastering'.
@@ -3771,16 +5553,27 @@ class PyCdlib(object):
                        work.  The callback function must have a signature of:
                        def func(done, total, opaque).
          progress_opaque - User data to be passed to the progress callback.
+         sparse - If True, blocks of the file data that are all zeros (and the
+                  padding after each file) are seeked over instead of written,
+                  so they become holes on filesystems that support sparse
+                  files; set to False by default.
+         workers - The number of threads to write the file data with.  With
+                   more than one, the file data is copied into the ISO by that
+                   many threads at once, which helps on storage that works
+                   best with many requests in flight; set to 1 by default.
         Returns:
-         Nothing.
+         The number of bytes that were seeked over instead of written.
         '''
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        with open(filename, 'wb') as fp:
-            self._write_fp(fp, blocksize, progress_cb, progress_opaque)
+        with self._rwlock.write_locked():
+            with open(filename, 'wb') as fp:
+                return self._write_fp(fp, blocksize, progress_cb, progress_opaque,
+                                      sparse=sparse, workers=workers)
 
-    def write_fp(self, outfp, blocksize=32768, progress_cb=None, progress_opaque=None):
+    def write_fp(self, outfp, blocksize=32768, progress_cb=None, progress_opaque=None,
+                 sequential=False, sparse=False, workers=1):
         '''
         Write a properly formatted ISO out to the file object passed in.  This
         also goes by the name of 'mastering'.
@@ -3792,13 +5585,86 @@ class PyCdlib(object):
                        work.  The callback function must have a signature of:
                        def func(done, total, opaque).
          progress_opaque - User data to be passed to the progress callback.
+         sequential - If True, write the ISO strictly front to back, filling any
+                      gaps with zeros, and never seek the output file object.
+                      This allows writing to pipes, sockets, and other
+                      non-seekable outputs; set to False by default.
+         sparse - If True, the output file object is truncated first, and then
+                  blocks of the file data that are all zeros (and the padding
+                  after each file) are seeked over instead of written, so they
+                  become holes on filesystems that support sparse files.  This
+                  cannot be combined with sequential; set to False by default.
+         workers - The number of threads to write the file data with.  With
+                   more than one, the file data is copied into the ISO by that
+                   many threads at once using positional writes to the file
+                   descriptor of outfp; if outfp has no file descriptor, the
+                   data is written by the calling thread.  This cannot be
+                   combined with sequential; set to 1 by default.
         Returns:
-         Nothing.
+         The number of bytes that were seeked over instead of written.
+        '''
+        if not self._initialized:
+            raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
+
+        with self._rwlock.write_locked():
+            return self._write_fp(outfp, blocksize, progress_cb, progress_opaque,
+                                  sequential, sparse, workers)
+
+    def batch(self):
+        '''
+        Get a context manager that groups a number of modifications to the ISO
+        together.  If this PyCdlib object was created with always_consistent,
+        the extents are normally reshuffled after every modification, which
+        makes adding many files quadratic in the number of files.  Inside of
+        the batch, the reshuffle is deferred, and is done once when the batch
+        exits (even if the batch exits due to an exception), so the ISO is
+        always consistent afterwards.  Batches may be nested; only the
+        outermost one does the reshuffle.
+
+        Parameters:
+         None.
+        Returns:
+         A context manager that yields this PyCdlib object.
+        '''
+        if not self._initialized:
+            raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
+
+        return self._Batch(self)
+
+    def as_fileobj(self):
+        '''
+        Get a read-only, seekable file object representing the mastered ISO.
+        Reading from the returned object gives exactly the same data that
+        write_fp() would write out, but file data is only read from its source
+        when that part of the ISO is read, so serving small ranges of a large
+        ISO is cheap.  The returned object reflects the ISO at the time this
+        method was called; it must not be used after further modifications to
+        the ISO, or after the PyCdlib object is closed.
+
+        Parameters:
+         None.
+        Returns:
+         A read-only, seekable file object for the mastered ISO.
         '''
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        self._write_fp(outfp, blocksize, progress_cb, progress_opaque)
+        with self._rwlock.write_locked():
+            # Rendering the ISO needs the entire directory tree.
+            self._walk_all_dirs()
+
+            if self._needs_reshuffle:
+                self._reshuffle_extents()
+
+            log_block_size = self.pvd.logical_block_size()
+            size = self.pvd.space_size * log_block_size
+            pieces = self._output_pieces()
+            if self.isohybrid_mbr is not None:
+                padding = self.isohybrid_mbr.record_padding(size)
+                pieces.append(self._OutputPiece(size, padding, None))
+                size += len(padding)
+
+            return self._VirtualISO(pieces, size, log_block_size)
 
     def add_fp(self, fp, length, iso_path, rr_name=None, joliet_path=None,
                file_mode=None, udf_path=None):
@@ -3827,13 +5693,16 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if not utils.file_object_supports_binary(fp):
-            raise pycdlibexception.PyCdlibInvalidInput('The fp argument must be in binary mode')
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-        num_bytes_to_add = self._add_fp(fp, length, False, iso_path, rr_name,
-                                        joliet_path, udf_path, file_mode, False)
+            if not utils.file_object_supports_binary(fp):
+                raise pycdlibexception.PyCdlibInvalidInput('The fp argument must be in binary mode')
 
-        self._finish_add(0, num_bytes_to_add)
+            num_bytes_to_add = self._add_fp(fp, length, False, iso_path, rr_name,
+                                            joliet_path, udf_path, file_mode, False)
+
+            self._finish_add(0, num_bytes_to_add, udf_path is None)
 
     def add_file(self, filename, iso_path, rr_name=None, joliet_path=None,
                  file_mode=None, udf_path=None):
@@ -3859,11 +5728,14 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        num_bytes_to_add = self._add_fp(filename, os.stat(filename).st_size,
-                                        True, iso_path, rr_name, joliet_path,
-                                        udf_path, file_mode, False)
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
+
+            num_bytes_to_add = self._add_fp(filename, os.stat(filename).st_size,
+                                            True, iso_path, rr_name, joliet_path,
+                                            udf_path, file_mode, False)
 
-        self._finish_add(0, num_bytes_to_add)
+            self._finish_add(0, num_bytes_to_add, udf_path is None)
 
     def modify_file_in_place(self, fp, length, iso_path, rr_name=None,  # pylint: disable=unused-argument
                              joliet_path=None, udf_path=None):          # pylint: disable=unused-argument
@@ -3900,92 +5772,101 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if hasattr(self._cdfp, 'mode') and not self._cdfp.mode.startswith(('r+', 'w', 'a', 'rb+')):
-            raise pycdlibexception.PyCdlibInvalidInput('To modify a file in place, the original ISO must have been opened in a write mode (r+, w, or a)')
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-        log_block_size = self.pvd.logical_block_size()
+            if hasattr(self._cdfp, 'mode') and not self._cdfp.mode.startswith(('r+', 'w', 'a', 'rb+')):
+                raise pycdlibexception.PyCdlibInvalidInput('To modify a file in place, the original ISO must have been opened in a write mode (r+, w, or a)')
 
-        iso_path = utils.normpath(iso_path)
+            log_block_size = self.pvd.logical_block_size()
 
-        child = self._find_iso_record(iso_path)
+            iso_path = utils.normpath(iso_path)
 
-        old_num_extents = utils.ceiling_div(child.get_data_length(), log_block_size)
-        new_num_extents = utils.ceiling_div(length, log_block_size)
+            child = self._find_iso_record(iso_path)
 
-        if old_num_extents != new_num_extents:
-            raise pycdlibexception.PyCdlibInvalidInput('When modifying a file in-place, the number of extents for a file cannot change!')
+            old_num_extents = utils.ceiling_div(child.get_data_length(), log_block_size)
+            new_num_extents = utils.ceiling_div(length, log_block_size)
 
-        if not child.is_file():
-            raise pycdlibexception.PyCdlibInvalidInput('Cannot modify a directory with modify_file_in_place')
+            if old_num_extents != new_num_extents:
+                raise pycdlibexception.PyCdlibInvalidInput('When modifying a file in-place, the number of extents for a file cannot change!')
 
-        child.inode.update_fp(fp, length)
+            if not child.is_file():
+                raise pycdlibexception.PyCdlibInvalidInput('Cannot modify a directory with modify_file_in_place')
 
-        # Remove the old size from the PVD size
-        for pvd in self.pvds:
-            pvd.remove_from_space_size(child.get_data_length())
-        # And add the new size to the PVD size
-        for pvd in self.pvds:
-            pvd.add_to_space_size(length)
+            child.inode.update_fp(fp, length)
 
-        if self.enhanced_vd is not None:
-            self.enhanced_vd.copy_sizes(self.pvd)
+            # Remove the old size from the PVD size
+            for pvd in self.pvds:
+                pvd.remove_from_space_size(child.get_data_length())
+            # And add the new size to the PVD size
+            for pvd in self.pvds:
+                pvd.add_to_space_size(length)
 
-        # If we made it here, we have successfully updated all of the in-memory
-        # metadata.  Now we can go and modify the on-disk file.
+            if self.enhanced_vd is not None:
+                self.enhanced_vd.copy_sizes(self.pvd)
 
-        self._cdfp.seek(self.pvd.extent_location() * log_block_size)
+            # If we made it here, we have successfully updated all of the in-memory
+            # metadata.  Now we can go and modify the on-disk file.  The input
+            # file object may be shared with copies of this object that are
+            # reading from it, so it is only ever written at explicit offsets.
 
-        # First write out the PVD.
-        rec = self.pvd.record()
-        self._cdfp.write(rec)
+            # First write out the PVD.
+            utils.pwrite(self._cdfp, self.pvd.record(),
+                         self.pvd.extent_location() * log_block_size)
 
-        # Write out the joliet VD
-        if self.joliet_vd is not None:
-            self._cdfp.seek(self.joliet_vd.extent_location() * log_block_size)
-            rec = self.joliet_vd.record()
-            self._cdfp.write(rec)
+            # Write out the joliet VD
+            if self.joliet_vd is not None:
+                utils.pwrite(self._cdfp, self.joliet_vd.record(),
+                             self.joliet_vd.extent_location() * log_block_size)
 
-        # Write out the enhanced VD
-        if self.enhanced_vd is not None:
-            self._cdfp.seek(self.enhanced_vd.extent_location() * log_block_size)
-            rec = self.enhanced_vd.record()
-            self._cdfp.write(rec)
-
-        # We don't have to write anything out for UDF since it only tracks
-        # extents, and we know we aren't changing the number of extents.
-
-        # Write out the actual file contents
-        self._cdfp.seek(child.extent_location() * log_block_size)
-        with inode.InodeOpenData(child.inode, log_block_size) as (data_fp, data_len):
-            utils.copy_data(data_len, log_block_size, data_fp, self._cdfp)
-            utils.zero_pad(self._cdfp, data_len, log_block_size)
-
-        # Finally write out the directory record entry.
-        # This is a little tricky because of what things mean.  First of all,
-        # child.extents_to_here represents the total number of extents up to
-        # this child in the parent.  Thus, to get the absolute extent offset,
-        # we start with the parent's extent location, add on the number of
-        # extents to here, and remove 1 (since our offset will be zero-based).
-        # Second, child.offset_to_here is the *last* byte that the child uses,
-        # so to get the start of it we subtract off the length of the child.
-        # Then we can multiple the extent location by the logical block size,
-        # add on the offset, and get to the absolute location in the file.
-        first_joliet = True
-        for rec in child.inode.linked_records:
-            if isinstance(rec, dr.DirectoryRecord):
-                if id(rec.vd) == id(self.joliet_vd) and first_joliet:
-                    first_joliet = False
-                    self.joliet_vd.remove_from_space_size(rec.get_data_length())
-                    self.joliet_vd.add_to_space_size(length)
-                abs_extent_loc = rec.parent.extent_location() + rec.extents_to_here - 1
-                offset = rec.offset_to_here - rec.dr_len
-                abs_offset = abs_extent_loc * log_block_size + offset
-            elif isinstance(rec, udfmod.UDFFileEntry):
-                abs_offset = rec.extent_location() * log_block_size
-
-            rec.set_data_length(length)
-            self._cdfp.seek(abs_offset)
-            self._cdfp.write(rec.record())
+            # Write out the enhanced VD
+            if self.enhanced_vd is not None:
+                utils.pwrite(self._cdfp, self.enhanced_vd.record(),
+                             self.enhanced_vd.extent_location() * log_block_size)
+
+            # We don't have to write anything out for UDF since it only tracks
+            # extents, and we know we aren't changing the number of extents.
+
+            # Write out the actual file contents
+            out_offset = child.extent_location() * log_block_size
+            with inode.InodeOpenData(child.inode, log_block_size, seek=False) as (data_fp, data_len):
+                in_offset = child.inode.data_offset(log_block_size)
+                done = 0
+                while done < data_len:
+                    data = utils.pread(data_fp, min(32 * log_block_size, data_len - done),
+                                       in_offset + done)
+                    if not data:
+                        break
+                    utils.pwrite(self._cdfp, data, out_offset + done)
+                    done += len(data)
+                utils.pwrite(self._cdfp, b'\x00' * (-done % log_block_size),
+                             out_offset + done)
+
+            # Finally write out the directory record entry.
+            # This is a little tricky because of what things mean.  First of all,
+            # child.extents_to_here represents the total number of extents up to
+            # this child in the parent.  Thus, to get the absolute extent offset,
+            # we start with the parent's extent location, add on the number of
+            # extents to here, and remove 1 (since our offset will be zero-based).
+            # Second, child.offset_to_here is the *last* byte that the child uses,
+            # so to get the start of it we subtract off the length of the child.
+            # Then we can multiple the extent location by the logical block size,
+            # add on the offset, and get to the absolute location in the file.
+            first_joliet = True
+            for rec in child.inode.linked_records:
+                if isinstance(rec, dr.DirectoryRecord):
+                    if id(rec.vd) == id(self.joliet_vd) and first_joliet:
+                        first_joliet = False
+                        self.joliet_vd.remove_from_space_size(rec.get_data_length())
+                        self.joliet_vd.add_to_space_size(length)
+                    abs_extent_loc = rec.parent.extent_location() + rec.extents_to_here - 1
+                    offset = rec.offset_to_here - rec.dr_len
+                    abs_offset = abs_extent_loc * log_block_size + offset
+                elif isinstance(rec, udfmod.UDFFileEntry):
+                    abs_offset = rec.extent_location() * log_block_size
+
+                rec.set_data_length(length)
+                utils.pwrite(self._cdfp, rec.record(), abs_offset)
 
     def add_hard_link(self, **kwargs):
         '''
@@ -4017,68 +5898,71 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        num_old = 0
-        iso_old_path = None
-        joliet_old_path = None
-        boot_catalog_old = False
-        udf_old_path = None
-        keys_to_remove = []
-        for key in kwargs:
-            if key == 'iso_old_path' and kwargs[key] is not None:
-                num_old += 1
-                iso_old_path = utils.normpath(kwargs[key])
-                keys_to_remove.append(key)
-            elif key == 'joliet_old_path' and kwargs[key] is not None:
-                num_old += 1
-                joliet_old_path = self._normalize_joliet_path(kwargs[key])
-                keys_to_remove.append(key)
-            elif key == 'boot_catalog_old' and kwargs[key] is not None:
-                num_old += 1
-                boot_catalog_old = True
-                if self.eltorito_boot_catalog is None:
-                    raise pycdlibexception.PyCdlibInvalidInput('Attempting to make link to non-existent El Torito boot catalog')
-                keys_to_remove.append(key)
-            elif key == 'udf_old_path' and kwargs[key] is not None:
-                num_old += 1
-                udf_old_path = utils.normpath(kwargs[key])
-                keys_to_remove.append(key)
-
-        if num_old != 1:
-            raise pycdlibexception.PyCdlibInvalidInput('Exactly one old path must be specified')
-
-        # Once we've iterated over the keys we know about, remove them from
-        # the map so that _add_hard_link_to_rec() can parse the rest.
-        for key in keys_to_remove:
-            del kwargs[key]
-
-        # It would be nice to allow the addition of a link to the El Torito
-        # Initial/Default Entry.  Unfortunately, the information we need for
-        # a 'hidden' Initial entry just doesn't exist on the ISO.  In
-        # particular, we don't know the real size that the file should be, we
-        # only know the number of emulated sectors (512 bytes) that it will be
-        # loaded into.  Since the true length and the number of sectors are not
-        # the same thing, we can't actually add a hard link.
-
-        if iso_old_path is not None:
-            # A link from a file on the ISO9660 filesystem...
-            old_rec = self._find_iso_record(iso_old_path)
-        elif joliet_old_path is not None:
-            # A link from a file on the Joliet filesystem...
-            old_rec = self._find_joliet_record(joliet_old_path)
-        elif boot_catalog_old:
-            # A link from the El Torito boot catalog...
-            old_rec = self.eltorito_boot_catalog.dirrecords[0]
-        elif udf_old_path is not None:
-            # A link from a file on the UDF filesystem...
-            old_rec = self._find_udf_record(udf_old_path)
-
-        # Above we checked to make sure we got at least one old path, so we
-        # don't need to worry about the else situation here.
-
-        num_bytes_to_add = self._add_hard_link_to_rec(old_rec, boot_catalog_old,
-                                                      **kwargs)
-
-        self._finish_add(0, num_bytes_to_add)
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
+
+            num_old = 0
+            iso_old_path = None
+            joliet_old_path = None
+            boot_catalog_old = False
+            udf_old_path = None
+            keys_to_remove = []
+            for key in kwargs:
+                if key == 'iso_old_path' and kwargs[key] is not None:
+                    num_old += 1
+                    iso_old_path = utils.normpath(kwargs[key])
+                    keys_to_remove.append(key)
+                elif key == 'joliet_old_path' and kwargs[key] is not None:
+                    num_old += 1
+                    joliet_old_path = self._normalize_joliet_path(kwargs[key])
+                    keys_to_remove.append(key)
+                elif key == 'boot_catalog_old' and kwargs[key] is not None:
+                    num_old += 1
+                    boot_catalog_old = True
+                    if self.eltorito_boot_catalog is None:
+                        raise pycdlibexception.PyCdlibInvalidInput('Attempting to make link to non-existent El Torito boot catalog')
+                    keys_to_remove.append(key)
+                elif key == 'udf_old_path' and kwargs[key] is not None:
+                    num_old += 1
+                    udf_old_path = utils.normpath(kwargs[key])
+                    keys_to_remove.append(key)
+
+            if num_old != 1:
+                raise pycdlibexception.PyCdlibInvalidInput('Exactly one old path must be specified')
+
+            # Once we've iterated over the keys we know about, remove them from
+            # the map so that _add_hard_link_to_rec() can parse the rest.
+            for key in keys_to_remove:
+                del kwargs[key]
+
+            # It would be nice to allow the addition of a link to the El Torito
+            # Initial/Default Entry.  Unfortunately, the information we need for
+            # a 'hidden' Initial entry just doesn't exist on the ISO.  In
+            # particular, we don't know the real size that the file should be, we
+            # only know the number of emulated sectors (512 bytes) that it will be
+            # loaded into.  Since the true length and the number of sectors are not
+            # the same thing, we can't actually add a hard link.
+
+            if iso_old_path is not None:
+                # A link from a file on the ISO9660 filesystem...
+                old_rec = self._find_iso_record(iso_old_path)
+            elif joliet_old_path is not None:
+                # A link from a file on the Joliet filesystem...
+                old_rec = self._find_joliet_record(joliet_old_path)
+            elif boot_catalog_old:
+                # A link from the El Torito boot catalog...
+                old_rec = self.eltorito_boot_catalog.dirrecords[0]
+            elif udf_old_path is not None:
+                # A link from a file on the UDF filesystem...
+                old_rec = self._find_udf_record(udf_old_path)
+
+            # Above we checked to make sure we got at least one old path, so we
+            # don't need to worry about the else situation here.
+
+            num_bytes_to_add = self._add_hard_link_to_rec(old_rec, boot_catalog_old,
+                                                          **kwargs)
+
+            self._finish_add(0, num_bytes_to_add)
 
     def rm_hard_link(self, iso_path=None, joliet_path=None, udf_path=None):
         '''
@@ -4104,29 +5988,32 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if len([x for x in (iso_path, joliet_path, udf_path) if x is not None]) != 1:
-            raise pycdlibexception.PyCdlibInvalidInput('Must provide exactly one of iso_path, joliet_path, or udf_path')
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
+
+            if len([x for x in (iso_path, joliet_path, udf_path) if x is not None]) != 1:
+                raise pycdlibexception.PyCdlibInvalidInput('Must provide exactly one of iso_path, joliet_path, or udf_path')
 
-        num_bytes_to_remove = 0
+            num_bytes_to_remove = 0
 
-        if iso_path is not None:
-            rec = self._find_iso_record(utils.normpath(iso_path))
-            num_bytes_to_remove += self._rm_dr_link(rec)
-        elif joliet_path is not None:
-            if self.joliet_vd is None:
-                raise pycdlibexception.PyCdlibInvalidInput('Cannot remove Joliet link from non-Joliet ISO')
-            joliet_path = self._normalize_joliet_path(joliet_path)
-            rec = self._find_joliet_record(joliet_path)
-            num_bytes_to_remove += self._rm_dr_link(rec)
-        else:
-            # UDF hard link removal
-            if self.udf_root is None:
-                raise pycdlibexception.PyCdlibInvalidInput('Can only specify a udf_path for a UDF ISO')
+            if iso_path is not None:
+                rec = self._find_iso_record(utils.normpath(iso_path))
+                num_bytes_to_remove += self._rm_dr_link(rec)
+            elif joliet_path is not None:
+                if self.joliet_vd is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot remove Joliet link from non-Joliet ISO')
+                joliet_path = self._normalize_joliet_path(joliet_path)
+                rec = self._find_joliet_record(joliet_path)
+                num_bytes_to_remove += self._rm_dr_link(rec)
+            else:
+                # UDF hard link removal
+                if self.udf_root is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Can only specify a udf_path for a UDF ISO')
 
-            rec = self._find_udf_record(utils.normpath(udf_path))
-            num_bytes_to_remove += self._rm_udf_link(rec)
+                rec = self._find_udf_record(utils.normpath(udf_path))
+                num_bytes_to_remove += self._rm_udf_link(rec)
 
-        self._finish_remove(num_bytes_to_remove, True)
+            self._finish_remove(num_bytes_to_remove, True)
 
     def add_directory(self, iso_path=None, rr_name=None, joliet_path=None,
                       file_mode=None, udf_path=None):
@@ -4149,144 +6036,147 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if iso_path is None and joliet_path is None and udf_path is None:
-            raise pycdlibexception.PyCdlibInvalidInput('Either iso_path or joliet_path must be passed')
-
-        if file_mode is not None and not self.rock_ridge:
-            raise pycdlibexception.PyCdlibInvalidInput('A file mode can only be specified for Rock Ridge ISOs')
-
-        # For backwards-compatibility reasons, if the mode was not specified we
-        # just assume 555.  We should probably eventually make file_mode
-        # required for Rock Ridge and remove this assumption.
-        if file_mode is None:
-            file_mode = 0o040555
-
-        num_bytes_to_add = 0
-        if iso_path is not None:
-            iso_path = utils.normpath(iso_path)
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
+
+            if iso_path is None and joliet_path is None and udf_path is None:
+                raise pycdlibexception.PyCdlibInvalidInput('Either iso_path or joliet_path must be passed')
+
+            if file_mode is not None and not self.rock_ridge:
+                raise pycdlibexception.PyCdlibInvalidInput('A file mode can only be specified for Rock Ridge ISOs')
+
+            # For backwards-compatibility reasons, if the mode was not specified we
+            # just assume 555.  We should probably eventually make file_mode
+            # required for Rock Ridge and remove this assumption.
+            if file_mode is None:
+                file_mode = 0o040555
+
+            num_bytes_to_add = 0
+            if iso_path is not None:
+                iso_path = utils.normpath(iso_path)
+
+                rr_name = self._check_rr_name(rr_name)
+
+                depth = len(utils.split_path(iso_path))
+
+                if self.rock_ridge is None and self.enhanced_vd is None:
+                    _check_path_depth(iso_path)
+                (name, parent) = self._name_and_parent_from_path(iso_path=iso_path)
+
+                _check_iso9660_directory(name, self.interchange_level)
+
+                relocated = False
+                fake_dir_rec = None
+                orig_parent = None
+                iso9660_name = name
+                if self.rock_ridge is not None and (depth % 8) == 0 and self.enhanced_vd is None:
+                    # If the depth was a multiple of 8, then we are going to have to
+                    # make a relocated entry for this record.
+
+                    rr_moved, add = self._find_or_create_rr_moved()
+                    num_bytes_to_add += add
+
+                    # With a depth of 8, we have to add the directory both to the
+                    # original parent with a CL link, and to the new parent with an
+                    # RE link.  Here we make the 'fake' record, as a child of the
+                    # original place; the real one will be done below.
+                    fake_dir_rec = dr.DirectoryRecord()
+                    fake_dir_rec.new_dir(self.pvd, name, parent,
+                                         self.pvd.sequence_number(),
+                                         self.rock_ridge, rr_name,
+                                         self.pvd.logical_block_size(), True, False,
+                                         self.xa, file_mode)
+                    num_bytes_to_add += self._add_child_to_dr(fake_dir_rec,
+                                                              self.pvd.logical_block_size())
 
-            rr_name = self._check_rr_name(rr_name)
-
-            depth = len(utils.split_path(iso_path))
-
-            if self.rock_ridge is None and self.enhanced_vd is None:
-                _check_path_depth(iso_path)
-            (name, parent) = self._name_and_parent_from_path(iso_path=iso_path)
-
-            _check_iso9660_directory(name, self.interchange_level)
-
-            relocated = False
-            fake_dir_rec = None
-            orig_parent = None
-            iso9660_name = name
-            if self.rock_ridge is not None and (depth % 8) == 0 and self.enhanced_vd is None:
-                # If the depth was a multiple of 8, then we are going to have to
-                # make a relocated entry for this record.
-
-                rr_moved, add = self._find_or_create_rr_moved()
-                num_bytes_to_add += add
-
-                # With a depth of 8, we have to add the directory both to the
-                # original parent with a CL link, and to the new parent with an
-                # RE link.  Here we make the 'fake' record, as a child of the
-                # original place; the real one will be done below.
-                fake_dir_rec = dr.DirectoryRecord()
-                fake_dir_rec.new_dir(self.pvd, name, parent,
-                                     self.pvd.sequence_number(),
-                                     self.rock_ridge, rr_name,
-                                     self.pvd.logical_block_size(), True, False,
-                                     self.xa, file_mode)
-                num_bytes_to_add += self._add_child_to_dr(fake_dir_rec,
-                                                          self.pvd.logical_block_size())
-
-                # The fake dir record doesn't get an entry in the path table record.
-
-                relocated = True
-                orig_parent = parent
-                parent = rr_moved
-
-                # Since we are moving the entry underneath the RR_MOVED
-                # directory, there is now the chance of a name collision (this
-                # can't happen without relocation since _add_child_to_dr() below
-                # won't allow duplicate names).  Check for that here and
-                # generate a new name.
-                index = 0
-                while True:
-                    for child in rr_moved.children:
-                        if child.file_ident == iso9660_name:
-                            # Python 3.4 doesn't support substitution with a byte
-                            # array, so we do it as a string and encode to bytes.
-                            iso9660_name = name + ('%03d' % (index)).encode()
-                            index += 1
+                    # The fake dir record doesn't get an entry in the path table record.
+
+                    relocated = True
+                    orig_parent = parent
+                    parent = rr_moved
+
+                    # Since we are moving the entry underneath the RR_MOVED
+                    # directory, there is now the chance of a name collision (this
+                    # can't happen without relocation since _add_child_to_dr() below
+                    # won't allow duplicate names).  Check for that here and
+                    # generate a new name.
+                    index = 0
+                    while True:
+                        for child in rr_moved.children:
+                            if child.file_ident == iso9660_name:
+                                # Python 3.4 doesn't support substitution with a byte
+                                # array, so we do it as a string and encode to bytes.
+                                iso9660_name = name + ('%03d' % (index)).encode()
+                                index += 1
+                                break
+                        else:
                             break
-                    else:
-                        break
-
-            rec = dr.DirectoryRecord()
-            rec.new_dir(self.pvd, iso9660_name, parent,
-                        self.pvd.sequence_number(), self.rock_ridge, rr_name,
-                        self.pvd.logical_block_size(), False, relocated,
-                        self.xa, file_mode)
-            num_bytes_to_add += self._add_child_to_dr(rec, self.pvd.logical_block_size())
-            if rec.rock_ridge is not None:
-                if relocated:
-                    fake_dir_rec.rock_ridge.cl_to_moved_dr = rec
-                    rec.rock_ridge.moved_to_cl_dr = fake_dir_rec
-                num_bytes_to_add += self._update_rr_ce_entry(rec)
 
-            self._create_dot(self.pvd, rec, self.rock_ridge, self.xa, file_mode)
-
-            parent_file_mode = None
-            if parent.rock_ridge is not None:
-                parent_file_mode = parent.rock_ridge.get_file_mode()
-            else:
-                if parent.is_root:
-                    parent_file_mode = file_mode
+                rec = dr.DirectoryRecord()
+                rec.new_dir(self.pvd, iso9660_name, parent,
+                            self.pvd.sequence_number(), self.rock_ridge, rr_name,
+                            self.pvd.logical_block_size(), False, relocated,
+                            self.xa, file_mode)
+                num_bytes_to_add += self._add_child_to_dr(rec, self.pvd.logical_block_size())
+                if rec.rock_ridge is not None:
+                    if relocated:
+                        fake_dir_rec.rock_ridge.cl_to_moved_dr = rec
+                        rec.rock_ridge.moved_to_cl_dr = fake_dir_rec
+                    num_bytes_to_add += self._update_rr_ce_entry(rec)
+
+                self._create_dot(self.pvd, rec, self.rock_ridge, self.xa, file_mode)
+
+                parent_file_mode = None
+                if parent.rock_ridge is not None:
+                    parent_file_mode = parent.rock_ridge.get_file_mode()
+                else:
+                    if parent.is_root:
+                        parent_file_mode = file_mode
 
-            dotdot = self._create_dotdot(self.pvd, rec, self.rock_ridge,
-                                         relocated, self.xa, parent_file_mode)
-            if dotdot.rock_ridge is not None and relocated:
-                dotdot.rock_ridge.parent_link = orig_parent
+                dotdot = self._create_dotdot(self.pvd, rec, self.rock_ridge,
+                                             relocated, self.xa, parent_file_mode)
+                if dotdot.rock_ridge is not None and relocated:
+                    dotdot.rock_ridge.parent_link = orig_parent
 
-            # We always need to add an entry to the path table record
-            ptr = path_table_record.PathTableRecord()
-            ptr.new_dir(iso9660_name)
+                # We always need to add an entry to the path table record
+                ptr = path_table_record.PathTableRecord()
+                ptr.new_dir(iso9660_name)
 
-            num_bytes_to_add += self._add_to_ptr_size(ptr) + self.pvd.logical_block_size()
+                num_bytes_to_add += self._add_to_ptr_size(ptr) + self.pvd.logical_block_size()
 
-            rec.set_ptr(ptr)
+                rec.set_ptr(ptr)
 
-        if joliet_path is not None:
-            num_bytes_to_add += self._add_joliet_dir(self._normalize_joliet_path(joliet_path))
+            if joliet_path is not None:
+                num_bytes_to_add += self._add_joliet_dir(self._normalize_joliet_path(joliet_path))
 
-        if udf_path is not None:
-            if self.udf_root is None:
-                raise pycdlibexception.PyCdlibInvalidInput('Can only specify a udf_path for a UDF ISO')
+            if udf_path is not None:
+                if self.udf_root is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Can only specify a udf_path for a UDF ISO')
 
-            log_block_size = self.pvd.logical_block_size()
+                log_block_size = self.pvd.logical_block_size()
 
-            udf_path = utils.normpath(udf_path)
-            (name, parent) = self._name_and_parent_from_path(udf_path=udf_path)
+                udf_path = utils.normpath(udf_path)
+                (name, parent) = self._name_and_parent_from_path(udf_path=udf_path)
 
-            file_ident = udfmod.UDFFileIdentifierDescriptor()
-            file_ident.new(True, False, name)
-            num_new_extents = parent.add_file_ident_desc(file_ident, log_block_size)
-            num_bytes_to_add += num_new_extents * log_block_size
+                file_ident = udfmod.UDFFileIdentifierDescriptor()
+                file_ident.new(True, False, name)
+                num_new_extents = parent.add_file_ident_desc(file_ident, log_block_size)
+                num_bytes_to_add += num_new_extents * log_block_size
 
-            file_entry = udfmod.UDFFileEntry()
-            file_entry.new(0, 'dir', parent, log_block_size)
-            file_ident.file_entry = file_entry
-            file_entry.file_ident = file_ident
-            num_bytes_to_add += log_block_size
+                file_entry = udfmod.UDFFileEntry()
+                file_entry.new(0, 'dir', parent, log_block_size)
+                file_ident.file_entry = file_entry
+                file_entry.file_ident = file_ident
+                num_bytes_to_add += log_block_size
 
-            dotdot = udfmod.UDFFileIdentifierDescriptor()
-            dotdot.new(True, True, b'')
-            num_new_extents = file_ident.file_entry.add_file_ident_desc(dotdot, log_block_size)
-            num_bytes_to_add += num_new_extents * log_block_size
+                dotdot = udfmod.UDFFileIdentifierDescriptor()
+                dotdot.new(True, True, b'')
+                num_new_extents = file_ident.file_entry.add_file_ident_desc(dotdot, log_block_size)
+                num_bytes_to_add += num_new_extents * log_block_size
 
-            self.udf_logical_volume_integrity.logical_volume_impl_use.num_dirs += 1
+                self.udf_logical_volume_integrity.logical_volume_impl_use.num_dirs += 1
 
-        self._finish_add(0, num_bytes_to_add)
+            self._finish_add(0, num_bytes_to_add)
 
     def add_joliet_directory(self, joliet_path):
         '''
@@ -4320,55 +6210,61 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        iso_path = utils.normpath(iso_path)
-
-        if not utils.starts_with_slash(iso_path):
-            raise pycdlibexception.PyCdlibInvalidInput('Must be a path starting with /')
-
-        child = self._find_iso_record(iso_path)
-
-        if not child.is_file():
-            raise pycdlibexception.PyCdlibInvalidInput('Cannot remove a directory with rm_file (try rm_directory instead)')
-
-        # We also want to check to see if this Directory Record is currently
-        # being used as an El Torito Boot Catalog, Initial Entry, or Section
-        # Entry.  If it is, we throw an exception; we don't know if the user
-        # meant to remove El Torito from this ISO, or if they meant to 'hide'
-        # the entry, but we need them to call the correct API to let us know.
-        if self.eltorito_boot_catalog is not None:
-            if any([id(child) == id(rec) for rec in self.eltorito_boot_catalog.dirrecords]):
-                raise pycdlibexception.PyCdlibInvalidInput("Cannot remove a file that is referenced by El Torito; either use 'rm_eltorito' to remove El Torito first, or use 'rm_hard_link' to hide the entry")
-
-            eltorito_entries = {}
-            eltorito_entries[id(self.eltorito_boot_catalog.initial_entry.inode)] = True
-            for sec in self.eltorito_boot_catalog.sections:
-                for entry in sec.section_entries:
-                    eltorito_entries[id(entry.inode)] = True
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-            if id(child.inode) in eltorito_entries:
-                raise pycdlibexception.PyCdlibInvalidInput("Cannot remove a file that is referenced by El Torito; either use 'rm_eltorito' to remove El Torito first, or use 'rm_hard_link' to hide the entry")
+            iso_path = utils.normpath(iso_path)
 
-        num_bytes_to_remove = 0
+            if not utils.starts_with_slash(iso_path):
+                raise pycdlibexception.PyCdlibInvalidInput('Must be a path starting with /')
 
-        # If the child is a Rock Ridge symlink, then it has no inodes since
-        # there is no data attached to it.
-        if child.inode is None:
-            num_bytes_to_remove += self._remove_child_from_dr(child,
-                                                              child.index_in_parent,
-                                                              self.pvd.logical_block_size())
-        else:
-            while child.inode.linked_records:
-                rec = child.inode.linked_records[0]
+            child = self._find_iso_record(iso_path)
 
-                if isinstance(rec, dr.DirectoryRecord):
-                    num_bytes_to_remove += self._rm_dr_link(rec)
-                elif isinstance(rec, udfmod.UDFFileEntry):
-                    num_bytes_to_remove += self._rm_udf_link(rec)
-                else:
-                    # This should never happen
-                    raise pycdlibexception.PyCdlibInternalError('Saw a linked record that was neither ISO or UDF')
+            if not child.is_file():
+                raise pycdlibexception.PyCdlibInvalidInput('Cannot remove a directory with rm_file (try rm_directory instead)')
+
+            # We also want to check to see if this Directory Record is currently
+            # being used as an El Torito Boot Catalog, Initial Entry, or Section
+            # Entry.  If it is, we throw an exception; we don't know if the user
+            # meant to remove El Torito from this ISO, or if they meant to 'hide'
+            # the entry, but we need them to call the correct API to let us know.
+            if self.eltorito_boot_catalog is not None:
+                if any([id(child) == id(rec) for rec in self.eltorito_boot_catalog.dirrecords]):
+                    raise pycdlibexception.PyCdlibInvalidInput("Cannot remove a file that is referenced by El Torito; either use 'rm_eltorito' to remove El Torito first, or use 'rm_hard_link' to hide the entry")
+
+                eltorito_entries = {}
+                eltorito_entries[id(self.eltorito_boot_catalog.initial_entry.inode)] = True
+                for sec in self.eltorito_boot_catalog.sections:
+                    for entry in sec.section_entries:
+                        eltorito_entries[id(entry.inode)] = True
+
+                if id(child.inode) in eltorito_entries:
+                    raise pycdlibexception.PyCdlibInvalidInput("Cannot remove a file that is referenced by El Torito; either use 'rm_eltorito' to remove El Torito first, or use 'rm_hard_link' to hide the entry")
+
+            num_bytes_to_remove = 0
+            data_only = True
+
+            # If the child is a Rock Ridge symlink, then it has no inodes since
+            # there is no data attached to it.
+            if child.inode is None:
+                num_bytes_to_remove += self._remove_child_from_dr(child,
+                                                                  child.index_in_parent,
+                                                                  self.pvd.logical_block_size())
+            else:
+                while child.inode.linked_records:
+                    rec = child.inode.linked_records[0]
+
+                    if isinstance(rec, dr.DirectoryRecord):
+                        num_bytes_to_remove += self._rm_dr_link(rec)
+                    elif isinstance(rec, udfmod.UDFFileEntry):
+                        num_bytes_to_remove += self._rm_udf_link(rec)
+                        # The UDF File Entries are laid out with the metadata.
+                        data_only = False
+                    else:
+                        # This should never happen
+                        raise pycdlibexception.PyCdlibInternalError('Saw a linked record that was neither ISO or UDF')
 
-        self._finish_remove(num_bytes_to_remove, True)
+            self._finish_remove(num_bytes_to_remove, True, data_only)
 
     def rm_directory(self, iso_path=None, rr_name=None, joliet_path=None, udf_path=None):
         '''
@@ -4385,101 +6281,106 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if iso_path is None and joliet_path is None and udf_path is None:
-            raise pycdlibexception.PyCdlibInvalidInput('Either iso_path or joliet_path must be passed')
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-        num_bytes_to_remove = 0
+            if iso_path is None and joliet_path is None and udf_path is None:
+                raise pycdlibexception.PyCdlibInvalidInput('Either iso_path or joliet_path must be passed')
 
-        if iso_path is not None:
-            iso_path = utils.normpath(iso_path)
+            num_bytes_to_remove = 0
 
-            if iso_path == b'/':
-                raise pycdlibexception.PyCdlibInvalidInput('Cannot remove base directory')
+            if iso_path is not None:
+                iso_path = utils.normpath(iso_path)
 
-            rr_name = self._check_rr_name(rr_name)
+                if iso_path == b'/':
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot remove base directory')
 
-            child = self._find_iso_record(iso_path)
+                rr_name = self._check_rr_name(rr_name)
 
-            if not child.is_dir():
-                raise pycdlibexception.PyCdlibInvalidInput('Cannot remove a file with rm_directory (try rm_file instead)')
+                child = self._find_iso_record(iso_path)
 
-            if len(child.children) > 2:
-                raise pycdlibexception.PyCdlibInvalidInput('Directory must be empty to use rm_directory')
+                if not child.is_dir():
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot remove a file with rm_directory (try rm_file instead)')
 
-            num_bytes_to_remove += self._remove_child_from_dr(child,
-                                                              child.index_in_parent,
-                                                              self.pvd.logical_block_size())
+                if len(child.children) > 2:
+                    raise pycdlibexception.PyCdlibInvalidInput('Directory must be empty to use rm_directory')
+
+                num_bytes_to_remove += self._remove_child_from_dr(child,
+                                                                  child.index_in_parent,
+                                                                  self.pvd.logical_block_size())
 
-            num_bytes_to_remove += self._remove_from_ptr_size(child.ptr)
+                num_bytes_to_remove += self._remove_from_ptr_size(child.ptr)
 
-            # Remove space for the directory itself.
-            num_bytes_to_remove += child.get_data_length()
+                # Remove space for the directory itself.
+                num_bytes_to_remove += child.get_data_length()
 
-            if child.rock_ridge is not None and child.rock_ridge.relocated_record():
-                # OK, this child was relocated.  If the parent of this relocated
-                # record is empty (only . and ..), we can remove it.
-                parent = child.parent
-                if len(parent.children) == 2:
-                    for index, c in enumerate(parent.parent.children):
-                        if c.file_ident == parent.file_ident:
-                            parent_index = index
+                if child.rock_ridge is not None and child.rock_ridge.relocated_record():
+                    # OK, this child was relocated.  If the parent of this relocated
+                    # record is empty (only . and ..), we can remove it.
+                    parent = child.parent
+                    if len(parent.children) == 2:
+                        for index, c in enumerate(parent.parent.children):
+                            if c.file_ident == parent.file_ident:
+                                parent_index = index
+                                break
+                        else:
+                            raise pycdlibexception.PyCdlibInvalidISO('Could not find parent in its own parent!')
+
+                        num_bytes_to_remove += self._remove_child_from_dr(parent,
+                                                                          parent_index,
+                                                                          self.pvd.logical_block_size())
+                        num_bytes_to_remove += parent.get_data_length()
+                        num_bytes_to_remove += self._remove_from_ptr_size(parent.ptr)
+
+                    cl = child.rock_ridge.moved_to_cl_dr
+                    for index, c in enumerate(cl.parent.children):
+                        if cl.file_ident == c.file_ident:
+                            clindex = index
                             break
                     else:
-                        raise pycdlibexception.PyCdlibInvalidISO('Could not find parent in its own parent!')
+                        raise pycdlibexception.PyCdlibInvalidISO('CL record does not exist')
 
-                    num_bytes_to_remove += self._remove_child_from_dr(parent,
-                                                                      parent_index,
+                    if cl.children:
+                        raise pycdlibexception.PyCdlibInvalidISO('Parent link should have no children!')
+                    num_bytes_to_remove += self._remove_child_from_dr(cl, clindex,
                                                                       self.pvd.logical_block_size())
-                    num_bytes_to_remove += parent.get_data_length()
-                    num_bytes_to_remove += self._remove_from_ptr_size(parent.ptr)
-
-                cl = child.rock_ridge.moved_to_cl_dr
-                for index, c in enumerate(cl.parent.children):
-                    if cl.file_ident == c.file_ident:
-                        clindex = index
-                        break
-                else:
-                    raise pycdlibexception.PyCdlibInvalidISO('CL record does not exist')
+                    # Note that we do not remove additional space from the PVD for the child_link
+                    # record because it is a 'fake' record that has no real size.
 
-                if cl.children:
-                    raise pycdlibexception.PyCdlibInvalidISO('Parent link should have no children!')
-                num_bytes_to_remove += self._remove_child_from_dr(cl, clindex,
-                                                                  self.pvd.logical_block_size())
-                # Note that we do not remove additional space from the PVD for the child_link
-                # record because it is a 'fake' record that has no real size.
-
-            if child.rock_ridge is not None and child.rock_ridge.dr_entries.ce_record is not None:
-                child.rock_ridge.ce_block.remove_entry(child.rock_ridge.dr_entries.ce_record.offset_cont_area,
-                                                       child.rock_ridge.dr_entries.ce_record.len_cont_area)
+                if child.rock_ridge is not None and child.rock_ridge.dr_entries.ce_record is not None:
+                    child.rock_ridge.ce_block.remove_entry(child.rock_ridge.dr_entries.ce_record.offset_cont_area,
+                                                           child.rock_ridge.dr_entries.ce_record.len_cont_area)
 
-        if joliet_path is not None:
-            num_bytes_to_remove += self._rm_joliet_dir(self._normalize_joliet_path(joliet_path))
+            if joliet_path is not None:
+                num_bytes_to_remove += self._rm_joliet_dir(self._normalize_joliet_path(joliet_path))
 
-        if udf_path is not None:
-            if self.udf_root is None:
-                raise pycdlibexception.PyCdlibInvalidInput('Can only specify a udf_path for a UDF ISO')
+            if udf_path is not None:
+                if self.udf_root is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Can only specify a udf_path for a UDF ISO')
 
-            udf_path = utils.normpath(udf_path)
+                udf_path = utils.normpath(udf_path)
 
-            if udf_path == b'/':
-                raise pycdlibexception.PyCdlibInvalidInput('Cannot remove base directory')
+                if udf_path == b'/':
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot remove base directory')
 
-            (udf_name, udf_parent) = self._name_and_parent_from_path(udf_path=udf_path)
+                (udf_name, udf_parent) = self._name_and_parent_from_path(udf_path=udf_path)
 
-            to_remove = udf_parent.remove_file_ident_desc_by_name(udf_name, self.pvd.logical_block_size())
-            # Remove space (if necessary) in the parent File Identifier
-            # Descriptor area.
-            num_bytes_to_remove += to_remove * self.pvd.logical_block_size()
-            # Remove space for the File Entry.
-            num_bytes_to_remove += self.pvd.logical_block_size()
-            # Remove space for the list of File Identifier Descriptors.
-            num_bytes_to_remove += self.pvd.logical_block_size()
+                udf_fi_desc = udf_parent.find_file_ident_desc_by_name(udf_name)
+                if udf_fi_desc is not None:
+                    self._forget_udf_paths(udf_fi_desc.file_entry)
 
-            self.udf_logical_volume_integrity.logical_volume_impl_use.num_dirs -= 1
+                to_remove = udf_parent.remove_file_ident_desc_by_name(udf_name, self.pvd.logical_block_size())
+                # Remove space (if necessary) in the parent File Identifier
+                # Descriptor area.
+                num_bytes_to_remove += to_remove * self.pvd.logical_block_size()
+                # Remove space for the File Entry.
+                num_bytes_to_remove += self.pvd.logical_block_size()
+                # Remove space for the list of File Identifier Descriptors.
+                num_bytes_to_remove += self.pvd.logical_block_size()
 
-            self._find_udf_record.cache_clear()  # pylint: disable=no-member
+                self.udf_logical_volume_integrity.logical_volume_impl_use.num_dirs -= 1
 
-        self._finish_remove(num_bytes_to_remove, True)
+            self._finish_remove(num_bytes_to_remove, True)
 
     def rm_joliet_directory(self, joliet_path):
         '''
@@ -4530,97 +6431,102 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        # In order to add an El Torito boot, we need to do the following:
-        # 1.  Find the boot file record (which must already exist).
-        # 2.  Construct a BootRecord.
-        # 3.  Construct a BootCatalog, and add it to the filesystem.
-        # 4.  Add the boot record to the ISO.
-
-        if bootcatfile is None:
-            bootcatfile = '/BOOT.CAT;1'
-
-        bootfile_path = utils.normpath(bootfile_path)
-        bootcatfile = utils.normpath(bootcatfile)
-
-        if self.joliet_vd is not None:
-            if joliet_bootcatfile is None:
-                joliet_bootcatfile = '/boot.cat'
-        else:
-            if joliet_bootcatfile is not None:
-                raise pycdlibexception.PyCdlibInvalidInput('A joliet path must not be passed when adding El Torito to a non-Joliet ISO')
-
-        if self.udf_root is not None:
-            if udf_bootcatfile is None:
-                udf_bootcatfile = '/boot.cat'
-        else:
-            if udf_bootcatfile is not None:
-                raise pycdlibexception.PyCdlibInvalidInput('A UDF path must not be passed when adding El Torito to a non-UDF ISO')
-
-        log_block_size = self.pvd.logical_block_size()
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-        # Step 1.
-        boot_dirrecord = self._find_iso_record(bootfile_path)
+            # In order to add an El Torito boot, we need to do the following:
+            # 1.  Find the boot file record (which must already exist).
+            # 2.  Construct a BootRecord.
+            # 3.  Construct a BootCatalog, and add it to the filesystem.
+            # 4.  Add the boot record to the ISO.
 
-        if boot_load_size is None:
-            sector_count = utils.ceiling_div(boot_dirrecord.get_data_length(),
-                                             log_block_size) * log_block_size // 512
-        else:
-            sector_count = boot_load_size
+            if bootcatfile is None:
+                bootcatfile = '/BOOT.CAT;1'
 
-        if boot_info_table:
-            orig_len = boot_dirrecord.get_data_length()
-            bi_table = eltorito.EltoritoBootInfoTable()
-            with inode.InodeOpenData(boot_dirrecord.inode, log_block_size) as (data_fp, data_len):
-                bi_table.new(self.pvd, boot_dirrecord.inode, orig_len,
-                             self._calculate_eltorito_boot_info_table_csum(data_fp, data_len))
+            bootfile_path = utils.normpath(bootfile_path)
+            bootcatfile = utils.normpath(bootcatfile)
 
-            boot_dirrecord.inode.add_boot_info_table(bi_table)
+            if self.joliet_vd is not None:
+                if joliet_bootcatfile is None:
+                    joliet_bootcatfile = '/boot.cat'
+            else:
+                if joliet_bootcatfile is not None:
+                    raise pycdlibexception.PyCdlibInvalidInput('A joliet path must not be passed when adding El Torito to a non-Joliet ISO')
 
-        system_type = 0
-        if media_name == 'hdemul':
-            with inode.InodeOpenData(boot_dirrecord.inode, log_block_size) as (data_fp, data_len):
-                disk_mbr = data_fp.read(512)
-                if len(disk_mbr) != 512:
-                    raise pycdlibexception.PyCdlibInvalidInput('Could not read entire HD MBR, must be at least 512 bytes')
-                system_type = eltorito.hdmbrcheck(disk_mbr, sector_count, bootable)
+            if self.udf_root is not None:
+                if udf_bootcatfile is None:
+                    udf_bootcatfile = '/boot.cat'
+            else:
+                if udf_bootcatfile is not None:
+                    raise pycdlibexception.PyCdlibInvalidInput('A UDF path must not be passed when adding El Torito to a non-UDF ISO')
 
-        num_bytes_to_add = 0
-        if self.eltorito_boot_catalog is not None:
-            # All right, we already created the boot catalog.  Add a new section
-            # to the boot catalog
-            self.eltorito_boot_catalog.add_section(boot_dirrecord.inode,
-                                                   sector_count, boot_load_seg,
-                                                   media_name, system_type, efi,
-                                                   bootable)
-        else:
-            # Step 2.
-            br = headervd.BootRecord()
-            br.new(b'EL TORITO SPECIFICATION')
-            self.brs.append(br)
-            # On a UDF ISO, adding a new Boot Record doesn't actually increase
-            # the size, since there are a bunch of gaps at the beginning.
-            if self.udf_main_descs is None:
-                num_bytes_to_add += log_block_size
+            log_block_size = self.pvd.logical_block_size()
 
-            # Step 3.
-            self.eltorito_boot_catalog = eltorito.EltoritoBootCatalog(br)
-            self.eltorito_boot_catalog.new(br, boot_dirrecord.inode, sector_count,
-                                           boot_load_seg, media_name, system_type,
-                                           platform_id, bootable)
+            # Step 1.
+            boot_dirrecord = self._find_iso_record(bootfile_path)
 
-            # Step 4.
-            rrname = None
-            if self.rock_ridge is not None:
-                if rr_bootcatname is None:
-                    rrname = 'boot.cat'
-                else:
-                    rrname = rr_bootcatname
+            if boot_load_size is None:
+                sector_count = utils.ceiling_div(boot_dirrecord.get_data_length(),
+                                                 log_block_size) * log_block_size // 512
+            else:
+                sector_count = boot_load_size
+
+            if boot_info_table:
+                orig_len = boot_dirrecord.get_data_length()
+                bi_table = eltorito.EltoritoBootInfoTable()
+                with inode.InodeOpenData(boot_dirrecord.inode, log_block_size, seek=False) as (data_fp, data_len):
+                    bi_table.new(self.pvd, boot_dirrecord.inode, orig_len,
+                                 self._calculate_eltorito_boot_info_table_csum(data_fp, data_len,
+                                                                               boot_dirrecord.inode.data_offset(log_block_size)))
+
+                boot_dirrecord.inode.add_boot_info_table(bi_table)
+
+            system_type = 0
+            if media_name == 'hdemul':
+                with inode.InodeOpenData(boot_dirrecord.inode, log_block_size, seek=False) as (data_fp, data_len):
+                    disk_mbr = utils.pread(data_fp, 512,
+                                           boot_dirrecord.inode.data_offset(log_block_size))
+                    if len(disk_mbr) != 512:
+                        raise pycdlibexception.PyCdlibInvalidInput('Could not read entire HD MBR, must be at least 512 bytes')
+                    system_type = eltorito.hdmbrcheck(disk_mbr, sector_count, bootable)
+
+            num_bytes_to_add = 0
+            if self.eltorito_boot_catalog is not None:
+                # All right, we already created the boot catalog.  Add a new section
+                # to the boot catalog
+                self.eltorito_boot_catalog.add_section(boot_dirrecord.inode,
+                                                       sector_count, boot_load_seg,
+                                                       media_name, system_type, efi,
+                                                       bootable)
+            else:
+                # Step 2.
+                br = headervd.BootRecord()
+                br.new(b'EL TORITO SPECIFICATION')
+                self.brs.append(br)
+                # On a UDF ISO, adding a new Boot Record doesn't actually increase
+                # the size, since there are a bunch of gaps at the beginning.
+                if self.udf_main_descs is None:
+                    num_bytes_to_add += log_block_size
+
+                # Step 3.
+                self.eltorito_boot_catalog = eltorito.EltoritoBootCatalog(br)
+                self.eltorito_boot_catalog.new(br, boot_dirrecord.inode, sector_count,
+                                               boot_load_seg, media_name, system_type,
+                                               platform_id, bootable)
+
+                # Step 4.
+                rrname = None
+                if self.rock_ridge is not None:
+                    if rr_bootcatname is None:
+                        rrname = 'boot.cat'
+                    else:
+                        rrname = rr_bootcatname
 
-            num_bytes_to_add += self._add_fp(None, log_block_size, False, bootcatfile,
-                                             rrname, joliet_bootcatfile,
-                                             udf_bootcatfile, None, True)
+                num_bytes_to_add += self._add_fp(None, log_block_size, False, bootcatfile,
+                                                 rrname, joliet_bootcatfile,
+                                                 udf_bootcatfile, None, True)
 
-        self._finish_add(0, num_bytes_to_add)
+            self._finish_add(0, num_bytes_to_add)
 
     def rm_eltorito(self):
         '''
@@ -4634,57 +6540,60 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if self.eltorito_boot_catalog is None:
-            raise pycdlibexception.PyCdlibInvalidInput('This ISO does not have an El Torito Boot Record')
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-        for brindex, br in enumerate(self.brs):
-            if br.boot_system_identifier == b'EL TORITO SPECIFICATION'.ljust(32, b'\x00'):
-                eltorito_index = brindex
-                break
-        else:
-            # There was a boot catalog, but no corresponding boot record.  This
-            # should never happen.
-            raise pycdlibexception.PyCdlibInternalError('El Torito boot catalog found with no corresponding boot record')
+            if self.eltorito_boot_catalog is None:
+                raise pycdlibexception.PyCdlibInvalidInput('This ISO does not have an El Torito Boot Record')
 
-        del self.brs[eltorito_index]
+            for brindex, br in enumerate(self.brs):
+                if br.boot_system_identifier == b'EL TORITO SPECIFICATION'.ljust(32, b'\x00'):
+                    eltorito_index = brindex
+                    break
+            else:
+                # There was a boot catalog, but no corresponding boot record.  This
+                # should never happen.
+                raise pycdlibexception.PyCdlibInternalError('El Torito boot catalog found with no corresponding boot record')
 
-        num_bytes_to_remove = 0
+            del self.brs[eltorito_index]
 
-        # On a UDF ISO, removing the Boot Record doesn't actually decrease
-        # the size, since there are a bunch of gaps at the beginning.
-        if self.udf_main_descs is None:
-            num_bytes_to_remove += self.pvd.logical_block_size()
+            num_bytes_to_remove = 0
 
-        # Remove all of the DirectoryRecord/UDFFileEntries associated with
-        # the Boot Catalog
-        for rec in self.eltorito_boot_catalog.dirrecords:
-            if isinstance(rec, dr.DirectoryRecord):
-                num_bytes_to_remove += self._rm_dr_link(rec)
-            elif isinstance(rec, udfmod.UDFFileEntry):
-                num_bytes_to_remove += self._rm_udf_link(rec)
-            else:
-                # This should never happen
-                raise pycdlibexception.PyCdlibInternalError('Saw an El Torito record that was neither ISO nor UDF')
+            # On a UDF ISO, removing the Boot Record doesn't actually decrease
+            # the size, since there are a bunch of gaps at the beginning.
+            if self.udf_main_descs is None:
+                num_bytes_to_remove += self.pvd.logical_block_size()
 
-        # Remove the linkage from the El Torito Entries to the inodes
-        entries_to_remove = [self.eltorito_boot_catalog.initial_entry]
-        for sec in self.eltorito_boot_catalog.sections:
-            for entry in sec.section_entries:
-                entries_to_remove.append(entry)
+            # Remove all of the DirectoryRecord/UDFFileEntries associated with
+            # the Boot Catalog
+            for rec in self.eltorito_boot_catalog.dirrecords:
+                if isinstance(rec, dr.DirectoryRecord):
+                    num_bytes_to_remove += self._rm_dr_link(rec)
+                elif isinstance(rec, udfmod.UDFFileEntry):
+                    num_bytes_to_remove += self._rm_udf_link(rec)
+                else:
+                    # This should never happen
+                    raise pycdlibexception.PyCdlibInternalError('Saw an El Torito record that was neither ISO nor UDF')
+
+            # Remove the linkage from the El Torito Entries to the inodes
+            entries_to_remove = [self.eltorito_boot_catalog.initial_entry]
+            for sec in self.eltorito_boot_catalog.sections:
+                for entry in sec.section_entries:
+                    entries_to_remove.append(entry)
 
-        for entry in entries_to_remove:
-            if entry.inode is not None:
-                new_list = []
-                for rec in entry.inode.linked_records:
-                    if id(rec) != id(entry):
-                        new_list.append(rec)
-                entry.inode.linked_records = new_list
+            for entry in entries_to_remove:
+                if entry.inode is not None:
+                    new_list = []
+                    for rec in entry.inode.linked_records:
+                        if id(rec) != id(entry):
+                            new_list.append(rec)
+                    entry.inode.linked_records = new_list
 
-        num_bytes_to_remove += len(self.eltorito_boot_catalog.record())
+            num_bytes_to_remove += len(self.eltorito_boot_catalog.record())
 
-        self.eltorito_boot_catalog = None
+            self.eltorito_boot_catalog = None
 
-        self._finish_remove(num_bytes_to_remove, True)
+            self._finish_remove(num_bytes_to_remove, True)
 
     def add_symlink(self, symlink_path, rr_symlink_name=None, rr_path=None,
                     joliet_path=None, udf_symlink_path=None, udf_target=None):
@@ -4707,147 +6616,150 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        # There are actually quite a few combinations and rules to think about
-        # here.  Rules:
-        #
-        # 1.  All symlinks must have an ISO9660 name.
-        # 2.  If the ISO is Rock Ridge, it must have a Rock Ridge name for the
-        #     ISO9660 Directory Record (rr_symlink_name).
-        # 3.  Conversely, rr_symlink_name must not be provided for a
-        #     non-Rock Ridge ISO.
-        # 4.  rr_path is the optional target for the symlink; if it is provided,
-        #     then the ISO must be a Rock Ridge one.
-        # 5.  udf_symlink_path is the optional UDF name for the symlink; if it
-        #     is provided, then this must be a UDF ISO and udf_target must also
-        #     be provided.
-        # 6.  Conversely, if this is a non-UDF ISO, udf_symlink_path must not
-        #     be provided.
-        # 7.  udf_target is the optional UDF target for the symlink; if it is
-        #     provided, then this must be a UDF ISO and udf_symlink_path must
-        #     also be provided.
-        # 8.  Conversely, if this is a non-UDF ISO, udf_target must not be
-        #     provided.
-        # 9.  joliet_path is the optional path on the Joliet filesystem; if it
-        #     is provided, the ISO must be a Joliet one.
-        # 10. Conversely, if this is a non-Joliet ISO, joliet_path must not be
-        #     provided.
-        # 11. At least one of rr_path and the pair of
-        #     udf_symlink_path, udf_target must be provided.
-
-        if self.rock_ridge is not None:
-            # Rule 2
-            if rr_symlink_name is None:
-                raise pycdlibexception.PyCdlibInvalidInput('A Rock Ridge name must be passed for a Rock Ridge ISO')
-        else:
-            # Rule 3
-            if rr_symlink_name is not None:
-                raise pycdlibexception.PyCdlibInvalidInput('A Rock Ridge name can only be passed for a Rock Ridge ISO')
-
-        if rr_path is not None:
-            # Rule 4
-            if self.rock_ridge is None:
-                raise pycdlibexception.PyCdlibInvalidInput('Can only add a symlink to a Rock Ridge or UDF ISO')
-
-        if udf_symlink_path is not None:
-            # Rule 5/6/7/8
-            if self.udf_main_descs is None:
-                raise pycdlibexception.PyCdlibInvalidInput('Can only add a UDF symlink to a UDF ISO')
-            if udf_target is None:
-                raise pycdlibexception.PyCdlibInvalidInput('A udf_target must be supplied along with a udf_symlink_path')
-
-        if joliet_path is not None:
-            # Rule 9/10
-            if self.joliet_vd is None:
-                raise pycdlibexception.PyCdlibInvalidInput('A Joliet path can only be specified for a Joliet ISO')
-
-        if rr_path is None and udf_symlink_path is None:
-            # Rule 11
-            raise pycdlibexception.PyCdlibInvalidInput('At least one of a Rock Ridge or a UDF target must be specified')
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
+
+            # There are actually quite a few combinations and rules to think about
+            # here.  Rules:
+            #
+            # 1.  All symlinks must have an ISO9660 name.
+            # 2.  If the ISO is Rock Ridge, it must have a Rock Ridge name for the
+            #     ISO9660 Directory Record (rr_symlink_name).
+            # 3.  Conversely, rr_symlink_name must not be provided for a
+            #     non-Rock Ridge ISO.
+            # 4.  rr_path is the optional target for the symlink; if it is provided,
+            #     then the ISO must be a Rock Ridge one.
+            # 5.  udf_symlink_path is the optional UDF name for the symlink; if it
+            #     is provided, then this must be a UDF ISO and udf_target must also
+            #     be provided.
+            # 6.  Conversely, if this is a non-UDF ISO, udf_symlink_path must not
+            #     be provided.
+            # 7.  udf_target is the optional UDF target for the symlink; if it is
+            #     provided, then this must be a UDF ISO and udf_symlink_path must
+            #     also be provided.
+            # 8.  Conversely, if this is a non-UDF ISO, udf_target must not be
+            #     provided.
+            # 9.  joliet_path is the optional path on the Joliet filesystem; if it
+            #     is provided, the ISO must be a Joliet one.
+            # 10. Conversely, if this is a non-Joliet ISO, joliet_path must not be
+            #     provided.
+            # 11. At least one of rr_path and the pair of
+            #     udf_symlink_path, udf_target must be provided.
 
-        symlink_path = utils.normpath(symlink_path)
-        (name, parent) = self._name_and_parent_from_path(iso_path=symlink_path)
+            if self.rock_ridge is not None:
+                # Rule 2
+                if rr_symlink_name is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('A Rock Ridge name must be passed for a Rock Ridge ISO')
+            else:
+                # Rule 3
+                if rr_symlink_name is not None:
+                    raise pycdlibexception.PyCdlibInvalidInput('A Rock Ridge name can only be passed for a Rock Ridge ISO')
 
-        log_block_size = self.pvd.logical_block_size()
+            if rr_path is not None:
+                # Rule 4
+                if self.rock_ridge is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Can only add a symlink to a Rock Ridge or UDF ISO')
 
-        # The ISO9660 directory record; this will be added in all cases.
-        rec = dr.DirectoryRecord()
+            if udf_symlink_path is not None:
+                # Rule 5/6/7/8
+                if self.udf_main_descs is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Can only add a UDF symlink to a UDF ISO')
+                if udf_target is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('A udf_target must be supplied along with a udf_symlink_path')
 
-        num_bytes_to_add = 0
-        if rr_path is not None:
-            # We specifically do *not* normalize rr_path here, since that
-            # potentially changes the meaning of what the user wanted.
+            if joliet_path is not None:
+                # Rule 9/10
+                if self.joliet_vd is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('A Joliet path can only be specified for a Joliet ISO')
 
-            rr_symlink_name = rr_symlink_name.encode('utf-8')
-            rec.new_symlink(self.pvd, name, parent, rr_path.encode('utf-8'),
-                            self.pvd.sequence_number(), self.rock_ridge,
-                            rr_symlink_name, self.xa)
-            num_bytes_to_add += self._add_child_to_dr(rec, log_block_size)
+            if rr_path is None and udf_symlink_path is None:
+                # Rule 11
+                raise pycdlibexception.PyCdlibInvalidInput('At least one of a Rock Ridge or a UDF target must be specified')
 
-            num_bytes_to_add += self._update_rr_ce_entry(rec)
+            symlink_path = utils.normpath(symlink_path)
+            (name, parent) = self._name_and_parent_from_path(iso_path=symlink_path)
 
-        if udf_symlink_path is not None and udf_target is not None:
-            # If we aren't making a Rock Ridge symlink at the same time, we need
-            # to add a new zero-byte file to the ISO.
-            if rr_path is None:
-                rrname = name
-                if self.rock_ridge is None:
-                    rrname = None
-                num_bytes_to_add += self._add_fp(None, 0, False, symlink_path,
-                                                 rrname, joliet_path, None, None, False)
+            log_block_size = self.pvd.logical_block_size()
 
-            udf_symlink_path = utils.normpath(udf_symlink_path)
+            # The ISO9660 directory record; this will be added in all cases.
+            rec = dr.DirectoryRecord()
 
-            # We specifically do *not* normalize udf_target here, since that
-            # potentially changes the meaning of what the user wanted.
+            num_bytes_to_add = 0
+            if rr_path is not None:
+                # We specifically do *not* normalize rr_path here, since that
+                # potentially changes the meaning of what the user wanted.
 
-            (udf_name, udf_parent) = self._name_and_parent_from_path(udf_path=udf_symlink_path)
-            file_ident = udfmod.UDFFileIdentifierDescriptor()
-            file_ident.new(False, False, udf_name)
-            num_new_extents = udf_parent.add_file_ident_desc(file_ident, log_block_size)
-            num_bytes_to_add += num_new_extents * log_block_size
+                rr_symlink_name = rr_symlink_name.encode('utf-8')
+                rec.new_symlink(self.pvd, name, parent, rr_path.encode('utf-8'),
+                                self.pvd.sequence_number(), self.rock_ridge,
+                                rr_symlink_name, self.xa)
+                num_bytes_to_add += self._add_child_to_dr(rec, log_block_size)
 
-            # Generate the bytearry representing the symlink
-            symlink_bytearray = udfmod.symlink_to_bytes(udf_target)
+                num_bytes_to_add += self._update_rr_ce_entry(rec)
 
-            # The UDF File Entry
-            file_entry = udfmod.UDFFileEntry()
-            file_entry.new(len(symlink_bytearray), 'symlink', udf_parent,
-                           log_block_size)
-            file_ident.file_entry = file_entry
-            file_entry.file_ident = file_ident
-            num_bytes_to_add += log_block_size
-            num_bytes_to_add += file_entry.info_len
-
-            # The inode for the symlink array.
-            ino = inode.Inode()
-            ino.new(len(symlink_bytearray), BytesIO(symlink_bytearray), False, 0)
-            ino.linked_records.append(file_entry)
-            ino.num_udf += 1
-            file_entry.inode = ino
-            self.inodes.append(ino)
+            if udf_symlink_path is not None and udf_target is not None:
+                # If we aren't making a Rock Ridge symlink at the same time, we need
+                # to add a new zero-byte file to the ISO.
+                if rr_path is None:
+                    rrname = name
+                    if self.rock_ridge is None:
+                        rrname = None
+                    num_bytes_to_add += self._add_fp(None, 0, False, symlink_path,
+                                                     rrname, joliet_path, None, None, False)
+
+                udf_symlink_path = utils.normpath(udf_symlink_path)
+
+                # We specifically do *not* normalize udf_target here, since that
+                # potentially changes the meaning of what the user wanted.
+
+                (udf_name, udf_parent) = self._name_and_parent_from_path(udf_path=udf_symlink_path)
+                file_ident = udfmod.UDFFileIdentifierDescriptor()
+                file_ident.new(False, False, udf_name)
+                num_new_extents = udf_parent.add_file_ident_desc(file_ident, log_block_size)
+                num_bytes_to_add += num_new_extents * log_block_size
+
+                # Generate the bytearry representing the symlink
+                symlink_bytearray = udfmod.symlink_to_bytes(udf_target)
+
+                # The UDF File Entry
+                file_entry = udfmod.UDFFileEntry()
+                file_entry.new(len(symlink_bytearray), 'symlink', udf_parent,
+                               log_block_size)
+                file_ident.file_entry = file_entry
+                file_entry.file_ident = file_ident
+                num_bytes_to_add += log_block_size
+                num_bytes_to_add += file_entry.info_len
 
-            self.udf_logical_volume_integrity.logical_volume_impl_use.num_files += 1
+                # The inode for the symlink array.
+                ino = inode.Inode()
+                ino.new(len(symlink_bytearray), BytesIO(symlink_bytearray), False, 0)
+                ino.linked_records.append(file_entry)
+                ino.num_udf += 1
+                file_entry.inode = ino
+                self.inodes.append(ino)
 
-            # Note that we explicitly do *not* link this record to the ISO9660
-            # record; that's because there is no way to correlate them during
-            # parse time.  Instead, we treat them as individual entries, which
-            # has the knock-on effect of requiring two operations to remove;
-            # rm_file() to remove the ISO9660 record, and rm_hard_link() to
-            # remove the UDF record.
+                self.udf_logical_volume_integrity.logical_volume_impl_use.num_files += 1
 
-        if joliet_path is not None:
-            joliet_path = self._normalize_joliet_path(joliet_path)
-            (joliet_name, joliet_parent) = self._name_and_parent_from_path(joliet_path=joliet_path)
+                # Note that we explicitly do *not* link this record to the ISO9660
+                # record; that's because there is no way to correlate them during
+                # parse time.  Instead, we treat them as individual entries, which
+                # has the knock-on effect of requiring two operations to remove;
+                # rm_file() to remove the ISO9660 record, and rm_hard_link() to
+                # remove the UDF record.
 
-            # Add in a "fake" symlink entry for Joliet.
-            joliet_rec = dr.DirectoryRecord()
-            joliet_rec.new_file(self.joliet_vd, 0, joliet_name, joliet_parent,
-                                self.joliet_vd.sequence_number(), None, None,
-                                self.xa, None)
-            num_bytes_to_add += self._add_child_to_dr(joliet_rec,
-                                                      self.joliet_vd.logical_block_size())
+            if joliet_path is not None:
+                joliet_path = self._normalize_joliet_path(joliet_path)
+                (joliet_name, joliet_parent) = self._name_and_parent_from_path(joliet_path=joliet_path)
+
+                # Add in a "fake" symlink entry for Joliet.
+                joliet_rec = dr.DirectoryRecord()
+                joliet_rec.new_file(self.joliet_vd, 0, joliet_name, joliet_parent,
+                                    self.joliet_vd.sequence_number(), None, None,
+                                    self.xa, None)
+                num_bytes_to_add += self._add_child_to_dr(joliet_rec,
+                                                          self.joliet_vd.logical_block_size())
 
-        self._finish_add(0, num_bytes_to_add)
+            self._finish_add(0, num_bytes_to_add)
 
     def list_dir(self, iso_path, joliet=False):
         '''
@@ -4866,19 +6778,23 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if joliet:
-            rec = self._get_entry(joliet_path=iso_path)
-        else:
-            try_rr = False
-            try:
-                rec = self._get_entry(iso_path=iso_path)
-            except pycdlibexception.PyCdlibInvalidInput:
-                try_rr = True
+        with self._rwlock.read_locked():
+            if joliet:
+                rec = self._get_entry(joliet_path=iso_path)
+            else:
+                try_rr = False
+                try:
+                    rec = self._get_entry(iso_path=iso_path)
+                except pycdlibexception.PyCdlibInvalidInput:
+                    try_rr = True
 
-            if try_rr:
-                rec = self._find_rr_record(utils.normpath(iso_path))
+                if try_rr:
+                    rec = self._find_rr_record(utils.normpath(iso_path))
+                    self._walk_pending_dir(rec)
 
-        for c in _yield_children(rec):
+            children = list(_yield_children(rec, self._walk_all_dirs))
+
+        for c in children:
             yield c
 
     def list_children(self, **kwargs):
@@ -4921,24 +6837,28 @@ class PyCdlib(object):
         if num_paths != 1:
             raise pycdlibexception.PyCdlibInvalidInput("Must specify one, and only one of 'iso_path', 'rr_path', or 'joliet_path'")
 
-        if udf_path is not None:
-            rec = self._get_entry(udf_path=udf_path)
+        # The children are gathered up while holding the lock, since it cannot
+        # be held across the yields to the caller.
+        with self._rwlock.read_locked():
+            if udf_path is not None:
+                rec = self._get_entry(udf_path=udf_path)
 
-            if not rec.is_dir():
-                raise pycdlibexception.PyCdlibInvalidInput('UDF File Entry is not a directory!')
+                if not rec.is_dir():
+                    raise pycdlibexception.PyCdlibInvalidInput('UDF File Entry is not a directory!')
 
-            for fi_desc in rec.fi_descs:
-                yield fi_desc.file_entry
-        else:
-            if joliet_path is not None:
-                rec = self._get_entry(joliet_path=joliet_path)
-            elif rr_path is not None:
-                rec = self._get_entry(rr_path=rr_path)
+                children = [fi_desc.file_entry for fi_desc in rec.fi_descs]
             else:
-                rec = self._get_entry(iso_path=iso_path)
+                if joliet_path is not None:
+                    rec = self._get_entry(joliet_path=joliet_path)
+                elif rr_path is not None:
+                    rec = self._get_entry(rr_path=rr_path)
+                else:
+                    rec = self._get_entry(iso_path=iso_path)
 
-            for c in _yield_children(rec):
-                yield c
+                children = list(_yield_children(rec, self._walk_all_dirs))
+
+        for c in children:
+            yield c
 
     def get_entry(self, iso_path, joliet=False):
         '''
@@ -4954,9 +6874,10 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if joliet:
-            return self._get_entry(joliet_path=iso_path)
-        return self._get_entry(iso_path=iso_path)
+        with self._rwlock.read_locked():
+            if joliet:
+                return self._get_entry(joliet_path=iso_path)
+            return self._get_entry(iso_path=iso_path)
 
     def get_record(self, **kwargs):
         '''
@@ -4979,35 +6900,74 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        iso_path = None
-        rr_path = None
-        joliet_path = None
-        udf_path = None
-        num_paths = 0
-        for key in kwargs:
-            if key == 'joliet_path':
-                joliet_path = kwargs[key]
-            elif key == 'rr_path':
-                rr_path = kwargs[key]
-            elif key == 'iso_path':
-                iso_path = kwargs[key]
-            elif key == 'udf_path':
-                udf_path = kwargs[key]
-            else:
-                raise pycdlibexception.PyCdlibInvalidInput("Invalid keyword, must be one of 'iso_path', 'rr_path', or 'joliet_path'")
-            if kwargs[key] is not None:
-                num_paths += 1
+        with self._rwlock.read_locked():
+            iso_path = None
+            rr_path = None
+            joliet_path = None
+            udf_path = None
+            num_paths = 0
+            for key in kwargs:
+                if key == 'joliet_path':
+                    joliet_path = kwargs[key]
+                elif key == 'rr_path':
+                    rr_path = kwargs[key]
+                elif key == 'iso_path':
+                    iso_path = kwargs[key]
+                elif key == 'udf_path':
+                    udf_path = kwargs[key]
+                else:
+                    raise pycdlibexception.PyCdlibInvalidInput("Invalid keyword, must be one of 'iso_path', 'rr_path', or 'joliet_path'")
+                if kwargs[key] is not None:
+                    num_paths += 1
 
-        if num_paths != 1:
-            raise pycdlibexception.PyCdlibInvalidInput("Must specify one, and only one of 'iso_path', 'rr_path', or 'joliet_path'")
+            if num_paths != 1:
+                raise pycdlibexception.PyCdlibInvalidInput("Must specify one, and only one of 'iso_path', 'rr_path', or 'joliet_path'")
 
-        if joliet_path is not None:
-            return self._get_entry(joliet_path=joliet_path)
-        elif rr_path is not None:
-            return self._get_entry(rr_path=rr_path)
-        elif udf_path is not None:
-            return self._get_entry(udf_path=udf_path)
-        return self._get_entry(iso_path=iso_path)
+            if joliet_path is not None:
+                return self._get_entry(joliet_path=joliet_path)
+            elif rr_path is not None:
+                return self._get_entry(rr_path=rr_path)
+            elif udf_path is not None:
+                return self._get_entry(udf_path=udf_path)
+            return self._get_entry(iso_path=iso_path)
+
+    def compact_tree(self, namespace='iso9660'):
+        '''
+        Build a compact, read-only copy of the directory tree of one namespace
+        of the ISO.  The directory records are read straight from the ISO into
+        array-backed columns, and entries are handed out as lightweight proxy
+        objects, so listing, comparing, and extracting very large ISOs needs a
+        fraction of the memory of the full tree.  Combined with opening the ISO
+        with lazy=True, the full tree is only ever parsed for the directories
+        whose complete Directory Records are asked for.  The compact tree
+        reflects the ISO as it was opened; later modifications are not seen.
+
+        Parameters:
+         namespace - One of 'iso9660', 'rr', or 'joliet'.
+        Returns:
+         A compact.CompactTree object.
+        '''
+        if not self._initialized:
+            raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
+
+        with self._rwlock.read_locked():
+            if self._cdfp is None:
+                raise pycdlibexception.PyCdlibInvalidInput('A compact tree can only be built for an opened ISO')
+
+            if namespace == 'rr':
+                if self.rock_ridge is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot build the Rock Ridge namespace of a non-Rock Ridge ISO')
+                vd = self.pvd
+            elif namespace == 'joliet':
+                if self.joliet_vd is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot build the Joliet namespace of a non-Joliet ISO')
+                vd = self.joliet_vd
+            elif namespace == 'iso9660':
+                vd = self.pvd
+            else:
+                raise pycdlibexception.PyCdlibInvalidInput("Namespace must be one of 'iso9660', 'rr', or 'joliet'")
+
+            return compact.CompactTree(self, self._cdfp, vd, namespace)
 
     def add_isohybrid(self, part_entry=1, mbr_id=None, part_offset=0,
                       geometry_sectors=32, geometry_heads=64, part_type=0x17,
@@ -5035,24 +6995,29 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if self.eltorito_boot_catalog is None:
-            raise pycdlibexception.PyCdlibInvalidInput('The ISO must have an El Torito Boot Record to add isohybrid support')
+        with self._rwlock.write_locked():
+            if self.eltorito_boot_catalog is None:
+                raise pycdlibexception.PyCdlibInvalidInput('The ISO must have an El Torito Boot Record to add isohybrid support')
 
-        if self.eltorito_boot_catalog.initial_entry.sector_count != 4:
-            raise pycdlibexception.PyCdlibInvalidInput('El Torito Boot Catalog sector count must be 4 (was actually 0x%x)' % (self.eltorito_boot_catalog.initial_entry.sector_count))
+            if self.eltorito_boot_catalog.initial_entry.sector_count != 4:
+                raise pycdlibexception.PyCdlibInvalidInput('El Torito Boot Catalog sector count must be 4 (was actually 0x%x)' % (self.eltorito_boot_catalog.initial_entry.sector_count))
 
-        # Now check that the eltorito boot file contains the appropriate
-        # signature (offset 0x40, '\xFB\xC0\x78\x70')
-        with inode.InodeOpenData(self.eltorito_boot_catalog.initial_entry.inode, self.pvd.logical_block_size()) as (data_fp, data_len_unused):
-            data_fp.seek(0x40, os.SEEK_CUR)
-            signature = data_fp.read(4)
+            # Now check that the eltorito boot file contains the appropriate
+            # signature (offset 0x40, '\xFB\xC0\x78\x70')
+            boot_inode = self.eltorito_boot_catalog.initial_entry.inode
+            with inode.InodeOpenData(boot_inode, self.pvd.logical_block_size(), seek=False) as (data_fp, data_len_unused):
+                signature = utils.pread(data_fp, 4,
+                                        boot_inode.data_offset(self.pvd.logical_block_size()) + 0x40)
 
-        if signature != b'\xfb\xc0\x78\x70':
-            raise pycdlibexception.PyCdlibInvalidInput('Invalid signature on boot file for iso hybrid')
+            if signature != b'\xfb\xc0\x78\x70':
+                raise pycdlibexception.PyCdlibInvalidInput('Invalid signature on boot file for iso hybrid')
 
-        self.isohybrid_mbr = isohybrid.IsoHybrid()
-        self.isohybrid_mbr.new(mac, part_entry, mbr_id, part_offset,
-                               geometry_sectors, geometry_heads, part_type)
+            self.isohybrid_mbr = isohybrid.IsoHybrid()
+            self.isohybrid_mbr.new(mac, part_entry, mbr_id, part_offset,
+                                   geometry_sectors, geometry_heads, part_type)
+
+            # The isohybrid RBA gets filled in by a full reshuffle.
+            self._file_layout = None
 
     def rm_isohybrid(self):
         '''
@@ -5068,7 +7033,8 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        self.isohybrid_mbr = None
+        with self._rwlock.write_locked():
+            self.isohybrid_mbr = None
 
     def full_path_from_dirrecord(self, rec, rockridge=False):
         '''
@@ -5083,46 +7049,47 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if isinstance(rec, dr.DirectoryRecord):
-            encoding = 'utf-8'
-            if self.joliet_vd is not None and id(rec.vd) == id(self.joliet_vd):
-                encoding = 'utf-16_be'
-            slash = '/'.encode(encoding)
-
-            # A root entry has no Rock Ridge entry, even on a Rock Ridge ISO.  Just
-            # always return / here.
-            if rec.is_root:
-                return slash
-
-            if rockridge and rec.rock_ridge is None:
-                raise pycdlibexception.PyCdlibInvalidInput('Cannot generate a Rock Ridge path on a non-Rock Ridge ISO')
-
-            parent = rec
-            ret = b''
-            while parent is not None:
-                if not parent.is_root:
-                    if rockridge and parent.rock_ridge is not None:
-                        ret = slash + parent.rock_ridge.name() + ret
-                    else:
-                        ret = slash + parent.file_identifier() + ret
-                parent = parent.parent
-        else:
-            encoding = rec.file_ident.encoding
-            slash = '/'.encode(encoding)
-            parent = rec
-            ret = b''
-            while parent is not None:
-                ident = parent.file_identifier()
-                if ident != b'/':
-                    ret = slash + ident + ret
-                parent = parent.parent
-
-        if sys.version_info >= (3, 0):
-            # Python 3, just return the encoded version
-            return ret.decode(encoding)
-
-        # Python 2.
-        return ret.decode(encoding).encode('utf-8')
+        with self._rwlock.read_locked():
+            if isinstance(rec, dr.DirectoryRecord):
+                encoding = 'utf-8'
+                if self.joliet_vd is not None and id(rec.vd) == id(self.joliet_vd):
+                    encoding = 'utf-16_be'
+                slash = '/'.encode(encoding)
+
+                # A root entry has no Rock Ridge entry, even on a Rock Ridge ISO.  Just
+                # always return / here.
+                if rec.is_root:
+                    return slash
+
+                if rockridge and rec.rock_ridge is None:
+                    raise pycdlibexception.PyCdlibInvalidInput('Cannot generate a Rock Ridge path on a non-Rock Ridge ISO')
+
+                parent = rec
+                ret = b''
+                while parent is not None:
+                    if not parent.is_root:
+                        if rockridge and parent.rock_ridge is not None:
+                            ret = slash + parent.rock_ridge.name() + ret
+                        else:
+                            ret = slash + parent.file_identifier() + ret
+                    parent = parent.parent
+            else:
+                encoding = rec.file_ident.encoding
+                slash = '/'.encode(encoding)
+                parent = rec
+                ret = b''
+                while parent is not None:
+                    ident = parent.file_identifier()
+                    if ident != b'/':
+                        ret = slash + ident + ret
+                    parent = parent.parent
+
+            if sys.version_info >= (3, 0):
+                # Python 3, just return the encoded version
+                return ret.decode(encoding)
+
+            # Python 2.
+            return ret.decode(encoding).encode('utf-8')
 
     def duplicate_pvd(self):
         '''
@@ -5138,11 +7105,14 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        pvd = headervd.PrimaryOrSupplementaryVD(headervd.VOLUME_DESCRIPTOR_TYPE_PRIMARY)
-        pvd.copy(self.pvd)
-        self.pvds.append(pvd)
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-        self._finish_add(self.pvd.logical_block_size(), 0)
+            pvd = headervd.PrimaryOrSupplementaryVD(headervd.VOLUME_DESCRIPTOR_TYPE_PRIMARY)
+            pvd.copy(self.pvd)
+            self.pvds.append(pvd)
+
+            self._finish_add(self.pvd.logical_block_size(), 0)
 
     def set_hidden(self, iso_path=None, rr_path=None, joliet_path=None):
         '''
@@ -5160,18 +7130,21 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if len([x for x in (iso_path, rr_path, joliet_path) if x is not None]) != 1:
-            raise pycdlibexception.PyCdlibInvalidInput('Must provide exactly one of iso_path, rr_path, or joliet_path')
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-        if iso_path is not None:
-            rec = self._find_iso_record(utils.normpath(iso_path))
-        elif rr_path is not None:
-            rec = self._find_rr_record(utils.normpath(rr_path))
-        elif joliet_path is not None:
-            joliet_path = self._normalize_joliet_path(joliet_path)
-            rec = self._find_joliet_record(joliet_path)
+            if len([x for x in (iso_path, rr_path, joliet_path) if x is not None]) != 1:
+                raise pycdlibexception.PyCdlibInvalidInput('Must provide exactly one of iso_path, rr_path, or joliet_path')
 
-        rec.change_existence(True)
+            if iso_path is not None:
+                rec = self._find_iso_record(utils.normpath(iso_path))
+            elif rr_path is not None:
+                rec = self._find_rr_record(utils.normpath(rr_path))
+            elif joliet_path is not None:
+                joliet_path = self._normalize_joliet_path(joliet_path)
+                rec = self._find_joliet_record(joliet_path)
+
+            rec.change_existence(True)
 
     def clear_hidden(self, iso_path=None, rr_path=None, joliet_path=None):
         '''
@@ -5189,18 +7162,21 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if len([x for x in (iso_path, rr_path, joliet_path) if x is not None]) != 1:
-            raise pycdlibexception.PyCdlibInvalidInput('Must provide exactly one of iso_path, rr_path, or joliet_path')
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-        if iso_path is not None:
-            rec = self._find_iso_record(utils.normpath(iso_path))
-        elif rr_path is not None:
-            rec = self._find_rr_record(utils.normpath(rr_path))
-        elif joliet_path is not None:
-            joliet_path = self._normalize_joliet_path(joliet_path)
-            rec = self._find_joliet_record(joliet_path)
+            if len([x for x in (iso_path, rr_path, joliet_path) if x is not None]) != 1:
+                raise pycdlibexception.PyCdlibInvalidInput('Must provide exactly one of iso_path, rr_path, or joliet_path')
+
+            if iso_path is not None:
+                rec = self._find_iso_record(utils.normpath(iso_path))
+            elif rr_path is not None:
+                rec = self._find_rr_record(utils.normpath(rr_path))
+            elif joliet_path is not None:
+                joliet_path = self._normalize_joliet_path(joliet_path)
+                rec = self._find_joliet_record(joliet_path)
 
-        rec.change_existence(False)
+            rec.change_existence(False)
 
     def force_consistency(self):
         '''
@@ -5219,7 +7195,8 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        self._reshuffle_extents()
+        with self._rwlock.write_locked():
+            self._reshuffle_extents()
 
     def set_relocated_name(self, name, rr_name):
         '''
@@ -5236,19 +7213,22 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if self.rock_ridge is None:
-            raise pycdlibexception.PyCdlibInvalidInput('Can only set the relocated name on a Rock Ridge ISO')
+        with self._rwlock.write_locked():
+            self._walk_all_dirs()
 
-        encoded_name = name.encode('utf-8')
-        encoded_rr_name = rr_name.encode('utf-8')
-        if self._rr_moved_name is not None:
-            if self._rr_moved_name == encoded_name and self._rr_moved_rr_name == encoded_rr_name:
-                return
-            raise pycdlibexception.PyCdlibInvalidInput('Changing the existing rr_moved name is not allowed')
+            if self.rock_ridge is None:
+                raise pycdlibexception.PyCdlibInvalidInput('Can only set the relocated name on a Rock Ridge ISO')
+
+            encoded_name = name.encode('utf-8')
+            encoded_rr_name = rr_name.encode('utf-8')
+            if self._rr_moved_name is not None:
+                if self._rr_moved_name == encoded_name and self._rr_moved_rr_name == encoded_rr_name:
+                    return
+                raise pycdlibexception.PyCdlibInvalidInput('Changing the existing rr_moved name is not allowed')
 
-        _check_iso9660_directory(encoded_name, self.interchange_level)
-        self._rr_moved_name = encoded_name
-        self._rr_moved_rr_name = encoded_rr_name
+            _check_iso9660_directory(encoded_name, self.interchange_level)
+            self._rr_moved_name = encoded_name
+            self._rr_moved_rr_name = encoded_rr_name
 
     def close(self):
         '''
@@ -5263,8 +7243,11 @@ class PyCdlib(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInvalidInput('This object is not yet initialized; call either open() or new() to create an ISO')
 
-        if self._managing_fp:
-            # In this case, we are managing self._cdfp, so we need to close it
-            self._cdfp.close()
+        with self._rwlock.write_locked():
+            self._unmap_fp()
 
-        self._initialize()
+            if self._managing_fp:
+                # In this case, we are managing self._cdfp, so we need to close it
+                self._cdfp.close()
+
+            self._initialize()
@@ -37,6 +37,19 @@ EXT_ID_112 = b'IEEE_P1282'
 EXT_DES_112 = b'THE IEEE P1282 PROTOCOL PROVIDES SUPPORT FOR POSIX FILE SYSTEM SEMANTICS'
 EXT_SRC_112 = b'PLEASE CONTACT THE IEEE STANDARDS DEPARTMENT, PISCATAWAY, NJ, USA FOR THE P1282 SPECIFICATION'
 
+# The precompiled structures of the System Use entries.
+_STRUCT_BBBBB = utils.compile_struct('=BBBBB')
+_STRUCT_BBB = utils.compile_struct('=BBB')
+_STRUCT_BBLLLLLL = utils.compile_struct('=BBLLLLLL')
+_STRUCT_BBLLLLLLLL = utils.compile_struct('=BBLLLLLLLL')
+_STRUCT_LL = utils.compile_struct('=LL')
+_STRUCT_BBBBBB = utils.compile_struct('=BBBBBB')
+_STRUCT_BBLLLL = utils.compile_struct('=BBLLLL')
+_STRUCT_BB = utils.compile_struct('=BB')
+_STRUCT_BBLL = utils.compile_struct('=BBLL')
+_STRUCT_BBLLLLB = utils.compile_struct('=BBLLLLB')
+_STRUCT_2sBB = utils.compile_struct('=2sBB')
+
 
 class RRSPRecord(object):
     '''
@@ -62,7 +75,7 @@ class RRSPRecord(object):
             raise pycdlibexception.PyCdlibInternalError('SP record already initialized!')
 
         (su_len, su_entry_version_unused, check_byte1, check_byte2,
-         self.bytes_to_skip) = struct.unpack_from('=BBBBB', rrstr[:7], 2)
+         self.bytes_to_skip) = _STRUCT_BBBBB.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -101,7 +114,7 @@ class RRSPRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('SP record not yet initialized!')
 
-        return b'SP' + struct.pack('=BBBBB', RRSPRecord.length(), SU_ENTRY_VERSION, 0xbe, 0xef, self.bytes_to_skip)
+        return b'SP' + _STRUCT_BBBBB.pack(RRSPRecord.length(), SU_ENTRY_VERSION, 0xbe, 0xef, self.bytes_to_skip)
 
     @staticmethod
     def length():
@@ -122,11 +135,14 @@ class RRRRRecord(object):
     A class that represents a Rock Ridge Rock Ridge record.  This optional
     record indicates which other Rock Ridge fields are present.
     '''
-    __slots__ = ('_initialized', 'rr_flags')
+    __slots__ = ('_initialized', 'rr_flags', '_shared', '_record_cache',
+                 '__weakref__')
 
     def __init__(self):
         self.rr_flags = None
         self._initialized = False
+        self._shared = False
+        self._record_cache = None
 
     def parse(self, rrstr):
         '''
@@ -140,8 +156,7 @@ class RRRRRecord(object):
         if self._initialized:
             raise pycdlibexception.PyCdlibInternalError('RR record already initialized!')
 
-        (su_len, su_entry_version_unused, self.rr_flags) = struct.unpack_from('=BBB',
-                                                                              rrstr[:5], 2)
+        (su_len, su_entry_version_unused, self.rr_flags) = _STRUCT_BBB.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -212,7 +227,13 @@ class RRRRRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('RR record not yet initialized!')
 
-        return b'RR' + struct.pack('=BBB', RRRRRecord.length(), SU_ENTRY_VERSION, self.rr_flags)
+        if self._record_cache is not None:
+            return self._record_cache
+
+        rec = b'RR' + _STRUCT_BBB.pack(RRRRRecord.length(), SU_ENTRY_VERSION, self.rr_flags)
+        if self._shared:
+            self._record_cache = rec
+        return rec
 
     @staticmethod
     def length():
@@ -254,7 +275,7 @@ class RRCERecord(object):
 
         (su_len, su_entry_version_unused, bl_cont_area_le, bl_cont_area_be,
          offset_cont_area_le, offset_cont_area_be,
-         len_cont_area_le, len_cont_area_be) = struct.unpack_from('=BBLLLLLL', rrstr[:28], 2)
+         len_cont_area_le, len_cont_area_be) = _STRUCT_BBLLLLLL.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -350,15 +371,14 @@ class RRCERecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('CE record not yet initialized!')
 
-        return b'CE' + struct.pack('=BBLLLLLL',
-                                   RRCERecord.length(),
-                                   SU_ENTRY_VERSION,
-                                   self.bl_cont_area,
-                                   utils.swab_32bit(self.bl_cont_area),
-                                   self.offset_cont_area,
-                                   utils.swab_32bit(self.offset_cont_area),
-                                   self.len_cont_area,
-                                   utils.swab_32bit(self.len_cont_area))
+        return b'CE' + _STRUCT_BBLLLLLL.pack(RRCERecord.length(),
+                                             SU_ENTRY_VERSION,
+                                             self.bl_cont_area,
+                                             utils.swab_32bit(self.bl_cont_area),
+                                             self.offset_cont_area,
+                                             utils.swab_32bit(self.offset_cont_area),
+                                             self.len_cont_area,
+                                             utils.swab_32bit(self.len_cont_area))
 
     @staticmethod
     def length():
@@ -381,7 +401,8 @@ class RRPXRecord(object):
     user ID, group ID, and serial number of a directory record.
     '''
     __slots__ = ('_initialized', 'posix_file_mode', 'posix_file_links',
-                 'posix_user_id', 'posix_group_id', 'posix_serial_number')
+                 'posix_user_id', 'posix_group_id', 'posix_serial_number',
+                 '_shared', '_record_cache', '__weakref__')
 
     def __init__(self):
         self.posix_file_mode = None
@@ -389,6 +410,8 @@ class RRPXRecord(object):
         self.posix_user_id = None
         self.posix_group_id = None
         self.posix_serial_number = None
+        self._shared = False
+        self._record_cache = None
 
         self._initialized = False
 
@@ -407,7 +430,7 @@ class RRPXRecord(object):
         (su_len, su_entry_version_unused, posix_file_mode_le, posix_file_mode_be,
          posix_file_links_le, posix_file_links_be, posix_file_user_id_le,
          posix_file_user_id_be, posix_file_group_id_le,
-         posix_file_group_id_be) = struct.unpack_from('=BBLLLLLLLL', rrstr[:38], 2)
+         posix_file_group_id_be) = _STRUCT_BBLLLLLLLL.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -431,8 +454,7 @@ class RRPXRecord(object):
             posix_file_serial_number_le = 0
         elif su_len == 44:
             (posix_file_serial_number_le,
-             posix_file_serial_number_be) = struct.unpack_from('=LL',
-                                                               rrstr[:44], 36)
+             posix_file_serial_number_be) = _STRUCT_LL.unpack_from(rrstr, 36)
             if posix_file_serial_number_le != utils.swab_32bit(posix_file_serial_number_be):
                 raise pycdlibexception.PyCdlibInvalidISO('PX record big and little-endian file serial number do not agree')
         else:
@@ -481,23 +503,31 @@ class RRPXRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('PX record not yet initialized!')
 
-        outlist = [b'PX', struct.pack('=BBLLLLLLLL', RRPXRecord.length(rr_version),
-                                      SU_ENTRY_VERSION, self.posix_file_mode,
-                                      utils.swab_32bit(self.posix_file_mode),
-                                      self.posix_file_links,
-                                      utils.swab_32bit(self.posix_file_links),
-                                      self.posix_user_id,
-                                      utils.swab_32bit(self.posix_user_id),
-                                      self.posix_group_id,
-                                      utils.swab_32bit(self.posix_group_id))]
+        # The cache holds the version the record was generated for, since
+        # the serial number is only written for Rock Ridge 1.12.
+        if self._record_cache is not None and self._record_cache[0] == rr_version:
+            return self._record_cache[1]
+
+        outlist = [b'PX', _STRUCT_BBLLLLLLLL.pack(RRPXRecord.length(rr_version),
+                                                  SU_ENTRY_VERSION, self.posix_file_mode,
+                                                  utils.swab_32bit(self.posix_file_mode),
+                                                  self.posix_file_links,
+                                                  utils.swab_32bit(self.posix_file_links),
+                                                  self.posix_user_id,
+                                                  utils.swab_32bit(self.posix_user_id),
+                                                  self.posix_group_id,
+                                                  utils.swab_32bit(self.posix_group_id))]
         if rr_version == '1.12':
-            outlist.append(struct.pack('=LL', self.posix_serial_number,
-                                       utils.swab_32bit(self.posix_serial_number)))
+            outlist.append(_STRUCT_LL.pack(self.posix_serial_number,
+                                           utils.swab_32bit(self.posix_serial_number)))
         elif rr_version not in ['1.09', '1.10']:
             # This should never happen
             raise pycdlibexception.PyCdlibInternalError('Invalid rr_version')
 
-        return b''.join(outlist)
+        rec = b''.join(outlist)
+        if self._shared:
+            self._record_cache = (rr_version, rec)
+        return rec
 
     @staticmethod
     def length(rr_version):
@@ -544,7 +574,7 @@ class RRERRecord(object):
             raise pycdlibexception.PyCdlibInternalError('ER record already initialized!')
 
         (su_len, su_entry_version_unused, len_id, len_des, len_src,
-         self.ext_ver) = struct.unpack_from('=BBBBBB', rrstr[:8], 2)
+         self.ext_ver) = _STRUCT_BBBBBB.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -598,7 +628,7 @@ class RRERRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('ER record not yet initialized!')
 
-        return b'ER' + struct.pack('=BBBBBB', RRERRecord.length(self.ext_id, self.ext_des, self.ext_src), SU_ENTRY_VERSION, len(self.ext_id), len(self.ext_des), len(self.ext_src), self.ext_ver) + self.ext_id + self.ext_des + self.ext_src
+        return b'ER' + _STRUCT_BBBBBB.pack(RRERRecord.length(self.ext_id, self.ext_des, self.ext_src), SU_ENTRY_VERSION, len(self.ext_id), len(self.ext_des), len(self.ext_src), self.ext_ver) + self.ext_id + self.ext_des + self.ext_src
 
     @staticmethod
     def length(ext_id, ext_des, ext_src):
@@ -641,7 +671,7 @@ class RRESRecord(object):
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
 
-        (su_len, su_entry_version_unused, self.extension_sequence) = struct.unpack_from('=BBB', rrstr[:5], 2)
+        (su_len, su_entry_version_unused, self.extension_sequence) = _STRUCT_BBB.unpack_from(rrstr, 2)
         if su_len != RRESRecord.length():
             raise pycdlibexception.PyCdlibInvalidISO('Invalid length on rock ridge extension')
 
@@ -674,7 +704,7 @@ class RRESRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('ES record not yet initialized!')
 
-        return b'ES' + struct.pack('=BBB', RRESRecord.length(), SU_ENTRY_VERSION, self.extension_sequence)
+        return b'ES' + _STRUCT_BBB.pack(RRESRecord.length(), SU_ENTRY_VERSION, self.extension_sequence)
 
     @staticmethod
     def length():
@@ -715,7 +745,7 @@ class RRPNRecord(object):
             raise pycdlibexception.PyCdlibInternalError('PN record already initialized!')
 
         (su_len, su_entry_version_unused, dev_t_high_le, dev_t_high_be,
-         dev_t_low_le, dev_t_low_be) = struct.unpack_from('=BBLLLL', rrstr[:20], 2)
+         dev_t_low_le, dev_t_low_be) = _STRUCT_BBLLLL.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -765,7 +795,7 @@ class RRPNRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('PN record not yet initialized!')
 
-        return b'PN' + struct.pack('=BBLLLL', RRPNRecord.length(), SU_ENTRY_VERSION, self.dev_t_high, utils.swab_32bit(self.dev_t_high), self.dev_t_low, utils.swab_32bit(self.dev_t_low))
+        return b'PN' + _STRUCT_BBLLLL.pack(RRPNRecord.length(), SU_ENTRY_VERSION, self.dev_t_high, utils.swab_32bit(self.dev_t_high), self.dev_t_low, utils.swab_32bit(self.dev_t_low))
 
     @staticmethod
     def length():
@@ -854,13 +884,13 @@ class RRSLRecord(object):
              Representation of this compnent suitable for writing to disk.
             '''
             if self.flags & (1 << 1):
-                return struct.pack('=BB', (1 << 1), 0)
+                return _STRUCT_BB.pack((1 << 1), 0)
             elif self.flags & (1 << 2):
-                return struct.pack('=BB', (1 << 2), 0)
+                return _STRUCT_BB.pack((1 << 2), 0)
             elif self.flags & (1 << 3):
-                return struct.pack('=BB', (1 << 3), 0)
+                return _STRUCT_BB.pack((1 << 3), 0)
 
-            return struct.pack('=BB', self.flags, self.curr_length) + self.data
+            return _STRUCT_BB.pack(self.flags, self.curr_length) + self.data
 
         def set_continued(self):
             '''
@@ -949,7 +979,7 @@ class RRSLRecord(object):
         if self._initialized:
             raise pycdlibexception.PyCdlibInternalError('SL record already initialized!')
 
-        (su_len, su_entry_version_unused, self.flags) = struct.unpack_from('=BBB', rrstr[:5], 2)
+        (su_len, su_entry_version_unused, self.flags) = _STRUCT_BBB.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -957,13 +987,13 @@ class RRSLRecord(object):
         cr_offset = 5
         data_len = su_len - 5
         while data_len > 0:
-            (cr_flags, len_cp) = struct.unpack_from('=BB', rrstr[:cr_offset + 2], cr_offset)
+            (cr_flags, len_cp) = _STRUCT_BB.unpack_from(rrstr, cr_offset)
 
             data_len -= 2
             cr_offset += 2
 
             self.symlink_components.append(self.Component(cr_flags, len_cp,
-                                                          rrstr[cr_offset:cr_offset + len_cp],
+                                                          bytes(rrstr[cr_offset:cr_offset + len_cp]),
                                                           previous_continued))
 
             previous_continued = self.symlink_components[-1].is_continued()
@@ -1038,7 +1068,7 @@ class RRSLRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('SL record not yet initialized!')
 
-        outlist = [b'SL', struct.pack('=BBB', self.current_length(), SU_ENTRY_VERSION, self.flags)]
+        outlist = [b'SL', _STRUCT_BBB.pack(self.current_length(), SU_ENTRY_VERSION, self.flags)]
         for comp in self.symlink_components:
             outlist.append(comp.record())
 
@@ -1185,7 +1215,7 @@ class RRNMRecord(object):
         if self._initialized:
             raise pycdlibexception.PyCdlibInternalError('NM record already initialized!')
 
-        (su_len, su_entry_version_unused, self.posix_name_flags) = struct.unpack_from('=BBB', rrstr[:5], 2)
+        (su_len, su_entry_version_unused, self.posix_name_flags) = _STRUCT_BBB.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -1197,7 +1227,7 @@ class RRNMRecord(object):
         if name_len != 0:
             if (self.posix_name_flags & (1 << 1)) or (self.posix_name_flags & (1 << 2)) or (self.posix_name_flags & (1 << 5)):
                 raise pycdlibexception.PyCdlibInvalidISO('Invalid name in Rock Ridge NM entry (0x%x %d)' % (self.posix_name_flags, name_len))
-            self.posix_name += rrstr[5:5 + name_len]
+            self.posix_name += bytes(rrstr[5:5 + name_len])
 
         self._initialized = True
 
@@ -1230,7 +1260,7 @@ class RRNMRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('NM record not yet initialized!')
 
-        return b'NM' + struct.pack(b'=BBB', RRNMRecord.length(self.posix_name), SU_ENTRY_VERSION, self.posix_name_flags) + self.posix_name
+        return b'NM' + _STRUCT_BBB.pack(RRNMRecord.length(self.posix_name), SU_ENTRY_VERSION, self.posix_name_flags) + self.posix_name
 
     def set_continued(self):
         '''
@@ -1287,7 +1317,7 @@ class RRCLRecord(object):
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
 
-        (su_len, su_entry_version_unused, child_log_block_num_le, child_log_block_num_be) = struct.unpack_from('=BBLL', rrstr[:12], 2)
+        (su_len, su_entry_version_unused, child_log_block_num_le, child_log_block_num_be) = _STRUCT_BBLL.unpack_from(rrstr, 2)
         if su_len != RRCLRecord.length():
             raise pycdlibexception.PyCdlibInvalidISO('Invalid length on rock ridge extension')
 
@@ -1325,7 +1355,7 @@ class RRCLRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('CL record not yet initialized!')
 
-        return b'CL' + struct.pack('=BBLL', RRCLRecord.length(), SU_ENTRY_VERSION, self.child_log_block_num, utils.swab_32bit(self.child_log_block_num))
+        return b'CL' + _STRUCT_BBLL.pack(RRCLRecord.length(), SU_ENTRY_VERSION, self.child_log_block_num, utils.swab_32bit(self.child_log_block_num))
 
     def set_log_block_num(self, bl):
         '''
@@ -1382,7 +1412,7 @@ class RRPLRecord(object):
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
 
-        (su_len, su_entry_version_unused, parent_log_block_num_le, parent_log_block_num_be) = struct.unpack_from('=BBLL', rrstr[:12], 2)
+        (su_len, su_entry_version_unused, parent_log_block_num_le, parent_log_block_num_be) = _STRUCT_BBLL.unpack_from(rrstr, 2)
         if su_len != RRPLRecord.length():
             raise pycdlibexception.PyCdlibInvalidISO('Invalid length on rock ridge extension')
         if parent_log_block_num_le != utils.swab_32bit(parent_log_block_num_be):
@@ -1419,7 +1449,7 @@ class RRPLRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('PL record not yet initialized!')
 
-        return b'PL' + struct.pack('=BBLL', RRPLRecord.length(), SU_ENTRY_VERSION, self.parent_log_block_num, utils.swab_32bit(self.parent_log_block_num))
+        return b'PL' + _STRUCT_BBLL.pack(RRPLRecord.length(), SU_ENTRY_VERSION, self.parent_log_block_num, utils.swab_32bit(self.parent_log_block_num))
 
     def set_log_block_num(self, bl):
         '''
@@ -1461,9 +1491,12 @@ class RRTFRecord(object):
     '''
     __slots__ = ('_initialized', 'creation_time', 'access_time',
                  'modification_time', 'attribute_change_time', 'backup_time',
-                 'expiration_time', 'effective_time', 'time_flags')
+                 'expiration_time', 'effective_time', 'time_flags', '_shared',
+                 '_record_cache', '__weakref__')
 
     def __init__(self):
+        self._shared = False
+        self._record_cache = None
         self.creation_time = None
         self.access_time = None
         self.modification_time = None
@@ -1489,7 +1522,7 @@ class RRTFRecord(object):
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
 
-        (su_len, su_entry_version_unused, self.time_flags,) = struct.unpack_from('=BBB', rrstr[:5], 2)
+        (su_len, su_entry_version_unused, self.time_flags,) = _STRUCT_BBB.unpack_from(rrstr, 2)
         if su_len < 5:
             raise pycdlibexception.PyCdlibInvalidISO('Not enough bytes in the TF record')
 
@@ -1584,7 +1617,10 @@ class RRTFRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('TF record not yet initialized!')
 
-        outlist = [b'TF', struct.pack('=BBB', RRTFRecord.length(self.time_flags), SU_ENTRY_VERSION, self.time_flags)]
+        if self._record_cache is not None:
+            return self._record_cache
+
+        outlist = [b'TF', _STRUCT_BBB.pack(RRTFRecord.length(self.time_flags), SU_ENTRY_VERSION, self.time_flags)]
         if self.creation_time is not None:
             outlist.append(self.creation_time.record())
         if self.access_time is not None:
@@ -1600,7 +1636,10 @@ class RRTFRecord(object):
         if self.effective_time is not None:
             outlist.append(self.effective_time.record())
 
-        return b''.join(outlist)
+        rec = b''.join(outlist)
+        if self._shared:
+            self._record_cache = rec
+        return rec
 
     @staticmethod
     def length(time_flags):
@@ -1652,7 +1691,7 @@ class RRSFRecord(object):
 
         (su_len, su_entry_version_unused, virtual_file_size_high_le,
          virtual_file_size_high_be, virtual_file_size_low_le,
-         virtual_file_size_low_be, self.table_depth) = struct.unpack_from('=BBLLLLB', rrstr[:21], 2)
+         virtual_file_size_low_be, self.table_depth) = _STRUCT_BBLLLLB.unpack_from(rrstr, 2)
         if su_len != RRSFRecord.length():
             raise pycdlibexception.PyCdlibInvalidISO('Invalid length on rock ridge extension')
 
@@ -1699,7 +1738,7 @@ class RRSFRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('SF record not yet initialized!')
 
-        return b'SF' + struct.pack('=BBLLLLB', RRSFRecord.length(), SU_ENTRY_VERSION, self.virtual_file_size_high, utils.swab_32bit(self.virtual_file_size_high), self.virtual_file_size_low, utils.swab_32bit(self.virtual_file_size_low), self.table_depth)
+        return b'SF' + _STRUCT_BBLLLLB.pack(RRSFRecord.length(), SU_ENTRY_VERSION, self.virtual_file_size_high, utils.swab_32bit(self.virtual_file_size_high), self.virtual_file_size_low, utils.swab_32bit(self.virtual_file_size_low), self.table_depth)
 
     @staticmethod
     def length():
@@ -1738,7 +1777,7 @@ class RRRERecord(object):
         if self._initialized:
             raise pycdlibexception.PyCdlibInternalError('RE record already initialized!')
 
-        (su_len, su_entry_version_unused) = struct.unpack_from('=BB', rrstr[:4], 2)
+        (su_len, su_entry_version_unused) = _STRUCT_BB.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -1775,7 +1814,7 @@ class RRRERecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('RE record not yet initialized')
 
-        return b'RE' + struct.pack('=BB', RRRERecord.length(), SU_ENTRY_VERSION)
+        return b'RE' + _STRUCT_BB.pack(RRRERecord.length(), SU_ENTRY_VERSION)
 
     @staticmethod
     def length():
@@ -1814,7 +1853,7 @@ class RRSTRecord(object):
         if self._initialized:
             raise pycdlibexception.PyCdlibInternalError('ST record already initialized!')
 
-        (su_len, su_entry_version_unused) = struct.unpack_from('=BB', rrstr[:4], 2)
+        (su_len, su_entry_version_unused) = _STRUCT_BB.unpack_from(rrstr, 2)
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -1851,7 +1890,7 @@ class RRSTRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('ST record not yet initialized')
 
-        return b'ST' + struct.pack('=BB', RRSTRecord.length(), SU_ENTRY_VERSION)
+        return b'ST' + _STRUCT_BB.pack(RRSTRecord.length(), SU_ENTRY_VERSION)
 
     @staticmethod
     def length():
@@ -1890,9 +1929,9 @@ class RRPDRecord(object):
         if self._initialized:
             raise pycdlibexception.PyCdlibInternalError('PD record already initialized!')
 
-        (su_len_unused, su_entry_version_unused) = struct.unpack_from('=BB', rrstr[:4], 2)
+        (su_len_unused, su_entry_version_unused) = _STRUCT_BB.unpack_from(rrstr, 2)
 
-        self.padding = rrstr[4:]
+        self.padding = bytes(rrstr[4:])
 
         # We assume that the caller has already checked the su_entry_version,
         # so we don't bother.
@@ -1927,8 +1966,8 @@ class RRPDRecord(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('PD record not yet initialized')
 
-        return b'PD' + struct.pack('=BB', RRPDRecord.length(self.padding),
-                                   SU_ENTRY_VERSION) + self.padding
+        return b'PD' + _STRUCT_BB.pack(RRPDRecord.length(self.padding),
+                                       SU_ENTRY_VERSION) + self.padding
 
     @staticmethod
     def length(padding):
@@ -1944,33 +1983,215 @@ class RRPDRecord(object):
         return 4 + len(padding)
 
 
+# The table used to parse System Use entries, mapping the signature of each
+# entry to the RockRidgeEntries attribute it is stored in, the class that
+# parses it, and whether decoding it can be deferred until it is first used.
+# The entries that are needed while walking the ISO (to find continuation
+# areas, to determine the Rock Ridge version, to link up relocated
+# directories, and the names used to sort the Rock Ridge children) are
+# always decoded right away.
+_SUSP_ENTRIES = {
+    b'SP': ('sp_record', RRSPRecord, False),
+    b'RR': ('rr_record', RRRRRecord, False),
+    b'CE': ('ce_record', RRCERecord, False),
+    b'PX': ('px_record', RRPXRecord, True),
+    b'PD': ('pd_records', RRPDRecord, False),
+    b'ST': ('st_record', RRSTRecord, False),
+    b'ER': ('er_record', RRERRecord, False),
+    b'ES': ('es_records', RRESRecord, False),
+    b'PN': ('pn_record', RRPNRecord, True),
+    b'SL': ('sl_records', RRSLRecord, True),
+    b'NM': ('nm_records', RRNMRecord, False),
+    b'CL': ('cl_record', RRCLRecord, False),
+    b'PL': ('pl_record', RRPLRecord, False),
+    b'RE': ('re_record', RRRERecord, False),
+    b'TF': ('tf_record', RRTFRecord, True),
+    b'SF': ('sf_record', RRSFRecord, False),
+}
+
+# The records that are the same for many entries on typical ISOs, so a single
+# parsed copy is shared between all of the identical System Use entries of an
+# ISO.
+_SHARED_ENTRIES = frozenset([b'RR', b'PX', b'TF'])
+
+_DEFERRABLE_ATTRS = frozenset([attr for attr, cls_unused, lazy in _SUSP_ENTRIES.values() if lazy])
+
+
 class RockRidgeEntries(object):
     '''
     A simple class container to hold a long list of possible Rock Ridge
-    records.
+    records.  The entries that do not have to be decoded while walking the ISO
+    are kept as raw bytes until they are first accessed.
     '''
-    __slots__ = ('sp_record', 'rr_record', 'ce_record', 'px_record',
-                 'er_record', 'es_records', 'pn_record', 'sl_records',
-                 'nm_records', 'cl_record', 'pl_record', 'tf_record',
-                 'sf_record', 're_record', 'st_record', 'pd_records')
+    __slots__ = ('sp_record', 'rr_record', 'ce_record', '_px_record',
+                 'er_record', 'es_records', '_pn_record', '_sl_records',
+                 'nm_records', 'cl_record', 'pl_record', '_tf_record',
+                 'sf_record', 're_record', 'st_record', 'pd_records',
+                 '_pending')
 
     def __init__(self):
         self.sp_record = None
         self.rr_record = None
         self.ce_record = None
-        self.px_record = None
+        self._px_record = None
         self.er_record = None
         self.es_records = []
-        self.pn_record = None
-        self.sl_records = []
+        self._pn_record = None
+        self._sl_records = []
         self.nm_records = []
         self.cl_record = None
         self.pl_record = None
-        self.tf_record = None
+        self._tf_record = None
         self.sf_record = None
         self.re_record = None
         self.st_record = None
         self.pd_records = []
+        self._pending = None
+
+    def defer(self, rtype, record, offset, interned):
+        '''
+        A method to remember where a System Use entry is, to be decoded the
+        first time the entry is accessed.
+
+        Parameters:
+         rtype - The two byte signature of the entry.
+         record - The System Use area the entry is in.
+         offset - The offset of the entry in the System Use area.
+         interned - The utils.InternTable to share the decoded entry through,
+                    or None to not share it.
+        Returns:
+         Nothing.
+        '''
+        if self._pending is None:
+            self._pending = []
+        self._pending.append((rtype, record, offset, interned))
+
+    def present(self, name):
+        '''
+        A method to determine whether there are any entries for an attribute,
+        without decoding them.
+
+        Parameters:
+         name - The name of the attribute to check.
+        Returns:
+         True if there is at least one entry for the attribute, False
+         otherwise.
+        '''
+        if self._pending is not None:
+            for rtype, record_unused, offset_unused, interned_unused in self._pending:
+                if _SUSP_ENTRIES[rtype][0] == name:
+                    return True
+        if name in _DEFERRABLE_ATTRS:
+            name = '_' + name
+        return bool(getattr(self, name))
+
+    def _decode(self, want):
+        '''
+        An internal method to decode the deferred entries of one type, in the
+        order they were recorded.
+
+        Parameters:
+         want - The two byte signature of the entries to decode.
+        Returns:
+         Nothing.
+        '''
+        remaining = []
+        for pending in self._pending:
+            (rtype, record, offset, interned) = pending
+            if rtype != want:
+                remaining.append(pending)
+                continue
+
+            attr_unused, cls, lazy_unused = _SUSP_ENTRIES[rtype]
+            rrstr = record[offset:]
+            if rtype in _SHARED_ENTRIES:
+                # The length byte of the entry says how much of it to key on.
+                key = rrstr[:bytearray([rrstr[2]])[0]]
+                setattr(self, '_' + _SUSP_ENTRIES[rtype][0],
+                        utils.parse_record(interned, cls, key, rrstr))
+                continue
+
+            rec = cls()
+            if rtype == b'SL':
+                previous_continued = False
+                if self._sl_records:
+                    previous_continued = self._sl_records[-1].last_component_continued()
+                rec.parse(rrstr, previous_continued)
+                self._sl_records.append(rec)
+            else:
+                rec.parse(rrstr)
+                setattr(self, '_' + _SUSP_ENTRIES[rtype][0], rec)
+
+        self._pending = remaining or None
+
+    def _discard(self, want):
+        '''
+        An internal method to throw away the deferred entries of one type,
+        since the attribute is being replaced.
+
+        Parameters:
+         want - The two byte signature of the entries to throw away.
+        Returns:
+         Nothing.
+        '''
+        if self._pending is not None:
+            self._pending = [p for p in self._pending if p[0] != want] or None
+
+    @property
+    def px_record(self):
+        '''
+        The Rock Ridge POSIX File Attributes record, or None.
+        '''
+        if self._pending is not None:
+            self._decode(b'PX')
+        return self._px_record
+
+    @px_record.setter
+    def px_record(self, value):
+        self._discard(b'PX')
+        self._px_record = value
+
+    @property
+    def pn_record(self):
+        '''
+        The Rock Ridge POSIX Device Number record, or None.
+        '''
+        if self._pending is not None:
+            self._decode(b'PN')
+        return self._pn_record
+
+    @pn_record.setter
+    def pn_record(self, value):
+        self._discard(b'PN')
+        self._pn_record = value
+
+    @property
+    def sl_records(self):
+        '''
+        The list of Rock Ridge Symbolic Link records.
+        '''
+        if self._pending is not None:
+            self._decode(b'SL')
+        return self._sl_records
+
+    @sl_records.setter
+    def sl_records(self, value):
+        self._discard(b'SL')
+        self._sl_records = value
+
+    @property
+    def tf_record(self):
+        '''
+        The Rock Ridge Time Stamp record, or None.
+        '''
+        if self._pending is not None:
+            self._decode(b'TF')
+        return self._tf_record
+
+    @tf_record.setter
+    def tf_record(self, value):
+        self._discard(b'TF')
+        self._tf_record = value
 
 
 # This is the class that implements the Rock Ridge extensions for PyCdlib.  The
@@ -2014,9 +2235,10 @@ class RockRidge(object):
         Returns:
          True if we have already parsed an entry of the named type, False otherwise.
         '''
-        return getattr(self.dr_entries, name) or getattr(self.ce_entries, name)
+        return self.dr_entries.present(name) or self.ce_entries.present(name)
 
-    def parse(self, record, is_first_dir_record_of_root, bytes_to_skip, continuation):
+    def parse(self, record, is_first_dir_record_of_root, bytes_to_skip,
+              continuation, interned=None):
         '''
         Method to parse a rock ridge record.
 
@@ -2030,6 +2252,8 @@ class RockRidge(object):
                          record.
          continuation - Whether the new entries should go in the continuation
                         list or in the DR list.
+         interned - The utils.InternTable to share identical RR, PX, and TF
+                    entries through, or None to not share them.
         Returns:
          Nothing.
         '''
@@ -2049,6 +2273,7 @@ class RockRidge(object):
         has_es_record = False
         sf_record_length = None
         er_id = None
+        seen = set()
         while True:
             if left == 0:
                 break
@@ -2060,17 +2285,20 @@ class RockRidge(object):
             elif left < 4:
                 raise pycdlibexception.PyCdlibInvalidISO('Not enough bytes left in the System Use field')
 
-            (rtype, su_len, su_entry_version) = struct.unpack_from('=2sBB', record[:offset + 4], offset)
+            (rtype, su_len, su_entry_version) = _STRUCT_2sBB.unpack_from(record, offset)
             if su_entry_version != SU_ENTRY_VERSION:
                 raise pycdlibexception.PyCdlibInvalidISO('Invalid RR version %d!' % su_entry_version)
 
-            recslice = record[offset:]
+            entry = _SUSP_ENTRIES.get(rtype)
+            if entry is None:
+                raise pycdlibexception.PyCdlibInvalidISO('Unknown SUSP record')
+            (attr, cls, lazy) = entry
 
-            if rtype in (b'SP', b'RR', b'CE', b'PX', b'ST', b'ER',
-                         b'PN', b'CL', b'PL', b'RE', b'TF', b'SF'):
-                recname = rtype.decode('utf-8').lower() + '_record'
-                if self.has_entry(recname):
-                    raise pycdlibexception.PyCdlibInvalidISO('Only single SP record supported')
+            # Only the continuation area can repeat an entry of the directory
+            # record itself, so that is the only time the other entries have to
+            # be looked at.
+            if attr.endswith('_record') and (rtype in seen or (continuation and self.has_entry(attr))):
+                raise pycdlibexception.PyCdlibInvalidISO('Only single SP record supported')
 
             if rtype == b'SP':
                 if left < 7 or not is_first_dir_record_of_root:
@@ -2079,72 +2307,44 @@ class RockRidge(object):
                 # OK, this is the first Directory Record of the root
                 # directory, which means we should check it for the SUSP/RR
                 # extension, which is exactly 7 bytes and starts with 'SP'.
-
-                entry_list.sp_record = RRSPRecord()
-                entry_list.sp_record.parse(recslice)
-            elif rtype == b'RR':
-                entry_list.rr_record = RRRRRecord()
-                entry_list.rr_record.parse(recslice)
-            elif rtype == b'CE':
-                if self.has_entry('ce_record'):
-                    raise pycdlibexception.PyCdlibInvalidISO('Only single CE record supported')
-
-                entry_list.ce_record = RRCERecord()
-                entry_list.ce_record.parse(recslice)
-            elif rtype == b'PX':
-                entry_list.px_record = RRPXRecord()
-                px_record_length = entry_list.px_record.parse(recslice)
-            elif rtype == b'PD':
-                pd = RRPDRecord()
-                pd.parse(recslice)
-                entry_list.pd_records.append(pd)
             elif rtype == b'ST':
                 if entry_list.st_record is not None:
                     raise pycdlibexception.PyCdlibInvalidISO('Only one ST record per SUSP area supported')
                 if su_len != 4:
                     raise pycdlibexception.PyCdlibInvalidISO('Invalid length on rock ridge extension')
-                entry_list.st_record = RRSTRecord()
-                entry_list.st_record.parse(recslice)
-            elif rtype == b'ER':
-                entry_list.er_record = RRERRecord()
-                entry_list.er_record.parse(recslice)
-                er_id = entry_list.er_record.ext_id
+            elif rtype == b'PX':
+                # The length of the PX record is all that is needed to
+                # determine the version, so the record itself can wait.
+                if su_len not in (36, 44):
+                    raise pycdlibexception.PyCdlibInvalidISO('Invalid length on Rock Ridge PX record')
+                px_record_length = su_len
             elif rtype == b'ES':
-                es = RRESRecord()
-                es.parse(recslice)
-                entry_list.es_records.append(es)
                 has_es_record = True
-            elif rtype == b'PN':
-                entry_list.pn_record = RRPNRecord()
-                entry_list.pn_record.parse(recslice)
-            elif rtype == b'SL':
-                new_sl_record = RRSLRecord()
-                previous_continued = False
-                if entry_list.sl_records:
-                    previous_continued = entry_list.sl_records[-1].last_component_continued()
-                new_sl_record.parse(recslice, previous_continued)
-                entry_list.sl_records.append(new_sl_record)
-            elif rtype == b'NM':
-                new_nm_record = RRNMRecord()
-                new_nm_record.parse(recslice)
-                entry_list.nm_records.append(new_nm_record)
-            elif rtype == b'CL':
-                entry_list.cl_record = RRCLRecord()
-                entry_list.cl_record.parse(recslice)
-            elif rtype == b'PL':
-                entry_list.pl_record = RRPLRecord()
-                entry_list.pl_record.parse(recslice)
-            elif rtype == b'RE':
-                entry_list.re_record = RRRERecord()
-                entry_list.re_record.parse(recslice)
-            elif rtype == b'TF':
-                entry_list.tf_record = RRTFRecord()
-                entry_list.tf_record.parse(recslice)
-            elif rtype == b'SF':
-                entry_list.sf_record = RRSFRecord()
-                sf_record_length = entry_list.sf_record.parse(recslice)
+
+            seen.add(rtype)
+
+            if lazy:
+                if not isinstance(record, bytes):
+                    # Don't hold on to a view of a mapped ISO.
+                    record = bytes(record)
+                entry_list.defer(rtype, record, offset, interned)
+            elif rtype in _SHARED_ENTRIES:
+                setattr(entry_list, attr,
+                        utils.parse_record(interned, cls, record[offset:offset + su_len],
+                                           record[offset:]))
             else:
-                raise pycdlibexception.PyCdlibInvalidISO('Unknown SUSP record')
+                new_rec = cls()
+                ret = new_rec.parse(record[offset:])
+                if attr.endswith('_records'):
+                    getattr(entry_list, attr).append(new_rec)
+                else:
+                    setattr(entry_list, attr, new_rec)
+
+                if rtype == b'ER':
+                    er_id = new_rec.ext_id
+                elif rtype == b'SF':
+                    sf_record_length = ret
+
             offset += su_len
             left -= su_len
 
@@ -2177,9 +2377,8 @@ class RockRidge(object):
             else:
                 self.rr_version = '1.09'
 
-        namelist = [nm.posix_name for nm in self.dr_entries.nm_records]
-        namelist.extend([nm.posix_name for nm in self.ce_entries.nm_records])
-        self._full_name = b''.join(namelist)
+        # The name is put together the first time it is asked for.
+        self._full_name = None
 
         self._initialized = True
 
@@ -2663,9 +2862,11 @@ class RockRidge(object):
         if self.dr_entries.px_record is None:
             if self.ce_entries.px_record is None:
                 raise pycdlibexception.PyCdlibInvalidInput('No Rock Ridge file links')
-            self.ce_entries.px_record.posix_file_links += 1
+            entries = self.ce_entries
         else:
-            self.dr_entries.px_record.posix_file_links += 1
+            entries = self.dr_entries
+        entries.px_record = utils.unshare(entries.px_record)
+        entries.px_record.posix_file_links += 1
 
     def remove_from_file_links(self):
         '''
@@ -2682,9 +2883,11 @@ class RockRidge(object):
         if self.dr_entries.px_record is None:
             if self.ce_entries.px_record is None:
                 raise pycdlibexception.PyCdlibInvalidInput('No Rock Ridge file links')
-            self.ce_entries.px_record.posix_file_links -= 1
+            entries = self.ce_entries
         else:
-            self.dr_entries.px_record.posix_file_links -= 1
+            entries = self.dr_entries
+        entries.px_record = utils.unshare(entries.px_record)
+        entries.px_record.posix_file_links -= 1
 
     def copy_file_links(self, src):
         '''
@@ -2711,9 +2914,11 @@ class RockRidge(object):
         if self.dr_entries.px_record is None:
             if self.ce_entries.px_record is None:
                 raise pycdlibexception.PyCdlibInvalidInput('No Rock Ridge file links')
-            self.ce_entries.px_record.posix_file_links = num_links
+            entries = self.ce_entries
         else:
-            self.dr_entries.px_record.posix_file_links = num_links
+            entries = self.dr_entries
+        entries.px_record = utils.unshare(entries.px_record)
+        entries.px_record.posix_file_links = num_links
 
     def get_file_mode(self):
         '''
@@ -2746,13 +2951,18 @@ class RockRidge(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('Rock Ridge extension not yet initialized')
 
+        if self._full_name is None:
+            namelist = [nm.posix_name for nm in self.dr_entries.nm_records]
+            namelist.extend([nm.posix_name for nm in self.ce_entries.nm_records])
+            self._full_name = b''.join(namelist)
+
         return self._full_name
 
     def _is_symlink(self):
         '''
         Internal method to determine whether this Rock Ridge entry is a symlink.
         '''
-        return len(self.dr_entries.sl_records) > 0 or len(self.ce_entries.sl_records) > 0
+        return self.dr_entries.present('sl_records') or self.ce_entries.present('sl_records')
 
     def is_symlink(self):
         '''
@@ -2994,12 +3204,17 @@ class RockRidgeContinuationBlock(object):
     Entries.  However, this is just used for tracking how many entries will
     fit in one block; all tracking of the actual data must be done elsewhere.
     '''
-    __slots__ = ('_extent', '_max_block_size', '_entries')
+    __slots__ = ('_extent', '_max_block_size', '_entries', '_owner',
+                 '_position')
 
     def __init__(self, extent, max_block_size):
         self._extent = extent
         self._max_block_size = max_block_size
         self._entries = []
+        # The RockRidgeContinuationBlocks this block belongs to (if any), and
+        # the position of this block in it.
+        self._owner = None
+        self._position = None
 
     def extent_location(self):
         '''
@@ -3021,8 +3236,39 @@ class RockRidgeContinuationBlock(object):
         Returns:
          Nothing.
         '''
+        if self._owner is not None:
+            self._owner.block_moved(self, self._extent, loc)
         self._extent = loc
 
+    def largest_gap(self):
+        '''
+        A method to get the size of the largest free gap in this block.
+
+        Parameters:
+         None.
+        Returns:
+         The size of the largest gap in this block, in bytes.
+        '''
+        largest = 0
+        lastend = 0
+        for entry in self._entries:
+            largest = max(largest, entry.offset - lastend)
+            lastend = entry.offset + entry.length
+        return max(largest, self._max_block_size - lastend)
+
+    def _changed(self):
+        '''
+        An internal method to let the owner of this block know that the free
+        space in it changed.
+
+        Parameters:
+         None.
+        Returns:
+         Nothing.
+        '''
+        if self._owner is not None:
+            self._owner.update_gap(self)
+
     def track_entry(self, offset, length):
         '''
         Track an already allocated entry in this Rock Ridge Continuation Block.
@@ -3033,11 +3279,18 @@ class RockRidgeContinuationBlock(object):
         Returns:
          Nothing.
         '''
-        newlen = offset + length - 1
-        for entry in self._entries:
-            thislen = entry.offset + entry.length - 1
-            overlap = range(max(entry.offset, offset), min(thislen, newlen) + 1)
-            if overlap:
+        # The entries never overlap each other, so only the neighbors of the
+        # new entry can overlap it.
+        new_entry = RockRidgeContinuationEntry(offset, length)
+        index = bisect.bisect_left(self._entries, new_entry)
+        newend = offset + length
+        if index > 0:
+            prev = self._entries[index - 1]
+            if prev.offset + prev.length > offset and prev.offset < newend:
+                raise pycdlibexception.PyCdlibInvalidISO('Overlapping CE regions on the ISO')
+        if index < len(self._entries):
+            nxt = self._entries[index]
+            if nxt.offset < newend and nxt.offset + nxt.length > offset:
                 raise pycdlibexception.PyCdlibInvalidISO('Overlapping CE regions on the ISO')
 
         # OK, there were no overlaps with existing entries.  Let's see if
@@ -3046,7 +3299,8 @@ class RockRidgeContinuationBlock(object):
             raise pycdlibexception.PyCdlibInvalidISO('No room in continuation block to track entry')
 
         # We passed all of the checks; add the new entry to track in.
-        bisect.insort_left(self._entries, RockRidgeContinuationEntry(offset, length))
+        self._entries.insert(index, new_entry)
+        self._changed()
 
     def add_entry(self, length):
         '''
@@ -3092,6 +3346,7 @@ class RockRidgeContinuationBlock(object):
         if offset is not None:
             bisect.insort_left(self._entries,
                                RockRidgeContinuationEntry(offset, length))
+            self._changed()
 
         return offset
 
@@ -3106,9 +3361,156 @@ class RockRidgeContinuationBlock(object):
         Returns:
          Nothing.
         '''
-        for index, entry in enumerate(self._entries):
-            if entry.offset == offset and entry.length == length:
-                del self._entries[index]
-                break
-        else:
+        index = bisect.bisect_left(self._entries,
+                                   RockRidgeContinuationEntry(offset, length))
+        if index == len(self._entries) or self._entries[index].offset != offset or self._entries[index].length != length:
             raise pycdlibexception.PyCdlibInternalError('Could not find an entry for the RR CE entry in the CE block!')
+        del self._entries[index]
+        self._changed()
+
+
+class RockRidgeContinuationBlocks(object):
+    '''
+    A class representing all of the Rock Ridge Continuation Blocks of a Volume
+    Descriptor, in the order they were allocated.  New entries go in the first
+    block with a gap that is big enough, which keeps the number of blocks
+    down.  To find that block without looking at every block, the size of the
+    largest gap of each block is kept in a tree where every node holds the
+    maximum of its children; the blocks are also indexed by extent, so
+    tracking the entries found while parsing does not have to search either.
+    '''
+    __slots__ = ('_blocks', '_by_extent', '_tree', '_leaves')
+
+    def __init__(self):
+        self._blocks = []
+        self._by_extent = {}
+        self._leaves = 1
+        self._tree = [0, 0]
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __iter__(self):
+        return iter(self._blocks)
+
+    def __getitem__(self, index):
+        return self._blocks[index]
+
+    def _append(self, block):
+        '''
+        An internal method to add a new block after all of the existing ones.
+
+        Parameters:
+         block - The RockRidgeContinuationBlock to add.
+        Returns:
+         Nothing.
+        '''
+        block._owner = self  # pylint: disable=protected-access
+        block._position = len(self._blocks)  # pylint: disable=protected-access
+        self._blocks.append(block)
+        self._by_extent.setdefault(block.extent_location(), []).append(block)
+
+        if len(self._blocks) > self._leaves:
+            # Out of room in the tree; double it and fill it back in.
+            self._leaves *= 2
+            self._tree = [0] * (2 * self._leaves)
+            for index, old in enumerate(self._blocks):
+                self._tree[self._leaves + index] = old.largest_gap()
+            for index in range(self._leaves - 1, 0, -1):
+                self._tree[index] = max(self._tree[2 * index],
+                                        self._tree[2 * index + 1])
+        else:
+            self.update_gap(block)
+
+    def update_gap(self, block):
+        '''
+        A method to update the tree after the free space in a block changed.
+
+        Parameters:
+         block - The RockRidgeContinuationBlock that changed.
+        Returns:
+         Nothing.
+        '''
+        index = self._leaves + block._position  # pylint: disable=protected-access
+        self._tree[index] = block.largest_gap()
+        index //= 2
+        while index > 0:
+            self._tree[index] = max(self._tree[2 * index],
+                                    self._tree[2 * index + 1])
+            index //= 2
+
+    def block_moved(self, block, old_extent, new_extent):
+        '''
+        A method to update the extent index when a block is moved.
+
+        Parameters:
+         block - The RockRidgeContinuationBlock that is moving.
+         old_extent - The extent the block was at.
+         new_extent - The extent the block is moving to.
+        Returns:
+         Nothing.
+        '''
+        old_list = self._by_extent.get(old_extent)
+        if old_list is not None and block in old_list:
+            old_list.remove(block)
+            if not old_list:
+                del self._by_extent[old_extent]
+        new_list = self._by_extent.setdefault(new_extent, [])
+        new_list.append(block)
+        new_list.sort(key=lambda b: b._position)  # pylint: disable=protected-access
+
+    def track_entry(self, extent, offset, length, block_size):
+        '''
+        A method to track an already allocated entry, adding a block for the
+        extent if there is not one already.
+
+        Parameters:
+         extent - The extent that the entry lives at.
+         offset - The offset within the extent that the entry lives at.
+         length - The length of the entry.
+         block_size - The size of a block.
+        Returns:
+         The RockRidgeContinuationBlock the entry was tracked in.
+        '''
+        blocks = self._by_extent.get(extent)
+        if blocks:
+            block = blocks[0]
+        else:
+            block = RockRidgeContinuationBlock(extent, block_size)
+            self._append(block)
+
+        block.track_entry(offset, length)
+
+        return block
+
+    def add_entry(self, length, block_size):
+        '''
+        A method to add a new entry in the first block it fits in, adding a
+        new block if it does not fit anywhere.
+
+        Parameters:
+         length - The length of the entry to add.
+         block_size - The size of a block.
+        Returns:
+         A 3-tuple consisting of whether a new block was added, the
+         RockRidgeContinuationBlock the entry was added to, and the offset
+         within the block that the entry was added at.
+        '''
+        added_block = False
+        if self._blocks and self._tree[1] >= length:
+            # Walk down to the leftmost block with a big enough gap.
+            index = 1
+            while index < self._leaves:
+                index *= 2
+                if self._tree[index] < length:
+                    index += 1
+            block = self._blocks[index - self._leaves]
+        else:
+            block = RockRidgeContinuationBlock(0, block_size)
+            self._append(block)
+            added_block = True
+
+        offset = block.add_entry(length)
+
+        return (added_block, block, offset)
+
@@ -26,84 +26,21 @@ import struct
 import sys
 import time
 
+import pycdlib.checksum as checksum
 import pycdlib.pycdlibexception as pycdlibexception
 import pycdlib.utils as utils
 
-# This is the CRC CCITT table generated with a polynomial of 0x11021 and
-# 16-bits.  The following code will re-generate the table:
-#
-# def _bytecrc(crc, poly, n):
-#    mask = 1<<(n-1)
-#    for i in range(8):
-#        if crc & mask:
-#            crc = (crc << 1) ^ poly
-#        else:
-#            crc = crc << 1
-#    mask = (1<<n) - 1
-#    crc = crc & mask
-#    return crc
-#
-# def _mkTable(poly, n):
-#    mask = (1<<n) - 1
-#    poly = poly & mask
-#    table = [_bytecrc(i<<(n-8),poly,n) for i in range(256)]
-#    return table
-
-crc_ccitt_table = (0, 4129, 8258, 12387, 16516, 20645, 24774, 28903, 33032,
-                   37161, 41290, 45419, 49548, 53677, 57806, 61935, 4657, 528,
-                   12915, 8786, 21173, 17044, 29431, 25302, 37689, 33560, 45947,
-                   41818, 54205, 50076, 62463, 58334, 9314, 13379, 1056, 5121,
-                   25830, 29895, 17572, 21637, 42346, 46411, 34088, 38153,
-                   58862, 62927, 50604, 54669, 13907, 9842, 5649, 1584, 30423,
-                   26358, 22165, 18100, 46939, 42874, 38681, 34616, 63455, 59390,
-                   55197, 51132, 18628, 22757, 26758, 30887, 2112, 6241, 10242,
-                   14371, 51660, 55789, 59790, 63919, 35144, 39273, 43274, 47403,
-                   23285, 19156, 31415, 27286, 6769, 2640, 14899, 10770, 56317,
-                   52188, 64447, 60318, 39801, 35672, 47931, 43802, 27814, 31879,
-                   19684, 23749, 11298, 15363, 3168, 7233, 60846, 64911, 52716,
-                   56781, 44330, 48395, 36200, 40265, 32407, 28342, 24277, 20212,
-                   15891, 11826, 7761, 3696, 65439, 61374, 57309, 53244, 48923,
-                   44858, 40793, 36728, 37256, 33193, 45514, 41451, 53516, 49453,
-                   61774, 57711, 4224, 161, 12482, 8419, 20484, 16421, 28742,
-                   24679, 33721, 37784, 41979, 46042, 49981, 54044, 58239, 62302,
-                   689, 4752, 8947, 13010, 16949, 21012, 25207, 29270, 46570,
-                   42443, 38312, 34185, 62830, 58703, 54572, 50445, 13538, 9411,
-                   5280, 1153, 29798, 25671, 21540, 17413, 42971, 47098, 34713,
-                   38840, 59231, 63358, 50973, 55100, 9939, 14066, 1681, 5808,
-                   26199, 30326, 17941, 22068, 55628, 51565, 63758, 59695,
-                   39368, 35305, 47498, 43435, 22596, 18533, 30726, 26663, 6336,
-                   2273, 14466, 10403, 52093, 56156, 60223, 64286, 35833, 39896,
-                   43963, 48026, 19061, 23124, 27191, 31254, 2801, 6864, 10931,
-                   14994, 64814, 60687, 56684, 52557, 48554, 44427, 40424, 36297,
-                   31782, 27655, 23652, 19525, 15522, 11395, 7392, 3265, 61215,
-                   65342, 53085, 57212, 44955, 49082, 36825, 40952, 28183, 32310,
-                   20053, 24180, 11923, 16050, 3793, 7920)
-
-
 have_py_3 = True
 if sys.version_info.major == 2:
     have_py_3 = False
 
+# The logical block size of a UDF filesystem; the Logical Volume Descriptor
+# is rejected at parse time if it uses anything else.
+_LOGICAL_BLOCK_SIZE = 2048
 
-def crc_ccitt(data):
-    '''
-    Calculate the CRC over a range of bytes using the CCITT polynomial.
-
-    Parameters:
-     data - The array of bytes to calculate the CRC over.
-    Returns:
-     The CCITT CRC of the data.
-    '''
-    crc = 0
-    if not have_py_3:
-        for x in data:
-            crc = crc_ccitt_table[ord(x) ^ ((crc >> 8) & 0xFF)] ^ ((crc << 8) & 0xFF00)
-    else:
-        mv = memoryview(data)
-        for x in mv.tobytes():
-            crc = crc_ccitt_table[x ^ ((crc >> 8) & 0xFF)] ^ ((crc << 8) & 0xFF00)
-
-    return crc
+# The largest length that we record in a single allocation descriptor; see
+# the comment in UDFFileEntry.new() for where this number comes from.
+_MAX_ALLOC_LEN = 0x3ffff800
 
 
 def _ostaunicode(src):
@@ -158,6 +95,7 @@ class BEAVolumeStructure(object):
     __slots__ = ('_initialized', 'orig_extent_loc', 'new_extent_loc')
 
     FMT = '=B5sB2041s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -176,7 +114,7 @@ class BEAVolumeStructure(object):
             raise pycdlibexception.PyCdlibInternalError('BEA Volume Structure already initialized')
 
         (structure_type, standard_ident, structure_version,
-         reserved_unused) = struct.unpack_from(self.FMT, data, 0)
+         reserved_unused) = self._STRUCT.unpack_from(data, 0)
 
         if structure_type != 0:
             raise pycdlibexception.PyCdlibInvalidISO('Invalid structure type')
@@ -204,7 +142,7 @@ class BEAVolumeStructure(object):
         '''
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('BEA Volume Structure not initialized')
-        return struct.pack(self.FMT, 0, b'BEA01', 1, b'\x00' * 2041)
+        return self._STRUCT.pack(0, b'BEA01', 1, b'\x00' * 2041)
 
     def new(self):
         '''
@@ -244,6 +182,7 @@ class NSRVolumeStructure(object):
     __slots__ = ('_initialized', 'orig_extent_loc', 'new_extent_loc')
 
     FMT = '=B5sB2041s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -262,7 +201,7 @@ class NSRVolumeStructure(object):
             raise pycdlibexception.PyCdlibInternalError('UDF NSR Volume Structure already initialized')
 
         (structure_type, standard_ident, structure_version,
-         reserved_unused) = struct.unpack_from(self.FMT, data, 0)
+         reserved_unused) = self._STRUCT.unpack_from(data, 0)
 
         if structure_type != 0:
             raise pycdlibexception.PyCdlibInvalidISO('Invalid structure type')
@@ -290,7 +229,7 @@ class NSRVolumeStructure(object):
         '''
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF NSR Volume Structure not initialized')
-        return struct.pack(self.FMT, 0, b'NSR02', 1, b'\x00' * 2041)
+        return self._STRUCT.pack(0, b'NSR02', 1, b'\x00' * 2041)
 
     def new(self):
         '''
@@ -330,6 +269,7 @@ class TEAVolumeStructure(object):
     __slots__ = ('_initialized', 'orig_extent_loc', 'new_extent_loc')
 
     FMT = '=B5sB2041s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -348,7 +288,7 @@ class TEAVolumeStructure(object):
             raise pycdlibexception.PyCdlibInternalError('TEA Volume Structure already initialized')
 
         (structure_type, standard_ident, structure_version,
-         reserved_unused) = struct.unpack_from(self.FMT, data, 0)
+         reserved_unused) = self._STRUCT.unpack_from(data, 0)
 
         if structure_type != 0:
             raise pycdlibexception.PyCdlibInvalidISO('Invalid structure type')
@@ -376,7 +316,7 @@ class TEAVolumeStructure(object):
         '''
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF TEA Volume Structure not initialized')
-        return struct.pack(self.FMT, 0, b'TEA01', 1, b'\x00' * 2041)
+        return self._STRUCT.pack(0, b'TEA01', 1, b'\x00' * 2041)
 
     def new(self):
         '''
@@ -418,26 +358,9 @@ def _compute_csum(data):
     Returns:
      The checksum.
     '''
-    def identity(x):
-        '''
-        The identity function so we can use a function for python2/3
-        compatibility.
-        '''
-        return x
-
-    if isinstance(data, str):
-        myord = ord
-    elif isinstance(data, bytes):
-        myord = identity
-    elif isinstance(data, bytearray):
-        myord = identity
-    csum = 0
-    for byte in data:
-        csum += myord(byte)
-    csum -= myord(data[4])
-    csum %= 256
-
-    return csum
+    # The checksum covers every byte of the tag except for the checksum
+    # itself, at offset 4.
+    return (checksum.byte_sum(data) - checksum.byte_sum(data[4:5])) % 256
 
 
 class UDFTag(object):
@@ -448,6 +371,7 @@ class UDFTag(object):
                  'tag_serial_number', 'tag_location', 'desc_crc_length')
 
     FMT = '=HHBBHHHL'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self.desc_crc_length = None
@@ -468,7 +392,7 @@ class UDFTag(object):
 
         (self.tag_ident, self.desc_version, tag_checksum, reserved,
          self.tag_serial_number, desc_crc, self.desc_crc_length,
-         self.tag_location) = struct.unpack_from(self.FMT, data, 0)
+         self.tag_location) = self._STRUCT.unpack_from(data, 0)
 
         if reserved != 0:
             raise pycdlibexception.PyCdlibInvalidISO('Reserved data not 0!')
@@ -492,7 +416,7 @@ class UDFTag(object):
         if (len(data) - 16) < self.desc_crc_length:
             raise pycdlibexception.PyCdlibInternalError('Not enough CRC bytes to compute (expected at least %d, got %d)' % (self.desc_crc_length, len(data) - 16))
 
-        if desc_crc != crc_ccitt(data[16:16 + self.desc_crc_length]):
+        if desc_crc != checksum.crc_ccitt(data[16:16 + self.desc_crc_length]):
             raise pycdlibexception.PyCdlibInvalidISO('Tag CRC does not match!')
 
         self._initialized = True
@@ -516,10 +440,10 @@ class UDFTag(object):
         # We need to compute the checksum, but we'll do that by first creating
         # the output buffer with the csum field set to 0, computing the csum,
         # and then setting that record back as usual.
-        rec = bytearray(struct.pack(self.FMT, self.tag_ident, self.desc_version,
-                                    0, 0, self.tag_serial_number,
-                                    crc_ccitt(crc_bytes[:crc_byte_len]),
-                                    crc_byte_len, self.tag_location))
+        rec = bytearray(self._STRUCT.pack(self.tag_ident, self.desc_version,
+                                          0, 0, self.tag_serial_number,
+                                          checksum.crc_ccitt(crc_bytes[:crc_byte_len]),
+                                          crc_byte_len, self.tag_location))
 
         rec[4] = _compute_csum(rec)
 
@@ -555,6 +479,7 @@ class UDFAnchorVolumeStructure(object):
                  'reserve_vd_extent', 'desc_tag')
 
     FMT = '=16sLLLL'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -575,7 +500,7 @@ class UDFAnchorVolumeStructure(object):
 
         (tag_unused, self.main_vd_length, self.main_vd_extent,
          self.reserve_vd_length,
-         self.reserve_vd_extent) = struct.unpack_from(self.FMT, data, 0)
+         self.reserve_vd_extent) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -597,9 +522,9 @@ class UDFAnchorVolumeStructure(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Anchor Volume Descriptor not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16, self.main_vd_length,
-                          self.main_vd_extent, self.reserve_vd_length,
-                          self.reserve_vd_extent)[16:] + b'\x00' * 480
+        rec = self._STRUCT.pack(b'\x00' * 16, self.main_vd_length,
+                                self.main_vd_extent, self.reserve_vd_length,
+                                self.reserve_vd_extent)[16:] + b'\x00' * 480
 
         return self.desc_tag.record(rec) + rec
 
@@ -669,6 +594,7 @@ class UDFTimestamp(object):
                  'microseconds', 'timetype', 'tz')
 
     FMT = '=BBHBBBBBBBB'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -687,7 +613,7 @@ class UDFTimestamp(object):
 
         (tz, timetype, self.year, self.month, self.day, self.hour, self.minute,
          self.second, self.centiseconds, self.hundreds_microseconds,
-         self.microseconds) = struct.unpack_from(self.FMT, data, 0)
+         self.microseconds) = self._STRUCT.unpack_from(data, 0)
 
         self.timetype = timetype >> 4
 
@@ -734,10 +660,10 @@ class UDFTimestamp(object):
         newtz = tmp & 0xff
         newtimetype = ((tmp >> 8) & 0x0f) | (self.timetype << 4)
 
-        return struct.pack(self.FMT, newtz, newtimetype, self.year, self.month,
-                           self.day, self.hour, self.minute, self.second,
-                           self.centiseconds, self.hundreds_microseconds,
-                           self.microseconds)
+        return self._STRUCT.pack(newtz, newtimetype, self.year, self.month,
+                                 self.day, self.hour, self.minute, self.second,
+                                 self.centiseconds, self.hundreds_microseconds,
+                                 self.microseconds)
 
     def new(self):
         '''
@@ -778,6 +704,7 @@ class UDFEntityID(object):
     __slots__ = ('_initialized', 'flags', 'identifier', 'suffix')
 
     FMT = '=B23s8s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -794,7 +721,7 @@ class UDFEntityID(object):
         if self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Entity ID already initialized')
 
-        (self.flags, self.identifier, self.suffix) = struct.unpack_from(self.FMT, data, 0)
+        (self.flags, self.identifier, self.suffix) = self._STRUCT.unpack_from(data, 0)
 
         self._initialized = True
 
@@ -810,7 +737,7 @@ class UDFEntityID(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Entity ID not initialized')
 
-        return struct.pack(self.FMT, self.flags, self.identifier, self.suffix)
+        return self._STRUCT.pack(self.flags, self.identifier, self.suffix)
 
     def new(self, flags=0, identifier=b'', suffix=b''):
         '''
@@ -853,6 +780,7 @@ class UDFPrimaryVolumeDescriptor(object):
                  'app_ident', 'impl_ident', 'max_interchange_level')
 
     FMT = '=16sLL32sHHHHLL128s64s64sLLLL32s12s32s64sLH22s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -879,7 +807,7 @@ class UDFPrimaryVolumeDescriptor(object):
          self.vol_copyright_length, self.vol_copyright_extent, app_ident,
          recording_date, impl_ident, self.implementation_use,
          self.predecessor_vol_desc_location, flags,
-         reserved) = struct.unpack_from(self.FMT, data, 0)
+         reserved) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -926,16 +854,16 @@ class UDFPrimaryVolumeDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Primary Volume Descriptor not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16,
-                          self.vol_desc_seqnum, self.desc_num,
-                          self.vol_ident, 1, 1, 2, self.max_interchange_level, 1, 1,
-                          self.vol_set_ident,
-                          self.desc_char_set, self.explanatory_char_set,
-                          self.vol_abstract_length, self.vol_abstract_extent,
-                          self.vol_copyright_length, self.vol_copyright_extent,
-                          self.app_ident.record(), self.recording_date.record(),
-                          self.impl_ident.record(), self.implementation_use,
-                          self.predecessor_vol_desc_location, 0, b'\x00' * 22)[16:]
+        rec = self._STRUCT.pack(b'\x00' * 16,
+                                self.vol_desc_seqnum, self.desc_num,
+                                self.vol_ident, 1, 1, 2, self.max_interchange_level, 1, 1,
+                                self.vol_set_ident,
+                                self.desc_char_set, self.explanatory_char_set,
+                                self.vol_abstract_length, self.vol_abstract_extent,
+                                self.vol_copyright_length, self.vol_copyright_extent,
+                                self.app_ident.record(), self.recording_date.record(),
+                                self.impl_ident.record(), self.implementation_use,
+                                self.predecessor_vol_desc_location, 0, b'\x00' * 22)[16:]
         return self.desc_tag.record(rec) + rec
 
     def extent_location(self):
@@ -1021,6 +949,7 @@ class UDFImplementationUseVolumeDescriptorImplementationUse(object):
                  'lv_info2', 'lv_info3', 'impl_ident', 'impl_use')
 
     FMT = '=64s128s36s36s36s32s128s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1040,7 +969,7 @@ class UDFImplementationUseVolumeDescriptorImplementationUse(object):
 
         (self.char_set, self.log_vol_ident, self.lv_info1, self.lv_info2,
          self.lv_info3, impl_ident,
-         self.impl_use) = struct.unpack_from(self.FMT, data, 0)
+         self.impl_use) = self._STRUCT.unpack_from(data, 0)
 
         self.impl_ident = UDFEntityID()
         self.impl_ident.parse(impl_ident)
@@ -1060,9 +989,9 @@ class UDFImplementationUseVolumeDescriptorImplementationUse(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Implementation Use Volume Descriptor Implementation Use field not initialized')
 
-        return struct.pack(self.FMT, self.char_set, self.log_vol_ident,
-                           self.lv_info1, self.lv_info2, self.lv_info3,
-                           self.impl_ident.record(), self.impl_use)
+        return self._STRUCT.pack(self.char_set, self.log_vol_ident,
+                                 self.lv_info1, self.lv_info2, self.lv_info3,
+                                 self.impl_ident.record(), self.impl_use)
 
     def new(self):
         '''
@@ -1096,6 +1025,7 @@ class UDFImplementationUseVolumeDescriptor(object):
                  'vol_desc_seqnum', 'impl_use', 'desc_tag', 'impl_ident')
 
     FMT = '=16sL32s460s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1116,7 +1046,7 @@ class UDFImplementationUseVolumeDescriptor(object):
             raise pycdlibexception.PyCdlibInternalError('UDF Implementation Use Volume Descriptor already initialized')
 
         (tag_unused, self.vol_desc_seqnum, impl_ident,
-         impl_use) = struct.unpack_from(self.FMT, data, 0)
+         impl_use) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -1146,9 +1076,9 @@ class UDFImplementationUseVolumeDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Implementation Use Volume Descriptor not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16,
-                          self.vol_desc_seqnum, self.impl_ident.record(),
-                          self.impl_use.record())[16:]
+        rec = self._STRUCT.pack(b'\x00' * 16,
+                                self.vol_desc_seqnum, self.impl_ident.record(),
+                                self.impl_use.record())[16:]
         return self.desc_tag.record(rec) + rec
 
     def extent_location(self):
@@ -1217,6 +1147,7 @@ class UDFPartitionHeaderDescriptor(object):
     __slots__ = ('_initialized',)
 
     FMT = '=LLLLLLLLLL88s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1236,7 +1167,7 @@ class UDFPartitionHeaderDescriptor(object):
          unalloc_bitmap_pos, part_integrity_table_length,
          part_integrity_table_pos, freed_table_length, freed_table_pos,
          freed_bitmap_length, freed_bitmap_pos,
-         reserved_unused) = struct.unpack_from(self.FMT, data, 0)
+         reserved_unused) = self._STRUCT.unpack_from(data, 0)
 
         if unalloc_table_length != 0:
             raise pycdlibexception.PyCdlibInvalidISO('Partition Header unallocated table length not 0')
@@ -1274,7 +1205,7 @@ class UDFPartitionHeaderDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Partition Header Descriptor not initialized')
 
-        return struct.pack(self.FMT, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, b'\x00' * 88)
+        return self._STRUCT.pack(0, 0, 0, 0, 0, 0, 0, 0, 0, 0, b'\x00' * 88)
 
     def new(self):
         '''
@@ -1301,6 +1232,7 @@ class UDFPartitionVolumeDescriptor(object):
                  'desc_tag', 'part_contents', 'impl_ident', 'part_contents_use')
 
     FMT = '=16sLHH32s128sLLL32s128s156s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1322,7 +1254,7 @@ class UDFPartitionVolumeDescriptor(object):
         (tag_unused, self.vol_desc_seqnum, self.part_flags, self.part_num,
          part_contents, part_contents_use, self.access_type,
          self.part_start_location, self.part_length, impl_ident,
-         self.implementation_use, reserved_unused) = struct.unpack_from(self.FMT, data, 0)
+         self.implementation_use, reserved_unused) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -1355,13 +1287,13 @@ class UDFPartitionVolumeDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Partition Volume Descriptor not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16,
-                          self.vol_desc_seqnum, self.part_flags,
-                          self.part_num, self.part_contents.record(),
-                          self.part_contents_use.record(), self.access_type,
-                          self.part_start_location, self.part_length,
-                          self.impl_ident.record(), self.implementation_use,
-                          b'\x00' * 156)[16:]
+        rec = self._STRUCT.pack(b'\x00' * 16,
+                                self.vol_desc_seqnum, self.part_flags,
+                                self.part_num, self.part_contents.record(),
+                                self.part_contents_use.record(), self.access_type,
+                                self.part_start_location, self.part_length,
+                                self.impl_ident.record(), self.implementation_use,
+                                b'\x00' * 156)[16:]
         return self.desc_tag.record(rec) + rec
 
     def extent_location(self):
@@ -1452,6 +1384,7 @@ class UDFPartitionMap(object):
     __slots__ = ('_initialized', 'part_num')
 
     FMT = '=BBHH'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1469,7 +1402,7 @@ class UDFPartitionMap(object):
             raise pycdlibexception.PyCdlibInternalError('UDF Partition Map already initialized')
 
         (map_type, map_length, vol_seqnum,
-         self.part_num) = struct.unpack_from(self.FMT, data, 0)
+         self.part_num) = self._STRUCT.unpack_from(data, 0)
 
         if map_type != 1:
             raise pycdlibexception.PyCdlibInvalidISO('UDF Partition Map type is not 1')
@@ -1492,7 +1425,7 @@ class UDFPartitionMap(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Partition Map not initialized')
 
-        return struct.pack(self.FMT, 1, 6, 1, self.part_num)
+        return self._STRUCT.pack(1, 6, 1, self.part_num)
 
     def new(self):
         '''
@@ -1519,6 +1452,7 @@ class UDFLongAD(object):
                  'part_ref_num', 'impl_use')
 
     FMT = '=LLH6s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1535,7 +1469,7 @@ class UDFLongAD(object):
         if self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Long Allocation descriptor already initialized')
         (self.extent_length, self.log_block_num, self.part_ref_num,
-         self.impl_use) = struct.unpack_from(self.FMT, data, 0)
+         self.impl_use) = self._STRUCT.unpack_from(data, 0)
 
         self._initialized = True
 
@@ -1551,8 +1485,8 @@ class UDFLongAD(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Long AD not initialized')
 
-        return struct.pack(self.FMT, self.extent_length, self.log_block_num,
-                           self.part_ref_num, self.impl_use)
+        return self._STRUCT.pack(self.extent_length, self.log_block_num,
+                                 self.part_ref_num, self.impl_use)
 
     def new(self, length, blocknum):
         '''
@@ -1601,6 +1535,7 @@ class UDFLogicalVolumeDescriptor(object):
                  'impl_ident', 'partition_map', 'logical_volume_contents_use')
 
     FMT = '=16sL64s128sL32s16sLL32s128sLL6s66s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1624,7 +1559,7 @@ class UDFLogicalVolumeDescriptor(object):
          logical_volume_contents_use, map_table_length, num_partition_maps,
          impl_ident, self.implementation_use, self.integrity_sequence_length,
          self.integrity_sequence_extent, partition_map,
-         end_unused) = struct.unpack_from(self.FMT, data, 0)
+         end_unused) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -1668,15 +1603,15 @@ class UDFLogicalVolumeDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Logical Volume Descriptor not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16,
-                          self.vol_desc_seqnum, self.desc_char_set,
-                          self.logical_vol_ident, 2048,
-                          self.domain_ident.record(),
-                          self.logical_volume_contents_use.record(), 6, 1,
-                          self.impl_ident.record(), self.implementation_use,
-                          self.integrity_sequence_length,
-                          self.integrity_sequence_extent,
-                          self.partition_map.record(), b'\x00' * 66)[16:]
+        rec = self._STRUCT.pack(b'\x00' * 16,
+                                self.vol_desc_seqnum, self.desc_char_set,
+                                self.logical_vol_ident, 2048,
+                                self.domain_ident.record(),
+                                self.logical_volume_contents_use.record(), 6, 1,
+                                self.impl_ident.record(), self.implementation_use,
+                                self.integrity_sequence_length,
+                                self.integrity_sequence_extent,
+                                self.partition_map.record(), b'\x00' * 66)[16:]
         return self.desc_tag.record(rec) + rec
 
     def extent_location(self):
@@ -1772,6 +1707,7 @@ class UDFUnallocatedSpaceDescriptor(object):
                  'vol_desc_seqnum', 'desc_tag')
 
     FMT = '=16sLL488s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1791,7 +1727,7 @@ class UDFUnallocatedSpaceDescriptor(object):
             raise pycdlibexception.PyCdlibInternalError('UDF Unallocated Space Descriptor already initialized')
 
         (tag_unused, self.vol_desc_seqnum,
-         num_alloc_descriptors, end_unused) = struct.unpack_from(self.FMT, data, 0)
+         num_alloc_descriptors, end_unused) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -1816,8 +1752,8 @@ class UDFUnallocatedSpaceDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Unallocated Space Descriptor not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16,
-                          self.vol_desc_seqnum, 0, b'\x00' * 488)[16:]
+        rec = self._STRUCT.pack(b'\x00' * 16,
+                                self.vol_desc_seqnum, 0, b'\x00' * 488)[16:]
         return self.desc_tag.record(rec) + rec
 
     def extent_location(self):
@@ -1880,6 +1816,7 @@ class UDFTerminatingDescriptor(object):
                  'desc_tag')
 
     FMT = '=16s496s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1917,7 +1854,7 @@ class UDFTerminatingDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Terminating Descriptor not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16, b'\x00' * 496)[16:]
+        rec = self._STRUCT.pack(b'\x00' * 16, b'\x00' * 496)[16:]
         return self.desc_tag.record(rec) + rec
 
     def extent_location(self):
@@ -1979,6 +1916,7 @@ class UDFLogicalVolumeHeaderDescriptor(object):
     __slots__ = ('_initialized', 'unique_id')
 
     FMT = '=Q24s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -1994,7 +1932,7 @@ class UDFLogicalVolumeHeaderDescriptor(object):
         '''
         if self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Logical Volume Header Descriptor already initialized')
-        (self.unique_id, reserved_unused) = struct.unpack_from(self.FMT, data, 0)
+        (self.unique_id, reserved_unused) = self._STRUCT.unpack_from(data, 0)
 
         self._initialized = True
 
@@ -2011,7 +1949,7 @@ class UDFLogicalVolumeHeaderDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Logical Volume Header Descriptor not initialized')
 
-        return struct.pack(self.FMT, self.unique_id, b'\x00' * 24)
+        return self._STRUCT.pack(self.unique_id, b'\x00' * 24)
 
     def new(self):
         '''
@@ -2039,6 +1977,7 @@ class UDFLogicalVolumeImplementationUse(object):
                  'max_udf_write_revision', 'impl_id', 'impl_use')
 
     FMT = '=32sLLHHH'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -2057,12 +1996,12 @@ class UDFLogicalVolumeImplementationUse(object):
 
         (impl_id, self.num_files, self.num_dirs, self.min_udf_read_revision,
          self.min_udf_write_revision,
-         self.max_udf_write_revision) = struct.unpack_from(self.FMT, data, 0)
+         self.max_udf_write_revision) = self._STRUCT.unpack_from(data, 0)
 
         self.impl_id = UDFEntityID()
         self.impl_id.parse(impl_id)
 
-        self.impl_use = data[46:]
+        self.impl_use = utils.to_bytes(data[46:])
 
         self._initialized = True
 
@@ -2079,11 +2018,11 @@ class UDFLogicalVolumeImplementationUse(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Logical Volume Implementation Use not initialized')
 
-        return struct.pack(self.FMT, self.impl_id.record(),
-                           self.num_files, self.num_dirs,
-                           self.min_udf_read_revision,
-                           self.min_udf_write_revision,
-                           self.max_udf_write_revision) + self.impl_use
+        return self._STRUCT.pack(self.impl_id.record(),
+                                 self.num_files, self.num_dirs,
+                                 self.min_udf_read_revision,
+                                 self.min_udf_write_revision,
+                                 self.max_udf_write_revision) + self.impl_use
 
     def new(self):
         '''
@@ -2121,6 +2060,7 @@ class UDFLogicalVolumeIntegrityDescriptor(object):
                  'logical_volume_impl_use')
 
     FMT = '=16s12sLLL32sLLLL424s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -2143,7 +2083,7 @@ class UDFLogicalVolumeIntegrityDescriptor(object):
          next_integrity_extent_length, next_integrity_extent_extent,
          logical_volume_contents_use, num_partitions,
          self.length_impl_use, self.free_space_table,
-         self.size_table, impl_use) = struct.unpack_from(self.FMT, data, 0)
+         self.size_table, impl_use) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -2193,12 +2133,12 @@ class UDFLogicalVolumeIntegrityDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF Logical Volume Integrity Descriptor not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16,
-                          self.recording_date.record(), 1, 0, 0,
-                          self.logical_volume_contents_use.record(), 1,
-                          self.length_impl_use, self.free_space_table,
-                          self.size_table,
-                          self.logical_volume_impl_use.record())[16:]
+        rec = self._STRUCT.pack(b'\x00' * 16,
+                                self.recording_date.record(), 1, 0, 0,
+                                self.logical_volume_contents_use.record(), 1,
+                                self.length_impl_use, self.free_space_table,
+                                self.size_table,
+                                self.logical_volume_impl_use.record())[16:]
         return self.desc_tag.record(rec[:118]) + rec
 
     def extent_location(self):
@@ -2275,6 +2215,7 @@ class UDFFileSetDescriptor(object):
                  'domain_ident', 'root_dir_icb')
 
     FMT = '=16s12sHHLLLL64s128s64s32s32s32s16s32s16s48s'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -2298,7 +2239,7 @@ class UDFFileSetDescriptor(object):
          self.log_vol_char_set, self.log_vol_ident,
          self.file_set_char_set, self.file_set_ident, self.copyright_file_ident,
          self.abstract_file_ident, root_dir_icb, domain_ident, next_extent,
-         reserved_unused) = struct.unpack_from(self.FMT, data, 0)
+         reserved_unused) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -2345,14 +2286,14 @@ class UDFFileSetDescriptor(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF File Set Descriptor not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16,
-                          self.recording_date.record(), 3, 3, 1, 1,
-                          self.file_set_num, 0, self.log_vol_char_set,
-                          self.log_vol_ident, self.file_set_char_set,
-                          self.file_set_ident, self.copyright_file_ident,
-                          self.abstract_file_ident, self.root_dir_icb.record(),
-                          self.domain_ident.record(), b'\x00' * 16,
-                          b'\x00' * 48)[16:]
+        rec = self._STRUCT.pack(b'\x00' * 16,
+                                self.recording_date.record(), 3, 3, 1, 1,
+                                self.file_set_num, 0, self.log_vol_char_set,
+                                self.log_vol_ident, self.file_set_char_set,
+                                self.file_set_ident, self.copyright_file_ident,
+                                self.abstract_file_ident, self.root_dir_icb.record(),
+                                self.domain_ident.record(), b'\x00' * 16,
+                                b'\x00' * 48)[16:]
         return self.desc_tag.record(rec) + rec
 
     def extent_location(self):
@@ -2415,6 +2356,7 @@ class UDFICBTag(object):
                  'parent_icb_log_block_num', 'parent_icb_part_ref_num', 'flags')
 
     FMT = '=LHHHBBLHH'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self._initialized = False
@@ -2434,7 +2376,7 @@ class UDFICBTag(object):
         (self.prior_num_direct_entries, self.strategy_type, self.strategy_param,
          self.max_num_entries, reserved, self.file_type,
          self.parent_icb_log_block_num, self.parent_icb_part_ref_num,
-         self.flags) = struct.unpack_from(self.FMT, data, 0)
+         self.flags) = self._STRUCT.unpack_from(data, 0)
 
         if self.strategy_type not in (4, 4096):
             raise pycdlibexception.PyCdlibInvalidISO('UDF ICB Tag invalid strategy type')
@@ -2456,11 +2398,11 @@ class UDFICBTag(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF ICB Tag not initialized')
 
-        return struct.pack(self.FMT, self.prior_num_direct_entries,
-                           self.strategy_type, self.strategy_param,
-                           self.max_num_entries, 0, self.file_type,
-                           self.parent_icb_log_block_num,
-                           self.parent_icb_part_ref_num, self.flags)
+        return self._STRUCT.pack(self.prior_num_direct_entries,
+                                 self.strategy_type, self.strategy_param,
+                                 self.max_num_entries, 0, self.file_type,
+                                 self.parent_icb_log_block_num,
+                                 self.parent_icb_part_ref_num, self.flags)
 
     def new(self, file_type):
         '''
@@ -2504,9 +2446,10 @@ class UDFFileEntry(object):
                  'desc_tag', 'icb_tag', 'alloc_descs', 'fi_descs', 'parent',
                  'access_time', 'mod_time', 'attr_time', 'extended_attr_icb',
                  'impl_ident', 'extended_attrs', 'file_ident', 'inode',
-                 'is_sorted')
+                 'is_sorted', '_fi_names', '_fi_names_clash')
 
     FMT = '=16s20sLLLHBBLQQ12s12s12sL16s32sQLL'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self.alloc_descs = []
@@ -2517,6 +2460,10 @@ class UDFFileEntry(object):
         self.file_ident = None
         self.inode = None
         self.is_sorted = False
+        # A map of the decoded names of the File Identifier Descriptors to
+        # the descriptors, built the first time a name is looked up.
+        self._fi_names = None
+        self._fi_names_clash = False
 
     def parse(self, data, extent, parent, desc_tag):
         '''
@@ -2537,7 +2484,7 @@ class UDFFileEntry(object):
          record_format, record_display_attrs, record_len,
          self.info_len, self.log_block_recorded, access_time, mod_time,
          attr_time, checkpoint, extended_attr_icb, impl_ident, self.unique_id,
-         self.len_extended_attrs, len_alloc_descs) = struct.unpack_from(self.FMT, data, 0)
+         self.len_extended_attrs, len_alloc_descs) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -2571,8 +2518,8 @@ class UDFFileEntry(object):
         self.impl_ident = UDFEntityID()
         self.impl_ident.parse(impl_ident)
 
-        offset = struct.calcsize(self.FMT)
-        self.extended_attrs = data[offset:offset + self.len_extended_attrs]
+        offset = self._STRUCT.size
+        self.extended_attrs = utils.to_bytes(data[offset:offset + self.len_extended_attrs])
 
         offset += self.len_extended_attrs
         num_alloc_descs = len_alloc_descs // 8  # a short_ad is 8 bytes
@@ -2600,15 +2547,15 @@ class UDFFileEntry(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF File Entry not initialized')
 
-        rec = struct.pack(self.FMT, b'\x00' * 16,
-                          self.icb_tag.record(), self.uid, self.gid,
-                          self.perms, self.file_link_count, 0, 0, 0,
-                          self.info_len, self.log_block_recorded,
-                          self.access_time.record(), self.mod_time.record(),
-                          self.attr_time.record(), 1,
-                          self.extended_attr_icb.record(),
-                          self.impl_ident.record(), self.unique_id,
-                          self.len_extended_attrs, len(self.alloc_descs) * 8)[16:]
+        rec = self._STRUCT.pack(b'\x00' * 16,
+                                self.icb_tag.record(), self.uid, self.gid,
+                                self.perms, self.file_link_count, 0, 0, 0,
+                                self.info_len, self.log_block_recorded,
+                                self.access_time.record(), self.mod_time.record(),
+                                self.attr_time.record(), 1,
+                                self.extended_attr_icb.record(),
+                                self.impl_ident.record(), self.unique_id,
+                                self.len_extended_attrs, len(self.alloc_descs) * 8)[16:]
         rec += self.extended_attrs
         for length, pos in self.alloc_descs:
             rec += struct.pack('=LL', length, pos)
@@ -2681,7 +2628,7 @@ class UDFFileEntry(object):
                 # split it into smaller.  cdrkit/cdrtools uses 0x3ffff800, and
                 # Windows uses 0x3ff00000.  To be more compatible with cdrkit,
                 # we'll choose their number of 0x3ffff800.
-                alloc_len = min(len_left, 0x3ffff800)
+                alloc_len = min(len_left, _MAX_ALLOC_LEN)
                 # The second field (position) is bogus, but will get set
                 # properly once reshuffle_extents is called.
                 self.alloc_descs.append([alloc_len, 0])
@@ -2752,6 +2699,7 @@ class UDFFileEntry(object):
             bisect.insort_left(self.fi_descs, new_fi_desc)
         else:
             self.fi_descs.append(new_fi_desc)
+        self._name_added(new_fi_desc)
 
         num_bytes_to_add = UDFFileIdentifierDescriptor.length(len(new_fi_desc.fi))
 
@@ -2766,7 +2714,7 @@ class UDFFileEntry(object):
 
         self.log_block_recorded = new_num_extents
 
-        self.alloc_descs[0][0] = self.info_len
+        self._split_dir_alloc_descs()
         if new_fi_desc.is_dir():
             self.file_link_count += 1
 
@@ -2790,17 +2738,26 @@ class UDFFileEntry(object):
         tmp_fi_desc.isparent = False
         tmp_fi_desc.fi = name
 
+        # The name is the encoded File Identifier, so look it up under each
+        # of the encodings it could be in; only if that fails do we have to
+        # look through all of the descriptors.
+        names = self._file_ident_names()
+        for encoding in ('latin-1', 'utf-16_be'):
+            try:
+                fi_desc = names.get(name.decode(encoding))
+            except UnicodeDecodeError:
+                continue
+            if fi_desc is not None and fi_desc.fi == name:
+                break
+        else:
+            if tmp_fi_desc not in self.fi_descs:
+                raise pycdlibexception.PyCdlibInvalidInput('Cannot find file to remove')
+
         # If flags bit 3 is set, the entries are sorted.
         if self.icb_tag.flags & 0x8 or self.is_sorted:
             desc_index = bisect.bisect_left(self.fi_descs, tmp_fi_desc)
         else:
-            desc_index = len(self.fi_descs)
-            for index, fi_desc in enumerate(self.fi_descs):
-                if fi_desc.fi == name:
-                    desc_index = index
-                    break
-        if desc_index == len(self.fi_descs) or self.fi_descs[desc_index].fi != name:
-            raise pycdlibexception.PyCdlibInvalidInput('Cannot find file to remove')
+            desc_index = self.fi_descs.index(tmp_fi_desc)
 
         this_desc = self.fi_descs[desc_index]
         if this_desc.is_dir():
@@ -2811,9 +2768,10 @@ class UDFFileEntry(object):
         old_num_extents = utils.ceiling_div(self.info_len, logical_block_size)
         self.info_len -= UDFFileIdentifierDescriptor.length(len(this_desc.fi))
         new_num_extents = utils.ceiling_div(self.info_len, logical_block_size)
-        self.alloc_descs[0][0] = self.info_len
+        self._split_dir_alloc_descs()
 
         del self.fi_descs[desc_index]
+        self._name_removed(this_desc)
 
         return old_num_extents - new_num_extents
 
@@ -2831,10 +2789,73 @@ class UDFFileEntry(object):
         if not self._initialized:
             raise pycdlibexception.PyCdlibInternalError('UDF File Entry not initialized')
 
+        if self.icb_tag.file_type == 4:
+            self._split_dir_alloc_descs()
+
+        # The data is laid out contiguously, so each allocation descriptor
+        # starts right after the blocks of the one before it.
         current_assignment = start_extent
-        for index, desc_unused in enumerate(self.alloc_descs):
-            self.alloc_descs[index][1] = current_assignment
-            current_assignment += 1
+        for desc in self.alloc_descs:
+            desc[1] = current_assignment
+            current_assignment += utils.ceiling_div(desc[0], _LOGICAL_BLOCK_SIZE)
+
+    def _split_dir_alloc_descs(self):
+        '''
+        An internal method to split the File Identifier Descriptors of this
+        directory across as many allocation descriptors as its length needs.
+        Every allocation descriptor but the last covers a whole number of
+        blocks, and they are laid out contiguously from the position of the
+        first one.
+
+        Parameters:
+         None.
+        Returns:
+         Nothing.
+        '''
+        current_assignment = self.alloc_descs[0][1] if self.alloc_descs else 0
+        alloc_descs = []
+        len_left = self.info_len
+        while True:
+            alloc_len = min(len_left, _MAX_ALLOC_LEN)
+            alloc_descs.append([alloc_len, current_assignment])
+            current_assignment += alloc_len // _LOGICAL_BLOCK_SIZE
+            len_left -= alloc_len
+            if len_left <= 0:
+                break
+        self.alloc_descs = alloc_descs
+
+    def file_ident_desc_pieces(self):
+        '''
+        A method to generate the recorded File Identifier Descriptors of this
+        directory, split up along its allocation descriptors.  The
+        descriptors are packed one after another as a single stream, so a
+        descriptor may be split between two allocation descriptors.
+
+        Parameters:
+         None.
+        Yields:
+         A 2-tuple of the partition-relative extent of an allocation
+         descriptor and the data to record there.
+        '''
+        if not self._initialized:
+            raise pycdlibexception.PyCdlibInternalError('UDF File Entry not initialized')
+
+        descs = iter(self.fi_descs)
+        data = bytearray()
+        for index, (length, pos) in enumerate(self.alloc_descs):
+            if index == len(self.alloc_descs) - 1:
+                for fi_desc in descs:
+                    data += fi_desc.record()
+                yield (pos, bytes(data))
+                break
+
+            while len(data) < length:
+                fi_desc = next(descs, None)
+                if fi_desc is None:
+                    break
+                data += fi_desc.record()
+            yield (pos, bytes(data[:length]))
+            data = data[length:]
 
     def get_data_length(self):
         '''
@@ -2868,7 +2889,7 @@ class UDFFileEntry(object):
             # If we are increasing the length, update the last alloc_desc up
             # to the max of 0x3ffff800, and throw an exception if we overflow.
             new_len = self.alloc_descs[-1][0] + len_diff
-            if new_len > 0x3ffff800:
+            if new_len > _MAX_ALLOC_LEN:
                 raise pycdlibexception.PyCdlibInvalidInput('Cannot increase the size of a UDF file beyond the current descriptor')
             self.alloc_descs[-1][0] = new_len
         elif len_diff < 0:
@@ -2879,7 +2900,7 @@ class UDFFileEntry(object):
             alloc_descs_needed = 0
             index = 0
             while len_left > 0:
-                this_len = min(len_left, 0x3ffff800)
+                this_len = min(len_left, _MAX_ALLOC_LEN)
                 alloc_descs_needed += 1
                 self.alloc_descs[index][0] = this_len
                 index += 1
@@ -2962,46 +2983,7 @@ class UDFFileEntry(object):
         if self.icb_tag.file_type != 4 or not self.fi_descs:
             return None
 
-        tmp = currpath.decode('utf-8')
-        try:
-            latin1_currpath = tmp.encode('latin-1')
-        except (UnicodeDecodeError, UnicodeEncodeError):
-            latin1_currpath = None
-        ucs2_currpath = tmp.encode('utf-16_be')
-
-        child = None
-
-        # If flags bit 3 is set, the entries are sorted.
-        if self.icb_tag.flags & 0x8 or self.is_sorted:
-            lo = 1
-            hi = len(self.fi_descs)
-            while lo < hi:
-                mid = (lo + hi) // 2
-                fi_desc = self.fi_descs[mid]
-                if latin1_currpath is not None and fi_desc.encoding == 'latin-1':
-                    lt = fi_desc.fi < latin1_currpath
-                else:
-                    lt = fi_desc.fi < ucs2_currpath
-
-                if lt:
-                    lo = mid + 1
-                else:
-                    hi = mid
-            index = lo
-            if index != len(self.fi_descs) and (self.fi_descs[index].fi == latin1_currpath or self.fi_descs[index].fi == ucs2_currpath):
-                child = self.fi_descs[index]
-        else:
-            for fi_desc in self.fi_descs:
-                if latin1_currpath is not None and fi_desc.encoding == 'latin-1':
-                    eq = fi_desc.fi == latin1_currpath
-                else:
-                    eq = fi_desc.fi == ucs2_currpath
-
-                if eq:
-                    child = fi_desc
-                    break
-
-        return child
+        return self._file_ident_names().get(currpath.decode('utf-8'))
 
     def track_file_ident_desc(self, file_ident):
         '''
@@ -3018,6 +3000,73 @@ class UDFFileEntry(object):
             bisect.insort_left(self.fi_descs, file_ident)
         else:
             self.fi_descs.append(file_ident)
+        self._name_added(file_ident)
+
+    def _file_ident_names(self):
+        '''
+        An internal method to get the map of decoded names to the UDF File
+        Identifier descriptors of this UDF File Entry, building it if it
+        doesn't exist yet.  Where more than one descriptor decodes to the same
+        name, the map holds the first one in the list.
+
+        Parameters:
+         None.
+        Returns:
+         A dictionary mapping names to UDF File Identifier descriptors.
+        '''
+        if self._fi_names is None:
+            self._fi_names = {}
+            self._fi_names_clash = False
+            for fi_desc in self.fi_descs:
+                if fi_desc.isparent:
+                    continue
+                key = _fi_desc_key(fi_desc)
+                if key in self._fi_names:
+                    self._fi_names_clash = True
+                else:
+                    self._fi_names[key] = fi_desc
+        return self._fi_names
+
+    def _name_added(self, fi_desc):
+        '''
+        An internal method to add a newly tracked UDF File Identifier
+        descriptor to the map of names, if the map has been built.
+
+        Parameters:
+         fi_desc - The UDF File Identifier descriptor that was added.
+        Returns:
+         Nothing.
+        '''
+        if self._fi_names is None or fi_desc.isparent:
+            return
+        key = _fi_desc_key(fi_desc)
+        if key in self._fi_names:
+            # Which of the descriptors comes first depends on where the new
+            # one was inserted; just rebuild the map when it is next needed.
+            self._fi_names = None
+        else:
+            self._fi_names[key] = fi_desc
+
+    def _name_removed(self, fi_desc):
+        '''
+        An internal method to remove a UDF File Identifier descriptor from
+        the map of names, if the map has been built.
+
+        Parameters:
+         fi_desc - The UDF File Identifier descriptor that was removed.
+        Returns:
+         Nothing.
+        '''
+        if self._fi_names is None:
+            return
+        if self._fi_names_clash:
+            # Another descriptor with the same name may have been hidden by
+            # this one; rebuild the map when it is next needed.
+            self._fi_names = None
+            return
+        key = _fi_desc_key(fi_desc)
+        if self._fi_names.get(key) is fi_desc:
+            del self._fi_names[key]
 
     def finish_directory_parse(self):
         '''
@@ -3045,6 +3094,24 @@ class UDFFileEntry(object):
             self.is_sorted = True
 
 
+def _fi_desc_key(fi_desc):
+    '''
+    An internal function to get the name a UDF File Identifier descriptor is
+    looked up by, which is its File Identifier decoded from whichever encoding
+    it was recorded in.
+
+    Parameters:
+     fi_desc - The UDF File Identifier descriptor to get the name for.
+    Returns:
+     The decoded name of the UDF File Identifier descriptor.
+    '''
+    try:
+        return fi_desc.fi.decode(fi_desc.encoding)
+    except UnicodeDecodeError:
+        # A malformed name can never match a lookup, but still needs a key.
+        return fi_desc.fi
+
+
 class UDFFileIdentifierDescriptor(object):
     '''
     A class representing a UDF File Identifier Descriptor.
@@ -3055,6 +3122,7 @@ class UDFFileIdentifierDescriptor(object):
                  'encoding')
 
     FMT = '=16sHBB16sH'
+    _STRUCT = utils.compile_struct(FMT)
 
     def __init__(self):
         self.file_entry = None
@@ -3078,7 +3146,7 @@ class UDFFileIdentifierDescriptor(object):
         '''
         if namelen > 0:
             namelen += 1
-        to_add = struct.calcsize(cls.FMT) + namelen
+        to_add = cls._STRUCT.size + namelen
         return to_add + UDFFileIdentifierDescriptor.pad(to_add)
 
     @staticmethod
@@ -3111,7 +3179,7 @@ class UDFFileIdentifierDescriptor(object):
             raise pycdlibexception.PyCdlibInternalError('UDF File Identifier Descriptor already initialized')
 
         (tag_unused, file_version_num, self.file_characteristics,
-         self.len_fi, icb, self.len_impl_use) = struct.unpack_from(self.FMT, data, 0)
+         self.len_fi, icb, self.len_impl_use) = self._STRUCT.unpack_from(data, 0)
 
         self.desc_tag = desc_tag
 
@@ -3127,9 +3195,9 @@ class UDFFileIdentifierDescriptor(object):
         self.icb = UDFLongAD()
         self.icb.parse(icb)
 
-        start = struct.calcsize(self.FMT)
+        start = self._STRUCT.size
         end = start + self.len_impl_use
-        self.impl_use = data[start:end]
+        self.impl_use = utils.to_bytes(data[start:end])
 
         start = end
         end = start + self.len_fi
@@ -3148,7 +3216,7 @@ class UDFFileIdentifierDescriptor(object):
 
             start += 1
 
-            self.fi = data[start:end]
+            self.fi = utils.to_bytes(data[start:end])
 
         self.orig_extent_loc = extent
         self.new_extent_loc = None
@@ -3206,10 +3274,10 @@ class UDFFileIdentifierDescriptor(object):
             fi = prefix + self.fi
         else:
             fi = b''
-        rec = struct.pack(self.FMT, b'\x00' * 16, 1,
-                          self.file_characteristics, self.len_fi,
-                          self.icb.record(),
-                          self.len_impl_use) + self.impl_use + fi + b'\x00' * UDFFileIdentifierDescriptor.pad(struct.calcsize(self.FMT) + self.len_impl_use + self.len_fi)
+        rec = self._STRUCT.pack(b'\x00' * 16, 1,
+                                self.file_characteristics, self.len_fi,
+                                self.icb.record(),
+                                self.len_impl_use) + self.impl_use + fi + b'\x00' * UDFFileIdentifierDescriptor.pad(self._STRUCT.size + self.len_impl_use + self.len_fi)
         return self.desc_tag.record(rec[16:]) + rec[16:]
 
     def extent_location(self):
@@ -24,11 +24,21 @@ try:
     import cStringIO  # pylint: disable=import-error
 except ImportError:
     pass
+import copy
+import errno
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 import io
 import os
 import socket
+import stat
+import struct
 import sys
+import threading
 import time
+import weakref
 
 import pycdlib.pycdlibexception as pycdlibexception
 
@@ -41,6 +51,158 @@ except ImportError:
     except ImportError:
         have_sendfile = False
 
+have_pread = hasattr(os, 'pread')
+
+have_pwrite = hasattr(os, 'pwrite')
+
+have_copy_file_range = hasattr(os, 'copy_file_range')
+
+# The Linux ioctl to share a range of blocks from another file.
+_FICLONERANGE = 0x4020940d
+have_reflink = fcntl is not None and sys.platform.startswith('linux')
+
+# The errors that mean a method of copying in the kernel is not available for
+# a pair of files; those pairs of devices are remembered here, so they are not
+# tried again.
+_KERNEL_COPY_UNSUPPORTED_ERRNOS = frozenset(getattr(errno, name) for name in
+                                            ('EXDEV', 'ENOSYS', 'EOPNOTSUPP',
+                                             'ENOTTY', 'ENOTSUP', 'EBADF')
+                                            if hasattr(errno, name))
+_kernel_copy_unsupported = set()
+
+# The precompiled struct.Struct objects handed out by compile_struct.
+_struct_registry = {}
+
+# Serializes the seek and read (or write) pairs done by pread(), pwrite(), and
+# file_length() on file objects that do not support positional I/O.
+_pread_lock = threading.Lock()
+
+
+def compile_struct(fmt):
+    '''
+    A utility function to get a precompiled struct.Struct object for a format
+    string.  The objects are kept in a registry shared by all of the record
+    classes, so each format is only compiled once, and the record classes can
+    keep them as class attributes instead of passing format strings to the
+    struct module (which looks them up in its cache) on every call.
+
+    Parameters:
+     fmt - The struct format string.
+    Returns:
+     The struct.Struct object for the format.
+    '''
+    compiled = _struct_registry.get(fmt)
+    if compiled is None:
+        compiled = struct.Struct(fmt)
+        _struct_registry[fmt] = compiled
+    return compiled
+
+
+class InternTable(object):
+    '''
+    A class to share a single parsed record between all of the places in one
+    ISO that the same bytes are parsed from.  Each PyCdlib object has its own
+    table, which it drops when it is closed, so records are never shared
+    between PyCdlib objects.  The shared records must be treated as immutable;
+    code that needs to change one first takes a private copy with unshare().
+    The table only keeps weak references, so records that are no longer used
+    anywhere drop out of it.  The record classes must have '_shared' and
+    '_record_cache' slots (and '__weakref__').
+    '''
+    __slots__ = ('_tables', '_lock')
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # The entries are only weak references, so a copy of the table starts
+        # out empty.
+        return (InternTable, ())
+
+    def get(self, cls, key, data=None):
+        '''
+        A method to get the shared record for some bytes, parsing it if there
+        is not one already.
+
+        Parameters:
+         cls - The class of the record.
+         key - The bytes that identify the record.
+         data - The bytes to parse the record out of, if they differ from the
+                key (for instance, when the parser needs the rest of the area
+                the record is in).
+        Returns:
+         The shared record.
+        '''
+        with self._lock:
+            table = self._tables.get(cls)
+            if table is None:
+                table = weakref.WeakValueDictionary()
+                self._tables[cls] = table
+            rec = table.get(key)
+            if rec is None:
+                rec = cls()
+                rec.parse(key if data is None else data)
+                rec._shared = True  # pylint: disable=protected-access
+                table[key] = rec
+        return rec
+
+
+def parse_record(interned, cls, key, data=None):
+    '''
+    A utility function to parse a record, sharing it through an InternTable if
+    one is given.
+
+    Parameters:
+     interned - The InternTable to share the record through, or None to parse
+                a private record.
+     cls - The class of the record.
+     key - The bytes that identify the record.
+     data - The bytes to parse the record out of, if they differ from the key.
+    Returns:
+     The parsed record.
+    '''
+    if interned is not None:
+        return interned.get(cls, to_bytes(key), data)
+    rec = cls()
+    rec.parse(key if data is None else data)
+    return rec
+
+
+def unshare(rec):
+    '''
+    A utility function to get a record that can be modified.  A record shared
+    through an InternTable is copied, and the copy is returned; any other
+    record is returned as is.
+
+    Parameters:
+     rec - The record that is about to be modified.
+    Returns:
+     A record that is safe to modify.
+    '''
+    if not rec._shared:  # pylint: disable=protected-access
+        return rec
+    new_rec = copy.copy(rec)
+    new_rec._shared = False  # pylint: disable=protected-access
+    new_rec._record_cache = None  # pylint: disable=protected-access
+    return new_rec
+
+
+def to_bytes(data):
+    '''
+    A utility function to copy a slice of parsed data into a bytes object.
+    On Python 2, bytes() of a memoryview is its repr rather than its data, so
+    memoryviews are copied with tobytes() instead.
+
+    Parameters:
+     data - The data to copy; a bytes, bytearray, or memoryview object.
+    Returns:
+     The data as a bytes object.
+    '''
+    if isinstance(data, memoryview):
+        return data.tobytes()
+    return bytes(data)
+
 
 def swab_32bit(input_int):
     '''
@@ -83,64 +245,452 @@ def ceiling_div(numer, denom):
     return -(-numer // denom)
 
 
+def _fd_dev(fd):
+    '''
+    An internal function to get the device a file descriptor lives on.
+
+    Parameters:
+     fd - The file descriptor.
+    Returns:
+     The device number.
+    '''
+    return os.fstat(fd).st_dev
+
+
+def _reflink(infd, in_offset, outfd, out_offset, length):
+    '''
+    An internal function to make a range of the output file share the blocks
+    of a range of the input file, as supported by copy-on-write filesystems
+    like Btrfs and XFS.  The offsets and the length must be multiples of the
+    filesystem block size.
+
+    Parameters:
+     infd - The file descriptor to copy data from.
+     in_offset - The offset in the input file to copy from.
+     outfd - The file descriptor to copy data to.
+     out_offset - The offset in the output file to copy to.
+     length - The amount of data to copy.
+    Returns:
+     True if the range was shared, False otherwise.
+    '''
+    devs = ('reflink', _fd_dev(infd), _fd_dev(outfd))
+    if devs[1] != devs[2] or devs in _kernel_copy_unsupported:
+        return False
+
+    try:
+        fcntl.ioctl(outfd, _FICLONERANGE,
+                    struct.pack('=qQQQ', infd, in_offset, length, out_offset))
+    except (IOError, OSError) as e:
+        if e.errno in _KERNEL_COPY_UNSUPPORTED_ERRNOS:
+            _kernel_copy_unsupported.add(devs)
+        return False
+
+    return True
+
+
+def _kernel_copy(infd, in_offset, outfd, out_offset, length,
+                 use_sendfile=True):
+    '''
+    An internal function to copy a range of the input file to the output file
+    without passing the data through Python, using copy_file_range (which may
+    share the blocks or copy them on the storage) or sendfile.
+
+    Parameters:
+     infd - The file descriptor to copy data from.
+     in_offset - The offset in the input file to copy from.
+     outfd - The file descriptor to copy data to.
+     out_offset - The offset in the output file to copy to.
+     length - The amount of data to copy.
+     use_sendfile - Whether sendfile may be used.  It writes at the current
+                    offset of the output file descriptor, so it is not safe
+                    when other threads write to the same file descriptor.
+    Returns:
+     The amount of data copied, which is less than length if the input file
+     ended early or the copy could not be done in the kernel.
+    '''
+    copied = 0
+    if have_copy_file_range:
+        devs = ('copy_file_range', _fd_dev(infd), _fd_dev(outfd))
+        if devs not in _kernel_copy_unsupported:
+            try:
+                while copied < length:
+                    count = os.copy_file_range(infd, outfd, length - copied,  # pylint: disable=no-member
+                                               in_offset + copied,
+                                               out_offset + copied)
+                    if count == 0:
+                        return copied
+                    copied += count
+                return copied
+            except OSError as e:
+                if e.errno in _KERNEL_COPY_UNSUPPORTED_ERRNOS:
+                    _kernel_copy_unsupported.add(devs)
+
+    if have_sendfile and use_sendfile:
+        # sendfile() writes at the current offset of the output file
+        # descriptor, so put that where the data belongs.
+        os.lseek(outfd, out_offset + copied, os.SEEK_SET)
+        try:
+            while copied < length:
+                count = sendfile(outfd, infd, in_offset + copied, length - copied)
+                if count == 0:
+                    break
+                copied += count
+        except OSError as e:
+            if e.errno not in _KERNEL_COPY_UNSUPPORTED_ERRNOS:
+                raise
+
+    return copied
+
+
+def _fd_copy(infd, in_offset, outfd, out_offset, length, use_sendfile=True):
+    '''
+    An internal function to copy a range of the input file to the output file
+    using the fastest method the platform and filesystem allow.  The whole
+    filesystem blocks in the range are shared with reflinks where possible,
+    and the rest is copied in the kernel.
+
+    Parameters:
+     infd - The file descriptor to copy data from.
+     in_offset - The offset in the input file to copy from.
+     outfd - The file descriptor to copy data to.
+     out_offset - The offset in the output file to copy to.
+     length - The amount of data to copy.
+     use_sendfile - Whether sendfile may be used.
+    Returns:
+     The amount of data copied; the caller must copy the rest.
+    '''
+    if have_reflink:
+        fs_block_size = os.fstat(outfd).st_blksize
+        head = -out_offset % fs_block_size
+        middle = (length - head) // fs_block_size * fs_block_size
+        # A reflink can only be made if the input and output are equally
+        # misaligned to the filesystem blocks; then the unaligned head and
+        # tail are copied and the whole blocks in between are shared.
+        if middle > 0 and (in_offset + head) % fs_block_size == 0:
+            if _kernel_copy(infd, in_offset, outfd, out_offset, head,
+                            use_sendfile) != head:
+                return 0
+            if _reflink(infd, in_offset + head, outfd, out_offset + head, middle):
+                done = head + middle
+                return done + _kernel_copy(infd, in_offset + done, outfd,
+                                           out_offset + done, length - done,
+                                           use_sendfile)
+            return head + _kernel_copy(infd, in_offset + head, outfd,
+                                       out_offset + head, length - head,
+                                       use_sendfile)
+
+    return _kernel_copy(infd, in_offset, outfd, out_offset, length,
+                        use_sendfile)
+
+
+def _copy_range(data_length, blocksize, infp, in_offset, outfp):
+    '''
+    An internal function to copy data from a particular offset of the input
+    file object to the current position of the output file object, leaving the
+    output file object positioned after the data.
+
+    Parameters:
+     data_length - The amount of data to copy.
+     blocksize - How much data to copy per iteration.
+     infp - The file object to copy data from.
+     in_offset - The offset in the input file object to start copying from.
+     outfp - The file object to copy data to.
+    Returns:
+     Nothing.
+    '''
+    copied = 0
+    # Python 3 implements the fileno method for all file-like objects, so
+    # we can't just use the existence of the method to tell whether it is
+    # available.  Instead, we try to call it, and if we fail, then we assume
+    # it is not available.
+    try:
+        infd = infp.fileno()
+        outfd = outfp.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        infd = None
+
+    if infd is not None:
+        # The data is written behind the back of the output file object, so
+        # flush anything it has buffered first, and tell it where the data
+        # ended afterwards.
+        outfp.flush()
+        out_offset = outfp.tell()
+        copied = _fd_copy(infd, in_offset, outfd, out_offset, data_length)
+        outfp.seek(out_offset + copied)
+
+    while copied < data_length:
+        data = pread(infp, min(blocksize, data_length - copied), in_offset + copied)
+        if not data:
+            break
+        outfp.write(data)
+        copied += len(data)
+
+
 def copy_data(data_length, blocksize, infp, outfp):
     '''
     A utility function to copy data from the input file object to the output
-    file object.  This function will use the most efficient copy method available,
-    which is often sendfile.
+    file object.  This function will use the most efficient copy method
+    available; in order, sharing the blocks with reflinks (on copy-on-write
+    filesystems), copy_file_range, sendfile, and finally reading and writing.
+
+    Parameters:
+     data_length - The amount of data to copy.
+     blocksize - How much data to copy per iteration.
+     infp - The file object to copy data from.
+     outfp - The file object to copy data to.
+    Returns:
+     Nothing.
+    '''
+    in_offset = infp.tell()
+    _copy_range(data_length, blocksize, infp, in_offset, outfp)
+    infp.seek(in_offset + data_length)
+
+
+def copy_data_from(data_length, blocksize, infp, in_offset, outfp):
+    '''
+    A utility function to copy data from a particular offset of the input
+    file object to the output file object, using the same methods as
+    copy_data.  Unlike copy_data, the position of the input file object is
+    neither used nor changed (when the platform allows it), so many threads
+    can copy out of the same input at once.
 
     Parameters:
      data_length - The amount of data to copy.
      blocksize - How much data to copy per iteration.
      infp - The file object to copy data from.
+     in_offset - The offset in the input file object to start copying from.
      outfp - The file object to copy data to.
     Returns:
      Nothing.
     '''
-    use_sendfile = False
-    if have_sendfile:
-        # Python 3 implements the fileno method for all file-like objects, so
-        # we can't just use the existence of the method to tell whether it is
-        # available.  Instead, we try to assign it, and if we fail, then we
-        # assume it is not available.
+    _copy_range(data_length, blocksize, infp, in_offset, outfp)
+
+
+def copy_data_sparse(data_length, blocksize, infp, in_offset, outfp):
+    '''
+    A utility function to copy data from a particular offset of the input file
+    object to the output file object, seeking over the blocks of data that are
+    all zero instead of writing them.  The output file object must be
+    seekable, and must already read back as zeros wherever it is seeked over
+    (for instance, because it was truncated beforehand).  The blocks are
+    aligned to the output offset, so that the skipped blocks line up with
+    filesystem blocks and become holes in the output file.  As in
+    copy_data_from, the input is only read with pread().
+
+    Parameters:
+     data_length - The amount of data to copy.
+     blocksize - How much data to copy per iteration.
+     infp - The file object to copy data from.
+     in_offset - The offset in the input file object to start copying from.
+     outfp - The file object to copy data to.
+    Returns:
+     The number of bytes that were seeked over instead of written.
+    '''
+    zeros = b'\x00' * blocksize
+    skipped = 0
+    left = data_length
+    readsize = blocksize - outfp.tell() % blocksize
+    while left > 0:
+        if left < readsize:
+            readsize = left
+        data = pread(infp, readsize, in_offset)
+        in_offset += len(data)
+        if data == zeros[:len(data)]:
+            outfp.seek(len(data), os.SEEK_CUR)
+            skipped += len(data)
+        else:
+            outfp.write(data)
+        # As in stream_data, an input that is shorter than it claims to be
+        # ends the copy silently.
+        if len(data) != readsize:
+            break
+        left -= readsize
+        readsize = blocksize
+
+    return skipped
+
+
+def pwrite_data(data_length, blocksize, infp, in_offset, outfd, out_offset,
+                sparse=False):
+    '''
+    A utility function to copy data from a particular offset of the input file
+    object to a particular offset of the output file descriptor.  Neither the
+    position of the input file object (when the platform allows it) nor that
+    of the output file descriptor is used or changed, so many threads can copy
+    into the same output at once.  This needs os.pwrite.
+
+    Parameters:
+     data_length - The amount of data to copy.
+     blocksize - How much data to copy per iteration.
+     infp - The file object to copy data from.
+     in_offset - The offset in the input file object to start copying from.
+     outfd - The file descriptor to copy data to.
+     out_offset - The offset in the output file descriptor to copy to.
+     sparse - Whether to skip over blocks of zeros instead of writing them, as
+              in copy_data_sparse.
+    Returns:
+     The number of bytes that were skipped instead of written.
+    '''
+    copied = 0
+    if not sparse:
         try:
-            x_unused = infp.fileno()  # NOQA
-            y_unused = outfp.fileno()  # NOQA
-            use_sendfile = True
+            infd = infp.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            infd = None
+        if infd is not None:
+            copied = _fd_copy(infd, in_offset, outfd, out_offset, data_length,
+                              use_sendfile=False)
+
+    zeros = b'\x00' * blocksize
+    skipped = 0
+    while copied < data_length:
+        readsize = min(blocksize - (out_offset + copied) % blocksize,
+                       data_length - copied)
+        data = pread(infp, readsize, in_offset + copied)
+        if not data:
+            break
+        if sparse and data == zeros[:len(data)]:
+            skipped += len(data)
+        else:
+            written = 0
+            while written < len(data):
+                written += os.pwrite(outfd, data[written:], out_offset + copied + written)  # pylint: disable=no-member
+        copied += len(data)
+
+    return skipped
+
+
+def pread(fp, length, offset):
+    '''
+    A utility function to read data from a file object at a particular offset.
+    When the file object is backed by a file descriptor and the platform has
+    os.pread, the data is read without using or changing the position of the
+    file object, so many readers can share it.  Otherwise this falls back to
+    a seek followed by a read.
+
+    Parameters:
+     fp - The file object to read from.
+     length - The maximum number of bytes to read.
+     offset - The offset in the file object to start reading at.
+    Returns:
+     The data read, which is only shorter than length at the end of the file.
+    '''
+    fileno = None
+    if have_pread:
+        try:
+            fileno = fp.fileno()
         except (AttributeError, io.UnsupportedOperation):
             pass
 
-    if use_sendfile:
-        # This is one of those instances where using the file object and the
-        # file descriptor causes problems.  The sendfile() call actually updates
-        # the underlying file descriptor, but the file object does not know
-        # about it.  To get around this, we instead get the offset, allow
-        # sendfile() to update the offset, then manually seek the file object
-        # to the right location.  This ensures that the file object gets updated
-        # properly.
-        in_offset = infp.tell()
-        out_offset = outfp.tell()
-        sendfile(outfp.fileno(), infp.fileno(), in_offset, data_length)
-        infp.seek(in_offset + data_length)
-        outfp.seek(out_offset + data_length)
-    else:
-        left = data_length
-        readsize = blocksize
-        while left > 0:
-            if left < readsize:
-                readsize = left
-            data = infp.read(readsize)
-            # We have seen ISOs in the wild (Tribes Vengeance 1of4.iso) that
-            # lie about the size of their files, causing reads to fail (since
-            # we hit EOF before the supposed end of the file).  If we are using
-            # sendfile above, sendfile just silently returns as much data as it
-            # can, with no additional checking.  We should do the same here, so
-            # if we got less data than we asked for, abort the loop silently.
-            data_len = len(data)
-            if data_len != readsize:
-                data_len = left
-            outfp.write(data)
-            left -= data_len
+    if fileno is None:
+        with _pread_lock:
+            fp.seek(offset)
+            return fp.read(length)
+
+    data = b''
+    while len(data) < length:
+        chunk = os.pread(fileno, length - len(data), offset + len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def pwrite(fp, data, offset):
+    '''
+    A utility function to write data to a file object at a particular offset.
+    When the file object is backed by a file descriptor and the platform has
+    os.pwrite, the data is written without using or changing the position of
+    the file object (after flushing anything it has buffered).  Otherwise
+    this falls back to a seek followed by a write, serialized with pread().
+
+    Parameters:
+     fp - The file object to write to.
+     data - The data to write.
+     offset - The offset in the file object to start writing at.
+    Returns:
+     Nothing.
+    '''
+    fileno = None
+    if have_pwrite:
+        try:
+            fileno = fp.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            pass
+
+    if fileno is None:
+        with _pread_lock:
+            fp.seek(offset)
+            fp.write(data)
+        return
+
+    fp.flush()
+    written = 0
+    while written < len(data):
+        written += os.pwrite(fileno, data[written:], offset + written)  # pylint: disable=no-member
+
+
+def file_length(fp):
+    '''
+    A utility function to get the length of the data in a file object, without
+    disturbing other threads reading from it with pread().
+
+    Parameters:
+     fp - The file object to get the length of.
+    Returns:
+     The length of the file object in bytes.
+    '''
+    try:
+        fileno = fp.fileno()
+        fp.flush()
+        st = os.fstat(fileno)
+    except (AttributeError, io.UnsupportedOperation, OSError):
+        st = None
+    if st is not None and stat.S_ISREG(st.st_mode):
+        return st.st_size
+
+    with _pread_lock:
+        old_loc = fp.tell()
+        fp.seek(0, os.SEEK_END)
+        length = fp.tell()
+        fp.seek(old_loc)
+    return length
+
+
+def stream_data(data_length, blocksize, infp, in_offset, outfp):
+    '''
+    A utility function to copy data from a particular offset of the input file
+    object to the output file object, reading with pread() and writing with
+    write() calls only.  Unlike copy_data, this never seeks or tells on the
+    output file object, so it can be used with non-seekable outputs like pipes
+    and sockets.
+
+    Parameters:
+     data_length - The amount of data to copy.
+     blocksize - How much data to copy per iteration.
+     infp - The file object to copy data from.
+     in_offset - The offset in the input file object to start copying from.
+     outfp - The file object to copy data to.
+    Returns:
+     The number of bytes actually copied.
+    '''
+    left = data_length
+    readsize = blocksize
+    while left > 0:
+        if left < readsize:
+            readsize = left
+        data = pread(infp, readsize, in_offset + data_length - left)
+        outfp.write(data)
+        left -= len(data)
+        # We have seen ISOs in the wild (Tribes Vengeance 1of4.iso) that
+        # lie about the size of their files, causing reads to fail (since
+        # we hit EOF before the supposed end of the file).  Stop copying, and
+        # let the caller know how much data there really was, since the
+        # output cannot be seeked past the missing data.
+        if len(data) != readsize:
+            break
+
+    return data_length - left
 
 
 def encode_space_pad(instr, length, encoding):
@@ -263,6 +813,27 @@ def zero_pad(fp, data_size, pad_size):
     fp.write(b'\x00')
 
 
+def zero_fill(fp, length, blocksize):
+    '''
+    A function to write the given number of zero bytes out to a file object
+    without seeking.  This is used when writing to non-seekable outputs, where
+    zero_pad cannot be used.
+
+    Parameters:
+     fp - The file object to write the zeros out to.
+     length - The number of zero bytes to write.
+     blocksize - The maximum number of bytes to write per iteration.
+    Returns:
+     Nothing.
+    '''
+    zeros = b'\x00' * min(length, blocksize)
+    while length > 0:
+        if length < len(zeros):
+            zeros = zeros[:length]
+        fp.write(zeros)
+        length -= len(zeros)
+
+
 def starts_with_slash(path):
     '''
     A function to determine if a path starts with a slash.  This is somewhat
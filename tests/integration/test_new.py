@@ -2,22 +2,34 @@
 
 from __future__ import absolute_import
 
+import glob
 import io
 import pytest
 import os
+import pickle
 import sys
 try:
     from cStringIO import StringIO as BytesIO
 except ImportError:
     from io import BytesIO
 import struct
+import threading
+import time
+import zlib
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 import pycdlib
+import pycdlib.indexcache
 
 from test_common import *
 
+@pytest.fixture
+def fixed_time(monkeypatch):
+    # Writing out an ISO stamps it with the current time; pin the time so that
+    # separate writes of the same ISO can be compared byte for byte.
+    monkeypatch.setattr(time, 'time', lambda: 1500000000.0)
+
 def do_a_test(iso, check_func, tmpdir=None):
     if tmpdir is None:
         out = BytesIO()
@@ -5170,3 +5182,1054 @@ def test_new_eltorito_rm_multi_boot():
     do_a_test(iso, check_onefile)
 
     iso.close()
+
+def test_new_open_fp_mmap():
+    # Create a new ISO.
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3, udf='2.60')
+
+    foostr = b"foo\n"
+    iso.add_fp(BytesIO(foostr), len(foostr), '/FOO.;1', rr_name='foo', joliet_path='/foo', udf_path='/foo')
+
+    out = io.BytesIO()
+    iso.write_fp(out)
+
+    iso.close()
+
+    iso = pycdlib.PyCdlib()
+    iso.open_fp(out, mmap=True)
+
+    assert(len(iso.pvd.root_dir_record.children) == 3)
+
+    fooout = BytesIO()
+    iso.get_file_from_iso_fp(fooout, udf_path='/foo')
+    assert(fooout.getvalue() == foostr)
+
+    iso.close()
+
+    # Make sure the mapping was released on close.
+    out.truncate(0)
+
+    out.close()
+
+def test_new_open_mmap(tmpdir):
+    # Create a new ISO.
+    iso = pycdlib.PyCdlib()
+    iso.new()
+
+    foostr = b"foo\n"
+    iso.add_fp(BytesIO(foostr), len(foostr), '/FOO.;1')
+
+    outfile = os.path.join(str(tmpdir), 'mmap.iso')
+    iso.write(outfile)
+
+    iso.close()
+
+    iso = pycdlib.PyCdlib()
+    iso.open(outfile, mmap=True)
+
+    check_onefile(iso, os.stat(outfile).st_size)
+
+    iso.close()
+
+def test_new_open_fp_lazy(fixed_time):
+    # Create a new ISO.
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3, udf='2.60')
+
+    iso.add_directory('/DIR1', rr_name='dir1', joliet_path='/dir1', udf_path='/dir1')
+    foostr = b"foo\n"
+    iso.add_fp(BytesIO(foostr), len(foostr), '/DIR1/FOO.;1', rr_name='foo', joliet_path='/dir1/foo', udf_path='/dir1/foo')
+
+    out = BytesIO()
+    iso.write_fp(out)
+
+    iso.close()
+
+    iso = pycdlib.PyCdlib()
+    iso.open_fp(out, lazy=True)
+
+    # Only the root directory should have been parsed so far.
+    dir1 = iso.pvd.root_dir_record.children[2]
+    assert(len(dir1.children) == 0)
+
+    for kwargs in ({'iso_path': '/DIR1/FOO.;1'}, {'rr_path': '/dir1/foo'},
+                   {'joliet_path': '/dir1/foo'}, {'udf_path': '/dir1/foo'}):
+        fooout = BytesIO()
+        iso.get_file_from_iso_fp(fooout, **kwargs)
+        assert(fooout.getvalue() == foostr)
+
+    assert(len(dir1.children) == 3)
+
+    names = [c.file_identifier() for c in iso.list_children(joliet_path='/dir1')]
+    assert(names == [b'.', b'..', 'foo'.encode('utf-16_be')])
+
+    # Writing out the lazily opened ISO should give exactly the same result.
+    out2 = BytesIO()
+    iso.write_fp(out2)
+    assert(out2.getvalue() == out.getvalue())
+
+    iso.close()
+
+def test_new_open_fp_lazy_modify():
+    # Create a new ISO.
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3)
+
+    iso.add_directory('/DIR1', rr_name='dir1', joliet_path='/dir1')
+    foostr = b"foo\n"
+    iso.add_fp(BytesIO(foostr), len(foostr), '/DIR1/FOO.;1', rr_name='foo', joliet_path='/dir1/foo')
+
+    out = BytesIO()
+    iso.write_fp(out)
+
+    iso.close()
+
+    iso = pycdlib.PyCdlib()
+    iso.open_fp(out, lazy=True)
+
+    # Removing the file must also remove the Joliet entry linked to it, even
+    # though that directory had not been parsed yet.
+    iso.rm_file('/DIR1/FOO.;1', rr_name='foo')
+
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        iso.get_file_from_iso_fp(BytesIO(), joliet_path='/dir1/foo')
+
+    assert(len(iso.inodes) == 0)
+
+    iso.close()
+
+def test_new_open_fp_lazy_list_relocated():
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09')
+
+    iso_path = ''
+    for name in ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']:
+        iso_path += '/' + name.upper()
+        iso.add_directory(iso_path, rr_name=name)
+    foostr = b"foo\n"
+    iso.add_fp(BytesIO(foostr), len(foostr), '/A/B/C/D/E/F/G/FOO.;1', rr_name='foo')
+
+    out = BytesIO()
+    iso.write_fp(out)
+
+    iso.close()
+
+    iso = pycdlib.PyCdlib()
+    iso.open_fp(out, lazy=True)
+
+    # The child link in G points at a directory under RR_MOVED, which has not
+    # been parsed yet.
+    children = list(iso.list_children(rr_path='/a/b/c/d/e/f/g'))
+    assert(len(children) == 4)
+    names = [child.rock_ridge.name() for child in children if not child.is_dot() and not child.is_dotdot()]
+    assert(sorted(names) == [b'foo', b'h'])
+
+    assert(len(list(iso.list_children(iso_path='/A/B/C/D/E/F/G'))) == 4)
+
+    iso.close()
+
+def test_new_path_index_per_instance():
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', udf='2.60')
+    iso.add_directory('/DIR1', rr_name='dir1', udf_path='/dir1')
+
+    iso2 = pycdlib.PyCdlib()
+    iso2.new(rock_ridge='1.09', udf='2.60')
+    iso2.add_directory('/DIR1', rr_name='dir1', udf_path='/dir1')
+
+    rec = iso.get_record(iso_path='/DIR1')
+    rec2 = iso2.get_record(iso_path='/DIR1')
+    assert(rec is not rec2)
+    assert(iso.get_record(rr_path='/dir1') is rec)
+    udf_rec = iso.get_record(udf_path='/dir1')
+
+    # Removing from one instance must not affect lookups in the other.
+    iso.rm_directory('/DIR1', rr_name='dir1', udf_path='/dir1')
+    assert(iso2.get_record(iso_path='/DIR1') is rec2)
+
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        iso.get_record(iso_path='/DIR1')
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        iso.get_record(rr_path='/dir1')
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        iso.get_record(udf_path='/dir1')
+
+    # A new entry at the same path must be found, not the removed one.
+    iso.add_directory('/DIR1', rr_name='dir1', udf_path='/dir1')
+    assert(iso.get_record(iso_path='/DIR1') is not rec)
+    assert(iso.get_record(rr_path='/dir1') is not rec)
+    assert(iso.get_record(udf_path='/dir1') is not udf_rec)
+
+    iso2.close()
+    iso.close()
+
+def test_new_write_fp_sequential(fixed_time):
+    class NonSeekable(object):
+        def __init__(self):
+            self.out = BytesIO()
+
+        def write(self, data):
+            self.out.write(data)
+
+    iso = pycdlib.PyCdlib()
+    iso.new(interchange_level=4, joliet=3, rock_ridge='1.09', udf='2.60')
+
+    iso.add_directory('/DIR1', rr_name='dir1', joliet_path='/dir1', udf_path='/dir1')
+    bootstr = b'\x00' * 128
+    iso.add_fp(BytesIO(bootstr), len(bootstr), '/BOOT.;1', rr_name='boot', joliet_path='/boot', udf_path='/boot')
+    iso.add_eltorito('/BOOT.;1', '/BOOT.CAT;1', boot_info_table=True)
+    foostr = b'foo\n'
+    iso.add_fp(BytesIO(foostr), len(foostr), '/DIR1/FOO.;1', rr_name='foo', joliet_path='/dir1/foo', udf_path='/dir1/foo')
+
+    seekable = BytesIO()
+    iso.write_fp(seekable)
+
+    nonseekable = NonSeekable()
+    iso.write_fp(nonseekable, sequential=True)
+
+    assert(nonseekable.out.getvalue() == seekable.getvalue())
+
+    iso.close()
+
+def test_new_write_fp_sequential_short_file(fixed_time):
+    class NonSeekable(object):
+        def __init__(self):
+            self.out = BytesIO()
+
+        def write(self, data):
+            self.out.write(data)
+
+    iso = pycdlib.PyCdlib()
+    iso.new()
+
+    # The first file claims to be longer than the data behind it; everything
+    # written after it must still land where the seeking writer puts it.
+    iso.add_fp(BytesIO(b'short'), 5000, '/AAA.;1')
+    barstr = b'bar\n'
+    iso.add_fp(BytesIO(barstr), len(barstr), '/BBB.;1')
+
+    seekable = BytesIO()
+    iso.write_fp(seekable)
+
+    nonseekable = NonSeekable()
+    iso.write_fp(nonseekable, sequential=True)
+
+    assert(nonseekable.out.getvalue() == seekable.getvalue())
+
+    iso.close()
+
+def test_new_as_fileobj():
+    iso = pycdlib.PyCdlib()
+    iso.new(joliet=3, rock_ridge='1.09', udf='2.60')
+
+    bootstr = b'\x00' * 128
+    iso.add_fp(BytesIO(bootstr), len(bootstr), '/BOOT.;1', rr_name='boot', joliet_path='/boot', udf_path='/boot')
+    iso.add_eltorito('/BOOT.;1', '/BOOT.CAT;1', boot_info_table=True)
+    foostr = b'foo\n' * 1000
+    iso.add_fp(BytesIO(foostr), len(foostr), '/FOO.;1', rr_name='foo', joliet_path='/foo', udf_path='/foo')
+
+    out = BytesIO()
+    iso.write_fp(out)
+    iso.close()
+
+    iso.open_fp(out)
+    fileobj = iso.as_fileobj()
+    expected = out.getvalue()
+
+    assert(fileobj.seekable())
+    assert(fileobj.read() == expected)
+
+    # Random access reads spanning metadata, gaps and file data.
+    foo_offset = iso.get_record(iso_path='/FOO.;1').extent_location() * 2048
+    fileobj.seek(foo_offset - 10)
+    assert(fileobj.read(30) == expected[foo_offset - 10:foo_offset + 20])
+    fileobj.seek(-5, os.SEEK_END)
+    assert(fileobj.read(100) == expected[-5:])
+    assert(fileobj.read(1) == b'')
+
+    fileobj.close()
+    iso.close()
+
+def test_new_as_fileobj_managed_file(tmpdir):
+    foostr = b'foo\n' * 3000
+    foo = os.path.join(str(tmpdir), 'foo')
+    with open(foo, 'wb') as outfp:
+        outfp.write(foostr)
+
+    iso = pycdlib.PyCdlib()
+    iso.new()
+    iso.add_file(foo, '/FOO.;1')
+
+    expected = BytesIO()
+    iso.write_fp(expected)
+    expected = expected.getvalue()
+
+    fileobj = iso.as_fileobj()
+    data = b''
+    while True:
+        chunk = fileobj.read(1000)
+        if not chunk:
+            break
+        data += chunk
+    assert(data == expected)
+    # The managed file is opened once and kept for the life of the reader.
+    assert(len(fileobj._fps) == 1)
+
+    fileobj.close()
+    assert(len(fileobj._fps) == 0)
+    iso.close()
+
+def test_new_batch_always_consistent(fixed_time):
+    iso = pycdlib.PyCdlib(always_consistent=True)
+    iso.new(rock_ridge='1.09', joliet=3)
+
+    with iso.batch():
+        with iso.batch():
+            iso.add_directory('/DIR1', rr_name='dir1', joliet_path='/dir1')
+        # The inner batch must not reshuffle.
+        assert(iso._needs_reshuffle)
+        for i in range(20):
+            data = b'file%d\n' % (i)
+            iso.add_fp(BytesIO(data), len(data), '/DIR1/FILE%d.;1' % (i),
+                       rr_name='file%d' % (i), joliet_path='/dir1/file%d' % (i))
+        iso.rm_file('/DIR1/FILE0.;1', rr_name='file0', joliet_path='/dir1/file0')
+
+    assert(not iso._needs_reshuffle)
+    batched = BytesIO()
+    iso.write_fp(batched)
+
+    # A full reshuffle after the batch must not change anything.
+    iso._reshuffle_extents()
+    reshuffled = BytesIO()
+    iso.write_fp(reshuffled)
+    assert(batched.getvalue() == reshuffled.getvalue())
+
+    out = BytesIO()
+    iso.get_file_from_iso_fp(out, rr_path='/dir1/file19')
+    assert(out.getvalue() == b'file19\n')
+
+    iso.close()
+
+def test_new_incremental_reshuffle():
+    iso = pycdlib.PyCdlib(always_consistent=True)
+    iso.new(rock_ridge='1.09', joliet=3)
+
+    iso.add_directory('/DIR1', rr_name='dir1', joliet_path='/dir1')
+    for name in ('BBB', 'DDD', 'FFF'):
+        data = name.encode('utf-8') * 1000
+        iso.add_fp(BytesIO(data), len(data), '/%s.;1' % (name),
+                   rr_name=name.lower(), joliet_path='/' + name.lower())
+    # Adding files that do not grow any directories keeps the layout of the
+    # metadata, and only moves the files that come after the new one.
+    assert(iso._file_layout is not None)
+    fff_extent = iso.get_record(iso_path='/FFF.;1').extent_location()
+
+    data = b'ccc'
+    iso.add_fp(BytesIO(data), len(data), '/CCC.;1', rr_name='ccc', joliet_path='/ccc')
+    assert(iso._file_layout is not None)
+    assert(iso.get_record(iso_path='/FFF.;1').extent_location() == fff_extent + 1)
+
+    iso.rm_file('/DDD.;1', rr_name='ddd')
+    assert(iso._file_layout is not None)
+
+    extents = [iso.get_record(iso_path=path).extent_location() for path in ('/BBB.;1', '/CCC.;1', '/FFF.;1')]
+
+    # A full reshuffle must agree with the incremental one.
+    iso._file_layout = None
+    iso._reshuffle_extents()
+    assert([iso.get_record(iso_path=path).extent_location() for path in ('/BBB.;1', '/CCC.;1', '/FFF.;1')] == extents)
+
+    # Adding a directory changes the metadata, so everything is reassigned.
+    iso.add_directory('/DIR2', rr_name='dir2', joliet_path='/dir2')
+    assert(iso.get_record(iso_path='/FFF.;1').extent_location() > extents[2])
+
+    out = BytesIO()
+    iso.write_fp(out)
+    iso.close()
+
+def test_new_incremental_reshuffle_suffix():
+    iso = pycdlib.PyCdlib()
+    iso.new(joliet=3)
+
+    for dirname in ('AAA', 'BBB', 'CCC'):
+        iso.add_directory('/' + dirname, joliet_path='/' + dirname.lower())
+        for name in ('F1', 'F2'):
+            data = (dirname + name).encode('utf-8') * 1000
+            iso.add_fp(BytesIO(data), len(data), '/%s/%s.;1' % (dirname, name),
+                       joliet_path='/%s/%s' % (dirname.lower(), name.lower()))
+    iso.force_consistency()
+    layout = iso._file_layout
+    assert(layout is not None)
+    aaa = layout.inodes[:2]
+
+    # Only the files from the first changed directory onwards are placed
+    # again.
+    iso.rm_file('/BBB/F1.;1')
+    assert(layout.first_dirty == layout.dir_index[id(iso.get_record(iso_path='/BBB'))])
+    iso.force_consistency()
+    assert(iso._file_layout is layout)
+    assert(layout.first_dirty is None)
+    assert(layout.inodes[:2] == aaa)
+    assert(len(layout.inodes) == 5)
+
+    extents = [iso.get_record(iso_path=path).extent_location() for path in ('/AAA/F2.;1', '/BBB/F2.;1', '/CCC/F1.;1')]
+    iso._file_layout = None
+    iso.force_consistency()
+    assert([iso.get_record(iso_path=path).extent_location() for path in ('/AAA/F2.;1', '/BBB/F2.;1', '/CCC/F1.;1')] == extents)
+
+    iso.close()
+
+def test_new_extract_tree_rr(tmpdir):
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3)
+
+    iso.add_directory('/DIR1', rr_name='dir1', joliet_path='/dir1')
+    foostr = b'foo\n'
+    iso.add_fp(BytesIO(foostr), len(foostr), '/DIR1/FOO.;1', rr_name='foo', joliet_path='/dir1/foo')
+    bigstr = b'big\n' * 10000
+    iso.add_fp(BytesIO(bigstr), len(bigstr), '/BIG.;1', rr_name='big', joliet_path='/big')
+    iso.add_hard_link(iso_old_path='/BIG.;1', iso_new_path='/BIG2.;1', rr_name='big2')
+    iso.add_symlink('/SYM.;1', 'sym', 'dir1/foo')
+
+    out = BytesIO()
+    iso.write_fp(out)
+    iso.close()
+
+    iso.open_fp(out)
+    for workers in (1, 3):
+        dest = os.path.join(str(tmpdir), 'rr%d' % (workers))
+        iso.extract_tree(dest, workers=workers)
+
+        with open(os.path.join(dest, 'dir1', 'foo'), 'rb') as fp:
+            assert(fp.read() == foostr)
+        with open(os.path.join(dest, 'big2'), 'rb') as fp:
+            assert(fp.read() == bigstr)
+        assert(os.stat(os.path.join(dest, 'big')).st_ino == os.stat(os.path.join(dest, 'big2')).st_ino)
+        assert(os.readlink(os.path.join(dest, 'sym')) == 'dir1/foo')
+        assert(os.stat(os.path.join(dest, 'big')).st_mode & 0o7777 == 0o444)
+        assert(os.stat(os.path.join(dest, 'dir1')).st_mode & 0o7777 == 0o555)
+
+    dest = os.path.join(str(tmpdir), 'joliet')
+    iso.extract_tree(dest, namespace='joliet', workers=2)
+    assert(sorted(os.listdir(dest)) == ['big', 'dir1'])
+    with open(os.path.join(dest, 'big'), 'rb') as fp:
+        assert(fp.read() == bigstr)
+
+    iso.close()
+
+def test_new_extract_tree_bad_namespace(tmpdir):
+    iso = pycdlib.PyCdlib()
+    iso.new()
+
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        iso.extract_tree(str(tmpdir), namespace='rr')
+
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        iso.extract_tree(str(tmpdir), namespace='bogus')
+
+    iso.close()
+
+def test_new_open_file_from_iso(tmpdir):
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3)
+
+    datastr = b''.join([struct.pack('=L', i) for i in range(10000)])
+    iso.add_fp(BytesIO(datastr), len(datastr), '/DATA.;1', rr_name='data', joliet_path='/data')
+    bootstr = b'\x00' * 2048 * 2
+    iso.add_fp(BytesIO(bootstr), len(bootstr), '/BOOT.;1', rr_name='boot')
+    iso.add_eltorito('/BOOT.;1', '/BOOT.CAT;1', boot_info_table=True)
+
+    outfile = str(tmpdir.join('openfile.iso'))
+    iso.write(outfile)
+    iso.close()
+
+    iso.open(outfile)
+
+    first = iso.open_file_from_iso(rr_path='/data')
+    second = iso.open_file_from_iso(joliet_path='/data')
+    assert(first.seekable())
+    assert(first.seek(0, os.SEEK_END) == len(datastr))
+    first.seek(400)
+    second.seek(1000)
+    assert(first.read(8) == datastr[400:408])
+    assert(second.read(8) == datastr[1000:1008])
+    assert(first.read(8) == datastr[408:416])
+    second.seek(-4, os.SEEK_END)
+    assert(second.read() == datastr[-4:])
+    assert(second.read() == b'')
+    first.close()
+    second.close()
+
+    out = BytesIO()
+    iso.get_file_from_iso_fp(out, iso_path='/BOOT.;1')
+    with iso.open_file_from_iso(iso_path='/BOOT.;1') as boot:
+        assert(boot.read() == out.getvalue())
+        boot.seek(4)
+        assert(boot.read(20) == out.getvalue()[4:24])
+
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        iso.open_file_from_iso(iso_path='/')
+
+    iso.close()
+
+def test_new_concurrent_reads(tmpdir):
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3, udf='2.60')
+
+    datas = {}
+    for i in range(10):
+        iso.add_directory('/DIR%d' % (i), rr_name='dir%d' % (i), joliet_path='/dir%d' % (i), udf_path='/dir%d' % (i))
+        for j in range(4):
+            datastr = (b'%d-%d\n' % (i, j)) * (1000 * j + i)
+            iso.add_fp(BytesIO(datastr), len(datastr), '/DIR%d/FILE%d.;1' % (i, j),
+                       rr_name='file%d' % (j), joliet_path='/dir%d/file%d' % (i, j),
+                       udf_path='/dir%d/file%d' % (i, j))
+            datas[(i, j)] = datastr
+
+    outfile = str(tmpdir.join('concurrent.iso'))
+    iso.write(outfile)
+    iso.close()
+
+    iso.open(outfile, lazy=True)
+
+    errors = []
+    def reader(seed):
+        try:
+            for n in range(100):
+                i = (seed * 7 + n) % 10
+                j = n % 4
+                kwargs = [{'iso_path': '/DIR%d/FILE%d.;1' % (i, j)},
+                          {'rr_path': '/dir%d/file%d' % (i, j)},
+                          {'joliet_path': '/dir%d/file%d' % (i, j)},
+                          {'udf_path': '/dir%d/file%d' % (i, j)}][(seed + n) % 4]
+                out = BytesIO()
+                iso.get_file_from_iso_fp(out, **kwargs)
+                assert(out.getvalue() == datas[(i, j)])
+                assert(len(list(iso.list_children(rr_path='/dir%d' % (i)))) >= 6)
+        except Exception as e:
+            errors.append(e)
+
+    def writer():
+        try:
+            for n in range(20):
+                iso.add_fp(BytesIO(b'new\n'), 4, '/NEW%d.;1' % (n), rr_name='new%d' % (n), joliet_path='/new%d' % (n))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(6)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert(errors == [])
+    assert(len(list(iso.list_children(rr_path='/'))) == 2 + 10 + 20)
+
+    iso.close()
+
+def test_new_concurrent_reads_bytesio():
+    iso = pycdlib.PyCdlib()
+    iso.new(udf='2.60')
+
+    datas = {}
+    for i in range(8):
+        datastr = (b'%d' % (i)) * (20000 + i)
+        iso.add_fp(BytesIO(datastr), len(datastr), '/FILE%d.;1' % (i),
+                   udf_path='/file%d' % (i))
+        datas[i] = datastr
+
+    out = BytesIO()
+    iso.write_fp(out)
+    iso.close()
+
+    # A BytesIO has no file descriptor, so every read has to seek the one
+    # shared file object.
+    iso.open_fp(out)
+
+    errors = []
+    def reader(seed):
+        try:
+            for n in range(50):
+                i = (seed + n) % 8
+                kwargs = [{'iso_path': '/FILE%d.;1' % (i)}, {'udf_path': '/file%d' % (i)}][n % 2]
+                outfp = BytesIO()
+                iso.get_file_from_iso_fp(outfp, blocksize=512, **kwargs)
+                assert(outfp.getvalue() == datas[i])
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert(errors == [])
+
+    iso.close()
+
+def test_new_open_index_cache(tmpdir, fixed_time):
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3, udf='2.60')
+
+    iso.add_directory('/DIR1', rr_name='dir1', joliet_path='/dir1', udf_path='/dir1')
+    foostr = b'foo\n'
+    iso.add_fp(BytesIO(foostr), len(foostr), '/DIR1/FOO.;1', rr_name='foo', joliet_path='/dir1/foo', udf_path='/dir1/foo')
+
+    outfile = str(tmpdir.join('cached.iso'))
+    iso.write(outfile)
+    iso.close()
+
+    cachedir = str(tmpdir.join('cache'))
+    cache = pycdlib.indexcache.IndexCache(cachedir)
+
+    outs = []
+    for i in range(3):
+        iso.open(outfile, index_cache=cache)
+        assert(len(glob.glob(os.path.join(cachedir, '*.idx'))) == 1)
+        out = BytesIO()
+        iso.get_file_from_iso_fp(out, udf_path='/dir1/foo')
+        assert(out.getvalue() == foostr)
+        out = BytesIO()
+        iso.write_fp(out)
+        outs.append(out.getvalue())
+        iso.close()
+
+    assert(outs[0] == outs[1] == outs[2])
+
+    # Changing the ISO makes the old entry unreachable, and a new one is made.
+    iso.open(outfile, index_cache=cache)
+    iso.add_fp(BytesIO(foostr), len(foostr), '/DIR1/BAR.;1', rr_name='bar', joliet_path='/dir1/bar')
+    out = BytesIO()
+    iso.write_fp(out)
+    iso.close()
+    with open(outfile, 'wb') as fp:
+        fp.write(out.getvalue())
+
+    iso.open(outfile, index_cache=cache)
+    assert(len(glob.glob(os.path.join(cachedir, '*.idx'))) == 2)
+    assert(len(list(iso.list_children(rr_path='/dir1'))) == 4)
+    iso.close()
+
+    # A cache too small for any entry never keeps one.
+    small = pycdlib.indexcache.IndexCache(str(tmpdir.join('small')), max_size=1)
+    iso.open(outfile, index_cache=small)
+    assert(glob.glob(str(tmpdir.join('small', '*.idx'))) == [])
+    iso.close()
+
+def test_new_open_index_cache_tampered(tmpdir):
+    iso = pycdlib.PyCdlib()
+    iso.new()
+    foostr = b'foo\n'
+    iso.add_fp(BytesIO(foostr), len(foostr), '/FOO.;1')
+    outfile = str(tmpdir.join('cached.iso'))
+    iso.write(outfile)
+    iso.close()
+
+    cachedir = str(tmpdir.join('cache'))
+    cache = pycdlib.indexcache.IndexCache(cachedir)
+    iso.open(outfile, index_cache=cache)
+    iso.close()
+    [entry] = glob.glob(os.path.join(cachedir, '*.idx'))
+
+    # Replace the entry with a pickle that runs code when it is loaded; the
+    # forged entry does not carry a valid HMAC, so it must never be unpickled.
+    marker = str(tmpdir.join('marker'))
+    class Exploit(object):
+        def __reduce__(self):
+            return (open, (marker, 'w'))
+    with open(entry, 'rb') as infp:
+        data = infp.read()
+    payload = zlib.compress(pickle.dumps((os.path.basename(entry)[:-4], Exploit())))
+    with open(entry, 'wb') as outfp:
+        outfp.write(data[:len(pycdlib.indexcache.IndexCache.MAGIC) + 32] + payload)
+
+    iso.open(outfile, index_cache=cache)
+    assert(not os.path.exists(marker))
+    out = BytesIO()
+    iso.get_file_from_iso_fp(out, iso_path='/FOO.;1')
+    assert(out.getvalue() == foostr)
+    iso.close()
+
+    # An entry written with a different key is not trusted either.
+    other = pycdlib.indexcache.IndexCache(cachedir, secret=b'x' * 32)
+    assert(other.load(os.path.basename(entry)[:-4]) is None)
+
+    # The key file has to be private to the current user.
+    os.chmod(os.path.join(cachedir, 'secret.key'), 0o644)
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        pycdlib.indexcache.IndexCache(cachedir)
+
+def test_new_write_sparse(tmpdir, fixed_time):
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3)
+    zerostr = b'\x00' * (1024 * 1024)
+    iso.add_fp(BytesIO(zerostr), len(zerostr), '/ZERO.;1', rr_name='zero', joliet_path='/zero')
+    mixedstr = b'\x00' * 40000 + b'data' + b'\x00' * 40000
+    iso.add_fp(BytesIO(mixedstr), len(mixedstr), '/MIXED.;1', rr_name='mixed', joliet_path='/mixed')
+    foostr = b'foo\n'
+    iso.add_fp(BytesIO(foostr), len(foostr), '/FOO.;1', rr_name='foo', joliet_path='/foo')
+
+    dense = BytesIO()
+    iso.write_fp(dense)
+
+    # The output is truncated first, so stale contents do not leak through.
+    out = BytesIO(b'\xff' * (len(dense.getvalue()) + 4096))
+    skipped = iso.write_fp(out, sparse=True)
+    assert(out.getvalue() == dense.getvalue())
+    assert(skipped >= len(zerostr) + 32768)
+
+    outfile = str(tmpdir.join('sparse.iso'))
+    assert(iso.write(outfile, sparse=True) == skipped)
+    with open(outfile, 'rb') as fp:
+        assert(fp.read() == dense.getvalue())
+
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput) as excinfo:
+        iso.write_fp(BytesIO(), sequential=True, sparse=True)
+    assert(str(excinfo.value) == 'A sparse write needs to seek, so it cannot also be sequential')
+
+    iso.close()
+
+def test_new_write_workers(tmpdir, fixed_time):
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3, udf='2.60')
+    bootstr = b'\x01' * 5000
+    iso.add_fp(BytesIO(bootstr), len(bootstr), '/BOOT.;1', rr_name='boot', joliet_path='/boot', udf_path='/boot')
+    iso.add_eltorito('/BOOT.;1', '/BOOT.CAT;1', boot_info_table=True)
+    iso.add_directory('/DIR1', rr_name='dir1', joliet_path='/dir1', udf_path='/dir1')
+    for i in range(50):
+        data = b'file%d\n' % (i) * (i * 100 + 1)
+        iso.add_fp(BytesIO(data), len(data), '/DIR1/FILE%d.;1' % (i),
+                   rr_name='file%d' % (i), joliet_path='/dir1/file%d' % (i),
+                   udf_path='/dir1/file%d' % (i))
+    serialfile = str(tmpdir.join('serial.iso'))
+    iso.write(serialfile)
+    iso.close()
+
+    # Writing the data of an opened ISO with many threads gives the same
+    # result, and the progress still reaches the total.
+    iso.open(serialfile)
+    progress = []
+    parallelfile = str(tmpdir.join('parallel.iso'))
+    iso.write(parallelfile, workers=4,
+              progress_cb=lambda done, total: progress.append((done, total)))
+    with open(serialfile, 'rb') as fp:
+        expected = fp.read()
+    with open(parallelfile, 'rb') as fp:
+        assert(fp.read() == expected)
+    assert(progress[-1][0] == progress[-1][1] == len(expected))
+
+    # Without a file descriptor, the data is written by the calling thread.
+    out = BytesIO()
+    iso.write_fp(out, workers=4)
+    assert(out.getvalue() == expected)
+
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput) as excinfo:
+        iso.write_fp(BytesIO(), sequential=True, workers=2)
+    assert(str(excinfo.value) == 'A sequential write cannot use more than one worker')
+
+    iso.close()
+
+def test_new_write_metadata_coalesced(fixed_time):
+    class CountingBytesIO(io.BytesIO):
+        def __init__(self):
+            io.BytesIO.__init__(self)
+            self.writes = 0
+
+        def write(self, data):
+            self.writes += 1
+            return io.BytesIO.write(self, data)
+
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3)
+    for i in range(100):
+        iso.add_directory('/DIR%d' % (i), rr_name='dir%d' % (i), joliet_path='/dir%d' % (i))
+
+    out = CountingBytesIO()
+    iso.write_fp(out)
+    # Hundreds of directory and path table records, but only a handful of
+    # contiguous metadata regions.
+    assert(out.writes < 10)
+
+    seq = BytesIO()
+    iso.write_fp(seq, sequential=True)
+    assert(out.getvalue() == seq.getvalue())
+
+    iso.close()
+
+def test_new_compact_tree():
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3)
+    path = ''
+    for i in range(1, 9):
+        path += '/DIR%d' % (i)
+        iso.add_directory(path, rr_name='dir%d' % (i), joliet_path=path.lower())
+    data = b'deep\n'
+    iso.add_fp(BytesIO(data), len(data), path + '/FOO.;1', rr_name='foo',
+               joliet_path=path.lower() + '/foo')
+    iso.add_symlink('/SYM.;1', 'sym', 'dir1/foo', joliet_path='/sym')
+    out = BytesIO()
+    iso.write_fp(out)
+    iso.close()
+
+    iso.open_fp(out, lazy=True)
+
+    # The relocated directory shows up where its child link points to, just
+    # like it does in the full tree.
+    tree = iso.compact_tree('rr')
+    rec = tree.get_record('/dir1/dir2/dir3/dir4/dir5/dir6/dir7/dir8/foo')
+    assert(rec.is_file())
+    assert(rec.get_data_length() == len(data))
+    assert(rec.full_path() == '/dir1/dir2/dir3/dir4/dir5/dir6/dir7/dir8/foo')
+    assert(rec.file_mode() == 0o100444)
+    fp = BytesIO()
+    tree.get_file_from_iso_fp(fp, rec.full_path())
+    assert(fp.getvalue() == data)
+
+    sym = tree.get_record('/sym')
+    assert(sym.is_symlink())
+    assert(sym.symlink_path() == b'dir1/foo')
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        tree.get_file_from_iso_fp(BytesIO(), '/sym')
+
+    names = sorted(child.name() for child in tree.list_children('/'))
+    assert(names == [b'dir1', b'rr_moved', b'sym'])
+    assert(len([rec for rec in tree.walk() if rec.is_dir()]) == 11)
+
+    # It also shows up where it is physically recorded, again like in the
+    # full tree.
+    assert([child.name() for child in tree.list_children('/rr_moved')] == [b'dir8'])
+    assert(tree.get_record('/rr_moved/dir8/foo').is_file())
+    iso9660 = iso.compact_tree('iso9660')
+    assert([child.name() for child in iso9660.list_children('/RR_MOVED')] == [b'DIR8'])
+    assert(iso9660.get_record('/RR_MOVED/DIR8/FOO.;1').get_data_length() == len(data))
+    assert(iso.get_record(iso_path='/RR_MOVED/DIR8/FOO.;1').get_data_length() == len(data))
+
+    # Anything that the columns do not answer comes from the full record.
+    assert(rec.rock_ridge.name() == b'foo')
+    assert(rec.parent.is_dir())
+
+    joliet = iso.compact_tree('joliet')
+    rec = joliet.get_record('/dir1/dir2/dir3/dir4/dir5/dir6/dir7/dir8/foo')
+    assert(rec.file_identifier() == 'foo'.encode('utf-16_be'))
+    fp = BytesIO()
+    joliet.get_file_from_iso_fp(fp, '/dir1/dir2/dir3/dir4/dir5/dir6/dir7/dir8/foo')
+    assert(fp.getvalue() == data)
+
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput):
+        iso.compact_tree('udf')
+
+    iso.close()
+
+def test_new_udf_unsorted_lookup():
+    iso = pycdlib.PyCdlib()
+    iso.new(udf='2.60')
+
+    iso.add_directory('/DIR1', udf_path='/dir1')
+    udf_dir = iso.get_record(udf_path='/dir1')
+    # Make the lookups go through the unsorted path, as for a directory
+    # written by another tool.
+    udf_dir.icb_tag.flags &= ~0x8
+    udf_dir.is_sorted = False
+
+    for index, name in enumerate(['zed', 'alpha', 'été', '日本']):
+        data = name.encode('utf-8')
+        iso.add_fp(BytesIO(data), len(data), '/DIR1/FILE%d.;1' % (index), udf_path='/dir1/' + name)
+
+    assert(udf_dir.find_file_ident_desc_by_name('日本'.encode('utf-8')).encoding == 'utf-16_be')
+    assert(udf_dir.find_file_ident_desc_by_name('été'.encode('utf-8')).encoding == 'latin-1')
+    assert(udf_dir.find_file_ident_desc_by_name(b'missing') is None)
+
+    iso.rm_file('/DIR1/FILE3.;1', udf_path='/dir1/日本')
+    assert(udf_dir.find_file_ident_desc_by_name('日本'.encode('utf-8')) is None)
+    iso.rm_file('/DIR1/FILE0.;1', udf_path='/dir1/zed')
+    assert(udf_dir.find_file_ident_desc_by_name(b'zed') is None)
+    assert(udf_dir.find_file_ident_desc_by_name(b'alpha') is not None)
+
+    data = b'again'
+    iso.add_fp(BytesIO(data), len(data), '/DIR1/FILE0.;1', udf_path='/dir1/zed')
+    fp = BytesIO()
+    iso.get_file_from_iso_fp(fp, udf_path='/dir1/zed')
+    assert(fp.getvalue() == data)
+
+    iso.close()
+
+def test_new_udf_multi_extent_directory(monkeypatch):
+    # Shrink the largest allocation descriptor so that a small directory
+    # needs several of them, with descriptors spanning the boundaries.
+    monkeypatch.setattr(pycdlib.udf, '_MAX_ALLOC_LEN', 2 * 2048)
+
+    iso = pycdlib.PyCdlib()
+    iso.new(udf='2.60')
+    iso.add_directory('/DIR1', udf_path='/dir1')
+    names = ['file%03d' % (index) + 'x' * 50 for index in range(150)]
+    for index, name in enumerate(names):
+        data = name.encode('utf-8')
+        iso.add_fp(BytesIO(data), len(data), '/DIR1/F%d.;1' % (index), udf_path='/dir1/' + name)
+
+    out = BytesIO()
+    iso.write_fp(out)
+    udf_dir = iso.get_record(udf_path='/dir1')
+    assert(len(udf_dir.alloc_descs) > 2)
+    for (length, pos), (next_length_unused, next_pos) in zip(udf_dir.alloc_descs, udf_dir.alloc_descs[1:]):
+        assert(length == 2 * 2048)
+        assert(next_pos == pos + 2)
+    iso.close()
+
+    iso2 = pycdlib.PyCdlib()
+    iso2.open_fp(out)
+    udf_dir = iso2.get_record(udf_path='/dir1')
+    assert(len(udf_dir.alloc_descs) > 2)
+    assert(len(list(iso2.list_children(udf_path='/dir1'))) == len(names) + 1)
+    for name in (names[0], names[70], names[-1]):
+        fp = BytesIO()
+        iso2.get_file_from_iso_fp(fp, udf_path='/dir1/' + name)
+        assert(fp.getvalue() == name.encode('utf-8'))
+
+    # Writing the parsed ISO back out must give the same bytes.
+    out2 = BytesIO()
+    iso2.write_fp(out2)
+    assert(out2.getvalue() == out.getvalue())
+    iso2.close()
+
+def test_new_udf_parsed_names_round_trip(tmpdir, fixed_time):
+    iso = pycdlib.PyCdlib()
+    iso.new(udf='2.60')
+    iso.add_directory('/DIR1', udf_path='/dir1')
+    foostr = b'foo\n'
+    iso.add_fp(BytesIO(foostr), len(foostr), '/FOO.;1', udf_path='/foo')
+    iso.add_fp(BytesIO(foostr), len(foostr), '/DIR1/BAR.;1', udf_path='/dir1/bar')
+    impl_use = iso.get_record(udf_path='/foo').file_ident.impl_use
+    extended_attrs = iso.get_record(udf_path='/foo').extended_attrs
+    outfile = str(tmpdir.join('udfnames.iso'))
+    iso.write(outfile)
+    iso.close()
+
+    # The File Identifier Descriptors are parsed out of a view of the
+    # directory data; the names and other byte fields must come back as the
+    # data itself, with and without a memory-mapped ISO.
+    for mmap in (False, True):
+        iso.open(outfile, mmap=mmap)
+        names = [child.file_identifier() for child in iso.list_children(udf_path='/')
+                 if child is not None]
+        assert(sorted(names) == [b'dir1', b'foo'])
+        rec = iso.get_record(udf_path='/foo')
+        assert(rec.file_ident.fi == b'foo')
+        assert(type(rec.file_ident.fi) == bytes)
+        assert(rec.file_ident.impl_use == impl_use)
+        assert(rec.extended_attrs == extended_attrs)
+        for path in ('/foo', '/dir1/bar'):
+            out = BytesIO()
+            iso.get_file_from_iso_fp(out, udf_path=path)
+            assert(out.getvalue() == foostr)
+        out = BytesIO()
+        iso.write_fp(out)
+        with open(outfile, 'rb') as infp:
+            assert(out.getvalue() == infp.read())
+        iso.close()
+
+
+def test_new_shared_records_per_instance(tmpdir, fixed_time):
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09')
+    foostr = b'foo\n'
+    iso.add_fp(BytesIO(foostr), len(foostr), '/FOO.;1', rr_name='foo')
+    iso.add_fp(BytesIO(foostr), len(foostr), '/BAR.;1', rr_name='bar')
+    outfile = str(tmpdir.join('shared.iso'))
+    iso.write(outfile)
+    iso.close()
+
+    iso1 = pycdlib.PyCdlib()
+    iso1.open(outfile)
+    iso2 = pycdlib.PyCdlib()
+    iso2.open(outfile)
+
+    # Identical records are shared within one ISO...
+    foo1 = iso1.get_record(iso_path='/FOO.;1')
+    bar1 = iso1.get_record(iso_path='/BAR.;1')
+    assert(foo1.rock_ridge.dr_entries.px_record is bar1.rock_ridge.dr_entries.px_record)
+    assert(foo1.date is bar1.date)
+
+    # ...but never between PyCdlib objects.
+    foo2 = iso2.get_record(iso_path='/FOO.;1')
+    assert(foo1.rock_ridge.dr_entries.px_record is not foo2.rock_ridge.dr_entries.px_record)
+    assert(foo1.rock_ridge.dr_entries.tf_record is not foo2.rock_ridge.dr_entries.tf_record)
+    assert(foo1.date is not foo2.date)
+    assert(iso1.pvd.volume_creation_date is not iso2.pvd.volume_creation_date)
+
+    # Changing a shared record in one ISO leaves the others alone.
+    foo1.rock_ridge.add_to_file_links()
+    assert(foo1.rock_ridge.dr_entries.px_record.posix_file_links == 2)
+    assert(bar1.rock_ridge.dr_entries.px_record.posix_file_links == 1)
+    assert(foo2.rock_ridge.dr_entries.px_record.posix_file_links == 1)
+
+    iso1.close()
+    iso2.close()
+
+def test_new_shared_fp_concurrent_writes(fixed_time):
+    iso = pycdlib.PyCdlib()
+    iso.new(rock_ridge='1.09', joliet=3)
+    datas = {}
+    for i in range(8):
+        datastr = (b'%d' % (i)) * (30000 + i)
+        iso.add_fp(BytesIO(datastr), len(datastr), '/FILE%d.;1' % (i),
+                   rr_name='file%d' % (i), joliet_path='/file%d' % (i))
+        datas[i] = datastr
+    out = BytesIO()
+    iso.write_fp(out)
+    iso.close()
+
+    # A BytesIO has no file descriptor, so every object sharing it has to
+    # seek it to read from it.
+    iso.open_fp(out)
+    expected = BytesIO()
+    iso.write_fp(expected)
+    others = []
+    for n_unused in range(2):
+        other = pycdlib.PyCdlib()
+        other.open_fp(out)
+        others.append(other)
+
+    errors = []
+    def writer(obj, sequential):
+        try:
+            for n_unused in range(5):
+                outfp = BytesIO()
+                obj.write_fp(outfp, blocksize=512, sequential=sequential)
+                assert(outfp.getvalue() == expected.getvalue())
+        except Exception as e:
+            errors.append(e)
+    def reader():
+        try:
+            for n in range(40):
+                outfp = BytesIO()
+                iso.get_file_from_iso_fp(outfp, blocksize=512, iso_path='/FILE%d.;1' % (n % 8))
+                assert(outfp.getvalue() == datas[n % 8])
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=writer, args=(others[0], False)),
+                   threading.Thread(target=writer, args=(others[1], True)),
+                   threading.Thread(target=reader)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert(errors == [])
+
+    for obj in others:
+        obj.close()
+    iso.close()
@@ -0,0 +1,82 @@
+from __future__ import absolute_import, print_function
+
+import pytest
+import os
+import random
+import sys
+import timeit
+
+prefix = '.'
+for i in range(0, 3):
+    if os.path.isdir(os.path.join(prefix, 'pycdlib')):
+        sys.path.insert(0, prefix)
+        break
+    else:
+        prefix = '../' + prefix
+
+import pycdlib
+import pycdlib.checksum
+
+# These are unit tests for the checksum backends.  Every backend has to agree
+# with the pure Python reference implementation, which is the definition of
+# each checksum.  The benchmarks at the end only run with --runslow, and print
+# the time each backend takes on data of the sizes PyCdlib sees.
+
+FUNCTIONS = ['crc_ccitt', 'byte_sum', 'word16_sum', 'word32_sum']
+
+@pytest.fixture(params=pycdlib.checksum.backends())
+def backend(request):
+    previous = pycdlib.checksum.get_backend()
+    pycdlib.checksum.set_backend(request.param)
+    yield request.param
+    pycdlib.checksum.set_backend(previous)
+
+def random_data(length):
+    rand = random.Random(length)
+    return bytes(bytearray(rand.getrandbits(8) for i in range(length)))
+
+def test_checksum_known_values(backend):
+    assert(pycdlib.checksum.crc_ccitt(b'123456789') == 0x31c3)
+    assert(pycdlib.checksum.byte_sum(b'\xff\xff\x02') == 0x200)
+    assert(pycdlib.checksum.word16_sum(b'\xff\xff\x02\x00') == 0x1)
+    assert(pycdlib.checksum.word32_sum(b'\xff\xff\xff\xff\x02\x00\x00\x00') == 0x1)
+    for name in FUNCTIONS:
+        assert(getattr(pycdlib.checksum, name)(b'') == 0)
+
+@pytest.mark.parametrize('length', [4, 16, 32, 2048, 8192, 65536])
+def test_checksum_matches_reference(backend, length):
+    data = random_data(length)
+    for name in FUNCTIONS:
+        reference = getattr(pycdlib.checksum, name + '_reference')
+        assert(getattr(pycdlib.checksum, name)(data) == reference(data))
+        assert(getattr(pycdlib.checksum, name)(bytearray(data)) == reference(data))
+
+def test_checksum_bad_backend():
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidInput) as excinfo:
+        pycdlib.checksum.set_backend('bogus')
+    assert(str(excinfo.value).startswith('Unknown checksum backend bogus'))
+
+@pytest.mark.slow
+@pytest.mark.parametrize('name,length', [
+    ('crc_ccitt', 2048),
+    ('byte_sum', 16),
+    ('word16_sum', 32),
+    ('word32_sum', 1024 * 1024),
+])
+def test_checksum_benchmark(name, length):
+    data = random_data(length)
+    previous = pycdlib.checksum.get_backend()
+    times = {}
+    for backend in pycdlib.checksum.backends():
+        pycdlib.checksum.set_backend(backend)
+        func = getattr(pycdlib.checksum, name)
+        number = max(1, 2000000 // (length * 8))
+        times[backend] = min(timeit.repeat(lambda: func(data), number=number, repeat=3)) / number
+    pycdlib.checksum.set_backend(previous)
+
+    for backend in sorted(times):
+        print('%s(%d bytes) %s: %.2f us' % (name, length, backend, times[backend] * 1000000))
+    # On tiny inputs, call overhead dominates and the timings are too noisy
+    # to compare.
+    if length >= 2048:
+        assert(times['stdlib'] < times['reference'])
@@ -0,0 +1,93 @@
+from __future__ import absolute_import
+
+import pytest
+import os
+import sys
+
+prefix = '.'
+for i in range(0, 3):
+    if os.path.isdir(os.path.join(prefix, 'pycdlib')):
+        sys.path.insert(0, prefix)
+        break
+    else:
+        prefix = '../' + prefix
+
+import pycdlib
+
+# These are deep unit tests for the DirectoryRecordChildren class.  The
+# packing of children into blocks has enough corner cases that it should
+# have its own tests.
+
+class FakeChild(object):
+    def __init__(self, name, dr_len):
+        self.name = name
+        self.dr_len = dr_len
+
+    def __lt__(self, other):
+        return self.name < other.name
+
+def insert_sorted(children, child):
+    children.insert(children.bisect_left(child), child)
+
+def test_drchildren_append_packs_blocks():
+    children = pycdlib.dr.DirectoryRecordChildren(100)
+    a = FakeChild(b'a', 60)
+    b = FakeChild(b'b', 40)
+    c = FakeChild(b'c', 10)
+    for child in (a, b, c):
+        insert_sorted(children, child)
+
+    assert(len(children) == 3)
+    assert(list(children) == [a, b, c])
+    assert(children.extents_and_offset(a) == (1, 60))
+    assert(children.extents_and_offset(b) == (1, 100))
+    assert(children.extents_and_offset(c) == (2, 10))
+    assert(children.num_extents() == 2)
+    assert(children.last_offset() == 10)
+
+def test_drchildren_insert_pushes_into_next_block():
+    children = pycdlib.dr.DirectoryRecordChildren(100)
+    a = FakeChild(b'a', 60)
+    c = FakeChild(b'c', 40)
+    d = FakeChild(b'd', 80)
+    for child in (a, c, d):
+        insert_sorted(children, child)
+    assert(children.num_extents() == 2)
+
+    # Inserting 'b' overflows the first block, which pushes 'c' into the
+    # second block, which in turn pushes 'd' into a third block.
+    b = FakeChild(b'b', 20)
+    insert_sorted(children, b)
+
+    assert(list(children) == [a, b, c, d])
+    assert(children.extents_and_offset(b) == (1, 80))
+    assert(children.extents_and_offset(c) == (2, 40))
+    assert(children.extents_and_offset(d) == (3, 80))
+    assert(children.index(d) == 3)
+    assert(children[-1] is d)
+
+def test_drchildren_remove_pulls_from_next_block():
+    children = pycdlib.dr.DirectoryRecordChildren(100)
+    a = FakeChild(b'a', 60)
+    b = FakeChild(b'b', 20)
+    c = FakeChild(b'c', 40)
+    d = FakeChild(b'd', 80)
+    for child in (a, b, c, d):
+        insert_sorted(children, child)
+    assert(children.num_extents() == 3)
+
+    del children[children.index(b)]
+
+    assert(list(children) == [a, c, d])
+    assert(children.extents_and_offset(c) == (1, 100))
+    assert(children.extents_and_offset(d) == (2, 80))
+    assert(children.num_extents() == 2)
+
+    del children[0]
+    del children[0]
+    del children[0]
+    assert(len(children) == 0)
+    assert(children.num_extents() == 1)
+    assert(children.last_offset() == 0)
+    with pytest.raises(IndexError):
+        children[0]
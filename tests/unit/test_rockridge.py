@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+
+import pytest
+import os
+import sys
+
+prefix = '.'
+for i in range(0, 3):
+    if os.path.isdir(os.path.join(prefix, 'pycdlib')):
+        sys.path.insert(0, prefix)
+        break
+    else:
+        prefix = '../' + prefix
+
+import pycdlib
+
+# These are unit tests for the deferred decoding of the Rock Ridge entries
+# in RockRidge.parse.
+
+def new_rr_record(version, symlink_path=None):
+    rr = pycdlib.rockridge.RockRidge()
+    rr.new(False, b'foo', 0o100444, symlink_path, version, False, False,
+           False, 0, 33)
+    return rr.record_dr_entries()
+
+@pytest.mark.parametrize('version', ['1.09', '1.12'])
+def test_rr_parse_defers_entries(version):
+    rec = new_rr_record(version, b'dir1/foo')
+    rr = pycdlib.rockridge.RockRidge()
+    rr.parse(rec, False, 0, False)
+
+    # The version is known and the name is decoded without touching the
+    # PX, SL, or TF entries.
+    assert(rr.rr_version == version)
+    assert(rr.name() == b'foo')
+    assert(rr.is_symlink())
+    assert(rr.dr_entries._px_record is None)
+    assert(rr.dr_entries._tf_record is None)
+    assert(rr.dr_entries._sl_records == [])
+
+    assert(rr.get_file_mode() == 0o100444)
+    assert(rr.dr_entries._px_record is not None)
+    assert(rr.dr_entries._tf_record is None)
+    assert(rr.symlink_path() == b'dir1/foo')
+
+    assert(rr.record_dr_entries() == rec)
+    assert(rr.dr_entries._pending is None)
+
+def test_rr_parse_replace_deferred_entry():
+    rr = pycdlib.rockridge.RockRidge()
+    rr.parse(new_rr_record('1.09'), False, 0, False)
+
+    px = pycdlib.rockridge.RRPXRecord()
+    px.new(0o100755)
+    rr.dr_entries.px_record = px
+
+    # The deferred entry that was replaced is never decoded over the new one.
+    assert(rr.dr_entries.tf_record is not None)
+    assert(rr.get_file_mode() == 0o100755)
+
+def test_rr_parse_duplicate_px():
+    rec = new_rr_record('1.09')
+    px = pycdlib.rockridge.RRPXRecord()
+    px.new(0o100444)
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidISO):
+        pycdlib.rockridge.RockRidge().parse(rec + px.record('1.09'), False, 0, False)
+
+def test_rr_parse_shares_records():
+    rec = new_rr_record('1.09')
+    interned = pycdlib.utils.InternTable()
+    rr1 = pycdlib.rockridge.RockRidge()
+    rr1.parse(rec, False, 0, False, interned)
+    rr2 = pycdlib.rockridge.RockRidge()
+    rr2.parse(rec, False, 0, False, interned)
+
+    assert(rr1.dr_entries.rr_record is rr2.dr_entries.rr_record)
+    assert(rr1.dr_entries.px_record is rr2.dr_entries.px_record)
+    assert(rr1.dr_entries.tf_record is rr2.dr_entries.tf_record)
+
+    # Records are only shared through the same table.
+    rr3 = pycdlib.rockridge.RockRidge()
+    rr3.parse(rec, False, 0, False, pycdlib.utils.InternTable())
+    assert(rr3.dr_entries.px_record is not rr1.dr_entries.px_record)
+    rr4 = pycdlib.rockridge.RockRidge()
+    rr4.parse(rec, False, 0, False)
+    assert(rr4.dr_entries.px_record is not rr1.dr_entries.px_record)
+    assert(not rr4.dr_entries.px_record._shared)
+
+    # Changing one entry gives it its own copy of the shared record.
+    rr1.add_to_file_links()
+    assert(rr1.dr_entries.px_record is not rr2.dr_entries.px_record)
+    assert(rr1.dr_entries.px_record.posix_file_links == 2)
+    assert(rr2.dr_entries.px_record.posix_file_links == 1)
+    assert(rr2.record_dr_entries() == rec)
+    assert(rr1.record_dr_entries() != rec)
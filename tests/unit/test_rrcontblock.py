@@ -121,3 +121,41 @@ def test_rrcontentry_add_multiple():
     assert(rr._entries[1].length == 12)
     assert(rr._entries[2].offset == 40)
     assert(rr._entries[2].length == 12)
+
+def test_rrcontblocks_add_first_fit():
+    blocks = pycdlib.rockridge.RockRidgeContinuationBlocks()
+    (added, first, offset) = blocks.add_entry(2000, 2048)
+    assert(added)
+    assert(offset == 0)
+    (added, second, offset) = blocks.add_entry(100, 2048)
+    assert(added)
+    assert(second is not first)
+    (added, block, offset) = blocks.add_entry(48, 2048)
+    assert(not added)
+    assert(block is first)
+    assert(offset == 2000)
+
+    first.remove_entry(0, 2000)
+    (added, block, offset) = blocks.add_entry(1000, 2048)
+    assert(not added)
+    assert(block is first)
+    assert(offset == 0)
+    assert(len(blocks) == 2)
+
+def test_rrcontblocks_track_by_extent():
+    blocks = pycdlib.rockridge.RockRidgeContinuationBlocks()
+    first = blocks.track_entry(24, 0, 100, 2048)
+    second = blocks.track_entry(25, 0, 100, 2048)
+    assert(blocks.track_entry(24, 100, 50, 2048) is first)
+    assert(len(first._entries) == 2)
+
+    first.set_extent_location(30)
+    assert(blocks.track_entry(30, 150, 50, 2048) is first)
+    assert(blocks.track_entry(24, 0, 10, 2048) not in (first, second))
+    assert(len(blocks) == 3)
+
+def test_rrcontblocks_track_overlap():
+    blocks = pycdlib.rockridge.RockRidgeContinuationBlocks()
+    blocks.track_entry(24, 0, 100, 2048)
+    with pytest.raises(pycdlib.pycdlibexception.PyCdlibInvalidISO):
+        blocks.track_entry(24, 50, 100, 2048)
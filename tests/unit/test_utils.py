@@ -0,0 +1,87 @@
+from __future__ import absolute_import
+
+import pytest
+import os
+import sys
+from io import BytesIO
+
+prefix = '.'
+for i in range(0, 3):
+    if os.path.isdir(os.path.join(prefix, 'pycdlib')):
+        sys.path.insert(0, prefix)
+        break
+    else:
+        prefix = '../' + prefix
+
+import pycdlib
+import pycdlib.path_table_record
+import pycdlib.utils
+
+# These are unit tests for the data copying utilities.  Each of the ways of
+# copying (reflinks, copy_file_range, sendfile, and reading and writing) has
+# to give the same result, so the tests run with each of them disabled in
+# turn.
+
+METHODS = ['have_reflink', 'have_copy_file_range', 'have_sendfile']
+
+@pytest.fixture(params=range(len(METHODS) + 1))
+def copy_methods(request, monkeypatch):
+    for name in METHODS[:request.param]:
+        monkeypatch.setattr(pycdlib.utils, name, False)
+
+def make_input(tmpdir, length):
+    data = bytes(bytearray(i % 251 for i in range(length)))
+    path = str(tmpdir.join('in'))
+    with open(path, 'wb') as fp:
+        fp.write(data)
+    return (path, data)
+
+@pytest.mark.parametrize('in_offset,out_offset,length', [
+    (0, 0, 65536),
+    (2048, 0, 65536),
+    (2048, 6144, 70000),
+    (0, 2048, 4096),
+    (4096, 4096, 100),
+])
+def test_copy_data_from(tmpdir, copy_methods, in_offset, out_offset, length):
+    (inpath, data) = make_input(tmpdir, 81920)
+    outpath = str(tmpdir.join('out'))
+    with open(inpath, 'rb') as infp:
+        with open(outpath, 'wb') as outfp:
+            outfp.write(b'\xff' * out_offset)
+            pycdlib.utils.copy_data_from(length, 8192, infp, in_offset, outfp)
+            assert(outfp.tell() == out_offset + length)
+            outfp.write(b'end')
+
+    with open(outpath, 'rb') as fp:
+        out = fp.read()
+    assert(out == b'\xff' * out_offset + data[in_offset:in_offset + length] + b'end')
+
+def test_copy_data_short_input(tmpdir, copy_methods):
+    (inpath, data) = make_input(tmpdir, 10000)
+    out = BytesIO()
+    with open(inpath, 'rb') as infp:
+        infp.seek(5000)
+        pycdlib.utils.copy_data(20000, 4096, infp, out)
+        assert(infp.tell() == 25000)
+    assert(out.getvalue() == data[5000:])
+
+def test_stream_data_short_input():
+    out = BytesIO()
+    assert(pycdlib.utils.stream_data(20000, 4096, BytesIO(b'b' * 100 + b'a' * 10000), 100, out) == 10000)
+    assert(out.getvalue() == b'a' * 10000)
+
+def test_compile_struct_shared():
+    first = pycdlib.utils.compile_struct('=BBLH')
+    assert(pycdlib.utils.compile_struct('=BBLH') is first)
+    assert(first.size == 8)
+    # The record classes share the registry, so the same format compiled
+    # anywhere is the same object.
+    assert(pycdlib.path_table_record.PathTableRecord._STRUCT is first)
+
+def test_to_bytes_memoryview():
+    data = bytearray(b'abcdef')
+    assert(pycdlib.utils.to_bytes(memoryview(data)[1:4]) == b'bcd')
+    assert(type(pycdlib.utils.to_bytes(memoryview(data)[1:4])) == bytes)
+    assert(pycdlib.utils.to_bytes(data[1:4]) == b'bcd')
+    assert(pycdlib.utils.to_bytes(b'bcd') == b'bcd')